@@ -1,7 +1,7 @@
 # train_entry.py
 from core_logic import DataPreprocess
 import config
-from core_logic import reward_engine
+from core_logic import dataset_builder
 from core_logic import model_manager
 from core_logic import monitor_utils
 import numpy as np
@@ -114,47 +114,16 @@ def run_training(job_config_path=None):
             except Exception as e:
                 print(f"⚠️ Failed to update job config: {e}")
 
-    # 3. 构建离线强化学习数据集 (MDPDataset)
-    states, actions, rewards, terminals = [], [], [], []
-    for i in range(len(df) - 1):
-        row, row2 = df.iloc[i], df.iloc[i + 1]
-
-        # State: [bg, current_actions, current_y]
-        s = np.concatenate(
-            [
-                row[bg_features].values.astype(np.float32),
-                row[config.ACTION_FEATURES].values.astype(np.float32),
-                [float(row[target_col])],  # 使用 target_col
-            ]
-        )
-
-        # Action: normalized delta
-        a_raw = (
-            row2[config.ACTION_FEATURES].values - row[config.ACTION_FEATURES].values
-        ).astype(np.float32)
-        a_norm = np.clip(a_raw / action_stds, -1.0, 1.0)
-
-        # Reward: 使用 reward_engine 计算
-        r = reward_engine.calculate_reward(
-            float(row[target_col]),
-            float(row2[target_col]),
-            a_norm,  # 使用 target_col
-        )
-
-        states.append(s)
-        actions.append(a_norm)
-        rewards.append(r)
-        terminals.append(False)
-
-    # ⭐ 修正：d3rlpy 要求至少有一個端點，否則會噴 AssertionError
-    if terminals:
-        terminals[-1] = True
+    # 3. 构建离线强化学习数据集 (MDPDataset)，向量化建构所有转移
+    states, actions, rewards, terminals = dataset_builder.build_transitions(
+        df, bg_features, config.ACTION_FEATURES, target_col, action_stds, obs_dtype=np.float64
+    )
 
     dataset = d3rlpy.dataset.MDPDataset(
-        observations=np.array(states),
-        actions=np.array(actions),
-        rewards=np.array(rewards),
-        terminals=np.array(terminals),
+        observations=states,
+        actions=actions,
+        rewards=rewards,
+        terminals=terminals,
     )
 
     # 3. 初始化 IQL 模型
@@ -213,6 +182,9 @@ def run_training(job_config_path=None):
         else:
             stable_counter = 0
 
+    # 等待背景繪圖並補繪最後一個 epoch
+    callback.close()
+
     model_manager.save_policy_bundle(
         iql,
         os.path.join(run_dir, "final_model"),
@@ -8,7 +8,7 @@ import uvicorn
 import sys
 from fastapi import FastAPI, UploadFile, File, Form
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 import config
@@ -50,6 +50,7 @@ from backend.routers import (
     ai_router,
     chart_ai_router,
     draft_router,
+    admin_router,
 )
 
 
@@ -58,6 +59,22 @@ from contextlib import asynccontextmanager
 # --- Log Filter (過濾輪詢請求日誌) ---
 from backend.utils.log_filters import add_log_filter
 
+# --- Prometheus 指標 ---
+from backend.utils import metrics
+from backend.middleware.metrics import add_metrics_middleware
+from backend.dependencies import (
+    register_metrics_gauges,
+    get_profile_service,
+    get_session_eviction_service,
+    get_session_snapshot_service,
+    get_training_scheduler,
+)
+from backend.middleware.profiling import add_profiling_middleware
+
+loop_lag_monitor = metrics.LoopLagMonitor(
+    getattr(config, "METRICS_LOOP_LAG_INTERVAL", 0.5)
+)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -67,6 +84,19 @@ async def lifespan(app: FastAPI):
     add_log_filter("uvicorn.access", "/api/history")
     add_log_filter("uvicorn.access", "/api/dashboard/history")
     add_log_filter("uvicorn.access", "/health")
+    add_log_filter("uvicorn.access", "/metrics")
+
+    if getattr(config, "METRICS_ENABLED", True):
+        register_metrics_gauges()
+        loop_lag_monitor.start()
+
+    # Session 快照: 登記可還原的 session、背景預載模型並定期快照
+    if getattr(config, "SESSION_SNAPSHOT_ENABLED", True):
+        get_session_snapshot_service().start()
+
+    # 閒置 Session 淘汰 (背景定期檢查)
+    if getattr(config, "SESSION_EVICTION_ENABLED", True):
+        get_session_eviction_service().start()
 
     # 顯示啟動訊息
     print("=" * 60)
@@ -86,6 +116,12 @@ async def lifespan(app: FastAPI):
 
     # --- Shutdown ---
     print("正在關閉 Sigma2 API Server...")
+    await loop_lag_monitor.stop()
+    await get_session_eviction_service().stop()
+    if getattr(config, "SESSION_SNAPSHOT_ENABLED", True):
+        await get_session_snapshot_service().stop()
+    # 排隊中的訓練作業無法延續到下次啟動，標記為失敗 (執行中的子進程不受影響)
+    get_training_scheduler().shutdown()
     # 在此處可以添加釋放資源的邏輯 (例如關閉 DB 連線、停止背景任務)
     print("Sigma2 API Server 已關閉。")
 
@@ -98,6 +134,26 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# 自定義異常 (例如推理佇列已滿 503) 依其 status_code 回應
+from backend.utils.exceptions import Sigma2Exception
+from backend.middleware.exception_handler import sigma2_exception_handler
+
+app.add_exception_handler(Sigma2Exception, sigma2_exception_handler)
+
+# 請求數 / 延遲 (依 router 與路由模板)
+if getattr(config, "METRICS_ENABLED", True):
+    add_metrics_middleware(app)
+
+# 單一請求的取樣式剖析 (opt-in，結果見 /api/files/profiles)
+if getattr(config, "PROFILER_ENABLED", False):
+    add_profiling_middleware(app, get_profile_service())
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus 文字格式指標"""
+    return Response(metrics.render_latest(), media_type=metrics.CONTENT_TYPE)
+
 
 # --- 靜態檔案服務（No Cache）---
 class NoCacheStaticFiles(StaticFiles):
@@ -155,6 +211,12 @@ app.include_router(
     tags=["Draft - 建模暫存"],
 )
 
+app.include_router(
+    admin_router.router,
+    prefix="/api/admin",
+    tags=["Admin - 維運"],
+)
+
 
 # --- 向後相容的 API 路由 ---
 # 為了不破壞現有前端，保留舊的 API 路徑，轉發到新的 router
@@ -170,12 +232,14 @@ async def predict_legacy(request: dict):
 
 
 @app.get("/api/history")
-async def get_history_legacy(session_id: str = "default"):
-    """向後相容"""
+async def get_history_legacy(
+    session_id: str = "default", since: int = None, fields: str = None
+):
+    """向後相容 (since / fields 見 /api/dashboard/history)"""
     from backend.routers.dashboard_router import get_history
     from backend.dependencies import get_session_service
 
-    return await get_history(session_id, get_session_service())
+    return await get_history(session_id, get_session_service(), since, fields)
 
 
 @app.post("/api/clear")
@@ -192,11 +256,38 @@ async def clear_history_legacy(body: dict):
 async def simulator_next_legacy(body: dict):
     """向後相容"""
     from backend.routers.dashboard_router import simulator_next
-    from backend.dependencies import get_session_service, get_prediction_service
+    from backend.dependencies import (
+        get_session_service,
+        get_prediction_service,
+        get_simulator_readahead_service,
+    )
 
     session_id = body.get("session_id", "default")
     return await simulator_next(
-        session_id, get_session_service(), get_prediction_service()
+        session_id,
+        get_session_service(),
+        get_prediction_service(),
+        get_simulator_readahead_service(),
+    )
+
+
+@app.post("/api/simulator/seek")
+async def simulator_seek_legacy(body: dict):
+    """向後相容:跳轉模擬位置"""
+    from backend.routers.dashboard_router import simulator_seek
+    from backend.dependencies import (
+        get_session_service,
+        get_prediction_service,
+        get_simulator_readahead_service,
+    )
+
+    return await simulator_seek(
+        index=int(body.get("index", 0)),
+        session_id=body.get("session_id", "default"),
+        warmup=bool(body.get("warmup", True)),
+        session_service=get_session_service(),
+        prediction_service=get_prediction_service(),
+        readahead_service=get_simulator_readahead_service(),
     )
 
 
@@ -204,7 +295,12 @@ async def simulator_next_legacy(body: dict):
 async def simulator_load_file_legacy(request: dict):
     """向後相容：載入模擬檔案"""
     from backend.routers.dashboard_router import load_simulation_file
-    from backend.dependencies import get_file_service, get_session_service
+    from backend.dependencies import (
+        get_file_service,
+        get_session_service,
+        get_prediction_service,
+        get_simulator_readahead_service,
+    )
 
     filename = request.get("filename")
     session_id = request.get("session_id", "default")
@@ -214,6 +310,8 @@ async def simulator_load_file_legacy(request: dict):
         session_id=session_id,
         file_service=get_file_service(),
         session_service=get_session_service(),
+        prediction_service=get_prediction_service(),
+        readahead_service=get_simulator_readahead_service(),
     )
 
 
@@ -225,6 +323,8 @@ async def model_load_legacy(request: dict):
         get_prediction_service,
         get_session_service,
         get_file_service,
+        get_model_load_service,
+        get_simulator_readahead_service,
     )
 
     model_path = request.get("model_path")
@@ -236,9 +336,20 @@ async def model_load_legacy(request: dict):
         prediction_service=get_prediction_service(),
         session_service=get_session_service(),
         file_service=get_file_service(),
+        model_load_service=get_model_load_service(),
+        readahead_service=get_simulator_readahead_service(),
     )
 
 
+@app.get("/api/model/load_status/{ticket_id}")
+async def model_load_status_legacy(ticket_id: str):
+    """向後相容:查詢模型載入進度"""
+    from backend.routers.dashboard_router import get_model_load_status
+    from backend.dependencies import get_model_load_service
+
+    return await get_model_load_status(ticket_id, get_model_load_service())
+
+
 @app.get("/api/simulator/models")
 async def list_models_legacy(session_id: str = "default"):
     """向後相容：列出模型"""
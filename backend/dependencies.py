@@ -10,6 +10,14 @@ from backend.services.analysis_service import AnalysisService
 from backend.services.ai_service import AIService
 from backend.services.chart_ai_service import ChartAIService
 from backend.services.draft_service import DraftService
+from backend.services.model_load_service import ModelLoadService
+from backend.services.simulator_readahead import SimulatorReadAheadService
+from backend.services.event_bus import EventBus
+from backend.services.sensitivity_service import SensitivityService
+from backend.services.profile_service import ProfileService
+from backend.services.session_eviction import SessionEvictionService
+from backend.services.session_snapshot import SessionSnapshotService
+from backend.services.training_scheduler import TrainingScheduler
 
 # 新增 Intelligent Analysis 服務
 from backend.services.analysis.analysis_service import (
@@ -29,6 +37,14 @@ _analysis_service: AnalysisService = None
 _ai_service: AIService = None
 _chart_ai_service: ChartAIService = None
 _draft_service: DraftService = None
+_model_load_service: ModelLoadService = None
+_simulator_readahead_service: SimulatorReadAheadService = None
+_event_bus: EventBus = None
+_sensitivity_service: SensitivityService = None
+_profile_service: ProfileService = None
+_session_eviction_service: SessionEvictionService = None
+_session_snapshot_service: SessionSnapshotService = None
+_training_scheduler: TrainingScheduler = None
 
 # Intelligent Analysis 單例
 _intelligent_analysis_service: IntelligentAnalysisService = None
@@ -56,6 +72,11 @@ def get_prediction_service() -> PredictionService:
     global _prediction_service
     if _prediction_service is None:
         _prediction_service = PredictionService()
+        # 被淘汰的 session 回來時，於背景重新載入先前使用的模型
+        _prediction_service.model_load_service = get_model_load_service()
+        _prediction_service.model_target_sources.append(
+            get_session_service().take_model_target
+        )
     return _prediction_service
 
 
@@ -63,10 +84,18 @@ def get_analysis_service() -> AnalysisService:
     """取得分析服務 (舊版：進階分析與模型訓練)"""
     global _analysis_service
     if _analysis_service is None:
-        _analysis_service = AnalysisService()
+        _analysis_service = AnalysisService(scheduler=get_training_scheduler())
     return _analysis_service
 
 
+def get_training_scheduler() -> TrainingScheduler:
+    """取得訓練作業排程器"""
+    global _training_scheduler
+    if _training_scheduler is None:
+        _training_scheduler = TrainingScheduler()
+    return _training_scheduler
+
+
 def get_ai_service() -> AIService:
     """取得 AI 服務 (舊版：基本報告)"""
     global _ai_service
@@ -91,6 +120,72 @@ def get_draft_service() -> DraftService:
     return _draft_service
 
 
+def get_model_load_service() -> ModelLoadService:
+    """取得模型背景載入服務"""
+    global _model_load_service
+    if _model_load_service is None:
+        _model_load_service = ModelLoadService(event_bus=get_event_bus())
+    return _model_load_service
+
+
+def get_simulator_readahead_service() -> SimulatorReadAheadService:
+    """取得模擬器預讀服務"""
+    global _simulator_readahead_service
+    if _simulator_readahead_service is None:
+        _simulator_readahead_service = SimulatorReadAheadService()
+    return _simulator_readahead_service
+
+
+def get_event_bus() -> EventBus:
+    """取得看板事件匯流排"""
+    global _event_bus
+    if _event_bus is None:
+        _event_bus = EventBus()
+    return _event_bus
+
+
+def get_sensitivity_service() -> SensitivityService:
+    """取得敏感度曲線服務"""
+    global _sensitivity_service
+    if _sensitivity_service is None:
+        _sensitivity_service = SensitivityService(get_prediction_service())
+    return _sensitivity_service
+
+
+def get_profile_service() -> ProfileService:
+    """取得請求剖析服務"""
+    global _profile_service
+    if _profile_service is None:
+        _profile_service = ProfileService(get_file_service())
+    return _profile_service
+
+
+def get_session_eviction_service() -> SessionEvictionService:
+    """取得閒置 Session 淘汰服務"""
+    global _session_eviction_service
+    if _session_eviction_service is None:
+        _session_eviction_service = SessionEvictionService(
+            get_session_service(),
+            get_prediction_service(),
+            get_simulator_readahead_service(),
+            get_event_bus(),
+        )
+    return _session_eviction_service
+
+
+def get_session_snapshot_service() -> SessionSnapshotService:
+    """取得 Session 快照服務"""
+    global _session_snapshot_service
+    if _session_snapshot_service is None:
+        _session_snapshot_service = SessionSnapshotService(
+            get_session_service(),
+            get_prediction_service(),
+            get_file_service(),
+            get_model_load_service(),
+        )
+    return _session_snapshot_service
+
+
 def get_intelligent_analysis_service() -> IntelligentAnalysisService:
     """取得智能分析服務 (新版：CSV索引與工具查詢)"""
     global _intelligent_analysis_service
@@ -113,3 +208,49 @@ def get_llm_agent() -> SigmaAnalysisWorkflow:
         analysis_service=service,
         timeout=600,  # 設定為 10 分鐘
     )
+
+
+def register_metrics_gauges():
+    """註冊 /metrics 於擷取時計算的 gauge (Session / Agent / 模型快取 / 訓練子進程)"""
+    from backend.utils.metrics import registry
+    from core_logic.model_cache import model_cache
+
+    def cached_models():
+        counts = {}
+        for item in model_cache.stats()["items"]:
+            counts[(item["kind"],)] = counts.get((item["kind"],), 0) + 1
+        return counts
+
+    registry.gauge_callback(
+        "sigma2_sessions",
+        "Live sessions by kind.",
+        lambda: {(k,): v for k, v in get_session_service().counts().items()},
+        ("kind",),
+    )
+    registry.gauge_callback(
+        "sigma2_agents_loaded",
+        "AgenticReasoning agents held by PredictionService.",
+        lambda: get_prediction_service().agent_count(),
+    )
+    registry.gauge_callback(
+        "sigma2_models_cached",
+        "Models held by the shared model cache, by kind.",
+        cached_models,
+        ("kind",),
+    )
+    registry.gauge_callback(
+        "sigma2_model_cache_bytes",
+        "Estimated bytes held by the shared model cache.",
+        lambda: model_cache.stats()["bytes"],
+    )
+    registry.gauge_callback(
+        "sigma2_training_processes",
+        "Training subprocesses started by this server that are still running.",
+        lambda: get_analysis_service().running_training_count(),
+    )
+    registry.gauge_callback(
+        "sigma2_training_jobs",
+        "Training jobs tracked by the scheduler, by state.",
+        lambda: {(k,): v for k, v in get_training_scheduler().counts().items()},
+        ("state",),
+    )
@@ -4,9 +4,15 @@ Backend 中間件模組
 
 from .exception_handler import register_exception_handlers
 from .quiet_routes import add_quiet_routes_middleware, QuietRoutesMiddleware
+from .metrics import add_metrics_middleware, MetricsMiddleware
+from .profiling import add_profiling_middleware, ProfilingMiddleware
 
 __all__ = [
     "register_exception_handlers",
     "add_quiet_routes_middleware",
     "QuietRoutesMiddleware",
+    "add_metrics_middleware",
+    "MetricsMiddleware",
+    "add_profiling_middleware",
+    "ProfilingMiddleware",
 ]
@@ -41,7 +41,7 @@ async def sigma2_exception_handler(request: Request, exc: Sigma2Exception):
     )
 
     return JSONResponse(
-        status_code=exc.status_code, content=error_response.model_dump()
+        status_code=exc.status_code, content=error_response.model_dump(mode="json")
     )
 
 
@@ -81,7 +81,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
     return JSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-        content=error_response.model_dump(),
+        content=error_response.model_dump(mode="json"),
     )
 
 
@@ -106,7 +106,7 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     )
 
     return JSONResponse(
-        status_code=exc.status_code, content=error_response.model_dump()
+        status_code=exc.status_code, content=error_response.model_dump(mode="json")
     )
 
 
@@ -155,7 +155,7 @@ async def general_exception_handler(request: Request, exc: Exception):
 
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content=error_response.model_dump(),
+        content=error_response.model_dump(mode="json"),
     )
 
 
@@ -0,0 +1,103 @@
+"""
+請求指標中間件 (純 ASGI，不經過 BaseHTTPMiddleware 的額外 task 與 body 複製)
+依 router 與路由模板 (例如 /api/dashboard/inference/latency，而非實際路徑) 記錄請求數與延遲，
+未匹配的路徑一律歸為 "unmatched"，避免 label 數量隨 URL 無限增長
+"""
+
+import time
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from backend.utils.metrics import http_requests, http_latency, http_in_flight
+
+# 路徑前綴 -> router label (與 api_entry.py 的 include_router prefix 一致)
+ROUTER_PREFIXES = (
+    ("/api/dashboard", "dashboard"),
+    ("/api/files", "files"),
+    ("/api/analysis", "analysis"),
+    ("/api/chart_ai", "chart_ai"),
+    ("/api/ai", "ai"),
+    ("/api/draft", "draft"),
+    ("/api/admin", "admin"),
+    ("/api/", "legacy"),
+    ("/static", "static"),
+)
+
+
+def _match_prefix(path: str):
+    for prefix, label in ROUTER_PREFIXES:
+        if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+            return prefix, label
+    return "", "app"
+
+
+def router_label(path: str) -> str:
+    return _match_prefix(path)[1]
+
+
+def route_template(scope: Scope) -> str:
+    """
+    請求對應的路由模板；未匹配時為 "unmatched"
+
+    Router 匹配後會把路由物件寫回 scope["route"]。較新的 FastAPI 以巢狀方式
+    include router，route.path 不含 prefix，此時補上實際路徑的 router prefix；
+    Mount (例如 /static) 沒有 route，以掛載點 (root_path) 作為模板
+    """
+    route = scope.get("route")
+    if route is not None:
+        template = route.path
+        prefix, label = _match_prefix(scope.get("path", ""))
+        if label not in ("app", "legacy", "static") and not template.startswith(prefix):
+            template = prefix + template
+        return template
+    if scope.get("endpoint") is not None and scope.get("root_path"):
+        return scope["root_path"]
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    只處理 http 請求 (WebSocket 長連線不計入延遲)；
+    text/event-stream 回應只計數，不觀察延遲 (連線時間不是請求延遲)
+    """
+
+    def __init__(self, app: ASGIApp, skip_paths=("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope.get("path") in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        in_flight = (router_label(scope.get("path", "")),)
+        http_in_flight.inc(labels=in_flight)
+        state = {"status": 500, "stream": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                for key, value in message.get("headers") or ():
+                    if key.lower() == b"content-type" and value.startswith(b"text/event-stream"):
+                        state["stream"] = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec(labels=in_flight)
+            template = route_template(scope)
+            router = router_label(template) if template != "unmatched" else template
+            method = scope.get("method", "GET")
+            http_requests.inc((router, method, template, str(state["status"])))
+            if not state["stream"]:
+                http_latency.observe(
+                    (router, method, template), time.perf_counter() - start
+                )
+
+
+def add_metrics_middleware(app, skip_paths=("/metrics",)):
+    """便捷函數：將請求指標中間件添加到 FastAPI app"""
+    app.add_middleware(MetricsMiddleware, skip_paths=skip_paths)
+    return app
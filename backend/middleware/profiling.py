@@ -0,0 +1,106 @@
+"""
+請求剖析中間件 (純 ASGI)
+請求帶 X-Sigma2-Profile: 1 標頭或 ?profile=1 時，於整個請求期間 (含 SSE 串流與背景工具執行)
+執行取樣式剖析；是否允許由 config.PROFILER_ENABLED / PROFILER_ALLOWED_PATHS 決定
+"""
+
+import json
+from urllib.parse import parse_qs
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from backend.utils import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_HEADER = b"x-sigma2-profile"
+TRUTHY = ("1", "true", "yes", "on")
+
+
+def profile_requested(scope: Scope) -> bool:
+    for key, value in scope.get("headers") or ():
+        if key == PROFILE_HEADER and value.decode("latin-1").lower() in TRUTHY:
+            return True
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return any(v.lower() in TRUTHY for v in query.get("profile", []))
+
+
+def _session_from_request(scope: Scope, body: bytes) -> str:
+    """session_id 依序取自 query、X-Session-Id 標頭、JSON 本體；都沒有時為 default"""
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    if query.get("session_id"):
+        return query["session_id"][0]
+    for key, value in scope.get("headers") or ():
+        if key == b"x-session-id":
+            return value.decode("latin-1")
+    if body:
+        try:
+            payload = json.loads(body)
+            if isinstance(payload, dict) and payload.get("session_id"):
+                return str(payload["session_id"])
+        except (ValueError, UnicodeDecodeError):
+            pass
+    return "default"
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, profile_service):
+        self.app = app
+        self.profile_service = profile_service
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or not profile_requested(scope)
+            or not self.profile_service.allowed(scope.get("path", ""))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # 先讀完請求本體以取得 session_id，再原樣轉交給 app
+        buffered = []
+        while True:
+            message = await receive()
+            buffered.append(message)
+            if message["type"] != "http.request" or not message.get("more_body"):
+                break
+        body = b"".join(m.get("body", b"") for m in buffered if m["type"] == "http.request")
+
+        async def replay():
+            if buffered:
+                return buffered.pop(0)
+            return await receive()
+
+        capture = self.profile_service.begin(
+            _session_from_request(scope, body), scope.get("method", "GET"), scope["path"]
+        )
+        if capture is None:
+            await self.app(scope, replay, send)
+            return
+
+        state = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                headers = list(message.get("headers") or [])
+                headers.append((PROFILE_HEADER, capture.name.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, replay, send_wrapper)
+        finally:
+            try:
+                meta = self.profile_service.finish(capture, state["status"])
+                logger.info(
+                    f"已儲存剖析 {meta['name']} ({meta['samples']} samples, {meta['duration_s']}s)"
+                )
+            except Exception as e:
+                logger.error(f"剖析儲存失敗: {e}")
+
+
+def add_profiling_middleware(app, profile_service):
+    """便捷函數：將請求剖析中間件添加到 FastAPI app"""
+    app.add_middleware(ProfilingMiddleware, profile_service=profile_service)
+    return app
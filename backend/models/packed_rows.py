@@ -0,0 +1,72 @@
+"""
+緊湊二進位資料列格式 (高頻資料來源用)
+先以 /schema 取得模型的欄位順序 (schema handshake)，之後每列以 little-endian float32 向量送出:
+    [measure_value, col_0, col_1, ..., col_{n-1}]    缺值以 NaN 表示
+向量直接對應預編譯擷取計畫 (FeatureGatherPlan) 的欄位順序，伺服器端不需解析欄位名稱
+"""
+
+from typing import Dict, Any, List
+
+import numpy as np
+
+PACKED_DTYPE = "<f4"
+PACKED_CONTENT_TYPE = "application/octet-stream"
+
+
+def describe_schema(plan, generation: int) -> Dict[str, Any]:
+    """schema handshake 內容 (欄位順序 / dtype / 每列位元組數)"""
+    return {
+        "schema_id": plan.schema_id,
+        "model_generation": generation,
+        "dtype": "float32",
+        "byteorder": "little",
+        "layout": ["measure_value"] + plan.columns,
+        "columns": plan.columns,
+        "row_bytes": 4 * (len(plan.columns) + 1),
+        "required": plan.snapshot_names,  # IQL 狀態欄位不可為 NaN
+        "action_features": plan.action_features,
+    }
+
+
+def decode_rows(body: bytes, n_columns: int):
+    """
+    將請求本體解為 (values, ys)
+
+    values: (n, n_columns) float64，與 plan.gather_many() 輸出相同
+    ys: (n,) float64，NaN 量測值以 0.0 表示 (與 JSON 路徑相同)
+    """
+    width = n_columns + 1
+    if len(body) % (4 * width):
+        raise ValueError(
+            f"資料長度 {len(body)} bytes 不是每列 {4 * width} bytes 的整數倍"
+        )
+    packed = np.frombuffer(body, dtype=PACKED_DTYPE).reshape(-1, width)
+    values = packed[:, 1:].astype(np.float64)
+    ys = np.nan_to_num(packed[:, 0].astype(np.float64), nan=0.0)
+    return values, ys
+
+
+def compact_results(results: List[Dict[str, Any]], action_features: List[str]) -> Dict[str, Any]:
+    """
+    將逐列的預測結果轉為欄式回應
+
+    省略 feature_snapshots 與 recommendations 的欄位名稱 (用戶端已有輸入與 schema)；
+    建議值以 (n, n_actions) 矩陣依 action_features 順序排列
+    """
+    def matrix(key):
+        return [[r["recommendations"][f][key] for f in action_features] for r in results]
+
+    payload = {
+        "count": len(results),
+        "action_features": action_features,
+        "status": [r["status"] for r in results],
+        "current_measure": [r["current_measure"] for r in results],
+        "predicted_y_next": [r["predicted_y_next"] for r in results],
+        "suggested_delta": matrix("suggested_delta"),
+        "suggested_delta_smoothed": matrix("suggested_delta_smoothed"),
+        "top_influencers": [r["top_influencers"] for r in results],
+        "diagnosis": [r["diagnosis"] for r in results],
+    }
+    if any("optimizer" in r for r in results):
+        payload["optimizer"] = [r.get("optimizer") for r in results]
+    return payload
@@ -0,0 +1,458 @@
+"""
+預測歷史的欄式環形緩衝區
+取代 DashboardSession.prediction_history 的 list[dict]：
+量測值、預測值、規格上下限與時間戳存成 float64，寬的逐特徵欄位矩陣存成 float32，狀態存成代碼；
+超過容量時覆寫最舊的一筆 (O(1))。
+對外仍支援 append / len / 迭代 / 索引 / 切片 (回傳與舊版相同的 dict)，
+並提供 since(cursor) 的欄式增量查詢
+"""
+
+from typing import Dict, Any, List, Optional, Iterable
+
+import numpy as np
+
+# 預設保留筆數 (與舊版 list 的上限相同)
+DEFAULT_CAPACITY = 5000
+
+# 建議值的各欄位 (recommendations[feat] 內的 key)
+REC_KEYS = (
+    "current",
+    "suggested_delta",
+    "suggested_delta_smoothed",
+    "suggested_next",
+    "suggested_next_smoothed",
+)
+
+# 以欄式儲存的頂層欄位；其餘 key (goal_name / goal_settings 等) 放在 extras
+_COLUMN_KEYS = {
+    "status",
+    "timestamp",
+    "current_measure",
+    "predicted_y_next",
+    "measure_name",
+    "target_range",
+    "diagnosis",
+    "top_influencers",
+    "current_top_influencers",
+    "smoothed_top_influencers",
+    "feature_snapshots",
+    "recommendations",
+}
+
+# since() 可選的欄位
+HISTORY_FIELDS = (
+    "timestamp",
+    "status",
+    "current_measure",
+    "predicted_y_next",
+    "target_low",
+    "target_high",
+    "measure_name",
+    "diagnosis",
+    "top_influencers",
+    "current_top_influencers",
+    "smoothed_top_influencers",
+    "feature_snapshots",
+    "recommendations",
+    "extras",
+)
+
+def _to_float(value) -> float:
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _json_floats(arr) -> list:
+    """float 陣列轉 list，NaN 以 None 表示 (JSON null)"""
+    return [None if v != v else v for v in np.asarray(arr, dtype=np.float64).tolist()]
+
+
+class _ColumnGroup:
+    """
+    名稱可動態增加的 float32 欄位矩陣 (capacity x width x depth)
+
+    寬度從 0 開始，第一次寫入時配置為實際欄位數 (從未預測的 session 不佔空間)，之後加倍擴充
+    """
+
+    def __init__(self, capacity: int, depth: int = 0):
+        self.capacity = capacity
+        self.depth = depth
+        self.index: Dict[str, int] = {}
+        self.names: List[str] = []
+        self._idx_cache: Dict[tuple, np.ndarray] = {}
+        self.data = self._alloc(0)
+
+    def _alloc(self, width):
+        shape = (self.capacity, width) + ((self.depth,) if self.depth else ())
+        return np.full(shape, np.nan, dtype=np.float32)
+
+    def columns(self, names: tuple) -> np.ndarray:
+        """名稱 -> 欄位索引 (新名稱自動配置欄位，必要時加寬矩陣)"""
+        idx = self._idx_cache.get(names)
+        if idx is not None:
+            return idx
+        for name in names:
+            if name not in self.index:
+                self.index[name] = len(self.names)
+                self.names.append(name)
+        width = self.data.shape[1]
+        if len(self.names) > width:
+            width = max(len(self.names), width * 2)
+            grown = self._alloc(width)
+            grown[:, : self.data.shape[1]] = self.data
+            self.data = grown
+        idx = np.array([self.index[n] for n in names], dtype=np.intp)
+        self._idx_cache[names] = idx
+        return idx
+
+
+class PredictionHistory:
+    """
+    欄式環形緩衝區
+
+    每筆紀錄有遞增的序號 (seq)；since(cursor) 回傳 seq >= cursor 的紀錄，
+    cursor 超出保留範圍 (已被覆寫或已清空) 時回傳 reset=True。
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._total = 0  # 累計寫入筆數 (下一筆的 seq)；clear() 不歸零
+        self._size = 0
+
+        self._timestamp = np.full(capacity, np.nan, dtype=np.float64)
+        self._measure = np.full(capacity, np.nan, dtype=np.float64)
+        self._predicted = np.full(capacity, np.nan, dtype=np.float64)
+        self._target = np.full((capacity, 2), np.nan, dtype=np.float64)
+        self._status = np.zeros(capacity, dtype=np.uint8)
+        self._status_labels: List[str] = []
+        self._status_codes: Dict[str, int] = {}
+
+        self._snapshots = _ColumnGroup(capacity)
+        self._recs = _ColumnGroup(capacity, depth=len(REC_KEYS))
+
+        # 少量的字串 / list 欄位與每筆的欄位排列 (相同排列共用同一個 tuple)
+        self._measure_name = np.empty(capacity, dtype=object)
+        self._diagnosis = np.empty(capacity, dtype=object)
+        self._influencers = np.empty((capacity, 3), dtype=object)
+        self._schema = np.empty(capacity, dtype=object)
+        self._extras = np.empty(capacity, dtype=object)
+        self._schemas: Dict[tuple, tuple] = {}
+
+    # ------------------------------------------------------------------
+    # 寫入
+    # ------------------------------------------------------------------
+    def append(self, result: Dict[str, Any]) -> int:
+        """寫入一筆預測結果 (PredictionService 回傳的 dict)，超過容量時覆寫最舊的一筆；回傳 seq"""
+        slot = self._total % self.capacity
+
+        self._timestamp[slot] = _to_float(result.get("timestamp"))
+        self._measure[slot] = _to_float(result.get("current_measure"))
+        self._predicted[slot] = _to_float(result.get("predicted_y_next"))
+        target = result.get("target_range") or (None, None)
+        self._target[slot] = (_to_float(target[0]), _to_float(target[1]))
+        self._status[slot] = self._status_code(result.get("status"))
+
+        self._measure_name[slot] = result.get("measure_name")
+        self._diagnosis[slot] = result.get("diagnosis")
+        self._influencers[slot, 0] = result.get("top_influencers")
+        self._influencers[slot, 1] = result.get("current_top_influencers")
+        self._influencers[slot, 2] = result.get("smoothed_top_influencers")
+
+        snapshots = result.get("feature_snapshots") or {}
+        recs = result.get("recommendations") or {}
+        snap_names = tuple(snapshots)
+        rec_names = tuple(recs)
+        schema = self._schemas.setdefault(
+            (snap_names, rec_names), (snap_names, rec_names)
+        )
+        self._schema[slot] = schema
+
+        # 先取得欄位索引 (新欄位可能加寬矩陣) 再寫入
+        snap_idx = self._snapshots.columns(snap_names)
+        rec_idx = self._recs.columns(rec_names)
+        self._snapshots.data[slot] = np.nan
+        if snap_names:
+            self._snapshots.data[slot, snap_idx] = [
+                _to_float(v) for v in snapshots.values()
+            ]
+        self._recs.data[slot] = np.nan
+        if rec_names:
+            self._recs.data[slot, rec_idx] = [
+                [_to_float(rec.get(k)) for k in REC_KEYS] for rec in recs.values()
+            ]
+
+        extras = {k: v for k, v in result.items() if k not in _COLUMN_KEYS}
+        self._extras[slot] = extras or None
+
+        self._total += 1
+        self._size = min(self._size + 1, self.capacity)
+        return self._total - 1
+
+    def _status_code(self, status) -> int:
+        code = self._status_codes.get(status)
+        if code is None:
+            code = len(self._status_labels)
+            self._status_labels.append(status)
+            self._status_codes[status] = code
+        return code
+
+    # ------------------------------------------------------------------
+    # 快照 (session 重啟還原)
+    # ------------------------------------------------------------------
+    def to_state(self):
+        """
+        回傳 (arrays, meta)：保留中的紀錄 (由舊到新) 的數值欄位，
+        以及可 JSON 序列化的其餘欄位；序號 (seq) 一併保存，重啟後用戶端 cursor 仍有效
+        """
+        slots = (np.arange(self.first_seq, self.next_seq) % self.capacity).astype(np.intp)
+        snap_width = len(self._snapshots.names)
+        rec_width = len(self._recs.names)
+        arrays = {
+            "timestamp": self._timestamp[slots],
+            "measure": self._measure[slots],
+            "predicted": self._predicted[slots],
+            "target": self._target[slots],
+            "status": self._status[slots],
+            "snapshots": self._snapshots.data[slots, :snap_width],
+            "recs": self._recs.data[slots, :rec_width],
+        }
+        schemas = list(self._schemas.values())
+        schema_pos = {id(s): i for i, s in enumerate(schemas)}
+        meta = {
+            "capacity": self.capacity,
+            "total": self._total,
+            "status_labels": list(self._status_labels),
+            "snapshot_names": list(self._snapshots.names),
+            "rec_names": list(self._recs.names),
+            "schemas": [[list(snap), list(rec)] for snap, rec in schemas],
+            "schema": [schema_pos[id(s)] for s in self._schema[slots]],
+            "measure_name": self._measure_name[slots].tolist(),
+            "diagnosis": self._diagnosis[slots].tolist(),
+            "influencers": self._influencers[slots].tolist(),
+            "extras": self._extras[slots].tolist(),
+        }
+        return arrays, meta
+
+    @classmethod
+    def from_state(cls, arrays, meta) -> "PredictionHistory":
+        """由 to_state() 的內容重建"""
+        history = cls(meta.get("capacity", DEFAULT_CAPACITY))
+        n = min(len(arrays["timestamp"]), history.capacity)
+        total = int(meta["total"])
+        history._total = total
+        history._size = n
+        history._status_labels = list(meta["status_labels"])
+        history._status_codes = {s: i for i, s in enumerate(history._status_labels)}
+        if n == 0:
+            return history
+
+        keep = slice(len(arrays["timestamp"]) - n, None)  # 容量變小時只保留最新的 n 筆
+        slots = (np.arange(total - n, total) % history.capacity).astype(np.intp)
+        history._timestamp[slots] = arrays["timestamp"][keep]
+        history._measure[slots] = arrays["measure"][keep]
+        history._predicted[slots] = arrays["predicted"][keep]
+        history._target[slots] = arrays["target"][keep]
+        history._status[slots] = arrays["status"][keep]
+
+        snap_idx = history._snapshots.columns(tuple(meta["snapshot_names"]))
+        rec_idx = history._recs.columns(tuple(meta["rec_names"]))
+        history._snapshots.data[np.ix_(slots, snap_idx)] = arrays["snapshots"][keep]
+        history._recs.data[np.ix_(slots, rec_idx)] = arrays["recs"][keep]
+
+        schemas = []
+        for snap, rec in meta["schemas"]:
+            key = (tuple(snap), tuple(rec))
+            schemas.append(history._schemas.setdefault(key, key))
+        tail = lambda name: meta[name][len(meta[name]) - n:]
+        for slot, schema, name, diagnosis, influencers, extras in zip(
+            slots,
+            tail("schema"),
+            tail("measure_name"),
+            tail("diagnosis"),
+            tail("influencers"),
+            tail("extras"),
+        ):
+            history._schema[slot] = schemas[schema]
+            history._measure_name[slot] = name
+            history._diagnosis[slot] = diagnosis
+            for j, value in enumerate(influencers):
+                history._influencers[slot, j] = value
+            history._extras[slot] = extras
+        return history
+
+    def nbytes(self) -> int:
+        """預先配置的陣列佔用的位元組 (不含 extras / 影響因子等 Python 物件本身)"""
+        arrays = (
+            self._timestamp,
+            self._measure,
+            self._predicted,
+            self._target,
+            self._status,
+            self._snapshots.data,
+            self._recs.data,
+            self._measure_name,
+            self._diagnosis,
+            self._influencers,
+            self._schema,
+            self._extras,
+        )
+        return int(sum(a.nbytes for a in arrays))
+
+    def clear(self):
+        """清空紀錄 (序號不歸零，持有舊 cursor 的用戶端會收到 reset)"""
+        self._size = 0
+        self._extras[:] = None
+        self._influencers[:] = None
+
+    # ------------------------------------------------------------------
+    # 舊版 list 介面
+    # ------------------------------------------------------------------
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self._row(self._slot(i))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._row(self._slot(i)) for i in range(*key.indices(self._size))]
+        if key < 0:
+            key += self._size
+        if not 0 <= key < self._size:
+            raise IndexError("prediction history index out of range")
+        return self._row(self._slot(key))
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """完整的 list[dict] (舊版 /history 回應)"""
+        return list(self)
+
+    @property
+    def first_seq(self) -> int:
+        return self._total - self._size
+
+    @property
+    def next_seq(self) -> int:
+        return self._total
+
+    def _slot(self, i: int) -> int:
+        """第 i 筆 (由舊到新) 所在的環形位置"""
+        return (self.first_seq + i) % self.capacity
+
+    def _row(self, slot: int) -> Dict[str, Any]:
+        snap_names, rec_names = self._schema[slot]
+        snaps = self._snapshots.data[slot, self._snapshots.columns(snap_names)] if snap_names else []
+        recs = self._recs.data[slot, self._recs.columns(rec_names)] if rec_names else []
+
+        predicted = float(self._predicted[slot])
+        row = {
+            "status": self._status_labels[self._status[slot]],
+            "current_measure": float(self._measure[slot]),
+            "measure_name": self._measure_name[slot],
+            "target_range": [float(v) for v in self._target[slot]],
+            "recommendations": {
+                name: dict(zip(REC_KEYS, (float(v) for v in values)))
+                for name, values in zip(rec_names, recs)
+            },
+            "feature_snapshots": {
+                name: float(v) for name, v in zip(snap_names, snaps)
+            },
+            "predicted_y_next": None if predicted != predicted else predicted,
+            "top_influencers": self._influencers[slot, 0],
+            "current_top_influencers": self._influencers[slot, 1],
+            "smoothed_top_influencers": self._influencers[slot, 2],
+            "diagnosis": self._diagnosis[slot],
+            "timestamp": float(self._timestamp[slot]),
+        }
+        if self._extras[slot]:
+            row.update(self._extras[slot])
+        return row
+
+    # ------------------------------------------------------------------
+    # 欄式增量查詢
+    # ------------------------------------------------------------------
+    def since(
+        self, cursor: Optional[int] = None, fields: Optional[Iterable[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        回傳 seq >= cursor 的紀錄 (欄式)
+
+        Args:
+            cursor: 上次回應的 cursor；None 表示從保留的第一筆開始
+            fields: 要回傳的欄位 (HISTORY_FIELDS 子集)，None 表示全部
+
+        Returns:
+            dict: cursor (下次查詢用)、start (第一筆的 seq)、count、reset、columns
+        """
+        reset = cursor is None or cursor < self.first_seq or cursor > self.next_seq
+        start = self.first_seq if reset else cursor
+        slots = (np.arange(start, self.next_seq) % self.capacity).astype(np.intp)
+        wanted = HISTORY_FIELDS if fields is None else [f for f in HISTORY_FIELDS if f in set(fields)]
+
+        columns: Dict[str, Any] = {}
+        for name in wanted:
+            columns[name] = self._column(name, slots)
+
+        return {
+            "cursor": self.next_seq,
+            "start": start,
+            "count": len(slots),
+            "reset": bool(reset and cursor is not None),
+            "total": self._size,
+            "status_labels": list(self._status_labels),
+            "columns": columns,
+        }
+
+    def _column(self, name: str, slots: np.ndarray):
+        if name == "timestamp":
+            return self._timestamp[slots].tolist()
+        if name == "status":
+            return self._status[slots].tolist()
+        if name == "current_measure":
+            return _json_floats(self._measure[slots])
+        if name == "predicted_y_next":
+            return _json_floats(self._predicted[slots])
+        if name == "target_low":
+            return _json_floats(self._target[slots, 0])
+        if name == "target_high":
+            return _json_floats(self._target[slots, 1])
+        if name == "measure_name":
+            return self._measure_name[slots].tolist()
+        if name == "diagnosis":
+            return self._diagnosis[slots].tolist()
+        if name == "top_influencers":
+            return self._influencers[slots, 0].tolist()
+        if name == "current_top_influencers":
+            return self._influencers[slots, 1].tolist()
+        if name == "smoothed_top_influencers":
+            return self._influencers[slots, 2].tolist()
+        if name == "extras":
+            return self._extras[slots].tolist()
+
+        # 特徵欄位: 只回傳這段紀錄實際出現過的欄位，未出現的列為 null
+        names = self._names_in(slots, 0 if name == "feature_snapshots" else 1)
+        if name == "feature_snapshots":
+            group = self._snapshots
+            return {
+                n: _json_floats(group.data[slots, group.index[n]]) for n in names
+            }
+        group = self._recs
+        return {
+            n: {
+                k: _json_floats(group.data[slots, group.index[n], j])
+                for j, k in enumerate(REC_KEYS)
+            }
+            for n in names
+        }
+
+    def _names_in(self, slots: np.ndarray, part: int) -> List[str]:
+        seen = {}
+        for schema in {id(s): s for s in self._schema[slots]}.values():
+            for n in schema[part]:
+                seen.setdefault(n, None)
+        return list(seen)
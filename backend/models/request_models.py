@@ -10,6 +10,27 @@ class InferenceRequest(BaseModel):
     data: Dict[str, Any]
     measure_value: Optional[float] = None
     session_id: str = "default"
+    debug_timing: bool = False  # 回應附上各階段耗時
+
+
+class BatchInferenceRequest(BaseModel):
+    """批次推理請求 (rows 與 measure_values 依序一一對應)"""
+
+    rows: List[Dict[str, Any]]
+    measure_values: Optional[List[Optional[float]]] = None
+    session_id: str = "default"
+    debug_timing: bool = False
+
+
+class SensitivityRequest(BaseModel):
+    """敏感度曲線請求 (features 預設為全部 action；grids 可指定個別特徵的網格)"""
+
+    data: Dict[str, Any]
+    features: Optional[List[str]] = None
+    points: Optional[int] = None
+    span: Optional[float] = None
+    grids: Optional[Dict[str, List[float]]] = None
+    session_id: str = "default"
 
 
 class ChatRequest(BaseModel):
@@ -6,12 +6,14 @@ Session 資料模型
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass, field
 
+from backend.models.prediction_history import PredictionHistory
+
 
 @dataclass
 class DashboardSession:
     """即時看板 Session"""
 
-    prediction_history: List[Dict[str, Any]] = field(default_factory=list)
+    prediction_history: PredictionHistory = field(default_factory=PredictionHistory)
     sim_index: int = 0
     sim_df: Any = None
     sim_file_name: Optional[str] = None
@@ -0,0 +1,48 @@
+"""
+Admin Router - 伺服器維運相關 API (Session 記憶體 / 淘汰、訓練排程)
+"""
+
+import asyncio
+
+from fastapi import APIRouter, Depends
+from backend.services.session_eviction import SessionEvictionService
+from backend.services.training_scheduler import TrainingScheduler
+from backend.dependencies import get_session_eviction_service, get_training_scheduler
+from backend.utils import sanitize_session_id
+
+router = APIRouter()
+
+
+@router.get("/sessions")
+async def session_footprint(
+    eviction_service: SessionEvictionService = Depends(get_session_eviction_service),
+):
+    """各 session 的估計記憶體 (sim_df / 預測歷史 / 模型參考 / 預讀) 與閒置時間"""
+    return await asyncio.to_thread(eviction_service.report)
+
+
+@router.post("/sessions/sweep")
+async def sweep_sessions(
+    eviction_service: SessionEvictionService = Depends(get_session_eviction_service),
+):
+    """立即執行一次閒置 / 記憶體預算淘汰"""
+    evicted = await asyncio.to_thread(eviction_service.sweep)
+    return {"evicted": evicted}
+
+
+@router.post("/sessions/{session_id}/evict")
+async def evict_session(
+    session_id: str,
+    eviction_service: SessionEvictionService = Depends(get_session_eviction_service),
+):
+    """手動淘汰指定 session 的大型狀態"""
+    session_id = sanitize_session_id(session_id)
+    return await asyncio.to_thread(eviction_service.evict, session_id)
+
+
+@router.get("/training")
+async def training_jobs(
+    scheduler: TrainingScheduler = Depends(get_training_scheduler),
+):
+    """訓練排程器狀態：並行上限、執行緒預算與所有作業 (排隊 / 執行中 / 已結束)"""
+    return {**scheduler.stats(), "items": scheduler.list_jobs()}
@@ -6,7 +6,7 @@ from fastapi import APIRouter, Depends, BackgroundTasks
 from backend.models.request_models import ChatRequest
 from backend.services.session_service import SessionService
 from backend.services.ai_service import AIService
-from backend.dependencies import get_session_service, get_ai_service
+from backend.dependencies import get_session_service, get_ai_service, get_event_bus
 import uuid
 import asyncio
 from typing import Dict, Any
@@ -17,6 +17,15 @@ router = APIRouter()
 ai_jobs: Dict[str, Dict[str, Any]] = {}
 
 
+def _notify_job_done(session_id: str, job_id: str, job_type: str):
+    """推送 AI 任務完成事件，前端收到後立即查詢結果 (不必等下一次輪詢)"""
+    get_event_bus().publish(
+        session_id,
+        "ai_job",
+        {"job_id": job_id, "type": job_type, "status": ai_jobs[job_id]["status"]},
+    )
+
+
 def cleanup_old_jobs():
     """清理超過 5 分鐘的舊任務"""
     import time
@@ -61,6 +70,7 @@ async def process_report_background(
             "error": str(e),
             "created_at": time.time(),
         }
+    _notify_job_done(session_id, job_id, "report")
 
 
 async def process_chat_background(
@@ -93,6 +103,7 @@ async def process_chat_background(
             "error": str(e),
             "created_at": time.time(),
         }
+    _notify_job_done(session_id, job_id, "chat")
 
 
 @router.get("/report")
@@ -4,21 +4,49 @@ Dashboard Router - 即時看板相關 API
 
 import time
 import os
+import asyncio
 import pandas as pd
-from fastapi import APIRouter, HTTPException, Depends, Body
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Body, Request, WebSocket
+from fastapi.responses import StreamingResponse
 
 import config
 from core_logic import DataPreprocess
-from backend.models.request_models import InferenceRequest
+from core_logic.model_cache import model_cache
+from core_logic.latency import latency
+from backend.models.request_models import (
+    InferenceRequest,
+    BatchInferenceRequest,
+    SensitivityRequest,
+)
+from backend.models.prediction_history import HISTORY_FIELDS
+from backend.models.packed_rows import compact_results
 from backend.services.session_service import SessionService
 from backend.services.prediction_service import PredictionService
 from backend.services.file_service import FileService
+from backend.services.model_load_service import ModelLoadService
+from backend.services.event_bus import EventBus
+from backend.services.stream_ingest import StreamIngestor
+from backend.services.sensitivity_service import SensitivityService
+from backend.services.simulator_readahead import (
+    SimulatorReadAheadService,
+    resolve_measure_column,
+)
 from backend.dependencies import (
     get_session_service,
     get_prediction_service,
     get_file_service,
+    get_model_load_service,
+    get_simulator_readahead_service,
+    get_event_bus,
+    get_sensitivity_service,
+)
+from backend.utils import (
+    get_logger,
+    Sigma2Exception,
+    ServiceOverloadedError,
+    SchemaMismatchError,
 )
-from backend.utils import get_logger
 
 logger = get_logger(__name__)
 
@@ -35,6 +63,7 @@ async def predict(
     if not prediction_service.is_ready(request.session_id):
         raise HTTPException(500, "Agent not initialized. Ensure models are trained.")
 
+    trace = latency.start(force=request.debug_timing)
     try:
         print(f"[DEBUG] predict() called")
         print(f"[DEBUG] Session ID: {request.session_id}")
@@ -57,22 +86,24 @@ async def predict(
 
         # 執行預測
         print(f"[DEBUG] Calling prediction_service.predict()...")
-        result = await prediction_service.predict(row, y, request.session_id)
+        if trace is not None:
+            trace.lap("parse")
+        result = await prediction_service.predict(
+            row, y, request.session_id, trace=trace
+        )
         print(f"[DEBUG] prediction_service.predict() returned")
         print(f"[DEBUG] Result keys: {list(result.keys())}")
 
-        # 加入時間戳
-        result["timestamp"] = time.time()
-
-        # 寫入 Session 專屬歷史
-        session.prediction_history.append(result)
-        if len(session.prediction_history) > 5000:
-            session.prediction_history.pop(0)
+        _record_prediction(session, result, request.session_id)
 
         print(f"[DEBUG] predict() completed successfully")
-        return result
+        return _finish_trace(trace, request.session_id, request.debug_timing, result)
 
+    except ServiceOverloadedError:
+        _finish_trace(trace, request.session_id, error=True)
+        raise
     except Exception as e:
+        _finish_trace(trace, request.session_id, error=True)
         print(f"[ERROR] Exception in predict():")
         print(f"[ERROR] Type: {type(e).__name__}")
         print(f"[ERROR] Message: {str(e)}")
@@ -83,14 +114,269 @@ async def predict(
         raise HTTPException(500, detail=str(e))
 
 
+def _finish_trace(trace, session_id, attach=False, result=None, error=False):
+    """結束分段計時: 計入統計，debug 時將耗時附在回應上"""
+    if trace is None:
+        return result
+    trace.lap("history")
+    trace.error = trace.error or error
+    latency.record(session_id, trace)
+    if attach and result is not None:
+        result = dict(result, timing=trace.to_dict())
+    return result
+
+
+def _record_prediction(session, result, session_id):
+    """加入時間戳並寫入 Session 專屬歷史 (環形緩衝區，超過容量自動覆寫最舊的一筆)，並推送給看板"""
+    result["timestamp"] = time.time()
+    seq = session.prediction_history.append(result)
+    get_event_bus().publish(session_id, "prediction", {"seq": seq, "row": result})
+
+
+@router.post("/predict_batch")
+async def predict_batch(
+    request: BatchInferenceRequest,
+    session_service: SessionService = Depends(get_session_service),
+    prediction_service: PredictionService = Depends(get_prediction_service),
+):
+    """批次執行 IQL 預測 (單次 IQL / XGBoost / SHAP)，逐列回傳建議"""
+    if not prediction_service.is_ready(request.session_id):
+        raise HTTPException(500, "Agent not initialized. Ensure models are trained.")
+
+    measure_values = request.measure_values
+    if measure_values is None:
+        measure_values = [None] * len(request.rows)
+    if len(measure_values) != len(request.rows):
+        raise HTTPException(
+            400,
+            detail=f"measure_values 筆數 ({len(measure_values)}) 與 rows ({len(request.rows)}) 不一致",
+        )
+
+    trace = latency.start(force=request.debug_timing)
+    try:
+        session = session_service.get_dashboard_session(request.session_id)
+
+        # 自動刪除 NaN 值
+        rows = [
+            {k: v for k, v in row.items() if v is not None and v == v}
+            for row in request.rows
+        ]
+
+        ys = []
+        for y_val in measure_values:
+            try:
+                ys.append(float(y_val) if y_val is not None else 0.0)
+            except (ValueError, TypeError):
+                logger.warning(f"無法將目標值轉為浮點數: {y_val}，使用預設值 0.0")
+                ys.append(0.0)
+
+        if trace is not None:
+            trace.lap("parse")
+        results = await prediction_service.predict_batch(
+            rows, ys, request.session_id, trace=trace
+        )
+        _record_batch(session, results, request.session_id)
+
+        return _finish_trace(
+            trace,
+            request.session_id,
+            request.debug_timing,
+            {"status": "success", "count": len(results), "results": results},
+        )
+
+    except ServiceOverloadedError:
+        _finish_trace(trace, request.session_id, error=True)
+        raise
+    except Exception as e:
+        _finish_trace(trace, request.session_id, error=True)
+        logger.error("批次預測執行失敗", exc_info=True)
+        raise HTTPException(500, detail=str(e))
+
+
+@router.post("/sensitivity")
+async def get_sensitivity(
+    request: SensitivityRequest,
+    prediction_service: PredictionService = Depends(get_prediction_service),
+    sensitivity_service: SensitivityService = Depends(get_sensitivity_service),
+):
+    """
+    敏感度曲線: 目前資料列在各特徵 (預設為 action) 調整時的預測量測值
+
+    所有網格點以一次 XGBoost 預測計算，結果依 (模型, 資料列, 特徵, 網格) 快取
+    """
+    if not prediction_service.is_ready(request.session_id):
+        raise HTTPException(500, "Agent not initialized. Ensure models are trained.")
+
+    row = {k: v for k, v in request.data.items() if v is not None and v == v}
+    try:
+        return await sensitivity_service.curves(
+            request.session_id,
+            row,
+            features=request.features,
+            points=request.points,
+            span=request.span,
+            grids=request.grids,
+        )
+    except Sigma2Exception:
+        raise
+    except Exception as e:
+        logger.error("敏感度曲線計算失敗", exc_info=True)
+        raise HTTPException(500, detail=str(e))
+
+
+@router.get("/sensitivity/stats")
+async def get_sensitivity_stats(
+    sensitivity_service: SensitivityService = Depends(get_sensitivity_service),
+):
+    """敏感度曲線快取的監控數據"""
+    return sensitivity_service.stats()
+
+
+@router.get("/schema")
+async def get_packed_schema(
+    session_id: str = "default",
+    prediction_service: PredictionService = Depends(get_prediction_service),
+):
+    """緊湊二進位格式的 schema handshake (每個模型取得一次)"""
+    if not prediction_service.is_ready(session_id):
+        raise HTTPException(500, "Agent not initialized. Ensure models are trained.")
+    return prediction_service.describe_schema(session_id)
+
+
+@router.post("/predict_packed")
+async def predict_packed(
+    request: Request,
+    schema_id: str,
+    session_id: str = "default",
+    response: str = "compact",
+    session_service: SessionService = Depends(get_session_service),
+    prediction_service: PredictionService = Depends(get_prediction_service),
+):
+    """
+    以緊湊二進位格式批次預測
+
+    本體為 little-endian float32，每列 [measure_value, *schema.columns]；
+    schema_id 與目前模型不符時回傳 409，用戶端應重新取得 /schema。
+    response=compact 回傳欄式結果，response=full 回傳與 /predict_batch 相同的逐列結果
+    """
+    if not prediction_service.is_ready(session_id):
+        raise HTTPException(500, "Agent not initialized. Ensure models are trained.")
+    if response not in ("compact", "full"):
+        raise HTTPException(400, detail=f"未知的 response 格式: {response}")
+
+    body = await request.body()
+    try:
+        session = session_service.get_dashboard_session(session_id)
+        results = await prediction_service.predict_packed(body, schema_id, session_id)
+        _record_batch(session, results, session_id)
+    except (ServiceOverloadedError, SchemaMismatchError):
+        raise
+    except (ValueError, KeyError) as e:
+        raise HTTPException(400, detail=f"{type(e).__name__}: {e}")
+    except Exception as e:
+        logger.error("緊湊格式預測執行失敗", exc_info=True)
+        raise HTTPException(500, detail=str(e))
+
+    if response == "full":
+        return {"status": "success", "count": len(results), "results": results}
+    payload = compact_results(results, list(results[0]["recommendations"]) if results else [])
+    payload["schema_id"] = schema_id
+    return payload
+
+
+def _record_batch(session, results, session_id):
+    """加入時間戳並依序寫入 Session 專屬歷史；批次結果不逐筆推送，通知看板以 cursor 增量取回"""
+    now = time.time()
+    for result in results:
+        result["timestamp"] = now
+        session.prediction_history.append(result)
+    get_event_bus().publish(
+        session_id,
+        "history",
+        {"cursor": session.prediction_history.next_seq},
+    )
+
+
+@router.websocket("/ingest")
+async def ingest_stream(
+    websocket: WebSocket,
+    session_id: str = "default",
+    session_service: SessionService = Depends(get_session_service),
+    prediction_service: PredictionService = Depends(get_prediction_service),
+):
+    """
+    產線即時資料串流 (每條產線一條連線)
+
+    用戶端持續送出 {"id", "data", "measure_value"} 或 {"rows": [...]}，
+    伺服器合併已到達的列做小批次推理，依序逐列回傳建議並寫入看板歷史
+    """
+    await websocket.accept()
+    if not prediction_service.is_ready(session_id):
+        await websocket.close(code=1011, reason="Agent not initialized")
+        return
+
+    session = session_service.get_dashboard_session(session_id)
+    ingestor = StreamIngestor(
+        session_id,
+        prediction_service,
+        on_results=lambda results: _record_batch(session, results, session_id),
+    )
+    print(f"[DEBUG] Ingest stream opened: {session_id}")
+    await ingestor.run(websocket.receive_json, websocket.send_json)
+    print(
+        f"[DEBUG] Ingest stream closed: {session_id} "
+        f"(rows={ingestor.processed}, batches={ingestor.batches})"
+    )
+
+
 @router.get("/history")
 async def get_history(
     session_id: str = "default",
     session_service: SessionService = Depends(get_session_service),
+    since: Optional[int] = None,
+    fields: Optional[str] = None,
 ):
-    """取得預測歷史紀錄"""
+    """
+    取得預測歷史紀錄
+
+    未帶 since / fields 時回傳完整的 list[dict] (舊版格式)；
+    帶入時回傳欄式增量資料，下次查詢以回應中的 cursor 作為 since，
+    fields 為逗號分隔的欄位清單 (見 HISTORY_FIELDS)。
+    """
     session = session_service.get_dashboard_session(session_id)
-    return session.prediction_history
+    if since is None and fields is None:
+        return session.prediction_history.to_list()
+
+    wanted = None
+    if fields:
+        wanted = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = sorted(set(wanted) - set(HISTORY_FIELDS))
+        if unknown:
+            raise HTTPException(400, detail=f"未知的欄位: {unknown}")
+    return session.prediction_history.since(since, wanted)
+
+
+@router.get("/events")
+async def dashboard_events(
+    request: Request,
+    session_id: str = "default",
+    last_event_id: Optional[int] = None,
+    event_bus: EventBus = Depends(get_event_bus),
+):
+    """
+    看板事件串流 (Server-Sent Events)
+
+    事件: prediction / history / history_cleared / simulator_eof / model_load / ai_job，
+    閒置時送出心跳；重連時依 Last-Event-ID 標頭 (或 last_event_id 參數) 補送缺漏事件
+    """
+    header = request.headers.get("last-event-id")
+    if header and header.isdigit():
+        last_event_id = int(header)
+    return StreamingResponse(
+        event_bus.stream(session_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/clear")
@@ -100,6 +386,7 @@ async def clear_history(
 ):
     """清空預測歷史"""
     session_service.clear_dashboard_session(session_id)
+    get_event_bus().publish(session_id, "history_cleared", {})
     return {"status": "success", "session_id": session_id}
 
 
@@ -108,8 +395,11 @@ async def simulator_next(
     session_id: str = Body(default="default", embed=True),
     session_service: SessionService = Depends(get_session_service),
     prediction_service: PredictionService = Depends(get_prediction_service),
+    readahead_service: SimulatorReadAheadService = Depends(
+        get_simulator_readahead_service
+    ),
 ):
-    """從模擬數據集讀取下一筆並執行推理"""
+    """從模擬數據集讀取下一筆並執行推理 (優先使用背景預讀的結果)"""
     try:
         print(f"\n{'=' * 60}")
         print(f"[DEBUG] /api/simulator/next called")
@@ -123,6 +413,16 @@ async def simulator_next(
             f"[DEBUG] sim_df loaded: {session.sim_df is not None if session else False}"
         )
 
+        # 閒置淘汰後只保留檔名與索引，回來時重新讀取模擬檔案
+        if session.sim_df is None and session.sim_file_name:
+            file_path = get_file_service().get_file_path(session.sim_file_name, session_id)
+            if os.path.exists(file_path):
+                df, _ = await asyncio.to_thread(
+                    DataPreprocess.get_processed_data_and_cols, file_path
+                )
+                session.sim_df = df
+                logger.info(f"Session {session_id} 重新載入模擬檔案: {session.sim_file_name}")
+
         # 檢查該 Session 是否已載入模擬數據
         if session.sim_df is None:
             print(f"[ERROR] No simulation file loaded!")
@@ -135,9 +435,13 @@ async def simulator_next(
 
         if session.sim_index >= len(session.sim_df):
             print(f"[INFO] Reached end of simulation data")
+            get_event_bus().publish(
+                session_id, "simulator_eof", {"rows": len(session.sim_df)}
+            )
             return {"status": "EOF", "message": "已到達模擬資料末端。"}
 
-        row = session.sim_df.iloc[session.sim_index]
+        row_index = session.sim_index
+        row = session.sim_df.iloc[row_index]
         session.sim_index += 1
 
         print(f"[DEBUG] Row fetched, index: {session.sim_index - 1}")
@@ -224,8 +528,42 @@ async def simulator_next(
             session_id=session_id,
         )
 
-        print(f"[DEBUG] Calling predict()...")
-        result = await predict(req, session_service, prediction_service)
+        # 預讀命中時只需套用平滑；未命中 (或預讀停用) 走完整推理 (predict() 另行計時)
+        precomputed = None
+        trace = None
+        if prediction_service.is_ready(session_id):
+            trace = latency.start()
+            precomputed = readahead_service.take(
+                session_id,
+                session,
+                prediction_service.get_agent(session_id),
+                row_index,
+                measure_value,
+            )
+
+        print(f"[DEBUG] Calling predict() (read-ahead hit: {precomputed is not None})...")
+        try:
+            if precomputed is not None:
+                if trace is not None:
+                    trace.lap("readahead_hit")
+                clean_row = {
+                    k: v for k, v in data_dict.items() if v is not None and v == v
+                }
+                try:
+                    result = await prediction_service.predict_precomputed(
+                        clean_row, measure_value, session_id, precomputed, trace=trace
+                    )
+                except Exception:
+                    _finish_trace(trace, session_id, error=True)
+                    raise
+                _record_prediction(session, result, session_id)
+                _finish_trace(trace, session_id)
+            else:
+                result = await predict(req, session_service, prediction_service)
+        except ServiceOverloadedError:
+            # 推理佇列已滿，此列未執行，退回索引讓下次重送同一列
+            session.sim_index -= 1
+            raise
 
         # 加入 goal 欄位名稱和 goalSettings 到返回結果
         if hasattr(session, "current_model_config") and session.current_model_config:
@@ -240,7 +578,7 @@ async def simulator_next(
         print(f"{'=' * 60}\n")
         return result
 
-    except HTTPException:
+    except (HTTPException, ServiceOverloadedError):
         raise
     except Exception as e:
         import traceback
@@ -261,8 +599,12 @@ async def load_simulation_file(
     session_id: str = Body(default="default", embed=True),
     session_service: SessionService = Depends(get_session_service),
     file_service: FileService = Depends(get_file_service),
+    prediction_service: PredictionService = Depends(get_prediction_service),
+    readahead_service: SimulatorReadAheadService = Depends(
+        get_simulator_readahead_service
+    ),
 ):
-    """載入指定的 CSV 檔案作為模擬數據"""
+    """載入指定的 CSV 檔案作為模擬數據 (模型已就緒時立即開始背景預讀)"""
     try:
         print(f"\n{'=' * 60}")
         print(f"[DEBUG] /api/simulator/load_file called")
@@ -295,6 +637,11 @@ async def load_simulation_file(
 
         logger.info(f"Session {session_id} 載入模擬檔案: {filename} ({len(df)} rows)")
 
+        readahead_service.invalidate(session_id)
+        readahead_service.ensure(
+            session_id, session, prediction_service.find_agent(session_id), 0
+        )
+
         # 驗證：立即讀取一次確認
         verify_session = session_service.get_dashboard_session(session_id)
         print(f"[DEBUG] Verification - Session object ID: {id(verify_session)}")
@@ -322,6 +669,65 @@ async def load_simulation_file(
         raise HTTPException(500, detail=f"載入檔案失敗: {str(e)}")
 
 
+@router.post("/simulator/seek")
+async def simulator_seek(
+    index: int = Body(..., embed=True),
+    session_id: str = Body(default="default", embed=True),
+    warmup: bool = Body(default=True, embed=True),
+    session_service: SessionService = Depends(get_session_service),
+    prediction_service: PredictionService = Depends(get_prediction_service),
+    readahead_service: SimulatorReadAheadService = Depends(
+        get_simulator_readahead_service
+    ),
+):
+    """
+    跳轉模擬位置 (快轉 / 指定列重播)
+
+    跳轉後清空平滑歷史；warmup=True 時先重播目標列之前一個平滑窗口的資料，
+    使下一筆結果與從頭依序播放到該列相同。
+    """
+    session = session_service.get_dashboard_session(session_id)
+    if session.sim_df is None:
+        raise HTTPException(400, detail="請先選擇模擬檔案。")
+    n_rows = len(session.sim_df)
+    if not 0 <= index <= n_rows:
+        raise HTTPException(400, detail=f"index 超出範圍 (0 ~ {n_rows})")
+    if not prediction_service.is_ready(session_id):
+        raise HTTPException(500, "Agent not initialized. Ensure models are trained.")
+
+    agent = prediction_service.get_agent(session_id)
+    df = session.sim_df
+    measure_col = resolve_measure_column(list(df.columns), session.current_model_config)
+    start = max(0, index - agent.action_history.maxlen) if warmup else index
+
+    def replay():
+        agent.reset_history()
+        return readahead_service.warmup(agent, df, start, index, measure_col)
+
+    # 與該 session 的推理共用同一條佇列，避免與進行中的 /simulator/next 交錯
+    replayed = await prediction_service.executor.run(session_id, replay)
+
+    session.sim_index = index
+    readahead_service.ensure(session_id, session, agent, index)
+    logger.info(f"Session {session_id} simulator seek -> {index} (warmup {replayed} rows)")
+    return {
+        "status": "success",
+        "index": index,
+        "rows": n_rows,
+        "warmup_rows": replayed,
+    }
+
+
+@router.get("/simulator/readahead_stats")
+async def get_readahead_stats(
+    readahead_service: SimulatorReadAheadService = Depends(
+        get_simulator_readahead_service
+    ),
+):
+    """模擬器預讀的命中率與各 session 緩衝狀態"""
+    return readahead_service.stats()
+
+
 @router.post("/model/load")
 async def load_specific_model(
     model_path: str = Body(..., embed=True),
@@ -329,14 +735,21 @@ async def load_specific_model(
     prediction_service: PredictionService = Depends(get_prediction_service),
     session_service: SessionService = Depends(get_session_service),
     file_service: FileService = Depends(get_file_service),
+    model_load_service: ModelLoadService = Depends(get_model_load_service),
+    readahead_service: SimulatorReadAheadService = Depends(
+        get_simulator_readahead_service
+    ),
 ):
-    """指定載入特定版本的模型"""
+    """
+    指定載入特定版本的模型 (背景載入，立即回傳 ticket)
+
+    新模型在背景建立完成後才一次切換，切換前的預測仍使用舊模型；
+    以 /model/load_status/{ticket_id} 查詢進度。
+    """
     try:
-        # 載入模型
-        agent = prediction_service.get_agent(session_id)
-        agent.reload_model(target_bundle_name=model_path)
+        job_config = None
 
-        # 如果是 job_xxx.json 配置檔,讀取並儲存到 session
+        # 如果是 job_xxx.json 配置檔,先讀取 (供前端立即套用圖表設定)
         if model_path.endswith(".json") and model_path.startswith("job_"):
             import json
 
@@ -347,27 +760,78 @@ async def load_specific_model(
                 try:
                     with open(config_path, "r", encoding="utf-8") as f:
                         job_config = json.load(f)
-
-                    # 儲存配置到 session
-                    session = session_service.get_dashboard_session(session_id)
-                    session.current_model_config = job_config
-
-                    logger.info(
-                        f"Session {session_id} 載入模型配置: {model_path}, goal={job_config.get('goal')}"
-                    )
                 except Exception as e:
                     logger.warning(f"Failed to load model config {model_path}: {e}")
 
+        def on_swapped():
+            # 模型切換上線後才更新 session 的模型配置，與預測使用的模型保持一致
+            session = session_service.get_dashboard_session(session_id)
+            if job_config is not None:
+                session.current_model_config = job_config
+                logger.info(
+                    f"Session {session_id} 載入模型配置: {model_path}, goal={job_config.get('goal')}"
+                )
+            # 舊模型的預讀結果已失效，以新模型從目前位置重新預讀
+            readahead_service.invalidate(session_id)
+            readahead_service.ensure(session_id, session, agent, session.sim_index)
+
+        agent = prediction_service.get_agent(session_id, auto_load=False)
+        ticket = model_load_service.submit(session_id, model_path, agent, on_swapped)
+
         return {
             "status": "success",
-            "message": f"Model {model_path} loaded",
-            "config": job_config if 'job_config' in locals() else None
+            "loading": True,
+            "ticket_id": ticket["ticket_id"],
+            "message": f"Model {model_path} loading",
+            "config": job_config,
         }
     except Exception as e:
         logger.error(f"模型載入失敗: {e}", exc_info=True)
         raise HTTPException(500, f"Model load failed: {str(e)}")
 
 
+@router.get("/model/load_status/{ticket_id}")
+async def get_model_load_status(
+    ticket_id: str,
+    model_load_service: ModelLoadService = Depends(get_model_load_service),
+):
+    """查詢背景模型載入進度 (queued / loading / ready / failed / superseded)"""
+    ticket = model_load_service.get_ticket(ticket_id)
+    if ticket is None:
+        raise HTTPException(404, f"Load ticket {ticket_id} not found")
+    return ticket
+
+
+@router.get("/inference/stats")
+async def get_inference_stats(
+    prediction_service: PredictionService = Depends(get_prediction_service),
+):
+    """推理執行器的佇列深度與等待/執行時間 (啟用時含微批次統計)"""
+    return prediction_service.inference_stats()
+
+
+@router.get("/inference/latency")
+async def get_inference_latency():
+    """推理各階段耗時 (依 session 與模型，p50 / p95 / p99 / 次數 / 錯誤數)"""
+    return latency.snapshot()
+
+
+@router.post("/inference/latency")
+async def set_inference_latency(enabled: Optional[bool] = None, reset: bool = False):
+    """執行中開關分段計時 (enabled) 或清空統計 (reset)"""
+    if enabled is not None:
+        latency.enabled = enabled
+    if reset:
+        latency.reset()
+    return {"enabled": latency.enabled}
+
+
+@router.get("/model/cache_stats")
+async def get_model_cache_stats():
+    """跨 session 共用模型快取的使用狀況 (命中/未命中/淘汰次數)"""
+    return model_cache.stats()
+
+
 @router.get("/simulator/models")
 async def list_available_models(
     session_id: str = "default",
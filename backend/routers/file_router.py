@@ -3,8 +3,10 @@ File Router - 檔案管理相關 API
 """
 
 from fastapi import APIRouter, Depends, File, UploadFile, Form, Query
+from fastapi.responses import FileResponse
 from backend.services.file_service import FileService
-from backend.dependencies import get_file_service
+from backend.services.profile_service import ProfileService
+from backend.dependencies import get_file_service, get_profile_service
 
 router = APIRouter()
 
@@ -61,3 +63,26 @@ async def clear_workspace(
 ):
     """清理 folos 使用者的工作空間 (刪除所有資料夾)"""
     return await file_service.clear_user_workspace(session_id)
+
+
+@router.get("/profiles")
+async def list_profiles(
+    session_id: str = Query("default"),
+    profile_service: ProfileService = Depends(get_profile_service),
+):
+    """列出已擷取的請求剖析 (workspace/<session>/logs/profile_*.folded)"""
+    return {
+        "enabled": profile_service.enabled,
+        "profiles": profile_service.list_profiles(session_id),
+    }
+
+
+@router.get("/profiles/{name}")
+async def download_profile(
+    name: str,
+    session_id: str = Query("default"),
+    profile_service: ProfileService = Depends(get_profile_service),
+):
+    """下載剖析檔 (folded stack 格式，可用 flamegraph.pl / speedscope 開啟)"""
+    path = profile_service.profile_path(session_id, name)
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=name)
@@ -21,6 +21,7 @@ from llama_index.core.workflow import (
     Context,
 )
 import config
+from backend.utils.metrics import track_llm_call, track_llm_stream
 from .analysis_types import (
     IntentEvent,
     AnalysisEvent,
@@ -69,8 +70,9 @@ class CustomOllamaLLM(CustomLLM):
 
         try:
             async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(self.api_url, json=payload)
-                response.raise_for_status()
+                with track_llm_call():
+                    response = await client.post(self.api_url, json=payload)
+                    response.raise_for_status()
                 result = response.json()
                 content = result.get("message", {}).get("content", "")
                 return CompletionResponse(text=content)
@@ -89,7 +91,7 @@ class CustomOllamaLLM(CustomLLM):
         }
         try:
             async with httpx.AsyncClient(timeout=self.timeout) as client:
-                async with client.stream(
+                async with track_llm_stream(), client.stream(
                     "POST", self.api_url, json=payload
                 ) as response:
                     response.raise_for_status()
@@ -113,7 +115,8 @@ class CustomOllamaLLM(CustomLLM):
             "messages": [{"role": "user", "content": prompt}],
             "stream": False,
         }
-        response = requests.post(self.api_url, json=payload, timeout=self.timeout)
+        with track_llm_call():
+            response = requests.post(self.api_url, json=payload, timeout=self.timeout)
         result = response.json()
         return CompletionResponse(text=result.get("message", {}).get("content", ""))
 
@@ -17,14 +17,23 @@ from backend.models.request_models import (
     QuickAnalysisRequest,
 )
 
+from backend.services.training_scheduler import (
+    TrainingScheduler,
+    pid_alive,
+    write_job_config,
+)
+from backend.utils.exceptions import Sigma2Exception
+
 import config as app_config
 
 
 class AnalysisService:
     """分析服務，處理數據分析相關的業務邏輯"""
 
-    def __init__(self, base_upload_dir: str = None):
+    def __init__(self, base_upload_dir: str = None, scheduler: TrainingScheduler = None):
         self.base_upload_dir = base_upload_dir or app_config.BASE_STORAGE_DIR
+        # 訓練子進程一律交由排程器啟動 (並行上限 / 佇列 / 配額 / 執行緒預算)
+        self.scheduler = scheduler or TrainingScheduler()
 
     def get_user_upload_dir(self, session_id: str) -> str:
         """取得特定使用者的上傳目錄 (Helper)"""
@@ -176,7 +185,6 @@ class AnalysisService:
         """
         try:
             import json
-            import subprocess
             import sys
             from datetime import datetime
             from backend.dependencies import get_file_service
@@ -230,7 +238,7 @@ class AnalysisService:
             full_config["job_id"] = job_id
             full_config["session_id"] = session_id  # 記錄所屬 session
             full_config["created_at"] = datetime.now().strftime("%Y/%m/%d %H:%M:%S")
-            full_config["status"] = "training"
+            full_config["status"] = "queued"
             full_config["bundles_dir"] = bundles_dir  # 告知引擎模型存放地
 
             with open(json_path, "w", encoding="utf-8") as f:
@@ -254,32 +262,43 @@ class AnalysisService:
 
             script_path = os.path.abspath(script_name)
 
-            # 啟動子進程並將輸出定向到隔離後的 log
+            # 交由排程器排隊/啟動，輸出定向到隔離後的 log
             try:
-                log_file = open(log_file_path, "ab")
-                proc = subprocess.Popen(
+                job = self.scheduler.submit(
+                    job_id,
+                    session_id,
                     [sys.executable, script_path, json_path],
-                    stdout=log_file,
-                    stderr=subprocess.STDOUT,
-                    creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+                    log_file_path,
+                    config_path=json_path,
+                    priority=int(full_config.get("priority") or 0),
                 )
-                full_config["pid"] = proc.pid
-                with open(json_path, "w", encoding="utf-8") as f:
-                    json.dump(full_config, f, ensure_ascii=False, indent=4)
-            except Exception as e:
-                full_config["status"] = "failed"
-                with open(json_path, "w", encoding="utf-8") as f:
-                    json.dump(full_config, f, ensure_ascii=False, indent=4)
-                return {"status": "error", "message": f"啟動訓練失敗: {str(e)}"}
+            except Sigma2Exception:
+                # 超過配額：不留下任務紀錄
+                os.remove(json_path)
+                raise
+
+            if job["status"] == "failed":
+                return {"status": "error", "message": job["error"]}
 
             display_name = full_config.get("modelName") or full_config.get(
                 "model_name", "Unnamed"
             )
+            if job["status"] == "queued":
+                message = (
+                    f"Queued {mission_type} training for {display_name} "
+                    f"(position {job['queue_position']})"
+                )
+            else:
+                message = f"Successfully started {mission_type} training for {display_name}"
             return {
                 "status": "success",
-                "message": f"Successfully started {mission_type} training for {display_name}",
+                "message": message,
                 "job_id": job_id,
+                "job_status": job["status"],
+                "queue_position": job.get("queue_position"),
             }
+        except Sigma2Exception:
+            raise
         except Exception as e:
             raise HTTPException(500, detail=f"訓練編排失敗: {str(e)}")
 
@@ -304,18 +323,24 @@ class AnalysisService:
                         with open(fpath, "r", encoding="utf-8") as f:
                             m_data = json.load(f)
 
-                            # 關鍵增強：檢查「訓練中」的模型進程是否還活著
-                            if m_data.get("status") == "training" and m_data.get("pid"):
-                                pid = m_data.get("pid")
-                                is_alive = self._check_process_alive(pid)
-
-                                if not is_alive:
-                                    m_data["status"] = "failed"
-                                    m_data["error"] = "Process unexpectedly terminated."
-                                    with open(fpath, "w", encoding="utf-8") as fw:
-                                        json.dump(
-                                            m_data, fw, ensure_ascii=False, indent=4
-                                        )
+                            # 排隊中 / 訓練中的作業以排程器狀態為準；
+                            # 排程器不認得的 (伺服器重啟前啟動的) 子進程仍可能在執行，以 pid 探測
+                            if m_data.get("status") in ("training", "queued"):
+                                job = self.scheduler.get(m_data.get("job_id", fname[:-5]))
+                                if job is None:
+                                    pid = m_data.get("pid")
+                                    orphan_alive = (
+                                        m_data.get("status") == "training"
+                                        and pid
+                                        and pid_alive(pid)
+                                    )
+                                    if not orphan_alive:
+                                        m_data["status"] = "failed"
+                                        m_data["error"] = "Process unexpectedly terminated."
+                                        m_data.pop("queue_position", None)
+                                        write_job_config(fpath, m_data)
+                                elif job["status"] == "queued":
+                                    m_data["queue_position"] = job["queue_position"]
                             models.append(m_data)
                     except Exception:
                         continue
@@ -324,24 +349,9 @@ class AnalysisService:
             print(f"Error listing models: {str(e)}")
             return []
 
-    def _check_process_alive(self, pid: int) -> bool:
-        """檢查進程是否還活著 (Helper)"""
-        if os.name == "nt":
-            try:
-                import subprocess as sp
-
-                output = sp.check_output(
-                    f'tasklist /FI "PID eq {pid}" /NH', shell=True
-                ).decode("gbk", errors="ignore")
-                return str(pid) in output
-            except Exception:
-                return False
-        else:
-            try:
-                os.kill(pid, 0)
-                return True
-            except OSError:
-                return False
+    def running_training_count(self) -> int:
+        """執行中的訓練子進程數量 (由排程器追蹤)"""
+        return self.scheduler.running_count()
 
     async def get_training_log(self, job_id: str, session_id: str = "default") -> str:
         """獲取特定任務的訓練日誌內容 (隔離版)"""
@@ -392,7 +402,8 @@ class AnalysisService:
         )
 
         try:
-            if os.path.exists(config_path):
+            # 排程器管理的作業 (排隊中/執行中) 直接取消；否則沿用 pid 終止舊進程
+            if not self.scheduler.cancel(job_id) and os.path.exists(config_path):
                 with open(config_path, "r", encoding="utf-8") as f:
                     m_data = json.load(f)
                     pid = m_data.get("pid")
@@ -435,6 +446,9 @@ class AnalysisService:
         if not os.path.exists(config_path):
             return {"status": "error", "message": "找不到該模型配置"}
 
+        if self.scheduler.cancel(job_id):
+            return {"status": "success", "message": f"任務 {job_id} 已強制停止"}
+
         try:
             with open(config_path, "r", encoding="utf-8") as f:
                 m_data = json.load(f)
@@ -448,8 +462,7 @@ class AnalysisService:
 
                 m_data["status"] = "failed"
                 m_data["error"] = "Manually stopped by user."
-                with open(config_path, "w", encoding="utf-8") as fw:
-                    json.dump(m_data, fw, ensure_ascii=False, indent=4)
+                write_job_config(config_path, m_data)
                 return {"status": "success", "message": f"任務 {job_id} 已強制停止"}
             return {"status": "error", "message": "任務已結束或無運行中的進程"}
         except Exception as e:
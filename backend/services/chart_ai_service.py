@@ -3,6 +3,7 @@ import requests
 from typing import List, Dict, Any
 from datetime import datetime
 from core_logic.llm_reporter import LLMReporter
+from backend.utils.metrics import track_llm_call
 import config
 
 
@@ -161,8 +162,9 @@ class ChartAIService:
             # 但 llm_reporter 也是用 requests，所以這裡暫時維持 requests (但在 async def 中會 block loop，需注意)
             # 考慮到這是一個 blocking call，理想上應該 run_in_executor，但暫時簡單處理。
 
-            response = requests.post(config.LLM_API_URL, json=payload, timeout=60)
-            response.raise_for_status()
+            with track_llm_call():
+                response = requests.post(config.LLM_API_URL, json=payload, timeout=60)
+                response.raise_for_status()
             result = response.json()
             return result.get("message", {}).get("content", "AI 無法產生回覆。")
         except Exception as e:
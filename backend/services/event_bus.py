@@ -0,0 +1,161 @@
+"""
+看板事件匯流排 (Server-Sent Events)
+依 session 推送新預測、模擬結束、模型載入完成與 AI 任務完成等事件，取代前端定時輪詢；
+每個 session 保留最近的事件供斷線重連時依 Last-Event-ID 補送
+"""
+
+import json
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, AsyncIterator
+
+import config
+from backend.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Subscriber:
+    __slots__ = ("queue", "loop", "overflowed")
+
+    def __init__(self, loop, maxsize):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.loop = loop
+        self.overflowed = False
+
+
+class _Channel:
+    __slots__ = ("next_id", "events", "subscribers")
+
+    def __init__(self, buffer_size):
+        self.next_id = 1
+        self.events = deque(maxlen=buffer_size)  # (id, event, payload_json)
+        self.subscribers = set()
+
+
+def _format(event_id: int, event: str, payload: str) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+class EventBus:
+    """
+    以 session 為頻道的事件匯流排
+
+    - publish() 可由任意執行緒呼叫 (推理執行緒、模型載入執行緒)，事件只序列化一次
+    - 從未有人訂閱的 session 不建立頻道，publish 幾乎沒有成本
+    - 訂閱者佇列滿 (用戶端過慢) 時中斷該連線，由瀏覽器以 Last-Event-ID 重連補送
+    """
+
+    def __init__(self, buffer_size: int = None, heartbeat: float = None, queue_size: int = None):
+        self.buffer_size = buffer_size or getattr(config, "EVENT_BUFFER_SIZE", 256)
+        self.heartbeat = heartbeat or getattr(config, "EVENT_HEARTBEAT_SECONDS", 15)
+        self.queue_size = queue_size or getattr(config, "EVENT_QUEUE_SIZE", 512)
+        self._channels: Dict[str, _Channel] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, session_id: str, event: str, data: Dict[str, Any]) -> Optional[int]:
+        """發布事件，回傳事件 id (該 session 沒有頻道時回傳 None)"""
+        channel = self._channels.get(session_id)
+        if channel is None:
+            return None
+
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+        with self._lock:
+            event_id = channel.next_id
+            channel.next_id += 1
+            item = (event_id, event, payload)
+            channel.events.append(item)
+            subscribers = list(channel.subscribers)
+
+        for sub in subscribers:
+            self._deliver(sub, item)
+        return event_id
+
+    def _deliver(self, sub: _Subscriber, item):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is sub.loop:
+            self._put(sub, item)
+        else:
+            try:
+                sub.loop.call_soon_threadsafe(self._put, sub, item)
+            except RuntimeError:
+                pass  # 連線所在的 event loop 已關閉
+
+    @staticmethod
+    def _put(sub: _Subscriber, item):
+        if sub.overflowed:
+            return
+        try:
+            sub.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            sub.overflowed = True
+            logger.warning("Event subscriber too slow, closing stream for resync")
+
+    async def stream(
+        self, session_id: str, last_event_id: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """
+        SSE 串流 (text/event-stream)
+
+        last_event_id 之後仍在緩衝內的事件會先補送；已超出緩衝範圍時
+        先送出 reset 事件，前端應以 /history?since= 重新同步
+        """
+        loop = asyncio.get_running_loop()
+        sub = _Subscriber(loop, self.queue_size)
+        with self._lock:
+            channel = self._channels.get(session_id)
+            if channel is None:
+                channel = _Channel(self.buffer_size)
+                self._channels[session_id] = channel
+            backlog = list(channel.events)
+            oldest = backlog[0][0] if backlog else channel.next_id
+            next_id = channel.next_id
+            channel.subscribers.add(sub)
+
+        try:
+            yield "retry: 3000\n\n"
+            if last_event_id is not None:
+                if last_event_id + 1 < oldest or last_event_id >= next_id:
+                    # 缺漏的事件已被覆寫 (或伺服器重啟過)
+                    yield _format(next_id - 1, "reset", json.dumps({"next_id": next_id}))
+                else:
+                    for item in backlog:
+                        if item[0] > last_event_id:
+                            yield _format(*item)
+
+            while not sub.overflowed:
+                try:
+                    item = await asyncio.wait_for(sub.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield _format(*item)
+        finally:
+            with self._lock:
+                channel.subscribers.discard(sub)
+
+    def subscriber_count(self, session_id: str) -> int:
+        with self._lock:
+            channel = self._channels.get(session_id)
+            return len(channel.subscribers) if channel is not None else 0
+
+    def drop_channel(self, session_id: str) -> bool:
+        """移除沒有訂閱者的頻道與其事件緩衝 (閒置 session 淘汰時呼叫)"""
+        with self._lock:
+            channel = self._channels.get(session_id)
+            if channel is None or channel.subscribers:
+                return False
+            del self._channels[session_id]
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "channels": len(self._channels),
+                "subscribers": sum(len(c.subscribers) for c in self._channels.values()),
+                "buffered_events": sum(len(c.events) for c in self._channels.values()),
+            }
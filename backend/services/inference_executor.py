@@ -0,0 +1,180 @@
+"""
+推理執行器
+將同步的模型推理 (IQL / XGBoost / 歸因) 移出 event loop，交給專用的執行緒池；
+同一個 session 的請求依到達順序執行 (動作/SHAP 平滑依賴順序)，
+超過容量時立即拒絕，避免請求無限堆積
+"""
+
+import asyncio
+import time
+import functools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable
+
+import numpy as np
+import config
+from backend.utils import get_logger
+from backend.utils.exceptions import ServiceOverloadedError
+
+logger = get_logger(__name__)
+
+# 統計等待/執行時間的取樣數
+_LATENCY_SAMPLES = 1000
+
+
+class InferenceExecutor:
+    """有界佇列 + 每 session 依序執行的推理執行緒池"""
+
+    def __init__(
+        self,
+        max_workers: int = None,
+        max_pending: int = None,
+        max_pending_per_session: int = None,
+    ):
+        self.max_workers = max_workers or getattr(config, "INFERENCE_WORKERS", 4)
+        self.max_pending = max_pending or getattr(config, "INFERENCE_MAX_PENDING", 64)
+        self.max_pending_per_session = max_pending_per_session or getattr(
+            config, "INFERENCE_MAX_PENDING_PER_SESSION", 8
+        )
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="inference"
+        )
+
+        # session_id -> asyncio.Lock (FIFO，保證同 session 依序執行)
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        self._session_pending: Dict[str, int] = {}
+        self._pending = 0
+        self._running = 0
+
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._wait_ms = deque(maxlen=_LATENCY_SAMPLES)
+        self._run_ms = deque(maxlen=_LATENCY_SAMPLES)
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        """推理執行緒池 (供 micro-batcher 提交合併後的批次)"""
+        return self._pool
+
+    async def run(self, session_id: str, fn: Callable, *args, **kwargs):
+        """
+        於執行緒池執行 fn(*args, **kwargs)，同一 session 依序執行
+
+        Raises:
+            ServiceOverloadedError: 全域或該 session 的待處理請求已達上限
+        """
+        loop = asyncio.get_running_loop()
+        return await self._guarded(
+            session_id,
+            lambda: loop.run_in_executor(
+                self._pool, functools.partial(fn, *args, **kwargs)
+            ),
+        )
+
+    async def run_async(self, session_id: str, coro_fn: Callable, *args, **kwargs):
+        """
+        與 run() 相同的容量控制與 session 順序，但執行的是 coroutine
+        (例如交給 micro-batcher 合併後再由執行緒池處理)
+        """
+        return await self._guarded(session_id, lambda: coro_fn(*args, **kwargs))
+
+    async def _guarded(self, session_id: str, start: Callable):
+        session_pending = self._session_pending.get(session_id, 0)
+        if (
+            self._pending >= self.max_pending
+            or session_pending >= self.max_pending_per_session
+        ):
+            self.rejected += 1
+            raise ServiceOverloadedError(
+                "推理佇列已滿，請稍後再試",
+                details={
+                    "pending": self._pending,
+                    "session_pending": session_pending,
+                    "max_pending": self.max_pending,
+                    "max_pending_per_session": self.max_pending_per_session,
+                },
+            )
+
+        self._pending += 1
+        self._session_pending[session_id] = session_pending + 1
+        self.submitted += 1
+        lock = self._session_locks.setdefault(session_id, asyncio.Lock())
+        enqueued = time.perf_counter()
+        try:
+            async with lock:
+                started = time.perf_counter()
+                self._running += 1
+                work = asyncio.ensure_future(start())
+                try:
+                    result = await asyncio.shield(work)
+                except asyncio.CancelledError:
+                    # 請求被取消 (例如用戶端斷線) 時執行緒仍在推理：
+                    # 等它結束才釋放 session 鎖，下一個請求不會與它同時修改 agent
+                    await self._drain(work)
+                    raise
+                except Exception:
+                    self.failed += 1
+                    raise
+                finally:
+                    self._running -= 1
+                    finished = time.perf_counter()
+                    with self._stats_lock:
+                        self._wait_ms.append((started - enqueued) * 1000)
+                        self._run_ms.append((finished - started) * 1000)
+                self.completed += 1
+                return result
+        finally:
+            self._pending -= 1
+            remaining = self._session_pending[session_id] - 1
+            if remaining:
+                self._session_pending[session_id] = remaining
+            else:
+                # 該 session 已無待處理請求，回收鎖
+                del self._session_pending[session_id]
+                self._session_locks.pop(session_id, None)
+
+    @staticmethod
+    async def _drain(work):
+        """等待已開始的工作結束 (期間再被取消也不提早返回)，結果與例外都捨棄"""
+        while not work.done():
+            try:
+                await asyncio.wait({work})
+            except asyncio.CancelledError:
+                pass
+        if not work.cancelled():
+            work.exception()  # 取出例外，避免 "exception was never retrieved"
+
+    def stats(self) -> Dict[str, Any]:
+        """佇列深度、等待/執行時間 (ms) 等監控數據"""
+        with self._stats_lock:
+            wait_ms = np.array(self._wait_ms) if self._wait_ms else np.zeros(1)
+            run_ms = np.array(self._run_ms) if self._run_ms else np.zeros(1)
+
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "max_pending_per_session": self.max_pending_per_session,
+            "pending": self._pending,
+            "running": self._running,
+            "queued": self._pending - self._running,
+            "active_sessions": len(self._session_pending),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_ms": {
+                "p50": float(np.percentile(wait_ms, 50)),
+                "p95": float(np.percentile(wait_ms, 95)),
+                "max": float(wait_ms.max()),
+            },
+            "run_ms": {
+                "p50": float(np.percentile(run_ms, 50)),
+                "p95": float(np.percentile(run_ms, 95)),
+                "max": float(run_ms.max()),
+            },
+        }
@@ -0,0 +1,178 @@
+"""
+跨 session 的微批次排程器 (opt-in)
+在短時間窗口內收集「使用同一組共用模型」的預測請求，合併成一次 IQL / XGBoost 推理，
+再把結果分回各自的 session 套用平滑
+"""
+
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+from backend.utils import get_logger
+
+logger = get_logger(__name__)
+
+# 統計批次大小的取樣數
+_BATCH_SAMPLES = 1000
+
+
+class _PendingGroup:
+    __slots__ = ("items", "timer")
+
+    def __init__(self):
+        self.items: List[Tuple[Any, Dict[str, Any], float, asyncio.Future]] = []
+        self.timer = None
+
+
+class MicroBatcher:
+    """
+    依 agent.batch_key() 分組的微批次排程器
+
+    - 同組請求在 window_ms 內累積，或達到 max_batch 筆時立即送出
+    - 合併階段只做無狀態推理 (agent.infer_raw)；平滑仍由各 session 依序套用
+    - 同一 session 的請求已由 InferenceExecutor 依序排隊，每批每個 session 至多一筆
+    """
+
+    def __init__(self, pool, window_ms: float = 5.0, max_batch: int = 32):
+        self.pool = pool
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._groups: Dict[Any, _PendingGroup] = {}
+
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.fallbacks = 0
+        self._sizes = deque(maxlen=_BATCH_SAMPLES)
+
+    async def submit(self, agent, row: Dict[str, Any], current_y: float, finish=None):
+        """
+        送出單筆預測，回傳 agent.get_reasoned_advice() 相同格式的結果
+
+        finish(result) 於同一個模型鎖內對結果做後處理 (例如格式化)，回傳其結果
+        """
+        loop = asyncio.get_running_loop()
+        key = agent.batch_key()
+        if key is None:
+            # 尚未載入共用模型，無法合併 -> 直接單筆推理
+            return await loop.run_in_executor(
+                self.pool, self._run_single, agent, row, current_y, finish
+            )
+
+        future = loop.create_future()
+        group = self._groups.get(key)
+        if group is None:
+            group = _PendingGroup()
+            self._groups[key] = group
+            group.timer = loop.call_later(self.window, self._flush, key)
+        group.items.append((agent, row, current_y, finish, future))
+
+        if len(group.items) >= self.max_batch:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key):
+        group = self._groups.pop(key, None)
+        if group is None:
+            return
+        if group.timer is not None:
+            group.timer.cancel()
+
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(self.pool, self._run_group, key, group.items)
+
+        def deliver(done):
+            try:
+                outcomes = done.result()
+            except Exception as e:
+                outcomes = [(None, e)] * len(group.items)
+            for (*_, future), (result, error) in zip(group.items, outcomes):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+        task.add_done_callback(deliver)
+
+    @staticmethod
+    def _run_single(agent, row, current_y, finish):
+        with agent._model_lock:
+            result = agent.get_reasoned_advice(row, current_y)
+            return finish(result) if finish is not None else result
+
+    def _run_group(self, key, items):
+        """(執行緒池) 合併推理後逐一套用各 session 的平滑"""
+        outcomes = [None] * len(items)
+
+        # 1. 各自擷取特徵；狀態欄位缺值的請求單獨回報錯誤，不影響其他請求
+        batch_idx, blocks, ys = [], [], []
+        for i, (agent, row, current_y, _, _) in enumerate(items):
+            try:
+                blocks.append(agent.gather_rows([row]))
+                ys.append(current_y)
+                batch_idx.append(i)
+            except Exception as e:
+                outcomes[i] = (None, e)
+
+        if not batch_idx:
+            return outcomes
+
+        # 2. 一次無狀態推理 (同組 agent 共用同一組模型物件，由第一個 agent 代表執行)
+        values = np.vstack(blocks)
+        lead = items[batch_idx[0]][0]
+        raw = None
+        try:
+            with lead._model_lock:
+                if lead.batch_key() == key:
+                    raw = lead.infer_raw(values, ys)
+        except Exception as e:
+            logger.error(f"❌ Micro-batch inference failed: {e}", exc_info=True)
+
+        # 3. 依 session 套用平滑；批次期間模型已切換的 session 改走單筆推理
+        fallbacks = 0
+        for pos, i in enumerate(batch_idx):
+            agent, row, current_y, finish, _ = items[i]
+            try:
+                with agent._model_lock:
+                    if raw is not None and agent.batch_key() == key:
+                        result = agent.apply_raw(
+                            values[pos : pos + 1],
+                            [current_y],
+                            agent.slice_raw(raw, pos, pos + 1),
+                        )[0]
+                    else:
+                        fallbacks += 1
+                        result = agent.get_reasoned_advice(row, current_y)
+                    if finish is not None:
+                        result = finish(result)
+                outcomes[i] = (result, None)
+            except Exception as e:
+                outcomes[i] = (None, e)
+
+        with self._stats_lock:
+            self.batches += 1
+            self.requests += len(items)
+            self.fallbacks += fallbacks
+            self._sizes.append(len(items))
+        return outcomes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            sizes = np.array(self._sizes) if self._sizes else np.zeros(1)
+            return {
+                "window_ms": self.window * 1000,
+                "max_batch": self.max_batch,
+                "pending_groups": len(self._groups),
+                "batches": self.batches,
+                "requests": self.requests,
+                "fallbacks": self.fallbacks,
+                "batch_size": {
+                    "mean": float(sizes.mean()),
+                    "p95": float(np.percentile(sizes, 95)),
+                    "max": float(sizes.max()),
+                },
+            }
@@ -0,0 +1,152 @@
+"""
+模型載入服務
+於背景執行緒建立完整的新模型組，完成後再一次切換 (雙緩衝)，
+避免在 event loop 上同步載入模型而卡住其他使用者的請求
+"""
+
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable
+
+from backend.utils import get_logger
+
+logger = get_logger(__name__)
+
+# 保留已完成 ticket 的時間 (秒)
+TICKET_TTL_SECONDS = 3600
+
+
+class ModelLoadService:
+    """背景模型載入與 ticket 狀態管理"""
+
+    def __init__(self, max_workers: int = 2, event_bus=None):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="model-load"
+        )
+        self._event_bus = event_bus  # 載入結束時推送 model_load 事件
+        self._tickets: Dict[str, Dict[str, Any]] = {}
+        self._latest: Dict[str, str] = {}  # session_id -> 最新 ticket_id
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        session_id: str,
+        model_path: str,
+        agent,
+        on_swapped: Optional[Callable[[], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        排入背景載入，立即回傳 ticket
+
+        同一個 session 連續送出多次載入時，只有最新的 ticket 會被切換上線，
+        較舊的 ticket 建立完成後標記為 superseded 並釋放模型。
+        """
+        ticket_id = str(uuid.uuid4())
+        ticket = {
+            "ticket_id": ticket_id,
+            "session_id": session_id,
+            "model_path": model_path,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0,
+            "error": None,
+            "warnings": [],
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        with self._lock:
+            self._cleanup_old_tickets()
+            self._tickets[ticket_id] = ticket
+            self._latest[session_id] = ticket_id
+
+        snapshot = dict(ticket)
+        self._executor.submit(self._run, ticket_id, agent, on_swapped)
+        return snapshot
+
+    def get_ticket(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            ticket = self._tickets.get(ticket_id)
+            return dict(ticket) if ticket else None
+
+    def get_latest(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            ticket_id = self._latest.get(session_id)
+        return self.get_ticket(ticket_id) if ticket_id else None
+
+    def _update(self, ticket_id: str, **fields):
+        with self._lock:
+            if ticket_id in self._tickets:
+                self._tickets[ticket_id].update(fields)
+
+    def _finish(self, ticket_id: str, **fields):
+        """寫入最終狀態 (ready / failed / superseded) 並推送事件"""
+        self._update(ticket_id, finished_at=time.time(), **fields)
+        if self._event_bus is not None:
+            ticket = self.get_ticket(ticket_id)
+            if ticket:
+                self._event_bus.publish(ticket["session_id"], "model_load", ticket)
+
+    def _is_latest(self, ticket_id: str, session_id: str) -> bool:
+        with self._lock:
+            return self._latest.get(session_id) == ticket_id
+
+    def _run(self, ticket_id: str, agent, on_swapped):
+        ticket = self.get_ticket(ticket_id)
+        session_id = ticket["session_id"]
+        model_path = ticket["model_path"]
+
+        if not self._is_latest(ticket_id, session_id):
+            self._finish(ticket_id, status="superseded", stage="superseded")
+            return
+
+        self._update(ticket_id, status="loading", stage="starting", progress=5)
+
+        def progress(stage, percent):
+            self._update(ticket_id, stage=stage, progress=percent)
+
+        try:
+            model_set = agent.build_model_set(model_path, progress=progress)
+        except Exception as e:
+            logger.error(f"模型載入失敗 ({session_id}, {model_path}): {e}", exc_info=True)
+            self._finish(ticket_id, status="failed", stage="failed", error=str(e))
+            return
+
+        # 建立期間已有更新的載入請求 -> 放棄此模型組
+        if not self._is_latest(ticket_id, session_id):
+            model_set.release()
+            self._finish(ticket_id, status="superseded", stage="superseded")
+            return
+
+        self._update(ticket_id, stage="swapping", progress=98)
+        agent.swap_model_set(model_set)
+
+        if on_swapped:
+            try:
+                on_swapped()
+            except Exception as e:
+                logger.warning(f"on_swapped callback failed for {session_id}: {e}")
+
+        logger.info(f"Session {session_id} 模型切換完成: {model_path}")
+        self._finish(
+            ticket_id,
+            status="ready",
+            stage="ready",
+            progress=100,
+            warnings=list(model_set.errors),
+            iql_available=model_set.iql_algo is not None,
+            xgb_available=bool(model_set.simulator and model_set.simulator.model),
+        )
+
+    def _cleanup_old_tickets(self):
+        """清除過期的已完成 ticket (需在 self._lock 內呼叫)"""
+        now = time.time()
+        expired = [
+            tid
+            for tid, t in self._tickets.items()
+            if t["finished_at"] and now - t["finished_at"] > TICKET_TTL_SECONDS
+            and self._latest.get(t["session_id"]) != tid
+        ]
+        for tid in expired:
+            del self._tickets[tid]
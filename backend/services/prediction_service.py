@@ -3,10 +3,18 @@
 封裝 AgenticReasoning 的業務邏輯
 """
 
+import threading
+import time
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, List, Callable, Optional
 import logging
 from core_logic.agent_logic import AgenticReasoning
+from core_logic.latency import activate, lap
+from backend.services.inference_executor import InferenceExecutor
+from backend.services.micro_batcher import MicroBatcher
+from backend.models.packed_rows import describe_schema, decode_rows
+from backend.utils import SchemaMismatchError
+import config
 
 # 获取 logger
 logger = logging.getLogger(__name__)
@@ -17,36 +25,118 @@ class PredictionService:
 
     def __init__(self):
         self._agents: Dict[str, AgenticReasoning] = {}
+        self._last_access: Dict[str, float] = {}  # 最後一次 get_agent (time.monotonic)
+        # 淘汰於背景執行緒移除 Agent，與 event loop 上的建立 / 迭代互斥
+        self._lock = threading.RLock()
+        # 新建 Agent 前查詢先前的模型載入目標 (淘汰 / 快照)：
+        # source(session_id) -> {"model_target": ...} | None (model_target 為 None 表示最新模型)
+        self.model_target_sources: List[Callable[[str], Optional[Dict[str, Any]]]] = []
+        # 有先前目標時交給背景載入 (ModelLoadService)，不同步載入最新模型
+        self.model_load_service = None
+        # 推理於專用執行緒池執行，不阻塞 event loop
+        self.executor = InferenceExecutor()
+        # 跨 session 微批次 (opt-in)
+        self.micro_batcher = (
+            MicroBatcher(
+                self.executor.pool,
+                window_ms=getattr(config, "MICRO_BATCH_WINDOW_MS", 5),
+                max_batch=getattr(config, "MICRO_BATCH_MAX_SIZE", 32),
+            )
+            if getattr(config, "MICRO_BATCH_ENABLED", False)
+            else None
+        )
 
-    def get_agent(self, session_id: str) -> AgenticReasoning:
-        """取得特定使用者的 Agent 實例"""
+    def get_agent(self, session_id: str, auto_load: bool = True) -> AgenticReasoning:
+        """
+        取得特定使用者的 Agent 實例
+
+        auto_load=False 時新建立的 Agent 不會同步載入模型 (由背景載入服務負責)；
+        session 有先前的模型目標 (被淘汰 / 快照還原) 時交給背景載入，不同步載入最新模型
+        """
         print(f"[DEBUG] PredictionService.get_agent called for session: {session_id}")
+        self._last_access[session_id] = time.monotonic()
         print(f"[DEBUG] PredictionService instance ID: {id(self)}")
         print(f"[DEBUG] Existing agents: {list(self._agents.keys())}")
 
-        if session_id not in self._agents:
-            print(f"[DEBUG] Creating new agent for session: {session_id}")
-            try:
-                # 傳入 session_id 以載入該使用者最近的模型
-                self._agents[session_id] = AgenticReasoning(session_id)
-                print(f"PredictionService: Agent for session {session_id} initialized")
-            except Exception as e:
-                print(
-                    f"PredictionService: Session {session_id} agent load failed - {e}"
-                )
-                return None
-        else:
+        agent = self._agents.get(session_id)
+        if agent is not None:
             print(f"[DEBUG] Reusing existing agent for session: {session_id}")
-        return self._agents[session_id]
+            return agent
+
+        print(f"[DEBUG] Creating new agent for session: {session_id}")
+        # auto_load=False 由呼叫端指定要載入的模型，先前的目標一併取出作廢
+        previous = self._take_model_target(session_id)
+        try:
+            # 傳入 session_id 以載入該使用者最近的模型；有先前目標時先建立空 Agent
+            agent = AgenticReasoning(session_id, auto_load and previous is None)
+            print(f"PredictionService: Agent for session {session_id} initialized")
+        except Exception as e:
+            print(
+                f"PredictionService: Session {session_id} agent load failed - {e}"
+            )
+            return None
+
+        with self._lock:
+            existing = self._agents.setdefault(session_id, agent)
+        if existing is not agent:
+            # 其他執行緒已先建立 -> 放棄這個 Agent
+            agent.release_models()
+            return existing
+
+        if auto_load and previous is not None:
+            self._load_previous_target(session_id, agent, previous["model_target"])
+        return agent
+
+    def _take_model_target(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """依序查詢 model_target_sources，取第一筆記錄 (每個來源的記錄都會被取出)"""
+        records = [source(session_id) for source in self.model_target_sources]
+        return next((r for r in records if r is not None), None)
+
+    def _load_previous_target(self, session_id: str, agent, model_target):
+        """重新載入 session 先前使用的模型目標 (背景載入服務不可用時同步載入)"""
+        if self.model_load_service is not None:
+            self.model_load_service.submit(session_id, model_target, agent)
+        else:
+            agent.reload_model(model_target)
+
+    def find_agent(self, session_id: str):
+        """取得已存在的 Agent (不建立、不載入模型)"""
+        with self._lock:
+            return self._agents.get(session_id)
+
+    def remove_agent(self, session_id: str) -> bool:
+        """移除使用者的 Agent，並歸還其持有的共用模型參考"""
+        with self._lock:
+            agent = self._agents.pop(session_id, None)
+            self._last_access.pop(session_id, None)
+        if agent is None:
+            return False
+        agent.release_models()
+        return True
+
+    def agent_ids(self):
+        with self._lock:
+            return list(self._agents)
+
+    def last_access(self, session_id: str):
+        return self._last_access.get(session_id)
+
+    def agent_count(self) -> int:
+        """目前已載入的 Agent 數量 (/metrics 用)"""
+        return len(self._agents)
 
     def is_ready(self, session_id: str = "default") -> bool:
         """檢查特定使用者的服務是否就緒"""
         return self.get_agent(session_id) is not None
 
     async def predict(
-        self, row: Dict[str, Any], measure_value: float, session_id: str = "default"
+        self,
+        row: Dict[str, Any],
+        measure_value: float,
+        session_id: str = "default",
+        trace=None,
     ) -> Dict[str, Any]:
-        """執行預測並返回建議"""
+        """執行預測並返回建議 (trace: core_logic.latency.Trace，記錄各階段耗時)"""
         # logger.debug("=" * 60)
         # logger.debug("🎯 PredictionService.predict() 被调用")
         # logger.debug("=" * 60)
@@ -54,56 +144,235 @@ class PredictionService:
         # logger.debug(f"Measure Value: {measure_value}")
         # logger.debug(f"Row data keys: {list(row.keys())[:10]}...")
 
+        if self.micro_batcher is not None:
+            return await self.executor.run_async(
+                session_id,
+                self._predict_micro_batched,
+                row,
+                measure_value,
+                session_id,
+                trace,
+            )
+        return await self.executor.run(
+            session_id, self._predict_sync, row, measure_value, session_id, trace
+        )
+
+    async def _predict_micro_batched(
+        self, row: Dict[str, Any], measure_value: float, session_id: str, trace=None
+    ) -> Dict[str, Any]:
+        """交給 micro-batcher 與其他 session 合併推理，再依本 session 的設定格式化"""
         agent = self.get_agent(session_id)
         if not agent:
             logger.error(f"❌ Agent not available for session {session_id}")
             raise RuntimeError(f"PredictionService not ready for session {session_id}")
 
-        # logger.debug("✅ Agent found, calling get_reasoned_advice()...")
+        if trace is not None:
+            trace.lap("queue")
+            trace.model = self._model_label(agent)
+        def finish(agent_out):
+            # 於 agent 的模型鎖內執行，格式化與推理使用同一組模型
+            target_range, measure_name = self._resolve_goal(agent, session_id)
+            return self._format_output(
+                agent, agent_out, row, measure_value, target_range, measure_name
+            )
 
-        # 執行推理
-        agent_out = agent.get_reasoned_advice(row, float(measure_value))
+        output = await self.micro_batcher.submit(
+            agent, row, float(measure_value), finish=finish
+        )
+        if trace is not None:
+            # 合併推理與格式化在其他執行緒，各階段不分開計時
+            trace.lap("micro_batch")
+        return output
 
-        # 格式化輸出
-        recommendations = {}
+    async def predict_precomputed(
+        self,
+        row: Dict[str, Any],
+        measure_value: float,
+        session_id: str,
+        precomputed,
+        trace=None,
+    ) -> Dict[str, Any]:
+        """以預讀的無狀態推理結果 (values, raw, model_generation) 套用平滑並格式化"""
+        return await self.executor.run(
+            session_id,
+            self._predict_precomputed_sync,
+            row,
+            measure_value,
+            session_id,
+            precomputed,
+            trace,
+        )
 
-        # 檢查是否有有效的動作建議
-        has_valid_actions = (
-            agent_out.get("iql_action_delta") is not None
-            and agent_out.get("iql_action_delta_smoothed") is not None
+    def _predict_precomputed_sync(
+        self,
+        row: Dict[str, Any],
+        measure_value: float,
+        session_id: str,
+        precomputed,
+        trace=None,
+    ) -> Dict[str, Any]:
+        with activate(trace):
+            lap("queue")
+            agent = self.get_agent(session_id)
+            if not agent:
+                logger.error(f"❌ Agent not available for session {session_id}")
+                raise RuntimeError(f"PredictionService not ready for session {session_id}")
+            if trace is not None:
+                trace.model = self._model_label(agent)
+
+            values, raw, generation = precomputed
+            with agent._model_lock:
+                if agent.model_generation == generation:
+                    agent_out = agent.apply_raw(values, [float(measure_value)], raw)[0]
+                else:
+                    # 預讀後模型已切換，改走逐筆推理
+                    agent_out = agent.get_reasoned_advice(row, float(measure_value))
+
+                target_range, measure_name = self._resolve_goal(agent, session_id)
+                output = self._format_output(
+                    agent, agent_out, row, measure_value, target_range, measure_name
+                )
+            lap("format")
+            return output
+
+    def inference_stats(self) -> Dict[str, Any]:
+        """推理執行器與微批次的監控數據"""
+        stats = self.executor.stats()
+        stats["micro_batch"] = (
+            self.micro_batcher.stats() if self.micro_batcher is not None else None
         )
+        return stats
 
-        for i, feat in enumerate(agent.action_features):
-            display_name = feat  # 直接使用原始特徵名稱
+    def _predict_sync(
+        self, row: Dict[str, Any], measure_value: float, session_id: str, trace=None
+    ) -> Dict[str, Any]:
+        """同步推理本體 (於推理執行緒池執行)"""
+        with activate(trace):
+            lap("queue")
+            agent = self.get_agent(session_id)
+            if not agent:
+                logger.error(f"❌ Agent not available for session {session_id}")
+                raise RuntimeError(f"PredictionService not ready for session {session_id}")
+            if trace is not None:
+                trace.model = self._model_label(agent)
 
-            # 安全獲取建議值
-            delta = agent_out["iql_action_delta"][i] if has_valid_actions else 0.0
-            delta_smoothed = (
-                agent_out["iql_action_delta_smoothed"][i] if has_valid_actions else 0.0
-            )
+            # logger.debug("✅ Agent found, calling get_reasoned_advice()...")
 
-            current_val = float(row[feat])
+            # 推理與格式化在同一個模型鎖內，期間背景載入不會切換模型
+            with agent._model_lock:
+                agent_out = agent.get_reasoned_advice(row, float(measure_value))
 
-            recommendations[display_name] = {
-                "current": current_val,
-                "suggested_delta": delta,
-                "suggested_delta_smoothed": delta_smoothed,
-                "suggested_next": float(current_val + delta),
-                "suggested_next_smoothed": float(current_val + delta_smoothed),
-            }
+                target_range, measure_name = self._resolve_goal(agent, session_id)
+                output = self._format_output(
+                    agent, agent_out, row, measure_value, target_range, measure_name
+                )
+            lap("format")
+            return output
 
-        feature_snapshots = {}
-        for feat in agent.bg_features + agent.action_features:
-            chn_name = feat  # 直接使用原始特徵名稱
-            raw_val = row.get(feat)
-            final_val = (
-                float(raw_val)
-                if raw_val is not None
-                and not (isinstance(raw_val, float) and np.isnan(raw_val))
-                else 0.0
-            )
-            feature_snapshots[chn_name] = final_val
+    async def predict_batch(
+        self,
+        rows: List[Dict[str, Any]],
+        measure_values: List[float],
+        session_id: str = "default",
+        trace=None,
+    ) -> List[Dict[str, Any]]:
+        """批次執行預測，逐列回傳與 predict() 相同格式的建議"""
+        return await self.executor.run(
+            session_id, self._predict_batch_sync, rows, measure_values, session_id, trace
+        )
+
+    def _predict_batch_sync(
+        self,
+        rows: List[Dict[str, Any]],
+        measure_values: List[float],
+        session_id: str,
+        trace=None,
+    ) -> List[Dict[str, Any]]:
+        """同步批次推理本體 (於推理執行緒池執行)"""
+        with activate(trace):
+            lap("queue")
+            agent = self.get_agent(session_id)
+            if not agent:
+                logger.error(f"❌ Agent not available for session {session_id}")
+                raise RuntimeError(f"PredictionService not ready for session {session_id}")
+            if trace is not None:
+                trace.model = self._model_label(agent)
+
+            # 執行批次推理 (單次 IQL / XGBoost / SHAP)；格式化同在模型鎖內
+            with agent._model_lock:
+                agent_outs = agent.get_reasoned_advice_batch(
+                    rows, [float(v) for v in measure_values]
+                )
+
+                target_range, measure_name = self._resolve_goal(agent, session_id)
+                outputs = [
+                    self._format_output(agent, agent_out, row, y, target_range, measure_name)
+                    for agent_out, row, y in zip(agent_outs, rows, measure_values)
+                ]
+            lap("format")
+            return outputs
+
+    @staticmethod
+    def _model_label(agent: AgenticReasoning) -> str:
+        """分段計時依模型彙整用的名稱 (policy bundle 路徑的最後兩層)"""
+        key = agent._model_keys.get("policy")
+        if not key:
+            return "none"
+        return "/".join(str(key[1]).replace("\\", "/").split("/")[-2:])
+
+    def describe_schema(self, session_id: str) -> Dict[str, Any]:
+        """緊湊二進位格式的 schema handshake (目前模型的欄位順序)"""
+        agent = self.get_agent(session_id)
+        if not agent:
+            raise RuntimeError(f"PredictionService not ready for session {session_id}")
+        with agent._model_lock:
+            return describe_schema(agent._get_gather_plan(), agent.model_generation)
+
+    async def predict_packed(
+        self, body: bytes, schema_id: str, session_id: str = "default"
+    ) -> List[Dict[str, Any]]:
+        """以緊湊二進位格式 (float32 向量) 批次預測，回傳與 predict_batch() 相同格式"""
+        return await self.executor.run(
+            session_id, self._predict_packed_sync, body, schema_id, session_id
+        )
+
+    def _predict_packed_sync(
+        self, body: bytes, schema_id: str, session_id: str
+    ) -> List[Dict[str, Any]]:
+        agent = self.get_agent(session_id)
+        if not agent:
+            logger.error(f"❌ Agent not available for session {session_id}")
+            raise RuntimeError(f"PredictionService not ready for session {session_id}")
+
+        # schema 檢查、推理與格式化在同一個模型鎖內，期間不會切換模型
+        with agent._model_lock:
+            plan = agent._get_gather_plan()
+            if schema_id != plan.schema_id:
+                raise SchemaMismatchError(
+                    "schema 已變更，請重新取得 /schema",
+                    details={"expected": plan.schema_id, "received": schema_id},
+                )
+            values, ys = decode_rows(body, len(plan.columns))
+            ys = ys.tolist()
+            agent_outs = agent.get_reasoned_advice_batch(values, ys)
+
+            # _format_output 只需要 action 欄位的當前值
+            action_cols = [plan.col_index[f] for f in plan.action_features]
+            target_range, measure_name = self._resolve_goal(agent, session_id)
+            return [
+                self._format_output(
+                    agent,
+                    agent_out,
+                    dict(zip(plan.action_features, values[i, action_cols].tolist())),
+                    y,
+                    target_range,
+                    measure_name,
+                )
+                for i, (agent_out, y) in enumerate(zip(agent_outs, ys))
+            ]
 
+    def _resolve_goal(self, agent: AgenticReasoning, session_id: str):
+        """取得 target_range 與 measure_name (優先使用 session 中的模型配置)"""
         # 從 agent 中讀取 target_range (從 JSON 配置載入)
         target_range = [agent.y_low, agent.y_high]
 
@@ -136,7 +405,51 @@ class PredictionService:
         ):
             measure_name = dashboard_session.current_model_config.get("goal", "目標值")
 
-        return {
+        return target_range, measure_name
+
+    def _format_output(
+        self,
+        agent: AgenticReasoning,
+        agent_out: Dict[str, Any],
+        row: Dict[str, Any],
+        measure_value: float,
+        target_range: List[float],
+        measure_name: str,
+    ) -> Dict[str, Any]:
+        """將 agent 推理結果格式化為 API 回應"""
+        recommendations = {}
+
+        # 檢查是否有有效的動作建議
+        has_valid_actions = (
+            agent_out.get("iql_action_delta") is not None
+            and agent_out.get("iql_action_delta_smoothed") is not None
+        )
+
+        for i, feat in enumerate(agent.action_features):
+            display_name = feat  # 直接使用原始特徵名稱
+
+            # 安全獲取建議值
+            delta = agent_out["iql_action_delta"][i] if has_valid_actions else 0.0
+            delta_smoothed = (
+                agent_out["iql_action_delta_smoothed"][i] if has_valid_actions else 0.0
+            )
+
+            current_val = float(row[feat])
+
+            recommendations[display_name] = {
+                "current": current_val,
+                "suggested_delta": delta,
+                "suggested_delta_smoothed": delta_smoothed,
+                "suggested_next": float(current_val + delta),
+                "suggested_next_smoothed": float(current_val + delta_smoothed),
+            }
+
+        # agent 已依擷取計畫產生 snapshot，模型未就緒時才逐欄組出
+        feature_snapshots = agent_out.get("feature_snapshots")
+        if feature_snapshots is None:
+            feature_snapshots = self._build_snapshots(agent, row)
+
+        output = {
             "status": agent_out["status"],
             "current_measure": float(measure_value),
             "measure_name": measure_name,  # 加入 measure_name
@@ -151,3 +464,23 @@ class PredictionService:
             "smoothed_top_influencers": agent_out["smoothed_top_influencers"],
             "diagnosis": agent_out["diagnosis"],
         }
+        # 候選動作掃描結果 (ACTION_SWEEP_ENABLED 時才有)
+        if "optimizer" in agent_out:
+            output["optimizer"] = agent_out["optimizer"]
+        return output
+
+    def _build_snapshots(
+        self, agent: AgenticReasoning, row: Dict[str, Any]
+    ) -> Dict[str, float]:
+        feature_snapshots = {}
+        for feat in agent.bg_features + agent.action_features:
+            chn_name = feat  # 直接使用原始特徵名稱
+            raw_val = row.get(feat)
+            final_val = (
+                float(raw_val)
+                if raw_val is not None
+                and not (isinstance(raw_val, float) and np.isnan(raw_val))
+                else 0.0
+            )
+            feature_snapshots[chn_name] = final_val
+        return feature_snapshots
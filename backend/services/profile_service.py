@@ -0,0 +1,159 @@
+"""
+請求層級效能剖析服務 (opt-in)
+單一請求帶 X-Sigma2-Profile 標頭或 ?profile=1 時，於請求期間執行取樣式剖析，
+結果存為 workspace/<session>/logs/profile_*.folded (火焰圖格式) 與同名 .json 摘要
+"""
+
+import os
+import json
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import config
+from backend.utils import (
+    get_logger,
+    sanitize_filename,
+    validate_file_path,
+    SecurityError,
+    FileNotFoundError,
+)
+from backend.utils.profiler import SamplingProfiler
+
+logger = get_logger(__name__)
+
+PROFILE_PREFIX = "profile_"
+PROFILE_SUFFIX = ".folded"
+
+
+class ProfileCapture:
+    """一次進行中的剖析 (ProfileService.begin 回傳，finish 時寫檔)"""
+
+    def __init__(self, name, session_id, method, path, profiler):
+        self.name = name
+        self.session_id = session_id
+        self.method = method
+        self.path = path
+        self.profiler = profiler
+
+
+class ProfileService:
+    def __init__(
+        self,
+        file_service,
+        enabled: bool = None,
+        allowed_paths: List[str] = None,
+        interval: float = None,
+        max_seconds: float = None,
+        max_concurrent: int = None,
+        keep: int = None,
+    ):
+        self.file_service = file_service
+        self.enabled = (
+            getattr(config, "PROFILER_ENABLED", False) if enabled is None else enabled
+        )
+        self.allowed_paths = list(
+            allowed_paths
+            if allowed_paths is not None
+            else getattr(config, "PROFILER_ALLOWED_PATHS", [])
+        )
+        self.interval = interval or getattr(config, "PROFILER_INTERVAL", 0.005)
+        self.max_seconds = max_seconds or getattr(config, "PROFILER_MAX_SECONDS", 300.0)
+        self.keep = keep or getattr(config, "PROFILER_KEEP", 50)
+        # 取樣會讀取整個程序的堆疊，限制同時進行的剖析數量
+        self._slots = threading.BoundedSemaphore(
+            max_concurrent or getattr(config, "PROFILER_MAX_CONCURRENT", 1)
+        )
+
+    def allowed(self, path: str) -> bool:
+        """config 啟用且路徑在允許清單內 (清單為空時不限制路徑)"""
+        if not self.enabled:
+            return False
+        if not self.allowed_paths:
+            return True
+        return any(path == p or path.startswith(p.rstrip("/") + "/") for p in self.allowed_paths)
+
+    def begin(self, session_id: str, method: str, path: str) -> Optional[ProfileCapture]:
+        """開始剖析；已達同時剖析上限時回傳 None (請求照常處理，只是不剖析)"""
+        if not self._slots.acquire(blocking=False):
+            logger.warning(f"剖析已達同時上限，略過 {method} {path}")
+            return None
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        slug = "".join(c if c.isalnum() else "_" for c in path.strip("/"))[:60]
+        name = f"{PROFILE_PREFIX}{stamp}_{slug}_{uuid.uuid4().hex[:6]}{PROFILE_SUFFIX}"
+        profiler = SamplingProfiler(self.interval, self.max_seconds).start()
+        return ProfileCapture(name, session_id, method, path, profiler)
+
+    def finish(self, capture: ProfileCapture, status: int) -> Dict[str, Any]:
+        """停止取樣並寫出 .folded 與 .json 摘要"""
+        try:
+            profiler = capture.profiler
+            profiler.stop()
+            log_dir = self.file_service.get_user_path(capture.session_id, "logs")
+            path = os.path.join(log_dir, capture.name)
+            profiler.write_folded(path)
+            meta = {
+                "name": capture.name,
+                "session_id": capture.session_id,
+                "method": capture.method,
+                "path": capture.path,
+                "status": status,
+                "started_at": datetime.fromtimestamp(profiler.started_at).isoformat(),
+                "duration_s": round(profiler.duration, 3),
+                "samples": profiler.samples,
+                "interval_s": profiler.interval,
+                "truncated": profiler.truncated,
+            }
+            with open(path[: -len(PROFILE_SUFFIX)] + ".json", "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            self._prune(log_dir)
+            return meta
+        finally:
+            self._slots.release()
+
+    def list_profiles(self, session_id: str) -> List[Dict[str, Any]]:
+        """列出 session 的剖析檔 (新到舊)"""
+        log_dir = self.file_service.get_user_path(session_id, "logs")
+        profiles = []
+        for fname in self._profile_files(log_dir):
+            meta_path = os.path.join(log_dir, fname[: -len(PROFILE_SUFFIX)] + ".json")
+            meta = {"name": fname}
+            if os.path.exists(meta_path):
+                try:
+                    with open(meta_path, "r", encoding="utf-8") as f:
+                        meta = json.load(f)
+                except Exception:
+                    pass
+            meta["bytes"] = os.path.getsize(os.path.join(log_dir, fname))
+            profiles.append(meta)
+        return profiles
+
+    def profile_path(self, session_id: str, name: str) -> str:
+        """下載用的剖析檔路徑 (只允許 logs 目錄下的 profile_*.folded)"""
+        name = sanitize_filename(name)
+        if not (name.startswith(PROFILE_PREFIX) and name.endswith(PROFILE_SUFFIX)):
+            raise SecurityError(f"不是剖析檔: {name}")
+        log_dir = self.file_service.get_user_path(session_id, "logs")
+        path = validate_file_path(os.path.join(log_dir, name), log_dir)
+        if not path.exists():
+            raise FileNotFoundError(name)
+        return str(path)
+
+    @staticmethod
+    def _profile_files(log_dir: str) -> List[str]:
+        names = [
+            n
+            for n in os.listdir(log_dir)
+            if n.startswith(PROFILE_PREFIX) and n.endswith(PROFILE_SUFFIX)
+        ]
+        return sorted(names, reverse=True)  # 檔名以時間戳開頭
+
+    def _prune(self, log_dir: str):
+        """每個 session 只保留最新的 keep 份"""
+        for fname in self._profile_files(log_dir)[self.keep :]:
+            for path in (fname, fname[: -len(PROFILE_SUFFIX)] + ".json"):
+                try:
+                    os.remove(os.path.join(log_dir, path))
+                except OSError:
+                    pass
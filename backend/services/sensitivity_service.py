@@ -0,0 +1,199 @@
+"""
+敏感度曲線服務 (partial dependence)
+回答「這個旋鈕調 ±x 時量測值會怎麼變」：對目前資料列的各個特徵掃描數值網格，
+所有網格點堆疊成一次 XGBoost 預測；結果依 (模型, 資料列, 特徵, 網格) 快取
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import config
+from backend.utils import get_logger, ValidationError
+
+logger = get_logger(__name__)
+
+
+class SensitivityService:
+    """敏感度曲線 (於推理執行器執行，與同 session 的預測依序排隊)"""
+
+    def __init__(
+        self,
+        prediction_service,
+        cache_size: int = None,
+        points: int = None,
+        std_span: float = None,
+        max_points: int = None,
+    ):
+        self.prediction_service = prediction_service
+        self.cache_size = cache_size or getattr(config, "SENSITIVITY_CACHE_SIZE", 512)
+        self.points = points or getattr(config, "SENSITIVITY_GRID_POINTS", 41)
+        self.std_span = std_span or getattr(config, "SENSITIVITY_STD_SPAN", 2.0)
+        self.max_points = max_points or getattr(config, "SENSITIVITY_MAX_POINTS", 256)
+        self._cache: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def curves(
+        self,
+        session_id: str,
+        row: Dict[str, Any],
+        features: Optional[List[str]] = None,
+        points: Optional[int] = None,
+        span: Optional[float] = None,
+        grids: Optional[Dict[str, List[float]]] = None,
+    ) -> Dict[str, Any]:
+        # 過大的請求在排入推理執行器之前就拒絕
+        self._check_points(points, grids)
+        return await self.prediction_service.executor.run(
+            session_id,
+            self._curves_sync,
+            session_id,
+            row,
+            features,
+            points,
+            span,
+            grids,
+        )
+
+    def _curves_sync(self, session_id, row, features, points, span, grids):
+        agent = self.prediction_service.get_agent(session_id)
+        if not agent:
+            raise RuntimeError(f"PredictionService not ready for session {session_id}")
+
+        with agent._model_lock:
+            sim = agent.simulator
+            if sim is None or sim.model is None or not sim.feature_names:
+                raise ValidationError("XGBoost 模擬器未載入，無法計算敏感度曲線")
+
+            names = list(sim.feature_names)
+            name_idx = {f: i for i, f in enumerate(names)}
+            features = list(features or agent.action_features)
+            unknown = [f for f in features if f not in name_idx]
+            if unknown:
+                raise ValidationError(
+                    f"不是 XGBoost 模型的特徵: {unknown[:10]}", {"unknown": unknown}
+                )
+            missing = [f for f in names if row.get(f) is None]
+            if missing:
+                raise ValidationError(
+                    f"缺少 XGBoost 特徵: {missing[:10]}", {"missing": missing}
+                )
+
+            x = np.array([row[f] for f in names], dtype=np.float64)
+            model_key = agent._model_keys.get("simulator") or id(sim)
+            row_hash = hashlib.sha1(x.astype(np.float32).tobytes()).hexdigest()
+
+            feature_grids = {
+                f: self._grid(agent, f, x[name_idx[f]], points, span, (grids or {}).get(f))
+                for f in features
+            }
+            keys = {
+                f: (model_key, row_hash, f, tuple(g)) for f, g in feature_grids.items()
+            }
+            current_key = (model_key, row_hash, None, ())
+
+            cached = {f: self._get(k) for f, k in keys.items()}
+            current = self._get(current_key)
+            todo = [f for f in features if cached[f] is None]
+
+            if todo or current is None:
+                # 未快取的特徵堆疊成一次預測
+                current, preds = sim.sensitivity_curves(
+                    x, [(name_idx[f], feature_grids[f]) for f in todo]
+                )
+                self._put(current_key, current)
+                for f, p in zip(todo, preds):
+                    cached[f] = p.tolist()
+                    self._put(keys[f], cached[f])
+
+        with self._lock:
+            self.hits += len(features) - len(todo)
+            self.misses += len(todo)
+
+        return {
+            "current_prediction": current,
+            "target_center": agent.target_center,
+            "target_range": [agent.y_low, agent.y_high],
+            "curves": {
+                f: {
+                    "current": float(x[name_idx[f]]),
+                    "grid": feature_grids[f],
+                    "predicted": cached[f],
+                }
+                for f in features
+            },
+            "computed": len(todo),
+            "cached": len(features) - len(todo),
+        }
+
+    def _check_points(self, points, grids):
+        """
+        網格點數上限 (points 與每個指定網格的長度)；所有點堆疊成一次預測，過大的請求直接拒絕
+
+        Raises:
+            ValidationError: 超過 SENSITIVITY_MAX_POINTS
+        """
+        if points is not None and int(points) > self.max_points:
+            raise ValidationError(
+                f"網格點數 {points} 超過上限 {self.max_points}",
+                {"points": points, "max_points": self.max_points},
+            )
+        oversize = {f: len(g) for f, g in (grids or {}).items() if len(g) > self.max_points}
+        if oversize:
+            raise ValidationError(
+                f"指定網格超過 {self.max_points} 點: {list(oversize)[:10]}",
+                {"grids": oversize, "max_points": self.max_points},
+            )
+
+    def _grid(self, agent, feature, current, points, span, explicit) -> List[float]:
+        """
+        特徵的數值網格: 指定的網格 > y2_axis_ranges > 目前值 ± span × 標準差
+
+        非 action 特徵沒有標準差時以目前值的 5% 為單位
+        """
+        if explicit:
+            return [float(v) for v in explicit]
+        points = min(max(2, int(points or self.points)), self.max_points)
+        ranges = (agent.meta or {}).get("y2_axis_ranges") or {}
+        bounds = ranges.get(feature)
+        if bounds and len(bounds) == 2:
+            lo, hi = float(bounds[0]), float(bounds[1])
+        else:
+            span = float(span or self.std_span)
+            std = None
+            if feature in agent.action_features and agent.action_stds is not None:
+                stds = np.asarray(agent.action_stds, dtype=np.float64).ravel()
+                i = agent.action_features.index(feature)
+                if i < len(stds) and stds[i] > 0:
+                    std = float(stds[i])
+            if std is None:
+                std = abs(current) * 0.05 or 1.0
+            lo, hi = current - span * std, current + span * std
+        return np.linspace(lo, hi, points).astype(np.float32).tolist()
+
+    def _get(self, key):
+        with self._lock:
+            value = self._cache.get(key)
+            if value is not None:
+                self._cache.move_to_end(key)
+            return value
+
+    def _put(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._cache),
+                "capacity": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
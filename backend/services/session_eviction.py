@@ -0,0 +1,249 @@
+"""
+閒置 Session 淘汰與記憶體估算
+SessionService / PredictionService 原本永久保留每個 session 的 sim_df、預測歷史與 Agent；
+此服務定期估算各 session 的記憶體，釋放閒置超過 TTL 的 session 的大型狀態
+(sim_df、預讀緩衝、Agent 持有的模型)，總量超過預算時再依最後存取時間 (LRU) 釋放。
+預測歷史、圖表分析與對話紀錄保留；Agent 使用的模型目標於回來時交由 ModelLoadService 重新載入
+"""
+
+import asyncio
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+import config
+from core_logic.latency import latency
+from core_logic.model_cache import model_cache
+from backend.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def _list_bytes(items) -> int:
+    """對話 / 分析紀錄 (list[dict]) 的粗估大小"""
+    total = sys.getsizeof(items)
+    for item in items:
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            total += sum(sys.getsizeof(v) for v in item.values())
+    return total
+
+
+class SessionEvictionService:
+    def __init__(
+        self,
+        session_service,
+        prediction_service,
+        readahead_service=None,
+        event_bus=None,
+        idle_ttl: float = None,
+        memory_budget: int = None,
+        min_idle: float = None,
+        interval: float = None,
+    ):
+        self.session_service = session_service
+        self.prediction_service = prediction_service
+        self.readahead_service = readahead_service
+        self.event_bus = event_bus
+        self.idle_ttl = idle_ttl or getattr(config, "SESSION_IDLE_TTL_SECONDS", 3600)
+        self.memory_budget = (
+            memory_budget
+            if memory_budget is not None
+            else getattr(config, "SESSION_MEMORY_BUDGET_BYTES", 4 * 1024**3)
+        )
+        # 超過預算時，最近 min_idle 秒內用過的 session 不淘汰
+        self.min_idle = (
+            min_idle if min_idle is not None else getattr(config, "SESSION_MIN_IDLE_SECONDS", 120)
+        )
+        self.interval = interval or getattr(config, "SESSION_SWEEP_INTERVAL", 60)
+        self._df_bytes: Dict[str, tuple] = {}  # session_id -> (id(df), shape, bytes)
+        self.evictions = 0
+        self._task = None
+
+    # ------------------------------------------------------------------
+    # 記憶體估算
+    # ------------------------------------------------------------------
+    def _sim_df_bytes(self, session_id: str, df) -> int:
+        """DataFrame 實際佔用 (deep)；同一個 df 只計算一次"""
+        if df is None:
+            return 0
+        cached = self._df_bytes.get(session_id)
+        if cached is not None and cached[0] == id(df) and cached[1] == df.shape:
+            return cached[2]
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        self._df_bytes[session_id] = (id(df), df.shape, nbytes)
+        return nbytes
+
+    def _model_refs(self, session_id: str) -> List[Dict[str, Any]]:
+        """Agent 持有的共用模型；bytes_attributed = 模型大小 / 參考數"""
+        agent = self.prediction_service.find_agent(session_id)
+        if agent is None:
+            return []
+        keys = dict(agent._model_keys)
+        sizes = model_cache.entry_sizes(keys.values())
+        refs = []
+        for kind, key in keys.items():
+            size, count = sizes.get(key, (0, 0))
+            refs.append(
+                {
+                    "kind": kind,
+                    "path": key[1],
+                    "bytes": size,
+                    "refs": count,
+                    "bytes_attributed": size // max(count, 1),
+                }
+            )
+        return refs
+
+    def footprint(self, session_id: str, now: float = None) -> Dict[str, Any]:
+        """單一 session 的估計記憶體與最後存取時間"""
+        now = time.monotonic() if now is None else now
+        dashboard = self.session_service.peek_dashboard_session(session_id)
+        analysis = self.session_service.peek_analysis_session(session_id)
+        ai = self.session_service.peek_ai_session(session_id)
+
+        parts = {
+            "sim_df": self._sim_df_bytes(session_id, dashboard.sim_df) if dashboard else 0,
+            "history": dashboard.prediction_history.nbytes() if dashboard else 0,
+            "analysis": _list_bytes(analysis.chart_analysis_history) if analysis else 0,
+            "chat": _list_bytes(ai.chat_history) if ai else 0,
+            "readahead": 0,
+        }
+        if self.readahead_service is not None:
+            parts["readahead"] = self.readahead_service.footprint(session_id)["bytes"]
+        models = self._model_refs(session_id)
+        parts["models"] = sum(m["bytes_attributed"] for m in models)
+
+        accesses = [
+            t
+            for t in (
+                self.session_service.last_access(session_id),
+                self.prediction_service.last_access(session_id),
+            )
+            if t is not None
+        ]
+        last = max(accesses) if accesses else None
+        return {
+            "session_id": session_id,
+            "bytes": sum(parts.values()),
+            # 淘汰可釋放的部分 (歷史與對話紀錄保留)
+            "evictable": parts["sim_df"] + parts["readahead"] + parts["models"],
+            "agent": self.prediction_service.find_agent(session_id) is not None,
+            "parts": parts,
+            "history_entries": len(dashboard.prediction_history) if dashboard else 0,
+            "sim_rows": len(dashboard.sim_df) if dashboard and dashboard.sim_df is not None else 0,
+            "sim_file_name": dashboard.sim_file_name if dashboard else None,
+            "models": models,
+            "idle_seconds": round(now - last, 1) if last is not None else None,
+            "subscribers": self.event_bus.subscriber_count(session_id) if self.event_bus else 0,
+        }
+
+    def session_ids(self) -> List[str]:
+        return sorted(self.session_service.session_ids() | set(self.prediction_service.agent_ids()))
+
+    def report(self) -> Dict[str, Any]:
+        """所有 session 的估計記憶體 (由大到小)"""
+        now = time.monotonic()
+        sessions = [self.footprint(sid, now) for sid in self.session_ids()]
+        sessions.sort(key=lambda s: s["bytes"], reverse=True)
+        return {
+            "total_bytes": sum(s["bytes"] for s in sessions),
+            "memory_budget": self.memory_budget,
+            "idle_ttl": self.idle_ttl,
+            "evictions": self.evictions,
+            "sessions": sessions,
+        }
+
+    # ------------------------------------------------------------------
+    # 淘汰
+    # ------------------------------------------------------------------
+    def evict(self, session_id: str, reason: str = "manual") -> Dict[str, Any]:
+        """
+        釋放 session 的大型狀態：sim_df、Agent (歸還共用模型)、預讀緩衝、計時與事件緩衝
+
+        預測歷史、圖表分析與對話紀錄保留。Agent 已載入的模型目標記錄於 SessionService，
+        session 回來時由 PredictionService 交給 ModelLoadService 於背景重新載入
+        """
+        freed = self.footprint(session_id)["evictable"]
+        agent = self.prediction_service.find_agent(session_id)
+        model = (
+            {"model_target": agent.model_target}
+            if agent is not None and agent.model_generation
+            else None
+        )
+        removed = self.session_service.evict(session_id, model=model)
+        removed = self.prediction_service.remove_agent(session_id) or removed
+        if self.readahead_service is not None:
+            self.readahead_service.invalidate(session_id)
+        if self.event_bus is not None:
+            self.event_bus.drop_channel(session_id)
+        latency.drop_session(session_id)
+        self._df_bytes.pop(session_id, None)
+        if removed:
+            self.evictions += 1
+            logger.info(f"淘汰 session {session_id} ({reason}, ~{freed / 1024**2:.1f} MB)")
+        return {"session_id": session_id, "reason": reason, "bytes": freed, "evicted": removed}
+
+    def sweep(self) -> List[Dict[str, Any]]:
+        """
+        淘汰閒置超過 idle_ttl 的 session；總量仍超過預算時，
+        再依閒置時間由久到近淘汰 (最近 min_idle 秒內用過的不動)。
+        有 SSE 訂閱者 (看板開著) 的 session 視為使用中；已無可釋放狀態的 session 略過。
+        """
+        report = self.report()
+        candidates = [
+            s
+            for s in report["sessions"]
+            if not s["subscribers"] and (s["evictable"] or s["agent"])
+        ]
+        evicted = []
+
+        for s in candidates:
+            if s["idle_seconds"] is None or s["idle_seconds"] >= self.idle_ttl:
+                evicted.append(self.evict(s["session_id"], "idle"))
+
+        total = report["total_bytes"] - sum(e["bytes"] for e in evicted)
+        if self.memory_budget and total > self.memory_budget:
+            done = {e["session_id"] for e in evicted}
+            lru = sorted(
+                (
+                    s
+                    for s in candidates
+                    if s["session_id"] not in done and s["idle_seconds"] >= self.min_idle
+                ),
+                key=lambda s: s["idle_seconds"],
+                reverse=True,
+            )
+            for s in lru:
+                if total <= self.memory_budget:
+                    break
+                result = self.evict(s["session_id"], "memory_budget")
+                total -= result["bytes"]
+                evicted.append(result)
+        return evicted
+
+    # ------------------------------------------------------------------
+    # 背景排程
+    # ------------------------------------------------------------------
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # 淘汰會取得 Agent 的模型鎖，於執行緒執行避免阻塞 event loop
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error(f"Session 淘汰失敗: {e}")
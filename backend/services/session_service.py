@@ -3,7 +3,9 @@ Session 管理服務
 集中管理所有 Session，避免全域狀態污染
 """
 
-from typing import Dict
+import threading
+import time
+from typing import Dict, Any, Optional, Set, Callable
 from backend.models.session_models import DashboardSession, AnalysisSession, AISession
 
 
@@ -14,6 +16,65 @@ class SessionService:
         self._dashboard_sessions: Dict[str, DashboardSession] = {}
         self._analysis_sessions: Dict[str, AnalysisSession] = {}
         self._ai_sessions: Dict[str, AISession] = {}
+        # 最後存取時間 (time.monotonic)，供閒置淘汰使用
+        self._last_access: Dict[str, float] = {}
+        # 已淘汰 session 的 Agent 先前使用的模型載入目標 {"model_target": ...}；
+        # 回來時由 PredictionService 交給背景載入 (不自動載入最新模型)
+        self._evicted: Dict[str, Dict[str, Any]] = {}
+        # 重啟後第一次存取時還原快照: restorer(session_id) -> DashboardSession | None
+        self.restorer: Optional[Callable[[str], Optional[DashboardSession]]] = None
+        # 淘汰於背景執行緒執行，與 event loop 上的存取 / 迭代互斥
+        self._lock = threading.RLock()
+
+    def touch(self, session_id: str):
+        """記錄 session 的存取時間"""
+        self._last_access[session_id] = time.monotonic()
+
+    def last_access(self, session_id: str) -> Optional[float]:
+        return self._last_access.get(session_id)
+
+    def session_ids(self) -> Set[str]:
+        """目前持有任何 Session 的 session_id"""
+        with self._lock:
+            return (
+                set(self._dashboard_sessions)
+                | set(self._analysis_sessions)
+                | set(self._ai_sessions)
+            )
+
+    def peek_dashboard_session(self, session_id: str) -> Optional[DashboardSession]:
+        """取得已存在的看板 Session (不建立、不更新存取時間)"""
+        return self._dashboard_sessions.get(session_id)
+
+    def peek_analysis_session(self, session_id: str) -> Optional[AnalysisSession]:
+        return self._analysis_sessions.get(session_id)
+
+    def peek_ai_session(self, session_id: str) -> Optional[AISession]:
+        return self._ai_sessions.get(session_id)
+
+    def evict(self, session_id: str, model: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        釋放看板 Session 的大型狀態 (sim_df)；預測歷史、圖表分析與對話紀錄、模擬位置都保留
+
+        sim_df 於下次 /simulator/next 依 sim_file_name 重新讀取。
+        model 為被移除的 Agent 的 {"model_target": ...} (None 表示最新模型)，由 take_model_target() 取回
+
+        Returns:
+            bool: 是否釋放了 sim_df
+        """
+        with self._lock:
+            dashboard = self._dashboard_sessions.get(session_id)
+            freed = dashboard is not None and dashboard.sim_df is not None
+            if freed:
+                dashboard.sim_df = None
+            if model is not None:
+                self._evicted[session_id] = dict(model)
+            return freed
+
+    def take_model_target(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """取回 (並清除) 已淘汰 session 的 {"model_target": ...}；未記錄時回傳 None"""
+        with self._lock:
+            return self._evicted.pop(session_id, None)
 
     def get_dashboard_session(self, session_id: str) -> DashboardSession:
         """取得即時看板 Session"""
@@ -26,38 +87,54 @@ class SessionService:
             f"[DEBUG] session_id in _dashboard_sessions: {session_id in self._dashboard_sessions}"
         )
 
-        if session_id not in self._dashboard_sessions:
-            print(f"[DEBUG] Creating NEW DashboardSession for {session_id}")
-            self._dashboard_sessions[session_id] = DashboardSession()
-            print(
-                f"[DEBUG] New session object ID: {id(self._dashboard_sessions[session_id])}"
-            )
-        else:
-            print(f"[DEBUG] Returning EXISTING DashboardSession for {session_id}")
-            print(
-                f"[DEBUG] Existing session object ID: {id(self._dashboard_sessions[session_id])}"
-            )
+        self.touch(session_id)
+        with self._lock:
+            if session_id not in self._dashboard_sessions:
+                print(f"[DEBUG] Creating NEW DashboardSession for {session_id}")
+                restored = self.restorer(session_id) if self.restorer is not None else None
+                self._dashboard_sessions[session_id] = restored or DashboardSession()
+                print(
+                    f"[DEBUG] New session object ID: {id(self._dashboard_sessions[session_id])}"
+                )
+            else:
+                print(f"[DEBUG] Returning EXISTING DashboardSession for {session_id}")
+                print(
+                    f"[DEBUG] Existing session object ID: {id(self._dashboard_sessions[session_id])}"
+                )
 
         return self._dashboard_sessions[session_id]
 
     def get_analysis_session(self, session_id: str) -> AnalysisSession:
         """取得數據分析 Session"""
-        if session_id not in self._analysis_sessions:
-            self._analysis_sessions[session_id] = AnalysisSession()
-        return self._analysis_sessions[session_id]
+        self.touch(session_id)
+        with self._lock:
+            if session_id not in self._analysis_sessions:
+                self._analysis_sessions[session_id] = AnalysisSession()
+            return self._analysis_sessions[session_id]
 
     def get_ai_session(self, session_id: str) -> AISession:
         """取得 AI 對話 Session"""
-        if session_id not in self._ai_sessions:
-            self._ai_sessions[session_id] = AISession()
-        return self._ai_sessions[session_id]
+        self.touch(session_id)
+        with self._lock:
+            if session_id not in self._ai_sessions:
+                self._ai_sessions[session_id] = AISession()
+            return self._ai_sessions[session_id]
+
+    def counts(self) -> Dict[str, int]:
+        """各類 Session 的數量 (/metrics 用)"""
+        with self._lock:
+            return {
+                "dashboard": len(self._dashboard_sessions),
+                "analysis": len(self._analysis_sessions),
+                "ai": len(self._ai_sessions),
+            }
 
     def clear_dashboard_session(self, session_id: str):
         """清空即時看板 Session 的預測歷史，但保留已載入的數據和模型"""
         if session_id in self._dashboard_sessions:
             session = self._dashboard_sessions[session_id]
             # 只清除预测历史，保留 sim_df 和其他关键数据
-            session.prediction_history = []
+            session.prediction_history.clear()
             session.latest_snapshot = None
             print(
                 f"[DEBUG] Cleared prediction history for session {session_id}, but kept sim_df"
@@ -65,5 +142,6 @@ class SessionService:
 
     def clear_analysis_session(self, session_id: str):
         """清空數據分析 Session"""
-        if session_id in self._analysis_sessions:
-            self._analysis_sessions[session_id] = AnalysisSession()
+        with self._lock:
+            if session_id in self._analysis_sessions:
+                self._analysis_sessions[session_id] = AnalysisSession()
@@ -0,0 +1,285 @@
+"""
+Session 快照與重啟還原
+定期將看板 Session 的輕量狀態 (預測歷史欄位、模擬位置、模型配置、載入中的模型) 寫入
+workspace/<session>/cache/session_snapshot.npz (numpy 陣列 + JSON 中繼資料，不 pickle DataFrame)。
+重啟後 Session 於第一次存取時才還原 (sim_df 由 /simulator/next 重新讀取)，
+最近使用過的模型在背景預先載入，其餘 session 的模型於第一次建立 Agent 時交給背景載入
+"""
+
+import asyncio
+import glob
+import json
+import os
+import time
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+import config
+from backend.models.session_models import DashboardSession
+from backend.models.prediction_history import PredictionHistory
+from backend.utils import get_logger
+
+logger = get_logger(__name__)
+
+SNAPSHOT_FILE = "session_snapshot.npz"
+SNAPSHOT_VERSION = 1
+
+
+def _json_default(value):
+    """numpy 純量 / 陣列與其他物件的 JSON 轉換"""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+class SessionSnapshotService:
+    def __init__(
+        self,
+        session_service,
+        prediction_service,
+        file_service,
+        model_load_service=None,
+        interval: float = None,
+        prewarm_max: int = None,
+    ):
+        self.session_service = session_service
+        self.prediction_service = prediction_service
+        self.file_service = file_service
+        self.model_load_service = model_load_service
+        self.interval = interval or getattr(config, "SESSION_SNAPSHOT_INTERVAL", 30)
+        self.prewarm_max = (
+            prewarm_max
+            if prewarm_max is not None
+            else getattr(config, "SESSION_SNAPSHOT_PREWARM", 8)
+        )
+        self._signatures: Dict[str, tuple] = {}  # 上次寫入時的狀態摘要 (未變更不重寫)
+        self._restorable: Dict[str, str] = {}  # 啟動時掃描到、尚未還原的快照 session_id -> path
+        # 快照中尚未重新載入的模型目標 session_id -> (saved_at, target)
+        self._model_targets: Dict[str, tuple] = {}
+        self.written = 0
+        self.restored = 0
+        self._task = None
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.file_service.get_user_path(session_id, "cache"), SNAPSHOT_FILE)
+
+    # ------------------------------------------------------------------
+    # 寫入
+    # ------------------------------------------------------------------
+    def _signature(self, session, agent) -> tuple:
+        return (
+            session.prediction_history.next_seq,
+            len(session.prediction_history),
+            session.sim_index,
+            session.sim_file_name,
+            id(session.current_model_config),
+            agent.model_generation if agent is not None else None,
+        )
+
+    def collect(self) -> List[tuple]:
+        """
+        (於 event loop 執行) 擷取有變更的 session 狀態，回傳 [(session_id, arrays, meta, signature)]
+
+        只複製陣列，序列化與寫檔交給 write()，不與請求處理交錯
+        """
+        collected = []
+        for session_id in sorted(self.session_service.session_ids()):
+            session = self.session_service.peek_dashboard_session(session_id)
+            if session is None:
+                continue
+            agent = self.prediction_service.find_agent(session_id)
+            signature = self._signature(session, agent)
+            if self._signatures.get(session_id) == signature:
+                continue
+            arrays, history = session.prediction_history.to_state()
+            meta = {
+                "version": SNAPSHOT_VERSION,
+                "session_id": session_id,
+                "saved_at": time.time(),
+                "sim_file_name": session.sim_file_name,
+                "sim_index": session.sim_index,
+                "current_model_config": session.current_model_config,
+                "model": None,
+                "history": history,
+            }
+            if agent is not None and agent.model_generation:
+                meta["model"] = {
+                    "target": agent.model_target,
+                    "keys": {kind: key[1] for kind, key in agent._model_keys.items()},
+                }
+            collected.append((session_id, arrays, meta, signature))
+        return collected
+
+    def write(self, collected: List[tuple]) -> int:
+        """(於背景執行緒) 寫入快照；先寫暫存檔再 os.replace，寫到一半不會留下壞檔"""
+        count = 0
+        for session_id, arrays, meta, signature in collected:
+            path = self._path(session_id)
+            tmp = path + ".tmp"
+            try:
+                payload = json.dumps(meta, ensure_ascii=False, default=_json_default)
+                with open(tmp, "wb") as f:
+                    np.savez(
+                        f,
+                        meta=np.frombuffer(payload.encode("utf-8"), dtype=np.uint8),
+                        **{f"history_{k}": v for k, v in arrays.items()},
+                    )
+                os.replace(tmp, path)
+                self._signatures[session_id] = signature
+                count += 1
+            except Exception as e:
+                logger.warning(f"Session {session_id} 快照寫入失敗: {e}")
+        self.written += count
+        return count
+
+    def snapshot_all(self) -> int:
+        """同步執行一次完整快照 (關機時 / 測試用)"""
+        return self.write(self.collect())
+
+    # ------------------------------------------------------------------
+    # 還原
+    # ------------------------------------------------------------------
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """讀取快照 (meta 與 history 陣列)；不存在或格式不符時回傳 None"""
+        return self._read(self._restorable.get(session_id) or self._path(session_id))
+
+    def _read(self, path: str, arrays: bool = True) -> Optional[Dict[str, Any]]:
+        """arrays=False 時只讀 meta (npz 成員按需解壓，不讀歷史陣列)"""
+        if not os.path.exists(path):
+            return None
+        session_id = os.path.basename(os.path.dirname(os.path.dirname(path)))
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+                if arrays:
+                    meta["arrays"] = {
+                        k[len("history_"):]: data[k]
+                        for k in data.files
+                        if k.startswith("history_")
+                    }
+        except Exception as e:
+            logger.warning(f"Session {session_id} 快照讀取失敗: {e}")
+            return None
+        if meta.get("version") != SNAPSHOT_VERSION:
+            return None
+        return meta
+
+    def scan(self) -> List[str]:
+        """
+        啟動時掃描 workspace 下的快照，登記為可還原 (第一次存取時才真正載入)
+
+        同時讀取各快照的模型目標 (只讀 meta)，供預先載入與第一次建立 Agent 時使用
+        """
+        pattern = os.path.join(self.file_service.base_dir, "*", "cache", SNAPSHOT_FILE)
+        for path in glob.glob(pattern):
+            session_id = os.path.basename(os.path.dirname(os.path.dirname(path)))
+            self._restorable[session_id] = path
+            meta = self._read(path, arrays=False)
+            if meta and meta.get("model"):
+                self._model_targets[session_id] = (
+                    meta.get("saved_at", 0),
+                    meta["model"]["target"],
+                )
+        return sorted(self._restorable)
+
+    def take_model_target(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        PredictionService.model_target_sources：取回 (並清除) 快照中的 {"model_target": ...}
+
+        每個 session 只取一次；None 表示快照中沒有已載入的模型
+        """
+        entry = self._model_targets.pop(session_id, None)
+        return {"model_target": entry[1]} if entry else None
+
+    def restore_dashboard(self, session_id: str) -> Optional[DashboardSession]:
+        """SessionService.restorer：只還原本次啟動時掃描到的快照，且每個 session 只還原一次"""
+        path = self._restorable.pop(session_id, None)
+        if path is None:
+            return None
+        snapshot = self._read(path)
+        if snapshot is None:
+            return None
+        try:
+            history = PredictionHistory.from_state(snapshot["arrays"], snapshot["history"])
+        except Exception as e:
+            logger.warning(f"Session {session_id} 預測歷史還原失敗: {e}")
+            history = PredictionHistory()
+        self.restored += 1
+        logger.info(
+            f"Session {session_id} 已由快照還原 ({len(history)} 筆歷史, index={snapshot['sim_index']})"
+        )
+        return DashboardSession(
+            prediction_history=history,
+            sim_index=snapshot["sim_index"],
+            sim_file_name=snapshot["sim_file_name"],
+            current_model_config=snapshot["current_model_config"],
+        )
+
+    def prewarm(self) -> List[str]:
+        """
+        於背景載入最近 prewarm_max 個快照 session 使用中的模型
+
+        透過 ModelLoadService 建立 Agent 的模型組 (共用模型進入 ModelCache)，
+        使用者回來時第一筆預測不必等待冷載入
+        """
+        if self.model_load_service is None or not self.prewarm_max:
+            return []
+        newest = sorted(self._model_targets.items(), key=lambda kv: kv[1][0], reverse=True)
+
+        warmed = []
+        for session_id, (_, target) in newest[: self.prewarm_max]:
+            if self.prediction_service.find_agent(session_id) is not None:
+                continue
+            agent = self.prediction_service.get_agent(session_id, auto_load=False)
+            if agent is None:
+                continue
+            self._model_targets.pop(session_id, None)
+            self.model_load_service.submit(session_id, target, agent)
+            warmed.append(session_id)
+        if warmed:
+            logger.info(f"預先載入 {len(warmed)} 個 session 的模型: {warmed}")
+        return warmed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "written": self.written,
+            "restored": self.restored,
+            "pending_restore": sorted(self._restorable),
+            "pending_models": sorted(self._model_targets),
+            "interval": self.interval,
+        }
+
+    # ------------------------------------------------------------------
+    # 背景排程
+    # ------------------------------------------------------------------
+    def start(self):
+        """掃描快照、登記 restorer 與模型目標來源、排入模型預載，並開始定期快照"""
+        self.scan()
+        self.session_service.restorer = self.restore_dashboard
+        self.prediction_service.model_target_sources.append(self.take_model_target)
+        self.prewarm()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # 關機前補一次快照
+        await asyncio.to_thread(self.write, self.collect())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                collected = self.collect()
+                if collected:
+                    await asyncio.to_thread(self.write, collected)
+            except Exception as e:
+                logger.error(f"Session 快照失敗: {e}")
@@ -0,0 +1,265 @@
+"""
+模擬器預讀服務
+載入模擬檔案且模型就緒後，於背景對接下來的列做批次推理 (無狀態的 IQL / XGBoost / 歸因)，
+/simulator/next 只需查表並依序套用平滑；模型、檔案或目標欄位變更時自動失效重建
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List
+
+import numpy as np
+import pandas as pd
+import config
+from backend.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def resolve_measure_column(columns: List[str], model_config: Optional[Dict[str, Any]]):
+    """
+    依 /simulator/next 的規則決定 Y 軸量測欄位 (欄位層級)
+
+    goal 欄位優先，其次為名稱含 std / measure 的欄位；
+    皆無時回傳 None (逐列判斷的備用規則不做預讀)
+    """
+    goal_column = (model_config or {}).get("goal")
+    if goal_column and goal_column in columns:
+        return goal_column
+    for col in columns:
+        if "std" in col.lower() or "measure" in col.lower():
+            return col
+    return None
+
+
+class _ReadAheadState:
+    """單一 session 的預讀狀態 (檔案 + 模型世代 + 量測欄位決定有效性)"""
+
+    __slots__ = (
+        "agent",
+        "df",
+        "file_name",
+        "generation",
+        "measure_col",
+        "entries",
+        "base",
+        "filled_to",
+        "running",
+        "disabled",
+    )
+
+    def __init__(self, agent, df, file_name, generation, measure_col, start):
+        self.agent = agent
+        self.df = df
+        self.file_name = file_name
+        self.generation = generation
+        self.measure_col = measure_col
+        self.entries: Dict[int, tuple] = {}  # row index -> (values, y, raw)
+        self.base = start  # 最小仍可能被取用的列
+        self.filled_to = start
+        self.running = False
+        self.disabled = False
+
+    def matches(self, agent, session, measure_col) -> bool:
+        return (
+            self.agent is agent
+            and self.df is session.sim_df
+            and self.file_name == session.sim_file_name
+            and self.generation == agent.model_generation
+            and self.measure_col == measure_col
+        )
+
+
+class SimulatorReadAheadService:
+    """依 session 維護預讀窗口，背景以專用執行緒批次推理"""
+
+    def __init__(self, window: int = None, chunk_size: int = None, max_workers: int = None):
+        self.window = window or getattr(config, "SIM_READAHEAD_WINDOW", 256)
+        self.chunk_size = chunk_size or getattr(config, "SIM_READAHEAD_CHUNK", 64)
+        self.enabled = getattr(config, "SIM_READAHEAD_ENABLED", True)
+        # 預讀與互動推理分開，避免大檔預讀佔滿推理執行緒
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers or getattr(config, "SIM_READAHEAD_WORKERS", 1),
+            thread_name_prefix="sim-readahead",
+        )
+        self._states: Dict[str, _ReadAheadState] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, session_id: str):
+        """丟棄該 session 的預讀結果 (載入新檔案、切換模型時呼叫)"""
+        with self._lock:
+            self._states.pop(session_id, None)
+
+    def ensure(self, session_id: str, session, agent, index: int):
+        """確保 index 之後的窗口正在 (或已經) 預讀；狀態過期時從 index 重新開始"""
+        if not self.enabled or agent is None or session.sim_df is None:
+            return
+        if not agent.iql_algo or not agent.bg_features:
+            return
+
+        measure_col = resolve_measure_column(
+            list(session.sim_df.columns), session.current_model_config
+        )
+        if measure_col is None:
+            return
+
+        with self._lock:
+            state = self._states.get(session_id)
+            if (
+                state is None
+                or not state.matches(agent, session, measure_col)
+                or not state.base <= index <= state.filled_to
+            ):
+                state = _ReadAheadState(
+                    agent,
+                    session.sim_df,
+                    session.sim_file_name,
+                    agent.model_generation,
+                    measure_col,
+                    index,
+                )
+                self._states[session_id] = state
+            self._schedule(session_id, state, index)
+
+    def take(self, session_id: str, session, agent, index: int, measure_value: float):
+        """
+        取出第 index 列的預讀結果 (values, raw, model_generation)；沒有或已失效時回傳 None
+
+        取出後會丟棄 index 之前的結果並視需要補充窗口
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            state = self._states.get(session_id)
+            entry = None
+            generation = None
+            if state is not None and state.matches(
+                agent, session, state.measure_col
+            ):
+                generation = state.generation
+                entry = state.entries.pop(index, None)
+                for stale in [i for i in state.entries if i < index]:
+                    del state.entries[stale]
+                state.base = max(state.base, index + 1)
+
+        if entry is not None and entry[1] != measure_value:
+            entry = None  # 量測值與預讀時不同 (例如目標欄位設定已變更)
+
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        self.ensure(session_id, session, agent, index + 1)
+        return None if entry is None else (entry[0], entry[2], generation)
+
+    def _schedule(self, session_id: str, state: _ReadAheadState, index: int):
+        """(需在 self._lock 內呼叫) 剩餘窗口不足一半時補充下一個 chunk"""
+        if state.running or state.disabled:
+            return
+        n_rows = len(state.df)
+        if state.filled_to >= n_rows or state.filled_to - index >= self.window // 2:
+            return
+        start = state.filled_to
+        stop = min(start + self.chunk_size, n_rows)
+        state.running = True
+        self._pool.submit(self._fill, session_id, state, start, stop)
+
+    def _fill(self, session_id: str, state: _ReadAheadState, start: int, stop: int):
+        """(背景執行緒) 對 [start, stop) 列做一次無狀態推理"""
+        agent = state.agent
+        entries = {}
+        ok = False
+        try:
+            with agent._model_lock:
+                # 模型已切換 -> 不寫入結果，由下一次 ensure() 以新世代重建
+                if agent.model_generation == state.generation and agent.iql_algo:
+                    entries = self._infer_chunk(
+                        agent, state.df, state.measure_col, start, stop
+                    )
+                    ok = True
+        except Exception as e:
+            # 例如欄位含非數值資料；停用此檔案的預讀，改走逐筆路徑
+            logger.warning(f"Simulator read-ahead disabled for {session_id}: {e}")
+            state.disabled = True
+
+        with self._lock:
+            state.running = False
+            if ok and self._states.get(session_id) is state:
+                state.entries.update(
+                    {i: e for i, e in entries.items() if i >= state.base}
+                )
+                state.filled_to = stop
+                # 從目前位置 (最小未取用列) 持續補充窗口
+                self._schedule(session_id, state, state.base)
+
+    @staticmethod
+    def _infer_chunk(agent, df, measure_col: str, start: int, stop: int):
+        """(需持有 agent._model_lock) 回傳 {row index: (values, y, raw)}"""
+        plan = agent._get_gather_plan()
+        chunk = df.iloc[start:stop]
+        values = plan.gather_frame(chunk)
+        ys = pd.to_numeric(chunk[measure_col], errors="coerce").to_numpy(
+            dtype=np.float64
+        )
+
+        # 狀態欄位或量測值缺值的列不預讀，由 /simulator/next 走逐筆路徑
+        valid = ~np.isnan(values[:, plan.state_idx]).any(axis=1) & ~np.isnan(ys)
+        rows = np.flatnonzero(valid)
+        entries = {}
+        if rows.size:
+            raw = agent.infer_raw(values[rows], ys[rows].tolist())
+            for pos, i in enumerate(rows):
+                entries[start + int(i)] = (
+                    values[i : i + 1],
+                    float(ys[i]),
+                    agent.slice_raw(raw, pos, pos + 1),
+                )
+        return entries
+
+    def warmup(self, agent, df, start: int, stop: int, measure_col: Optional[str]):
+        """
+        依序重播 [start, stop) 列以重建平滑歷史 (跳轉後使用)，不回傳結果
+
+        於推理執行緒池執行；回傳實際重播的列數
+        """
+        if measure_col is None or stop <= start:
+            return 0
+        with agent._model_lock:
+            if not agent.iql_algo or not agent.bg_features:
+                return 0
+            entries = self._infer_chunk(agent, df, measure_col, start, stop)
+            for i in sorted(entries):
+                values, y, raw = entries[i]
+                agent.apply_raw(values, [y], raw)
+            return len(entries)
+
+    def footprint(self, session_id: str) -> Dict[str, int]:
+        """該 session 預讀緩衝的筆數與估計位元組 (特徵值陣列)"""
+        with self._lock:
+            state = self._states.get(session_id)
+            entries = list(state.entries.values()) if state is not None else []
+        nbytes = sum(getattr(e[0], "nbytes", 0) for e in entries)
+        return {"entries": len(entries), "bytes": int(nbytes)}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions = {
+                sid: {
+                    "file": s.file_name,
+                    "buffered": len(s.entries),
+                    "filled_to": s.filled_to,
+                    "rows": len(s.df),
+                    "disabled": s.disabled,
+                }
+                for sid, s in self._states.items()
+            }
+        return {
+            "enabled": self.enabled,
+            "window": self.window,
+            "chunk_size": self.chunk_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "sessions": sessions,
+        }
@@ -0,0 +1,151 @@
+"""
+串流資料接收 (產線即時資料)
+每條產線開一條長連線持續送入資料列，伺服器將已到達的列合併成小批次推理，
+建議結果依原順序由同一條連線送回；處理不及時停止讀取連線 (背壓)，不會無限堆積
+"""
+
+import asyncio
+from typing import Dict, Any, List, Callable, Awaitable, Optional
+
+import config
+from backend.utils import get_logger, ServiceOverloadedError
+
+logger = get_logger(__name__)
+
+_EOF = object()
+
+
+class StreamIngestor:
+    """
+    單一連線的串流推理
+
+    訊息格式 (JSON):
+        單筆: {"id": 選填, "data": {...}, "measure_value": 數值}
+        多筆: {"rows": [{"id", "data", "measure_value"}, ...]}
+    回應: 每列一則 {"id", "status": "ok", "result": {...}} 或 {"id", "status": "error", "error": "..."}
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        prediction_service,
+        on_results: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        max_batch: int = None,
+        queue_size: int = None,
+    ):
+        self.session_id = session_id
+        self.prediction_service = prediction_service
+        self.on_results = on_results
+        self.max_batch = max_batch or getattr(config, "INGEST_MAX_BATCH", 16)
+        self.queue_size = queue_size or getattr(config, "INGEST_QUEUE_SIZE", 64)
+        self.received = 0
+        self.processed = 0
+        self.batches = 0
+
+    async def run(
+        self,
+        receive_json: Callable[[], Awaitable[Any]],
+        send_json: Callable[[Any], Awaitable[None]],
+    ):
+        """讀取與推理並行：佇列滿時 reader 停在 put()，不再從連線讀取 (背壓)"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        async def reader():
+            try:
+                while True:
+                    message = await receive_json()
+                    for item in self._parse(message):
+                        self.received += 1
+                        await queue.put(item)
+            except Exception as e:
+                # 用戶端斷線或送出非 JSON 資料
+                logger.info(f"Ingest stream {self.session_id} closed: {type(e).__name__}")
+            finally:
+                await queue.put(_EOF)
+
+        reader_task = asyncio.create_task(reader())
+        try:
+            done = False
+            while not done:
+                item = await queue.get()
+                if item is _EOF:
+                    break
+                batch = [item]
+                # 合併已到達的列 (不等待)，一次推理
+                while len(batch) < self.max_batch and not queue.empty():
+                    nxt = queue.get_nowait()
+                    if nxt is _EOF:
+                        done = True
+                        break
+                    batch.append(nxt)
+
+                replies = await self._process(batch)
+                for reply in replies:
+                    await send_json(reply)
+        except Exception as e:
+            logger.info(f"Ingest stream {self.session_id} send failed: {type(e).__name__}")
+        finally:
+            reader_task.cancel()
+
+    def _parse(self, message) -> List[Dict[str, Any]]:
+        if not isinstance(message, dict):
+            return [{"id": None, "error": "訊息必須為 JSON 物件"}]
+        entries = message["rows"] if isinstance(message.get("rows"), list) else [message]
+
+        items = []
+        for entry in entries:
+            if not isinstance(entry, dict) or not isinstance(entry.get("data"), dict):
+                items.append({"id": None, "error": "缺少 data 欄位"})
+                continue
+            item_id = entry.get("id")
+            y_val = entry.get("measure_value")
+            try:
+                y = float(y_val) if y_val is not None else 0.0
+            except (ValueError, TypeError):
+                items.append({"id": item_id, "error": f"無效的 measure_value: {y_val}"})
+                continue
+            # 自動刪除 NaN 值
+            row = {k: v for k, v in entry["data"].items() if v is not None and v == v}
+            items.append({"id": item_id, "row": row, "y": y})
+        return items
+
+    async def _process(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        valid = [item for item in batch if "error" not in item]
+        results: Dict[int, Any] = {}
+
+        if valid:
+            try:
+                outs = await self._predict([i["row"] for i in valid], [i["y"] for i in valid])
+                for item, out in zip(valid, outs):
+                    results[id(item)] = out
+            except Exception:
+                # 批次中有無法推理的列 (例如缺少狀態欄位) -> 逐列推理找出錯誤
+                for item in valid:
+                    try:
+                        results[id(item)] = (await self._predict([item["row"]], [item["y"]]))[0]
+                    except Exception as e:
+                        item["error"] = f"{type(e).__name__}: {e}"
+
+        ok = [results[id(item)] for item in batch if id(item) in results]
+        if ok and self.on_results:
+            self.on_results(ok)
+        self.batches += 1
+        self.processed += len(batch)
+
+        replies = []
+        for item in batch:
+            if id(item) in results:
+                replies.append({"id": item.get("id"), "status": "ok", "result": results[id(item)]})
+            else:
+                replies.append({"id": item.get("id"), "status": "error", "error": item["error"]})
+        return replies
+
+    async def _predict(self, rows, ys):
+        """推理佇列已滿時稍候重試 (由背壓吸收，而不是回報錯誤)"""
+        delay = 0.05
+        while True:
+            try:
+                return await self.prediction_service.predict_batch(rows, ys, self.session_id)
+            except ServiceOverloadedError:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 1.0)
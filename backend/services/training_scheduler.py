@@ -0,0 +1,373 @@
+"""
+訓練作業排程器
+統一管理訓練子進程：全域並行上限、依優先權 (同優先權 FIFO) 的佇列、每個 session 的配額，
+並為每個作業分配 CPU 執行緒預算 (XGBoost n_jobs / torch threads / BLAS)，避免多人同時訓練時互相搶核心。
+作業狀態 queued -> running -> completed / failed / cancelled；
+子進程存活由監看執行緒 (proc.wait) 追蹤。伺服器重啟前啟動的子進程不在排程器中，
+列表時以 pid_alive() 探測 (os.kill(pid, 0) / tasklist)
+"""
+
+import itertools
+import json
+import os
+import subprocess
+import threading
+import time
+from typing import Dict, Any, List, Optional, Callable
+
+import config
+from backend.utils import get_logger
+from backend.utils.exceptions import ServiceOverloadedError
+
+logger = get_logger(__name__)
+
+# 傳給引擎的執行緒預算環境變數 (engines 以 SIGMA2_TRAIN_THREADS 設定 n_jobs / torch threads)
+THREAD_ENV_VARS = (
+    "SIGMA2_TRAIN_THREADS",
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+)
+
+# 保留已結束作業的時間 (秒)
+JOB_TTL_SECONDS = 3600
+
+FINAL_STATES = ("completed", "failed", "cancelled")
+
+
+def _default_launcher(argv: List[str], log_path: str, env: Dict[str, str]):
+    """啟動引擎子進程，輸出導向作業日誌"""
+    with open(log_path, "ab") as log_file:
+        return subprocess.Popen(
+            argv,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+            env=env,
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+        )
+
+
+def pid_alive(pid: int) -> bool:
+    """檢查進程是否還活著 (不由排程器管理的舊作業用)"""
+    if os.name == "nt":
+        try:
+            output = subprocess.check_output(
+                f'tasklist /FI "PID eq {pid}" /NH', shell=True
+            ).decode("gbk", errors="ignore")
+            return str(pid) in output
+        except Exception:
+            return False
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+def write_job_config(path: str, data: Dict[str, Any]):
+    """
+    寫入作業配置 JSON：先寫暫存檔再 os.replace
+
+    引擎子進程與伺服器 (排程器、列表) 都會改寫同一個檔案，讀取端不會讀到寫到一半的內容
+    """
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _terminate(proc):
+    """終止子進程 (Windows 連同子進程樹)"""
+    if os.name == "nt":
+        os.system(f"taskkill /F /T /PID {proc.pid}")
+    else:
+        proc.terminate()
+
+
+class TrainingScheduler:
+    def __init__(
+        self,
+        max_concurrent: int = None,
+        session_max_running: int = None,
+        session_max_queued: int = None,
+        cpu_threads: int = None,
+        launcher: Callable = None,
+    ):
+        self.max_concurrent = max(
+            1, max_concurrent or getattr(config, "TRAINING_MAX_CONCURRENT", 2)
+        )
+        self.session_max_running = max(
+            1, session_max_running or getattr(config, "TRAINING_SESSION_MAX_RUNNING", 1)
+        )
+        self.session_max_queued = (
+            session_max_queued
+            if session_max_queued is not None
+            else getattr(config, "TRAINING_SESSION_MAX_QUEUED", 3)
+        )
+        self.cpu_threads = (
+            cpu_threads or getattr(config, "TRAINING_CPU_THREADS", 0) or os.cpu_count() or 1
+        )
+        self.launcher = launcher or _default_launcher
+
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._procs: Dict[str, Any] = {}
+        self._queue: List[tuple] = []  # (-priority, seq, job_id)
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+        self.launched = 0
+        self.rejected = 0
+
+    # ------------------------------------------------------------------
+    # 對外介面
+    # ------------------------------------------------------------------
+    def threads_per_job(self) -> int:
+        """每個作業的 CPU 執行緒預算"""
+        return max(1, self.cpu_threads // self.max_concurrent)
+
+    def submit(
+        self,
+        job_id: str,
+        session_id: str,
+        argv: List[str],
+        log_path: str,
+        config_path: str = None,
+        priority: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        排入訓練作業；有空位時立即啟動
+
+        Raises:
+            ServiceOverloadedError: 該 session 排隊中的作業已達上限
+        """
+        with self._lock:
+            self._cleanup_old_jobs()
+            queued = sum(
+                1
+                for j in self._jobs.values()
+                if j["session_id"] == session_id and j["status"] == "queued"
+            )
+            if self.session_max_queued and queued >= self.session_max_queued:
+                self.rejected += 1
+                raise ServiceOverloadedError(
+                    "Too many training jobs queued for this session",
+                    details={"session_id": session_id, "queued": queued},
+                )
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "session_id": session_id,
+                "argv": list(argv),
+                "log_path": log_path,
+                "config_path": config_path,
+                "priority": priority,
+                "status": "queued",
+                "pid": None,
+                "threads": None,
+                "returncode": None,
+                "error": None,
+                "queued_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            self._queue.append((-priority, next(self._seq), job_id))
+            self._queue.sort()
+            self._dispatch()
+            return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """作業狀態 (queued 時附 queue_position，從 1 起算)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = {k: v for k, v in job.items() if k != "argv"}
+            if job["status"] == "queued":
+                snapshot["queue_position"] = next(
+                    i + 1 for i, item in enumerate(self._queue) if item[2] == job_id
+                )
+            return snapshot
+
+    def list_jobs(self, session_id: str = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            ids = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if session_id is None or job["session_id"] == session_id
+            ]
+            return [self.get(job_id) for job_id in ids]
+
+    def cancel(self, job_id: str) -> bool:
+        """取消作業：排隊中直接移出佇列，執行中則終止子進程 (由監看執行緒收尾)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] in FINAL_STATES:
+                return False
+            if job["status"] == "queued":
+                self._queue = [item for item in self._queue if item[2] != job_id]
+                self._finish(job_id, "cancelled", error="Manually stopped by user.")
+                return True
+            job["cancel_requested"] = True
+            proc = self._procs.get(job_id)
+        if proc is not None:
+            try:
+                _terminate(proc)
+            except Exception as e:
+                logger.warning(f"終止訓練作業 {job_id} 失敗: {e}")
+        return True
+
+    def counts(self) -> Dict[str, int]:
+        """各狀態的作業數 (供 /metrics)"""
+        with self._lock:
+            counts = {state: 0 for state in ("queued", "running") + FINAL_STATES}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return counts
+
+    def running_count(self) -> int:
+        return self.counts()["running"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "session_max_running": self.session_max_running,
+            "session_max_queued": self.session_max_queued,
+            "cpu_threads": self.cpu_threads,
+            "threads_per_job": self.threads_per_job(),
+            "launched": self.launched,
+            "rejected": self.rejected,
+            "jobs": self.counts(),
+        }
+
+    def shutdown(self):
+        """伺服器關閉：排隊中的作業標記為失敗 (執行中的子進程不受影響)"""
+        with self._lock:
+            for _, _, job_id in list(self._queue):
+                self._finish(job_id, "failed", error="Server stopped before the job started.")
+            self._queue = []
+
+    # ------------------------------------------------------------------
+    # 排程
+    # ------------------------------------------------------------------
+    def _dispatch(self):
+        """依佇列順序啟動作業，直到全域上限；已達 session 上限者留在佇列 (需在 self._lock 內呼叫)"""
+        running = [j for j in self._jobs.values() if j["status"] == "running"]
+        per_session: Dict[str, int] = {}
+        for job in running:
+            per_session[job["session_id"]] = per_session.get(job["session_id"], 0) + 1
+
+        slots = self.max_concurrent - len(running)
+        for item in list(self._queue):
+            if slots <= 0:
+                break
+            job = self._jobs[item[2]]
+            if per_session.get(job["session_id"], 0) >= self.session_max_running:
+                continue
+            self._queue.remove(item)
+            if self._launch(job):
+                per_session[job["session_id"]] = per_session.get(job["session_id"], 0) + 1
+                slots -= 1
+
+    def _launch(self, job: Dict[str, Any]) -> bool:
+        threads = self.threads_per_job()
+        env = dict(os.environ)
+        for name in THREAD_ENV_VARS:
+            env[name] = str(threads)
+
+        job_id = job["job_id"]
+        self._update_config(job, status="training", queue_position=None, threads=threads)
+        try:
+            proc = self.launcher(job["argv"], job["log_path"], env)
+        except Exception as e:
+            logger.error(f"啟動訓練作業 {job_id} 失敗: {e}")
+            self._finish(job_id, "failed", error=f"啟動訓練失敗: {e}")
+            return False
+
+        job.update(status="running", pid=proc.pid, threads=threads, started_at=time.time())
+        self._procs[job_id] = proc
+        self.launched += 1
+        self._update_config(job, pid=proc.pid)
+        threading.Thread(
+            target=self._watch, args=(job_id, proc), name=f"train-watch-{job_id}", daemon=True
+        ).start()
+        logger.info(
+            f"訓練作業 {job_id} 已啟動 (session={job['session_id']}, pid={proc.pid}, threads={threads})"
+        )
+        return True
+
+    def _watch(self, job_id: str, proc):
+        """等待子進程結束，更新狀態並啟動下一個作業"""
+        returncode = proc.wait()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            self._procs.pop(job_id, None)
+            if job is None:
+                return
+            job["returncode"] = returncode
+            if job.get("cancel_requested"):
+                self._finish(job_id, "cancelled", error="Manually stopped by user.")
+            else:
+                # 引擎成功時自行將配置寫為 completed；其餘情況 (崩潰 / 未回報) 視為失敗
+                reported = self._read_config_status(job)
+                if returncode == 0 and reported == "completed":
+                    self._finish(job_id, "completed")
+                else:
+                    self._finish(
+                        job_id,
+                        "failed",
+                        error=f"Process unexpectedly terminated (exit code {returncode}).",
+                    )
+            self._dispatch()
+
+    def _finish(self, job_id: str, status: str, error: str = None):
+        """寫入最終狀態；同步到作業配置 JSON (UI 以 failed 顯示取消/失敗)"""
+        job = self._jobs[job_id]
+        job.update(status=status, finished_at=time.time())
+        if error:
+            job["error"] = error
+        if status != "completed":
+            self._update_config(job, status="failed", error=job["error"], queue_position=None)
+        logger.info(f"訓練作業 {job_id} 結束: {status}")
+
+    # ------------------------------------------------------------------
+    # 作業配置 JSON
+    # ------------------------------------------------------------------
+    def _read_config_status(self, job: Dict[str, Any]) -> Optional[str]:
+        path = job.get("config_path")
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f).get("status")
+        except Exception:
+            return None
+
+    def _update_config(self, job: Dict[str, Any], **fields):
+        """合併欄位到作業配置 JSON (None 代表移除該欄位)；檔案已被刪除時略過"""
+        path = job.get("config_path")
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for key, value in fields.items():
+                if value is None:
+                    data.pop(key, None)
+                else:
+                    data[key] = value
+            write_job_config(path, data)
+        except Exception as e:
+            logger.warning(f"更新作業配置 {path} 失敗: {e}")
+
+    def _cleanup_old_jobs(self):
+        """清除過期的已結束作業 (需在 self._lock 內呼叫)"""
+        now = time.time()
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job["finished_at"] and now - job["finished_at"] > JOB_TTL_SECONDS
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
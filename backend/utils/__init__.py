@@ -12,6 +12,8 @@ from .exceptions import (
     ModelTrainingError,
     DataProcessingError,
     ConfigurationError,
+    ServiceOverloadedError,
+    SchemaMismatchError,
     SecurityError,
 )
 from .security import (
@@ -40,6 +42,8 @@ __all__ = [
     "ModelTrainingError",
     "DataProcessingError",
     "ConfigurationError",
+    "ServiceOverloadedError",
+    "SchemaMismatchError",
     "SecurityError",
     # Security
     "sanitize_session_id",
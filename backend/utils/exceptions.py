@@ -93,6 +93,30 @@ class ConfigurationError(Sigma2Exception):
         )
 
 
+class ServiceOverloadedError(Sigma2Exception):
+    """服務忙碌 (佇列已滿) 錯誤"""
+
+    def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
+        super().__init__(
+            message=message,
+            code="SERVICE_OVERLOADED",
+            status_code=503,
+            details=details,
+        )
+
+
+class SchemaMismatchError(Sigma2Exception):
+    """緊湊格式的 schema 與目前模型不符 (需重新取得 schema)"""
+
+    def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
+        super().__init__(
+            message=message,
+            code="SCHEMA_MISMATCH",
+            status_code=409,
+            details=details,
+        )
+
+
 class SecurityError(Sigma2Exception):
     """安全錯誤"""
 
@@ -0,0 +1,281 @@
+"""
+Prometheus 文字格式指標 (不依賴 prometheus_client)
+提供 Counter / Histogram / 擷取時計算的 Gauge，以及 /metrics 的輸出 (text format 0.0.4)
+"""
+
+import asyncio
+import math
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from typing import Callable, Dict, Iterable, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 秒；LLM / 訓練相關的路由可能到數十秒
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, v in items:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(v)}"
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in items:
+            for bound, count in zip(self.buckets, series):
+                le = _labels(self.labelnames, labels, f'le="{_number(bound)}"')
+                yield f"{self.name}_bucket{le} {count}"
+            inf = _labels(self.labelnames, labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{inf} {series[-1]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-2])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}"
+
+
+class Gauge:
+    """可直接 set / inc，或註冊 callback 於擷取時計算 (回傳數值或 {labels: 數值})"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        callback: Callable = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, labels: tuple = ()):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, amount: float = 1.0, labels: tuple = ()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, labels: tuple = ()):
+        self.inc(-amount, labels)
+
+    def value(self, labels: tuple = ()) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def render(self):
+        if self.callback is not None:
+            try:
+                value = self.callback()
+            except Exception:
+                # 收集失敗時略過此指標，不影響整個 /metrics
+                return
+            items = sorted(value.items()) if isinstance(value, dict) else [((), value)]
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, v in items:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(v)}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """同名指標只註冊一次 (重複註冊時回傳既有的)"""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def gauge_callback(self, name, documentation, callback, labelnames=()):
+        """註冊 (或替換) 擷取時計算的 gauge"""
+        gauge = Gauge(name, documentation, labelnames, callback)
+        with self._lock:
+            self._metrics[name] = gauge
+        return gauge
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.register(
+    Counter(
+        "sigma2_http_requests_total",
+        "HTTP requests by router, route template, method and status.",
+        ("router", "method", "route", "status"),
+    )
+)
+http_latency = registry.register(
+    Histogram(
+        "sigma2_http_request_duration_seconds",
+        "HTTP request latency (until the response body is sent).",
+        ("router", "method", "route"),
+    )
+)
+http_in_flight = registry.register(
+    Gauge(
+        "sigma2_http_requests_in_flight",
+        "HTTP requests currently being handled.",
+        ("router",),
+    )
+)
+llm_in_flight = registry.register(
+    Gauge("sigma2_llm_calls_in_flight", "LLM API calls currently waiting for a reply.")
+)
+llm_calls = registry.register(
+    Counter("sigma2_llm_calls_total", "LLM API calls by outcome.", ("outcome",))
+)
+loop_lag = registry.register(
+    Gauge("sigma2_event_loop_lag_seconds", "Latest measured asyncio event-loop lag.")
+)
+loop_lag_max = registry.register(
+    Gauge(
+        "sigma2_event_loop_lag_max_seconds",
+        "Maximum event-loop lag since the last scrape.",
+    )
+)
+
+
+@contextmanager
+def track_llm_call():
+    """包住一次 LLM API 呼叫 (同步或於 async 函式內皆可)，計入進行中數量與結果"""
+    llm_in_flight.inc()
+    try:
+        yield
+    except BaseException:
+        llm_calls.inc(("error",))
+        raise
+    else:
+        llm_calls.inc(("ok",))
+    finally:
+        llm_in_flight.dec()
+
+
+@asynccontextmanager
+async def track_llm_stream():
+    """串流版本 (async generator 內使用)"""
+    with track_llm_call():
+        yield
+
+
+class LoopLagMonitor:
+    """
+    每 interval 秒 sleep 一次，實際喚醒時間超出的部分即為 event loop 延遲
+    (同步阻塞呼叫、CPU 密集工作卡住 loop 時會上升)
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            loop_lag.set(lag)
+            if lag > loop_lag_max.value():
+                loop_lag_max.set(lag)
+
+
+def render_latest() -> str:
+    """/metrics 輸出；最大延遲於每次擷取後歸零"""
+    text = registry.render()
+    loop_lag_max.set(0.0)
+    return text
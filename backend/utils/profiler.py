@@ -0,0 +1,90 @@
+"""
+取樣式效能剖析 (sampling profiler)
+以背景執行緒每 interval 秒讀取一次所有執行緒的呼叫堆疊 (sys._current_frames)，
+輸出 folded stack 格式 ("thread;frame;frame... count")，
+可直接交給 flamegraph.pl / speedscope / inferno 繪製火焰圖
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILER_THREAD_PREFIX = "sigma2-profiler"
+
+# 最內層 frame 落在這些模組時視為閒置等待 (event loop select、執行緒池等工作、鎖等待)
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+
+def _frame_label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    label = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label.replace(";", ":").replace(" ", "_")
+
+
+class SamplingProfiler:
+    """
+    對整個程序取樣，因此背景工作 (執行緒池中的工具執行、推理執行緒) 也會被記錄；
+    同一時間其他請求的工作同樣會出現在結果中，以執行緒名稱作為最外層 frame 區分
+    """
+
+    def __init__(self, interval: float = 0.005, max_seconds: float = 300.0, include_idle: bool = False):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.include_idle = include_idle
+        self.stacks = Counter()
+        self.samples = 0
+        self.truncated = False
+        self.started_at = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(
+            target=self._run, name=f"{PROFILER_THREAD_PREFIX}-{id(self):x}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        start = time.perf_counter()
+        labels = {}  # code object -> label (同一函式只格式化一次)
+        while not self._stop.wait(self.interval):
+            self.duration = time.perf_counter() - start
+            if self.duration > self.max_seconds:
+                self.truncated = True
+                break
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, str(ident))
+                if name.startswith(PROFILER_THREAD_PREFIX):
+                    continue
+                if not self.include_idle and frame.f_code.co_filename.endswith(_IDLE_FILES):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _frame_label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(name.replace(";", ":").replace(" ", "_"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+        self.duration = time.perf_counter() - start
+
+    def write_folded(self, path: str):
+        """寫出 folded stack 檔 (每行 "frame;frame;... 次數")"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
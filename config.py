@@ -52,6 +52,84 @@ DEFAULT_PRED_ALGO = "XGBoost"
 # --- 邏輯優化 ---
 SHAP_SMOOTHING_WINDOW = 10
 
+# --- 模型快取 (跨 session 共用) ---
+MODEL_CACHE_MAX_BYTES = 2 * 1024**3  # 未被任何 session 參考的模型超過此預算時依 LRU 淘汰
+
+# --- 推理執行器 ---
+INFERENCE_WORKERS = 4  # 推理執行緒數
+INFERENCE_MAX_PENDING = 64  # 全域待處理上限，超過回傳 503
+INFERENCE_MAX_PENDING_PER_SESSION = 8  # 單一 session 待處理上限
+
+# 跨 session 微批次 (opt-in)：同一組共用模型的 /predict 於窗口內合併推理
+MICRO_BATCH_ENABLED = False
+MICRO_BATCH_WINDOW_MS = 5  # 合併窗口 (延遲上限)
+MICRO_BATCH_MAX_SIZE = 32  # 單批上限，達到即送出
+
+# --- 模擬器預讀 ---
+SIM_READAHEAD_ENABLED = True
+SIM_READAHEAD_WINDOW = 256  # 預讀窗口 (列)，剩餘不足一半時補充
+SIM_READAHEAD_CHUNK = 64  # 每次背景批次推理的列數
+SIM_READAHEAD_WORKERS = 1  # 預讀專用執行緒 (與互動推理分開)
+
+# --- 看板事件推送 (SSE) ---
+EVENT_BUFFER_SIZE = 256  # 每個 session 保留的最近事件數 (斷線重連補送)
+EVENT_HEARTBEAT_SECONDS = 15  # 閒置時的心跳間隔
+EVENT_QUEUE_SIZE = 512  # 單一連線的待送事件上限，超過即斷線重新同步
+
+# --- 串流資料接收 (/ingest WebSocket) ---
+INGEST_MAX_BATCH = 16  # 每次合併推理的最大列數
+INGEST_QUEUE_SIZE = 64  # 單一連線待推理列上限，滿了即停止讀取 (背壓)
+
+# --- 候選動作掃描 (what-if optimizer，opt-in) ---
+ACTION_SWEEP_ENABLED = False
+ACTION_SWEEP_CANDIDATES = 2048  # 每列候選數 (grid 模式為上限)
+ACTION_SWEEP_STD_SPAN = 2.0  # 候選 delta 範圍: ±span × action_std
+ACTION_SWEEP_MODE = "random"  # "random" 或 "grid"
+
+# --- 敏感度曲線 (/sensitivity) ---
+SENSITIVITY_GRID_POINTS = 41  # 每個特徵的預設網格點數
+SENSITIVITY_STD_SPAN = 2.0  # 預設網格範圍: 目前值 ± span × action_std
+SENSITIVITY_MAX_POINTS = 256  # 單一特徵網格點數上限 (points 與指定網格長度)，超過回 400
+SENSITIVITY_CACHE_SIZE = 512  # 快取的曲線數 (模型, 資料列, 特徵, 網格)
+
+# --- 推理分段計時 ---
+LATENCY_TRACE_ENABLED = False  # 關閉時各階段只剩一次 ContextVar 查詢
+LATENCY_WINDOW = 2048  # 每個 session / 模型每個階段保留的取樣數
+
+# --- Prometheus 指標 (/metrics) ---
+METRICS_ENABLED = True
+METRICS_LOOP_LAG_INTERVAL = 0.5  # event loop 延遲量測間隔 (秒)
+
+# --- 請求剖析 (X-Sigma2-Profile 標頭或 ?profile=1，opt-in) ---
+PROFILER_ENABLED = False  # 關閉時不註冊中間件，標頭會被忽略
+PROFILER_ALLOWED_PATHS = [
+    "/api/analysis/chat/stream",
+    "/api/dashboard/predict",
+    "/predict",
+]
+PROFILER_INTERVAL = 0.005  # 取樣間隔 (秒)
+PROFILER_MAX_SECONDS = 300.0  # 單次剖析最長取樣時間，超過後停止取樣
+PROFILER_MAX_CONCURRENT = 1  # 同時進行的剖析數量上限
+PROFILER_KEEP = 50  # 每個 session 保留的剖析檔數量
+
+# --- 閒置 Session 淘汰 ---
+SESSION_EVICTION_ENABLED = True
+SESSION_IDLE_TTL_SECONDS = 3600  # 閒置超過此時間即釋放 sim_df / 預測歷史 / Agent
+SESSION_MEMORY_BUDGET_BYTES = 4 * 1024**3  # 所有 session 估計總量上限 (0 = 不限制)
+SESSION_MIN_IDLE_SECONDS = 120  # 超過預算時，最近用過的 session 不淘汰
+SESSION_SWEEP_INTERVAL = 60  # 背景檢查間隔 (秒)
+
+# --- Session 快照 (重啟後還原) ---
+SESSION_SNAPSHOT_ENABLED = True
+SESSION_SNAPSHOT_INTERVAL = 30  # 快照間隔 (秒)；狀態未變更的 session 不重寫
+SESSION_SNAPSHOT_PREWARM = 8  # 啟動時預先載入模型的 session 數 (依最近快照時間)
+
+# --- 訓練作業排程 ---
+TRAINING_MAX_CONCURRENT = 2  # 同時執行的訓練子進程上限，其餘排隊
+TRAINING_SESSION_MAX_RUNNING = 1  # 每個 session 同時執行的訓練數
+TRAINING_SESSION_MAX_QUEUED = 3  # 每個 session 排隊中的作業上限 (超過回 503)
+TRAINING_CPU_THREADS = 0  # 分給所有訓練作業的 CPU 執行緒總數 (0 = os.cpu_count())；每個作業得到 總數 / 並行上限
+
 # --- LLM 配置 ---
 LLM_API_URL = "http://10.10.20.214:11434/api/chat"
 LLM_MODEL = "gemma3:27b-it-qat"
@@ -59,6 +137,8 @@ LLM_MODEL = "gemma3:27b-it-qat"
 # --- 儲存與監控 ---
 BASE_STORAGE_DIR = "workspace"
 DASHBOARD_DIR = "monitor_dashboard"
+MONITOR_PLOT_EVERY = 10  # 訓練監控 plot.png 每 N 個 epoch 繪製一次 (0 = 只輸出 policy_slice.json)
+MONITOR_PLOT_ASYNC = True  # 於背景執行緒繪圖，不阻塞訓練迴圈
 API_PORT = 8001
 
 # --- 初始化基本目錄 ---
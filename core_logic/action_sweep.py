@@ -0,0 +1,161 @@
+# action_sweep.py
+import numpy as np
+
+
+class ActionSweep:
+    """
+    候選動作掃描 (what-if optimizer)
+
+    以目前 action 值為中心，在 ±std_span × action_std 範圍內產生候選 delta
+    (並限制在 y2_axis_ranges 內)，將所有候選一次送入 XGBoost 預測，
+    回傳預測值最接近 target_center 的候選。候選偏移在建立時預先產生，
+    推理時只需向量化地疊加到每列的 XGBoost 輸入；
+    候選只評估會在 action 欄位上分裂的樹 (XGBSimulator.tree_subset)，其餘樹的輸出不變。
+    """
+
+    def __init__(
+        self,
+        plan,
+        action_stds,
+        y2_ranges=None,
+        n_candidates=2048,
+        std_span=2.0,
+        mode="random",
+        max_rows_per_call=65536,
+        seed=0,
+    ):
+        self.plan = plan
+        self.action_features = list(plan.action_features)
+        n_actions = len(self.action_features)
+
+        # 只有同時是 XGBoost 特徵的 action 才會影響模擬結果
+        xgb_pos = {f: i for i, f in enumerate(plan.xgb_features)}
+        self.movable = np.array(
+            [f in xgb_pos for f in self.action_features], dtype=bool
+        )
+        self.xgb_cols = np.array(
+            [xgb_pos[f] for f, m in zip(self.action_features, self.movable) if m],
+            dtype=np.intp,
+        )
+
+        stds = np.zeros(n_actions)
+        if action_stds is not None:
+            given = np.asarray(action_stds, dtype=np.float64).ravel()[:n_actions]
+            stds[: len(given)] = given
+        stds[~self.movable] = 0.0
+
+        # y2 軸範圍 {feature: [min, max]}；未提供的 action 不限制
+        self.lower = np.full(n_actions, -np.inf)
+        self.upper = np.full(n_actions, np.inf)
+        for i, feat in enumerate(self.action_features):
+            bounds = (y2_ranges or {}).get(feat)
+            if bounds and len(bounds) == 2:
+                self.lower[i], self.upper[i] = float(bounds[0]), float(bounds[1])
+
+        unit = self._unit_offsets(int(self.movable.sum()), n_candidates, mode, seed)
+        offsets = np.zeros((len(unit), n_actions))
+        offsets[:, self.movable] = unit
+        # 第 0 個候選固定為「維持現狀」(delta = 0)
+        self.deltas = np.vstack([np.zeros(n_actions), offsets * std_span * stds])
+        self.max_rows_per_call = max_rows_per_call
+
+    @staticmethod
+    def _unit_offsets(dims, n_candidates, mode, seed):
+        """
+        [-1, 1]^dims 內的候選偏移 (grid 或 random)
+
+        grid 的總點數不超過 n_candidates；每維連 2 點都放不下 (2^dims > n_candidates) 時改為隨機取樣
+        """
+        if dims == 0:
+            return np.zeros((0, 0))
+        if mode == "grid":
+            per_dim = int(n_candidates ** (1.0 / dims) + 1e-9)
+            if per_dim >= 2:
+                axes = [np.linspace(-1.0, 1.0, per_dim)] * dims
+                return np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, dims)
+        rng = np.random.default_rng(seed)
+        return rng.uniform(-1.0, 1.0, size=(n_candidates, dims))
+
+    @property
+    def n_candidates(self):
+        return len(self.deltas)
+
+    def sweep(self, simulator, values, target_center, iql_deltas=None):
+        """
+        對每列掃描候選動作
+
+        Args:
+            simulator: XGBSimulator
+            values: 擷取計畫的 (n, n_columns) 矩陣
+            target_center: 目標中心值
+            iql_deltas: (n, n_actions) IQL 建議的 delta，會一併評分供比較
+
+        Returns:
+            list: 每列一個 dict (XGBoost 特徵不完整或沒有可調整的 action 時為 None)
+        """
+        values = np.atleast_2d(values)
+        n = len(values)
+        out = [None] * n
+        if simulator.model is None or not len(self.xgb_cols) or n == 0:
+            return out
+
+        X_base = self.plan.xgb(values)
+        valid = ~np.isnan(X_base).any(axis=1)
+        rows = np.flatnonzero(valid)
+        if not rows.size:
+            return out
+
+        current = self.plan.actions(values)[rows]  # (r, n_actions)
+        # 候選: 0 = 維持現狀，1..m = 掃描候選，最後一個 = IQL 建議
+        deltas = np.broadcast_to(self.deltas, (len(rows),) + self.deltas.shape)
+        if iql_deltas is not None:
+            iql = np.asarray(iql_deltas, dtype=np.float64)[rows][:, None, :]
+            deltas = np.concatenate([deltas, iql], axis=1)
+        # 限制在 y2 軸範圍內 (current + delta 超出時截斷)
+        targets = np.clip(current[:, None, :] + deltas, self.lower, self.upper)
+        deltas = targets - current[:, None, :]
+        n_cand = deltas.shape[1]
+
+        X_rows = X_base[rows]
+        movable_targets = targets[:, :, self.movable]
+        subset = simulator.tree_subset(self.xgb_cols)
+        if subset is not None:
+            # predict(候選) = predict(目前) + subset(候選) - subset(目前)；
+            # 子模型只用到少數欄位，候選矩陣也只需這幾欄
+            pos = {int(c): i for i, c in enumerate(subset.columns)}
+            sel = [k for k, c in enumerate(self.xgb_cols) if int(c) in pos]
+            dst = np.array([pos[int(self.xgb_cols[k])] for k in sel], dtype=np.intp)
+            src = X_rows[:, subset.columns]
+            score = subset.predict
+            base = np.asarray(simulator.model.predict(X_rows), dtype=np.float64)
+            base = base - score(src)
+            movable_targets = movable_targets[:, :, sel]
+        else:
+            dst = self.xgb_cols
+            src = X_rows
+            score = lambda X: np.asarray(simulator.model.predict(X), dtype=np.float64)
+            base = np.zeros(len(rows))
+
+        preds = np.empty((len(rows), n_cand))
+        step = max(1, self.max_rows_per_call // n_cand)
+        for start in range(0, len(rows), step):
+            stop = min(start + step, len(rows))
+            X = np.repeat(src[start:stop], n_cand, axis=0)
+            X[:, dst] = movable_targets[start:stop].reshape(-1, len(dst))
+            preds[start:stop] = score(X).reshape(stop - start, n_cand)
+        preds += base[:, None]
+
+        distance = np.abs(preds - target_center)
+        best = distance.argmin(axis=1)
+        for k, row in enumerate(rows):
+            b = best[k]
+            out[row] = {
+                "delta": deltas[k, b].tolist(),
+                "suggested_actions": targets[k, b].tolist(),
+                "predicted_y": float(preds[k, b]),
+                "hold_predicted_y": float(preds[k, 0]),
+                "iql_predicted_y": float(preds[k, -1]) if iql_deltas is not None else None,
+                "improvement": float(distance[k, 0] - distance[k, b]),
+                "candidates": n_cand,
+            }
+        return out
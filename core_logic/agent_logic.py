@@ -3,15 +3,77 @@ import numpy as np
 import config
 from . import model_manager
 from .xgb_predict import XGBSimulator
+from .feature_plan import FeatureGatherPlan
+from .action_sweep import ActionSweep
+from .model_cache import model_cache
+from .latency import lap
 from collections import deque
+import functools
 import logging
+import threading
 
 # 获取 logger
 logger = logging.getLogger(__name__)
 
 
+def build_gather_plan(bg_features, action_features, simulator):
+    """依 bg / action / XGBoost 特徵編譯擷取計畫"""
+    xgb_features = (
+        simulator.feature_names
+        if simulator is not None and simulator.feature_names
+        else []
+    )
+    return FeatureGatherPlan(bg_features, action_features, xgb_features)
+
+
+def _with_model_lock(method):
+    """推理期間持有模型鎖，確保整個請求使用同一組模型 (不會讀到切換一半的狀態)"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._model_lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class ModelSet:
+    """
+    一組完整載入的模型與其業務設定 (雙緩衝的「後台」緩衝區)
+
+    由 build_model_set() 在背景建立，建立過程不影響正在服務的模型；
+    完成後交給 swap_model_set() 一次切換。
+    """
+
+    def __init__(self, agent):
+        # 業務設定預設沿用目前值 (與舊版 reload 行為一致)
+        self.bg_features = agent.bg_features
+        self.action_features = agent.action_features
+        self.action_stds = agent.action_stds
+        self.y_low = agent.y_low
+        self.y_high = agent.y_high
+        self.target_center = agent.target_center
+
+        self.iql_algo = None
+        self.meta = None
+        self.simulator = None
+        self.explainer = None
+        self.gather_plan = None
+        self.model_path = None
+        self.pred_model_dir = None
+        self.target = None  # build_model_set 的 target_bundle_name (None = 最新模型)
+        self.keys = {}  # 持有的共用模型 cache key (kind -> key)
+        self.errors = []
+
+    def release(self):
+        """放棄此模型組 (未切換就被取代或建立失敗時)，歸還共用模型參考"""
+        for key in self.keys.values():
+            model_cache.release(key)
+        self.keys = {}
+
+
 class AgenticReasoning:
-    def __init__(self, session_id: str = "default"):
+    def __init__(self, session_id: str = "default", auto_load: bool = True):
         self.session_id = session_id
         self.iql_algo = None
         self.meta = None
@@ -19,6 +81,12 @@ class AgenticReasoning:
         self.explainer = None
         self.shap_history = None
         self.action_history = deque(maxlen=config.SHAP_SMOOTHING_WINDOW)
+        self.gather_plan = None
+        self.action_sweep = None  # 候選動作掃描 (依擷取計畫延遲建立)
+        self._model_keys = {}  # 目前持有的共用模型 cache key (kind -> key)
+        self._model_lock = threading.RLock()
+        self.model_generation = 0  # 每次切換模型組 +1 (供預先計算的結果判斷是否失效)
+        self.model_target = None  # 目前模型組的載入目標 (session 快照用於重啟後重新載入)
 
         # 初始化預設特徵，避免未載入模型時崩潰
         self.bg_features = getattr(config, "STATE_FEATURES", [])
@@ -30,15 +98,47 @@ class AgenticReasoning:
             config, "TARGET_CENTER", (self.y_low + self.y_high) / 2
         )
 
-        # 執行首次模型載入
-        self.reload_model()
+        # 執行首次模型載入 (auto_load=False 時由呼叫端於背景載入)
+        if auto_load:
+            self.reload_model()
 
     def reload_model(self, target_bundle_name: str = None):
-        """從隔離空間重新載入模型與模擬器"""
+        """從隔離空間重新載入模型與模擬器 (建立完整模型組後一次切換)"""
         try:
-            from backend.dependencies import get_file_service
-            import os
+            model_set = self.build_model_set(target_bundle_name)
+        except Exception as e:
+            print(
+                f"AgenticReasoning: Reload failed for session {self.session_id} - {e}"
+            )
+            import traceback
 
+            traceback.print_exc()
+            return False
+
+        self.swap_model_set(model_set)
+        return True
+
+    def build_model_set(self, target_bundle_name: str = None, progress=None):
+        """
+        解析並載入一組完整的模型 (不修改目前 agent 的狀態，可在背景執行緒執行)
+
+        Args:
+            target_bundle_name: job_xxx.json、rl_run 目錄或模型路徑；None 表示載入最新模型
+            progress: 進度回呼 progress(stage, percent)
+
+        Returns:
+            ModelSet: 交給 swap_model_set() 一次切換；失敗時拋出例外
+        """
+        from backend.dependencies import get_file_service
+        import os
+
+        def report(stage, percent):
+            if progress:
+                progress(stage, percent)
+
+        ms = ModelSet(self)
+        try:
+            report("resolving", 10)
             file_service = get_file_service()
             user_bundles_dir = file_service.get_user_path(self.session_id, "bundles")
 
@@ -128,20 +228,25 @@ class AgenticReasoning:
 
             if actual_model_path:
                 print(f"🔄 Loading policy bundle from: {actual_model_path}")
+                report("loading_policy", 30)
                 try:
-                    self.iql_algo, self.meta = model_manager.load_policy_bundle(
-                        actual_model_path
+                    policy_key, (ms.iql_algo, meta) = model_cache.acquire(
+                        "policy", actual_model_path, model_manager.load_policy_bundle
                     )
+                    ms.keys["policy"] = policy_key
+                    ms.meta = dict(meta)  # 共用模型唯讀，session 端使用淺拷貝
                     print(f"✅ Policy bundle loaded successfully")
+                    print(f"   - policy engine: {type(ms.iql_algo).__name__}")
                     print(
-                        f"   - bg_features: {len(self.meta.get('bg_features', []))} features"
+                        f"   - bg_features: {len(ms.meta.get('bg_features', []))} features"
                     )
-                    print(f"   - action_stds: {self.meta.get('action_stds', 'None')}")
+                    print(f"   - action_stds: {ms.meta.get('action_stds', 'None')}")
 
-                    self.bg_features = self.meta["bg_features"]
-                    self.action_stds = self.meta["action_stds"]
+                    ms.bg_features = ms.meta["bg_features"]
+                    ms.action_stds = ms.meta["action_stds"]
 
                     # 從 JSON 配置讀取 actions (如果有的話)
+                    report("reading_config", 50)
                     if target_bundle_name and target_bundle_name.endswith(".json"):
                         try:
                             configs_dir = file_service.get_user_path(
@@ -153,98 +258,144 @@ class AgenticReasoning:
                                     job_conf = json.load(f)
 
                                     # 讀取 actions
-                                    self.action_features = job_conf.get("actions", [])
+                                    ms.action_features = job_conf.get("actions", [])
                                     print(
-                                        f"   - action_features from JSON: {len(self.action_features)} features"
+                                        f"   - action_features from JSON: {len(ms.action_features)} features"
                                     )
-                                    print(f"     {self.action_features}")
+                                    print(f"     {ms.action_features}")
 
                                     # 讀取 goalSettings (LSL/USL)
                                     goal_settings = job_conf.get(
                                         "goalSettings"
                                     ) or job_conf.get("goal_settings")
                                     if goal_settings:
-                                        self.y_low = float(goal_settings.get("lsl", 0))
-                                        self.y_high = float(goal_settings.get("usl", 1))
-                                        self.target_center = float(
+                                        ms.y_low = float(goal_settings.get("lsl", 0))
+                                        ms.y_high = float(goal_settings.get("usl", 1))
+                                        ms.target_center = float(
                                             goal_settings.get(
-                                                "target", (self.y_low + self.y_high) / 2
+                                                "target", (ms.y_low + ms.y_high) / 2
                                             )
                                         )
                                         print(
-                                            f"   - Y range from JSON: [{self.y_low}, {self.y_high}]"
+                                            f"   - Y range from JSON: [{ms.y_low}, {ms.y_high}]"
                                         )
                                         print(
-                                            f"   - Target center: {self.target_center}"
+                                            f"   - Target center: {ms.target_center}"
                                         )
                                     else:
-                                        self.y_low = getattr(config, "Y_LOW", 0)
-                                        self.y_high = getattr(config, "Y_HIGH", 1)
-                                        self.target_center = getattr(
+                                        ms.y_low = getattr(config, "Y_LOW", 0)
+                                        ms.y_high = getattr(config, "Y_HIGH", 1)
+                                        ms.target_center = getattr(
                                             config,
                                             "TARGET_CENTER",
-                                            (self.y_low + self.y_high) / 2,
+                                            (ms.y_low + ms.y_high) / 2,
                                         )
                         except Exception as e:
                             print(f"⚠️ Failed to read actions from JSON: {e}")
-                            self.action_features = getattr(
+                            ms.action_features = getattr(
                                 config, "ACTION_FEATURES", []
                             )
-                            self.y_low = getattr(config, "Y_LOW", 0)
-                            self.y_high = getattr(config, "Y_HIGH", 1)
-                            self.target_center = getattr(
-                                config, "TARGET_CENTER", (self.y_low + self.y_high) / 2
+                            ms.y_low = getattr(config, "Y_LOW", 0)
+                            ms.y_high = getattr(config, "Y_HIGH", 1)
+                            ms.target_center = getattr(
+                                config, "TARGET_CENTER", (ms.y_low + ms.y_high) / 2
                             )
                     else:
-                        self.action_features = getattr(config, "ACTION_FEATURES", [])
-                        self.y_low = getattr(config, "Y_LOW", 0)
-                        self.y_high = getattr(config, "Y_HIGH", 1)
-                        self.target_center = getattr(
-                            config, "TARGET_CENTER", (self.y_low + self.y_high) / 2
+                        ms.action_features = getattr(config, "ACTION_FEATURES", [])
+                        ms.y_low = getattr(config, "Y_LOW", 0)
+                        ms.y_high = getattr(config, "Y_HIGH", 1)
+                        ms.target_center = getattr(
+                            config, "TARGET_CENTER", (ms.y_low + ms.y_high) / 2
                         )
                 except Exception as e:
                     print(f"❌ Failed to load policy bundle: {e}")
-                    self.iql_algo = None
-                    self.meta = None
+                    ms.errors.append(f"Failed to load policy bundle: {e}")
+                    ms.iql_algo = None
+                    ms.meta = None
+                    model_cache.release(ms.keys.pop("policy", None))
             else:
                 print(f"⚠️ No RL model path found. IQL will not be available.")
-                self.iql_algo = None
+                ms.iql_algo = None
 
-            # 載入 XGBoost 模擬器（使用指定的 pred_model_dir）
+            # 載入 XGBoost 模擬器（使用指定的 pred_model_dir，跨 session 共用）
             print(f"🔄 Loading XGBoost simulator from: {pred_model_dir}")
-            self.simulator = XGBSimulator(model_dir=pred_model_dir)
-            if self.simulator.model:
+            report("loading_simulator", 70)
+            sim_key, ms.simulator = model_cache.acquire(
+                "simulator", pred_model_dir, XGBSimulator
+            )
+            ms.keys["simulator"] = sim_key
+            if ms.simulator.model:
                 print(f"✅ XGBoost model loaded successfully")
             else:
                 print(f"⚠️ XGBoost model not loaded")
 
-            # 初始化 SHAP 解釋器
-            if self.simulator.model:
-                import shap
-
-                self.explainer = shap.TreeExplainer(self.simulator.model)
-                self.shap_history = deque(maxlen=config.SHAP_SMOOTHING_WINDOW)
-                print(f"✅ SHAP explainer initialized")
+            # 初始化歸因: 優先使用 XGBoost 原生 pred_contribs，不支援時才建立 SHAP 解釋器
+            if ms.simulator.model:
+                report("attribution", 85)
+                if ms.simulator.contrib_ready:
+                    print(f"✅ Attribution: XGBoost native contributions")
+                else:
+                    ms.explainer = ms.simulator.get_explainer()
+                    print(f"✅ SHAP explainer initialized")
 
-            # 清空歷史記錄,避免形狀不一致問題
-            self.action_history.clear()
-            print("✅ Action history cleared")
+            # 依新模型的特徵編譯擷取計畫
+            report("compiling", 95)
+            ms.gather_plan = build_gather_plan(
+                ms.bg_features, ms.action_features, ms.simulator
+            )
+            print(f"✅ Feature gather plan compiled: {len(ms.gather_plan.columns)} columns")
 
             print(
-                f"AgenticReasoning: Session {self.session_id} models reloaded successfully"
+                f"AgenticReasoning: Session {self.session_id} model set built successfully"
             )
             print(f"  - RL Model: {actual_model_path}")
             print(f"  - Prediction Model Dir: {pred_model_dir}")
-            print(f"  - IQL Available: {self.iql_algo is not None}")
-            print(f"  - XGBoost Available: {self.simulator.model is not None}")
-        except Exception as e:
-            print(
-                f"AgenticReasoning: Reload failed for session {self.session_id} - {e}"
-            )
-            import traceback
+            print(f"  - IQL Available: {ms.iql_algo is not None}")
+            print(f"  - XGBoost Available: {ms.simulator.model is not None}")
+        except Exception:
+            ms.release()
+            raise
 
-            traceback.print_exc()
+        ms.model_path = actual_model_path
+        ms.pred_model_dir = pred_model_dir
+        ms.target = target_bundle_name
+        return ms
+
+    def swap_model_set(self, model_set):
+        """
+        一次切換到新的模型組 (雙緩衝)
+
+        與推理共用同一把鎖，推理中的請求會用完舊模型後才切換；
+        切換後清空平滑歷史並歸還舊模型的共用參考。
+        """
+        with self._model_lock:
+            old_keys = self._model_keys
+            self.iql_algo = model_set.iql_algo
+            self.meta = model_set.meta
+            self.simulator = model_set.simulator
+            self.explainer = model_set.explainer
+            self.gather_plan = model_set.gather_plan
+            self.bg_features = model_set.bg_features
+            self.action_features = model_set.action_features
+            self.action_stds = model_set.action_stds
+            self.y_low = model_set.y_low
+            self.y_high = model_set.y_high
+            self.target_center = model_set.target_center
+            self._model_keys = dict(model_set.keys)
+            model_set.keys = {}
+            self.model_generation += 1
+            self.model_target = model_set.target
+
+            # 清空歷史記錄,避免形狀不一致問題
+            self.reset_history()
+            print("✅ Action history cleared")
 
+        for key in old_keys.values():
+            model_cache.release(key)
+        print(f"AgenticReasoning: Session {self.session_id} models swapped")
+
+
+    @_with_model_lock
     def get_reasoned_advice(self, row, current_y):
         """
         執行 Agentic 推理: IQL 提議 -> XGBoost 驗證 + SHAP 歸因分析
@@ -269,80 +420,61 @@ class AgenticReasoning:
         if not self.iql_algo:
             logger.error("❌ IQL model not loaded!")
             logger.error("   Reason: self.iql_algo is None")
-            return {
-                "current_y": current_y,
-                "iql_action_delta": None,
-                "iql_action_delta_smoothed": None,
-                "predicted_y_next": None,
-                "top_influencers": [],
-                "current_top_influencers": [],
-                "smoothed_top_influencers": [],
-                "status": "HOLD",
-                "diagnosis": "警告：尚未載入有效的策略模型（iql_algo is None），無法提供建議。請先執行模型訓練。",
-            }
+            return self._empty_advice(
+                current_y,
+                "警告：尚未載入有效的策略模型（iql_algo is None），無法提供建議。請先執行模型訓練。",
+            )
 
         if not self.bg_features:
             logger.error("❌ BG features not loaded!")
             logger.error("   Reason: self.bg_features is None or empty")
-            return {
-                "current_y": current_y,
-                "iql_action_delta": None,
-                "iql_action_delta_smoothed": None,
-                "predicted_y_next": None,
-                "top_influencers": [],
-                "current_top_influencers": [],
-                "smoothed_top_influencers": [],
-                "status": "HOLD",
-                "diagnosis": "警告：背景特徵未載入（bg_features is None），無法提供建議。請先執行模型訓練。",
-            }
+            return self._empty_advice(
+                current_y,
+                "警告：背景特徵未載入（bg_features is None），無法提供建議。請先執行模型訓練。",
+            )
 
         logger.info("✅ All models loaded successfully, proceeding with inference...")
         print("=" * 60)
         print("[DEBUG] Starting inference workflow...")
 
-        # 1. 取得特徵值
+        plan = self._get_gather_plan()
+
+        # 1. 取得特徵值 (依預編譯計畫一次擷取)
+        print("[DEBUG] ⏳ Extracting features...")
+        print(f"[DEBUG]    BG Features count: {len(self.bg_features)}")
+        print(f"[DEBUG]    Action Features count: {len(self.action_features)}")
+        print(f"[DEBUG]    Row data keys count: {len(row.keys())}")
+
+        # 检查是否有缺失的特征 (單次集合差集)
+        missing = plan.missing(row)
+        missing_state = plan.missing_state(missing)
+        missing_xgb = plan.missing_xgb(missing)
+        if missing_state:
+            missing_list = sorted(missing_state)
+            print(f"[ERROR] ❌ Missing BG/Action features: {missing_list[:10]}...")
+            raise KeyError(missing_list[0])
+        if missing_xgb:
+            print(f"[ERROR] ❌ Missing XGBoost features: {sorted(missing_xgb)[:10]}...")
+
         try:
-            print("[DEBUG] ⏳ Extracting features...")
-            print(f"[DEBUG]    BG Features count: {len(self.bg_features)}")
-            print(f"[DEBUG]    Action Features count: {len(self.action_features)}")
-            print(f"[DEBUG]    Row data keys count: {len(row.keys())}")
-
-            # 检查是否有缺失的特征
-            missing_bg = [f for f in self.bg_features if f not in row]
-            missing_act = [f for f in self.action_features if f not in row]
-
-            if missing_bg:
-                print(f"[ERROR] ❌ Missing BG features: {missing_bg[:10]}...")
-            if missing_act:
-                print(f"[ERROR] ❌ Missing Action features: {missing_act}")
-
-            print("[DEBUG] ⏳ Extracting BG values...")
-            bg_vals = [row[f] for f in self.bg_features]
-            print(f"[DEBUG] ✅ BG values extracted: {len(bg_vals)} values")
-
-            print("[DEBUG] ⏳ Extracting Action values...")
-            act_vals = [row[f] for f in self.action_features]
-            print(f"[DEBUG] ✅ Action values extracted: {len(act_vals)} values")
-
-        except KeyError as e:
-            print(f"[ERROR] ❌ KeyError when extracting features: {e}")
-            print(f"[ERROR]    Missing feature: {str(e)}")
-            raise
+            values = plan.gather(row, missing)
         except Exception as e:
             print(f"[ERROR] ❌ Unexpected error when extracting features: {e}")
             import traceback
 
             traceback.print_exc()
             raise
+        act_vals = plan.actions(values)[0].tolist()
+        print(f"[DEBUG] ✅ Features extracted: {len(values)} values")
+        lap("gather")
 
         # 2. 先用 IQL 推理出 action delta
         print("[DEBUG] ⏳ Running IQL inference...")
-        state_iql = np.concatenate([bg_vals, act_vals, [current_y]], axis=0)[
-            None, :
-        ].astype(np.float32)
+        state_iql = plan.state(values, current_y)
 
         try:
             action_norm = self.iql_algo.predict(state_iql)[0]
+            lap("iql")
             print(
                 f"[DEBUG] ✅ IQL inference complete, action_norm shape: {action_norm.shape}"
             )
@@ -355,27 +487,309 @@ class AgenticReasoning:
             print(f"[WARNING] ⚠️ Skipping IQL inference, using HOLD strategy")
 
             # 跳過 IQL,返回 HOLD 狀態
+            return self._empty_advice(
+                current_y,
+                f"警告: IQL 模型特徵維度不匹配 (期望: {state_iql.shape[1]} 個特徵)。請使用匹配的模型配置,或重新訓練模型。當前建議: 維持現狀。",
+            )
+
+        # 邏輯判斷: 若在帶內則 HOLD
+        is_locked = self.y_low <= current_y <= self.y_high
+        print(f"[DEBUG]    Is locked: {is_locked}")
+
+        # 2b. 動作平滑邏輯
+        delta_suggested, delta_suggested_smoothed = self._smooth_action_delta(
+            action_norm, is_locked
+        )
+        print(f"[DEBUG]    Delta suggested: {delta_suggested}")
+        lap("smoothing")
+
+        # 3. XGBoost 預測 + 歸因 (同一個 DMatrix 取得預測值與 contributions)
+        print("[DEBUG] ⏳ Running XGBoost prediction + attribution...")
+        xgb_ready = bool(self.simulator.feature_names) and not missing_xgb
+        current_state_xgb = plan.xgb(values)
+        if not xgb_ready:
+            print("[ERROR] ❌ XGBoost features not available, skipping SHAP analysis")
+        preds, contribs = self._predict_and_attribute(
+            current_state_xgb, np.array([xgb_ready])
+        )
+        predicted_y_after_move = preds[0]
+        print(f"[DEBUG] ✅ XGBoost prediction complete: {predicted_y_after_move}")
+
+        # 4. 及時歸因分析（解釋為什麼預測是這個值）
+        current_top_influencers = []
+        smoothed_top_influencers = []
+        if contribs[0] is not None:
+            current_top_influencers, smoothed_top_influencers = (
+                self._smooth_shap_influencers(contribs[0])
+            )
+            print(f"[DEBUG] ✅ SHAP influencers identified")
+        lap("attribution_smoothing")
+
+        print(f"[DEBUG] 📊 Recommendation summary:")
+        print(f"[DEBUG]    Current actions: {act_vals}")
+        print(f"[DEBUG]    Delta suggested: {delta_suggested}")
+
+        result = self._compose_advice(
+            current_y,
+            act_vals,
+            delta_suggested,
+            delta_suggested_smoothed,
+            predicted_y_after_move,
+            current_top_influencers,
+            smoothed_top_influencers,
+            is_locked,
+        )
+        result["feature_snapshots"] = plan.snapshot(values)
+        lap("compose")
+
+        # 5. (選用) 候選動作掃描
+        sweep = self._get_action_sweep() if xgb_ready else None
+        if sweep is not None:
+            result["optimizer"] = sweep.sweep(
+                self.simulator,
+                values,
+                self.target_center,
+                np.atleast_2d(delta_suggested),
+            )[0]
+            lap("sweep")
+        return result
+
+    @_with_model_lock
+    def get_reasoned_advice_batch(self, rows, current_ys):
+        """
+        批次 Agentic 推理: 一次組出 IQL 狀態矩陣、XGBoost 特徵矩陣並做一次 SHAP 歸因，
+        再依列順序套用動作 / SHAP 平滑，結果與逐筆呼叫 get_reasoned_advice 相同。
+        """
+        current_ys = [float(y) for y in current_ys]
+        if len(rows) != len(current_ys):
+            raise ValueError(
+                f"rows ({len(rows)}) 與 current_ys ({len(current_ys)}) 筆數不一致"
+            )
+        if len(rows) == 0:
+            return []
+
+        if not self.iql_algo:
+            logger.error("❌ IQL model not loaded!")
+            return [
+                self._empty_advice(
+                    y,
+                    "警告：尚未載入有效的策略模型（iql_algo is None），無法提供建議。請先執行模型訓練。",
+                )
+                for y in current_ys
+            ]
+
+        if not self.bg_features:
+            logger.error("❌ BG features not loaded!")
+            return [
+                self._empty_advice(
+                    y,
+                    "警告：背景特徵未載入（bg_features is None），無法提供建議。請先執行模型訓練。",
+                )
+                for y in current_ys
+            ]
+
+        values = self.gather_rows(rows)
+        lap("gather")
+        raw = self.infer_raw(values, current_ys)
+        return self.apply_raw(values, current_ys, raw)
+
+    def gather_rows(self, rows):
+        """
+        依預編譯計畫一次擷取所有列 (DataFrame 直接整批擷取)；缺值以 NaN 表示
+
+        狀態欄位缺值與逐筆路徑一樣拋出 KeyError
+        """
+        plan = self._get_gather_plan()
+        if hasattr(rows, "columns"):
+            values = plan.gather_frame(rows)
+        elif isinstance(rows, np.ndarray):
+            # 已依計畫欄位順序排列的矩陣 (緊湊二進位格式)
+            if rows.ndim != 2 or rows.shape[1] != len(plan.columns):
+                raise ValueError(
+                    f"矩陣欄數 {rows.shape[-1]} 與擷取計畫 ({len(plan.columns)}) 不符"
+                )
+            values = rows
+        else:
+            values = plan.gather_many(rows)
+
+        state_nan = np.isnan(values[:, plan.state_idx])
+        if state_nan.any():
+            bad_row, bad_col = np.argwhere(state_nan)[0]
+            raise KeyError(plan.snapshot_names[bad_col])
+        return values
+
+    def infer_raw(self, values, current_ys):
+        """
+        無狀態的模型推理: 單次 IQL + 單次 XGBoost 預測/歸因
+
+        不讀寫平滑歷史，因此共用同一組模型的多個 session 可以合併成一次呼叫，
+        再各自以 apply_raw() 套用平滑。
+
+        Returns:
+            dict: action_norms (IQL 維度不符時為 None，並附 diagnosis)、predicted、contribs
+        """
+        plan = self._get_gather_plan()
+
+        # 2. 單次 IQL 推理
+        state_iql = plan.state(values, current_ys)
+        try:
+            action_norms = np.asarray(self.iql_algo.predict(state_iql))
+            lap("iql")
+        except AssertionError as e:
+            logger.error(f"❌ IQL model dimension mismatch: {e}")
             return {
-                "current_y": current_y,
-                "iql_action_delta": None,
-                "iql_action_delta_smoothed": None,
-                "predicted_y_next": None,
-                "top_influencers": [],
-                "current_top_influencers": [],
-                "smoothed_top_influencers": [],
-                "status": "HOLD",
+                "action_norms": None,
                 "diagnosis": f"警告: IQL 模型特徵維度不匹配 (期望: {state_iql.shape[1]} 個特徵)。請使用匹配的模型配置,或重新訓練模型。當前建議: 維持現狀。",
+                "predicted": [None] * len(values),
+                "contribs": [None] * len(values),
             }
 
-        # 邏輯判斷: 若在帶內則 HOLD
-        is_locked = self.y_low <= current_y <= self.y_high
+        # 3. 單次 XGBoost 預測 + 歸因 (缺特徵的列回傳 None，與逐筆路徑一致)
+        X_xgb = plan.xgb(values)
+        if self.simulator.feature_names:
+            valid_mask = ~np.isnan(X_xgb).any(axis=1)
+        else:
+            valid_mask = np.zeros(len(values), dtype=bool)
+        predicted, contribs = self._predict_and_attribute(X_xgb, valid_mask)
+
+        # 4. (選用) 候選動作掃描: 所有列的候選合併成一次 XGBoost 預測
+        sweeps = None
+        sweep = self._get_action_sweep()
+        if sweep is not None:
+            ys = np.asarray(current_ys, dtype=np.float64)
+            locked = (self.y_low <= ys) & (ys <= self.y_high)
+            iql_deltas = np.where(
+                locked[:, None], 0.0, action_norms * np.asarray(self.action_stds)
+            )
+            sweeps = sweep.sweep(self.simulator, values, self.target_center, iql_deltas)
+            lap("sweep")
+        return {
+            "action_norms": action_norms,
+            "diagnosis": None,
+            "predicted": predicted,
+            "contribs": contribs,
+            "sweeps": sweeps,
+        }
+
+    @staticmethod
+    def slice_raw(raw, start, stop):
+        """取出 infer_raw() 結果中 [start, stop) 列"""
+        return {
+            "action_norms": None
+            if raw["action_norms"] is None
+            else raw["action_norms"][start:stop],
+            "diagnosis": raw["diagnosis"],
+            "predicted": raw["predicted"][start:stop],
+            "contribs": raw["contribs"][start:stop],
+            "sweeps": None if raw.get("sweeps") is None else raw["sweeps"][start:stop],
+        }
+
+    def apply_raw(self, values, current_ys, raw):
+        """依列順序套用動作 / SHAP 平滑並組出建議 (與逐筆路徑共用同一份狀態)"""
+        if raw["action_norms"] is None:
+            return [self._empty_advice(y, raw["diagnosis"]) for y in current_ys]
+
+        plan = self._get_gather_plan()
+        act_mat = plan.actions(values)
+        action_norms = raw["action_norms"]
+        predicted = raw["predicted"]
+        shap_rows = raw["contribs"]
+        sweeps = raw.get("sweeps")
+
+        results = []
+        for i, current_y in enumerate(current_ys):
+            is_locked = self.y_low <= current_y <= self.y_high
+            delta_suggested, delta_suggested_smoothed = self._smooth_action_delta(
+                action_norms[i], is_locked
+            )
+
+            current_top_influencers = []
+            smoothed_top_influencers = []
+            if shap_rows[i] is not None:
+                current_top_influencers, smoothed_top_influencers = (
+                    self._smooth_shap_influencers(shap_rows[i])
+                )
+
+            result = self._compose_advice(
+                current_y,
+                act_mat[i].tolist(),
+                delta_suggested,
+                delta_suggested_smoothed,
+                predicted[i],
+                current_top_influencers,
+                smoothed_top_influencers,
+                is_locked,
+            )
+            result["feature_snapshots"] = plan.snapshot(values[i])
+            if sweeps is not None:
+                result["optimizer"] = sweeps[i]
+            results.append(result)
+        lap("smoothing")
+        return results
+
+    def batch_key(self):
+        """
+        可跨 session 合併推理的識別:
+        (policy cache key, simulator cache key, 特徵排列, 目標規格)
+
+        目標規格 (LSL / USL / target) 來自各 session 的任務配置，即使共用同一組模型也可能不同；
+        infer_raw 的帶內判斷與候選掃描都依賴它，因此列入識別。
+        未載入模型或模型不在共用快取中時回傳 None (不可合併)
+        """
+        policy_key = self._model_keys.get("policy")
+        sim_key = self._model_keys.get("simulator")
+        if (
+            not self.iql_algo
+            or not self.bg_features
+            or policy_key is None
+            or sim_key is None
+        ):
+            return None
+        return (
+            policy_key,
+            sim_key,
+            self._get_gather_plan().signature,
+            (float(self.y_low), float(self.y_high), float(self.target_center)),
+        )
+
+    def _get_gather_plan(self):
+        """取得特徵擷取計畫 (模型載入時編譯；尚未編譯則即時編譯)"""
+        if self.gather_plan is None:
+            self._compile_gather_plan()
+        return self.gather_plan
+
+    def _get_action_sweep(self):
+        """候選動作掃描 (ACTION_SWEEP_ENABLED 時啟用；擷取計畫變更後重建)"""
+        if not getattr(config, "ACTION_SWEEP_ENABLED", False):
+            return None
+        if self.simulator is None or self.simulator.model is None:
+            return None
+        plan = self._get_gather_plan()
+        sweep = getattr(self, "action_sweep", None)
+        if sweep is None or sweep.plan is not plan:
+            sweep = ActionSweep(
+                plan,
+                self.action_stds,
+                (self.meta or {}).get("y2_axis_ranges"),
+                n_candidates=getattr(config, "ACTION_SWEEP_CANDIDATES", 2048),
+                std_span=getattr(config, "ACTION_SWEEP_STD_SPAN", 2.0),
+                mode=getattr(config, "ACTION_SWEEP_MODE", "random"),
+            )
+            self.action_sweep = sweep
+        return sweep
+
+    def _compile_gather_plan(self):
+        """依目前的 bg / action / XGBoost 特徵編譯擷取計畫"""
+        self.gather_plan = build_gather_plan(
+            self.bg_features, self.action_features, self.simulator
+        )
+
+    def _smooth_action_delta(self, action_norm, is_locked):
+        """依帶內/帶外計算 delta，並推入動作歷史取得平滑後的 delta"""
         delta_suggested = (
             np.zeros_like(action_norm) if is_locked else action_norm * self.action_stds
         )
-        print(f"[DEBUG]    Is locked: {is_locked}")
-        print(f"[DEBUG]    Delta suggested: {delta_suggested}")
 
-        # 2b. 動作平滑邏輯
         # 確保 delta_suggested 是 numpy array 且形狀一致
         delta_suggested = np.array(delta_suggested).flatten()
 
@@ -401,71 +815,93 @@ class AgenticReasoning:
             self.action_history.append(delta_suggested)
             delta_suggested_smoothed = delta_suggested
 
-        # 3. 用 XGBoost 預測結果
-        print("[DEBUG] ⏳ Running XGBoost prediction...")
-        predicted_y_after_move = self.simulator.predict_next_y(row)
-        print(f"[DEBUG] ✅ XGBoost prediction complete: {predicted_y_after_move}")
-
-        # 4. SHAP 及時歸因分析（解釋為什麼預測是這個值）
-        current_top_influencers = []
-        smoothed_top_influencers = []
-
-        if self.explainer:
-            print("[DEBUG] ⏳ Running SHAP analysis...")
-            # SHAP 使用與 XGBoost 相同的輸入：所有 predFeatures (338個)
-            # 使用 simulator.feature_names 從 row 中提取所有特徵
-            if self.simulator.feature_names:
-                current_state_xgb = np.array(
-                    [row[f] for f in self.simulator.feature_names]
-                ).reshape(1, -1)
-                print(f"[DEBUG]    State shape: {current_state_xgb.shape}")
-                print(
-                    f"[DEBUG]    Expected features: {len(self.simulator.feature_names)}"
-                )
+        return delta_suggested, delta_suggested_smoothed
 
-                print("[DEBUG]    Calling explainer.shap_values()...")
-                try:
-                    shap_output = self.explainer.shap_values(current_state_xgb)
-                    print(f"[DEBUG]    SHAP output received, type: {type(shap_output)}")
-
-                    current_shap_v = (
-                        shap_output[0]
-                        if isinstance(shap_output, list)
-                        else shap_output[0]
-                    )
-                    print("[DEBUG] ✅ SHAP values computed")
-
-                    # 4b. 計算平滑 SHAP
-                    self.shap_history.append(current_shap_v)
-                    shap_v_avg = np.mean(list(self.shap_history), axis=0)
-
-                    feat_names = self.simulator.feature_names
-
-                    def get_influencers(vals):
-                        out = []
-                        idx = np.argsort(np.abs(vals))[-3:][::-1]
-                        for i in idx:
-                            impact = vals[i]
-                            feat_name = feat_names[i]  # 直接使用原始特徵名稱
-                            dir_str = "[UP]" if impact > 0 else "[DOWN]"
-                            out.append(
-                                "{} ({} {:.4f})".format(feat_name, dir_str, abs(impact))
-                            )
-                        return out
+    def reset_history(self):
+        """清空動作 / SHAP 平滑歷史 (切換模型或模擬器跳轉時呼叫)"""
+        with self._model_lock:
+            self.action_history.clear()
+            self.shap_history = (
+                deque(maxlen=config.SHAP_SMOOTHING_WINDOW)
+                if self.simulator is not None and self.simulator.model
+                else None
+            )
 
-                    current_top_influencers = get_influencers(current_shap_v)
-                    smoothed_top_influencers = get_influencers(shap_v_avg)
-                    print(f"[DEBUG] ✅ SHAP influencers identified")
-                except Exception as e:
-                    print(f"[ERROR] ❌ SHAP analysis failed: {e}")
-                    import traceback
+    def release_models(self):
+        """歸還此 session 持有的所有共用模型參考 (session 移除時呼叫)"""
+        with self._model_lock:
+            old_keys = self._model_keys
+            self._model_keys = {}
+        for key in old_keys.values():
+            model_cache.release(key)
+
+    def _get_explainer(self):
+        """SHAP 解釋器 (僅在 XGBoost 原生 contributions 不可用時才建立，隨模擬器共用)"""
+        if self.explainer is None and self.simulator is not None:
+            self.explainer = self.simulator.get_explainer()
+        return self.explainer
+
+    def _predict_and_attribute(self, X, valid_mask):
+        """
+        XGBoost 預測與逐列歸因向量 (依 simulator.feature_names 順序)
 
-                    traceback.print_exc()
-                    # 继续执行，不让 SHAP 错误阻止推理
-            else:
-                print("[ERROR] ❌ Feature names not available, skipping SHAP analysis")
+        優先使用 booster.predict(pred_contribs=True) 單次呼叫同時取得兩者；
+        不支援時改為 predict_matrix + shap.TreeExplainer。
+        """
+        native = self.simulator.predict_with_contribs(X, valid_mask)
+        if native is not None:
+            lap("xgb")
+            return native
+
+        preds = self.simulator.predict_matrix(X, valid_mask)
+        lap("xgb")
+        contribs = [None] * len(X)
+        explainer = self._get_explainer() if valid_mask.any() else None
+        if explainer is not None:
+            try:
+                shap_output = explainer.shap_values(X[valid_mask])
+                shap_mat = np.asarray(
+                    shap_output[0] if isinstance(shap_output, list) else shap_output
+                )
+                for out_idx, row_idx in enumerate(np.flatnonzero(valid_mask)):
+                    contribs[row_idx] = shap_mat[out_idx]
+            except Exception as e:
+                logger.error(f"❌ SHAP analysis failed: {e}", exc_info=True)
+        lap("shap")
+        return preds, contribs
+
+    def _smooth_shap_influencers(self, current_shap_v):
+        """推入 SHAP 歷史，回傳 (當下, 平滑後) 的前三大影響因子"""
+        self.shap_history.append(current_shap_v)
+        shap_v_avg = np.mean(list(self.shap_history), axis=0)
+        return (
+            self._get_influencers(current_shap_v),
+            self._get_influencers(shap_v_avg),
+        )
 
-        # 4. 基礎診斷 (這一部分之後可以餵給 LLM)
+    def _get_influencers(self, vals):
+        feat_names = self.simulator.feature_names
+        out = []
+        idx = np.argsort(np.abs(vals))[-3:][::-1]
+        for i in idx:
+            impact = vals[i]
+            feat_name = feat_names[i]  # 直接使用原始特徵名稱
+            dir_str = "[UP]" if impact > 0 else "[DOWN]"
+            out.append("{} ({} {:.4f})".format(feat_name, dir_str, abs(impact)))
+        return out
+
+    def _compose_advice(
+        self,
+        current_y,
+        act_vals,
+        delta_suggested,
+        delta_suggested_smoothed,
+        predicted_y_after_move,
+        current_top_influencers,
+        smoothed_top_influencers,
+        is_locked,
+    ):
+        # 基礎診斷 (這一部分之後可以餵給 LLM)
         conflict_detected = False
         if not is_locked and predicted_y_after_move is not None:
             improvement = abs(current_y - self.target_center) - abs(
@@ -478,12 +914,7 @@ class AgenticReasoning:
         suggested_actions = np.array(act_vals) + delta_suggested
         suggested_actions_smoothed = np.array(act_vals) + delta_suggested_smoothed
 
-        print(f"[DEBUG] 📊 Recommendation summary:")
-        print(f"[DEBUG]    Current actions: {act_vals}")
-        print(f"[DEBUG]    Delta suggested: {delta_suggested}")
-        print(f"[DEBUG]    Suggested NEW actions: {suggested_actions}")
-
-        result = {
+        return {
             "current_y": current_y,
             "current_actions": act_vals,  # 新增：當前 action 值
             "iql_action_delta": delta_suggested.tolist(),
@@ -501,7 +932,20 @@ class AgenticReasoning:
                 current_y, predicted_y_after_move, is_locked, conflict_detected
             ),
         }
-        return result
+
+    def _empty_advice(self, current_y, diagnosis):
+        """模型未就緒或維度不符時回傳的 HOLD 建議"""
+        return {
+            "current_y": current_y,
+            "iql_action_delta": None,
+            "iql_action_delta_smoothed": None,
+            "predicted_y_next": None,
+            "top_influencers": [],
+            "current_top_influencers": [],
+            "smoothed_top_influencers": [],
+            "status": "HOLD",
+            "diagnosis": diagnosis,
+        }
 
     def _generate_simple_diagnosis(self, curr_y, pred_y, is_locked, is_conflict):
         if is_locked:
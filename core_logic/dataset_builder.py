@@ -0,0 +1,62 @@
+# dataset_builder.py
+import numpy as np
+
+from core_logic import reward_engine
+
+
+def _columns(df, cols):
+    """
+    取出欄位矩陣：先以 float64 取值 (與 df.iloc[i] 的列 Series 相同)，
+    需要時再轉 float32，確保與逐列建構的數值完全一致
+    """
+    if not cols:
+        return np.empty((len(df), 0), dtype=np.float64)
+    # DataFrame 區塊取出為 Fortran 順序，轉成 C 順序讓逐列運算走連續記憶體
+    return np.ascontiguousarray(df[list(cols)].to_numpy(dtype=np.float64))
+
+
+def build_transitions(
+    df,
+    state_features,
+    action_features,
+    goal_col,
+    action_stds,
+    low=None,
+    high=None,
+    obs_dtype=np.float32,
+    reward=None,
+):
+    """
+    向量化建構離線 RL 轉移 (取代逐列 df.iloc[i] / df.iloc[i + 1] 的迴圈)
+
+    State:  [背景參數, 當前動作, 當前目標值]
+    Action: 相鄰兩列動作差 / action_stds，裁切至 [-1, 1]
+    Reward: reward_engine 依名稱登記的獎勵定義 (預設 band)，一次計算全部轉移
+
+    回傳 (observations (N-1, S+A+1), actions float32 (N-1, A),
+          rewards float64 (N-1,), terminals bool (N-1,)，最後一筆為 True)
+    obs_dtype=np.float64 時，背景/動作欄位仍先轉 float32，目標值保留 float64 (同 np.concatenate 的結果)
+    """
+    n = max(len(df) - 1, 0)
+    bg = _columns(df, state_features)
+    act = _columns(df, action_features)
+    y = df[goal_col].to_numpy(dtype=np.float64)
+
+    observations = np.empty((n, bg.shape[1] + act.shape[1] + 1), dtype=obs_dtype)
+    observations[:, : bg.shape[1]] = bg[:n].astype(np.float32)
+    observations[:, bg.shape[1] : bg.shape[1] + act.shape[1]] = act[:n].astype(np.float32)
+    observations[:, -1] = y[:n]
+
+    action_stds = np.asarray(action_stds, dtype=np.float32)
+    a_raw = (act[1:] - act[:-1]).astype(np.float32)
+    actions = np.clip(a_raw / action_stds, -1.0, 1.0)
+
+    rewards = reward_engine.compute_rewards(
+        y[:n], y[1:], actions, low=low, high=high, reward=reward
+    )
+
+    terminals = np.zeros(n, dtype=bool)
+    if n:
+        # d3rlpy 要求至少有一個端點
+        terminals[-1] = True
+    return observations, actions, rewards, terminals
@@ -0,0 +1,124 @@
+# feature_plan.py
+import json
+import hashlib
+import operator
+import numpy as np
+
+
+class FeatureGatherPlan:
+    """
+    模型載入時預先編譯的特徵擷取計畫
+
+    將 IQL 狀態 (bg + action)、XGBoost 輸入與 snapshot 所需欄位合併成一組固定欄位順序，
+    並為各用途建立欄位索引陣列。推理時每筆 row 只需擷取一次成為向量，
+    再以索引陣列切出各模型輸入；缺欄位則以一次集合差集判斷。
+    """
+
+    def __init__(self, bg_features, action_features, xgb_features=None):
+        self.bg_features = list(bg_features or [])
+        self.action_features = list(action_features or [])
+        self.xgb_features = list(xgb_features or [])
+
+        # 合併欄位 (保留首次出現順序)
+        self.columns = list(
+            dict.fromkeys(self.bg_features + self.action_features + self.xgb_features)
+        )
+        self.col_index = {c: i for i, c in enumerate(self.columns)}
+
+        def to_idx(names):
+            return np.array([self.col_index[c] for c in names], dtype=np.intp)
+
+        self.bg_idx = to_idx(self.bg_features)
+        self.action_idx = to_idx(self.action_features)
+        self.state_idx = to_idx(self.bg_features + self.action_features)
+        self.xgb_idx = to_idx(self.xgb_features)
+
+        # snapshot 沿用 bg + action 的原始順序 (與舊版 feature_snapshots 相同)
+        self.snapshot_names = self.bg_features + self.action_features
+        self.snapshot_idx = self.state_idx
+
+        # 特徵排列識別: 相同 signature 的計畫可合併成同一個輸入矩陣
+        self.signature = (
+            tuple(self.bg_features),
+            tuple(self.action_features),
+            tuple(self.xgb_features),
+        )
+        # 對外的 schema 識別 (緊湊二進位格式的欄位順序版本)
+        self.schema_id = hashlib.sha1(
+            json.dumps(self.signature, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:16]
+
+        self._column_set = frozenset(self.columns)
+        self._state_set = frozenset(self.bg_features + self.action_features)
+        self._xgb_set = frozenset(self.xgb_features)
+        self._getter = operator.itemgetter(*self.columns) if self.columns else None
+
+    @property
+    def state_dim(self):
+        """IQL 狀態維度 (bg + action + current_y)"""
+        return len(self.state_idx) + 1
+
+    def missing(self, row):
+        """回傳 row 缺少的欄位集合 (dict 或 Series)"""
+        return self._column_set.difference(row.keys())
+
+    def missing_state(self, missing):
+        """缺欄位中屬於 IQL 狀態 (bg + action) 的部分"""
+        return self._state_set.intersection(missing)
+
+    def missing_xgb(self, missing):
+        """缺欄位中屬於 XGBoost 輸入的部分"""
+        return self._xgb_set.intersection(missing)
+
+    def gather(self, row, missing=None):
+        """
+        將單筆 row (dict 或 Series) 擷取為固定順序的向量
+
+        缺少的欄位以 NaN 填入。使用 float64 擷取以保留原始數值，
+        模型輸入再由 state()/xgb() 轉為 float32。
+        """
+        if not self.columns:
+            return np.empty(0, dtype=np.float64)
+        if not isinstance(row, dict):
+            return row.reindex(self.columns).to_numpy(dtype=np.float64)
+        if missing is None:
+            missing = self.missing(row)
+        if not missing:
+            values = self._getter(row)
+            if len(self.columns) == 1:
+                values = (values,)
+            return np.array(values, dtype=np.float64)
+        return np.array([row.get(c, np.nan) for c in self.columns], dtype=np.float64)
+
+    def gather_many(self, rows):
+        """將多筆 row 擷取為 (n, n_columns) 矩陣"""
+        out = np.empty((len(rows), len(self.columns)), dtype=np.float64)
+        for i, row in enumerate(rows):
+            out[i] = self.gather(row)
+        return out
+
+    def gather_frame(self, df):
+        """將 DataFrame 直接依欄位順序擷取為 (n, n_columns) 矩陣，缺欄位以 NaN 填入"""
+        return df.reindex(columns=self.columns).to_numpy(dtype=np.float64)
+
+    def state(self, values, current_y):
+        """由擷取後的向量/矩陣組出 IQL 狀態 [bg, action, current_y] (float32)"""
+        values = np.atleast_2d(values)
+        y_col = np.asarray(current_y, dtype=np.float64).reshape(-1, 1)
+        return np.concatenate([values[:, self.state_idx], y_col], axis=1).astype(
+            np.float32
+        )
+
+    def actions(self, values):
+        """當前 action 值"""
+        return np.atleast_2d(values)[:, self.action_idx]
+
+    def xgb(self, values):
+        """XGBoost 輸入矩陣 (float32)"""
+        return np.atleast_2d(values)[:, self.xgb_idx].astype(np.float32)
+
+    def snapshot(self, values):
+        """snapshot payload: {feature: value}，NaN/缺值以 0.0 表示"""
+        snap = values[self.snapshot_idx]
+        snap = np.where(np.isnan(snap), 0.0, snap)
+        return dict(zip(self.snapshot_names, snap.tolist()))
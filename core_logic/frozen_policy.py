@@ -0,0 +1,159 @@
+# frozen_policy.py
+import os
+import numpy as np
+
+FROZEN_POLICY_FILE = "policy_frozen.npz"
+FROZEN_FORMAT_VERSION = 1
+
+# 目前支援的 encoder 層類型 (d3rlpy VectorEncoder 的預設組成)
+_ACTIVATIONS = {
+    "ReLU": lambda h: np.maximum(h, 0.0, out=h),
+    "Tanh": lambda h: np.tanh(h, out=h),
+    "Identity": lambda h: h,
+}
+
+
+def _to_numpy(param):
+    return np.ascontiguousarray(param.detach().cpu().numpy(), dtype=np.float32)
+
+
+def export_frozen_policy(algo, save_path):
+    """
+    將 d3rlpy 策略的 deterministic actor 匯出為純 NumPy 權重檔 (.npz)
+
+    內容: encoder 各 Linear 層權重、activation 序列、mu 層權重、
+    StandardObservationScaler 的 mean/std/eps。
+    不支援的網路結構或 scaler 時回傳 None (呼叫端保留 policy.d3rlpy 即可)。
+
+    Returns:
+        str | None: 寫出的檔案路徑
+    """
+    import torch.nn as nn
+
+    try:
+        policy = algo.impl.modules.policy
+        encoder = getattr(policy, "_encoder", None)
+        mu = getattr(policy, "_mu", None)
+        layers = getattr(encoder, "_layers", None)
+        if layers is None or not isinstance(mu, nn.Linear):
+            print(f"⚠️ Frozen policy export skipped: unsupported policy {policy}")
+            return None
+
+        if algo.config.action_scaler is not None:
+            print("⚠️ Frozen policy export skipped: action_scaler is not supported")
+            return None
+
+        arrays = {}
+        activations = []
+        n_linear = 0
+        for layer in layers:
+            name = layer.__class__.__name__
+            if isinstance(layer, nn.Linear):
+                arrays[f"w{n_linear}"] = _to_numpy(layer.weight.T)
+                arrays[f"b{n_linear}"] = _to_numpy(layer.bias)
+                activations.append(f"linear:{n_linear}")
+                n_linear += 1
+            elif name in _ACTIVATIONS:
+                activations.append(name)
+            else:
+                print(f"⚠️ Frozen policy export skipped: unsupported layer {name}")
+                return None
+
+        arrays["mu_w"] = _to_numpy(mu.weight.T)
+        arrays["mu_b"] = _to_numpy(mu.bias)
+
+        scaler = algo.config.observation_scaler
+        if scaler is not None:
+            if scaler.__class__.__name__ != "StandardObservationScaler":
+                print(
+                    f"⚠️ Frozen policy export skipped: unsupported scaler {scaler.__class__.__name__}"
+                )
+                return None
+            arrays["obs_mean"] = np.asarray(scaler.mean, dtype=np.float32)
+            arrays["obs_std"] = np.asarray(scaler.std, dtype=np.float32)
+            arrays["obs_eps"] = np.float32(scaler.eps)
+
+        arrays["layers"] = np.array(activations)
+        arrays["format_version"] = np.int32(FROZEN_FORMAT_VERSION)
+
+        np.savez(save_path, **arrays)
+        return save_path
+    except Exception as e:
+        print(f"⚠️ Frozen policy export failed: {e}")
+        return None
+
+
+class FrozenPolicy:
+    """
+    純 NumPy 的 deterministic actor (不需 torch / d3rlpy)
+
+    推理流程與 d3rlpy QLearningAlgoBase.predict 相同:
+    (x - mean) / (std + eps) -> encoder (Linear + activation) -> mu -> tanh
+    """
+
+    def __init__(self, layers, weights, mu_w, mu_b, obs_mean=None, obs_std=None, eps=0.0):
+        self.layers = list(layers)
+        self.weights = weights
+        self.mu_w = mu_w
+        self.mu_b = mu_b
+        self.obs_mean = obs_mean
+        self.obs_scale = None if obs_std is None else (obs_std + eps).astype(np.float32)
+
+        first = next((w for w, _ in weights), mu_w)
+        self.observation_size = first.shape[0]
+        self.action_size = mu_w.shape[1]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            layers = [str(s) for s in data["layers"]]
+            n_linear = sum(1 for s in layers if s.startswith("linear:"))
+            weights = [(data[f"w{i}"], data[f"b{i}"]) for i in range(n_linear)]
+            has_scaler = "obs_mean" in data.files
+            return cls(
+                layers,
+                weights,
+                data["mu_w"],
+                data["mu_b"],
+                obs_mean=data["obs_mean"] if has_scaler else None,
+                obs_std=data["obs_std"] if has_scaler else None,
+                eps=float(data["obs_eps"]) if has_scaler else 0.0,
+            )
+
+    def predict(self, x):
+        """與 algo.predict 相同介面: 輸入 (n, obs_dim)，回傳 (n, action_dim)"""
+        x = np.asarray(x, dtype=np.float32)
+        assert x.ndim == 2, "Input must have batch dimension."
+        assert x.shape[1] == self.observation_size, (
+            f"Observation size mismatch: expected={self.observation_size}, actual={x.shape[1]}"
+        )
+
+        if self.obs_mean is not None:
+            h = (x - self.obs_mean) / self.obs_scale
+        else:
+            h = x.copy()
+
+        for layer in self.layers:
+            if layer.startswith("linear:"):
+                w, b = self.weights[int(layer.split(":", 1)[1])]
+                h = h @ w
+                h += b
+            else:
+                h = _ACTIVATIONS[layer](h)
+
+        mu = h @ self.mu_w
+        mu += self.mu_b
+        return np.tanh(mu)
+
+
+def load_frozen_policy(bundle_dir, algo_meta=None):
+    """若 bundle 內有 frozen actor 則載入，否則回傳 None"""
+    algo_meta = algo_meta or {}
+    frozen_file = algo_meta.get("frozen_file", FROZEN_POLICY_FILE)
+    if frozen_file is None:
+        # 舊版 save_policy_bundle 在匯出失敗時寫入 null
+        return None
+    path = os.path.join(bundle_dir, frozen_file)
+    if not os.path.exists(path):
+        return None
+    return FrozenPolicy.load(path)
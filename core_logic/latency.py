@@ -0,0 +1,163 @@
+# latency.py
+"""
+推理路徑的分段計時
+
+每個請求建立一個 Trace，於推理執行緒以 activate() 設為目前的 trace；
+core_logic 內各階段結束時呼叫 lap(stage) 記錄與上一個記錄點的間隔。
+沒有啟用的 trace 時 lap() 只做一次 ContextVar 查詢，幾乎沒有成本。
+
+階段名稱:
+    parse      請求解析 (router)
+    readahead_hit  /simulator/next 取出預讀結果 (命中時取代 gather ~ xgb 各階段)
+    queue      推理執行器排隊 + 切換到推理執行緒
+    gather     特徵擷取
+    iql        IQL 推理
+    xgb / shap XGBoost 預測 (原生 contributions 時含歸因) / SHAP 歸因
+    smoothing  動作平滑 (批次路徑含 SHAP 平滑與組出建議)
+    attribution_smoothing  SHAP 影響因子平滑 (單筆路徑)
+    compose    組出建議與 snapshot
+    sweep      候選動作掃描 (啟用時)
+    micro_batch 跨 session 微批次推理 (啟用時取代上面各階段)
+    format     PredictionService 格式化回應
+    history    回到 event loop、寫入預測歷史與推送事件
+"""
+
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import config
+
+_current = contextvars.ContextVar("latency_trace", default=None)
+
+
+class Trace:
+    """單一請求的分段耗時 (ms)；同一階段多次記錄會累加"""
+
+    __slots__ = ("stages", "error", "model", "_last", "_start")
+
+    def __init__(self):
+        self.stages = {}
+        self.error = False
+        self.model = None
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self._start) * 1000
+
+    def to_dict(self):
+        return {
+            "stages_ms": {k: round(v, 3) for k, v in self.stages.items()},
+            "total_ms": round(self.total_ms, 3),
+        }
+
+
+@contextmanager
+def activate(trace):
+    """在目前執行緒 (context) 以 trace 記錄 lap()；trace 為 None 時不做任何事"""
+    if trace is None:
+        yield None
+        return
+    token = _current.set(trace)
+    try:
+        yield trace
+    except BaseException:
+        trace.error = True
+        raise
+    finally:
+        _current.reset(token)
+
+
+def lap(stage):
+    """記錄目前 trace 的一個階段 (沒有 trace 時為 no-op)"""
+    trace = _current.get()
+    if trace is not None:
+        trace.lap(stage)
+
+
+class LatencyRegistry:
+    """依 session 與模型彙整最近 window 筆的分段耗時 (滾動取樣)"""
+
+    def __init__(self, window=2048, enabled=False):
+        self.window = window
+        self.enabled = enabled
+        self._scopes = {}  # (kind, name) -> {"stages": {stage: deque}, "count", "errors"}
+        self._lock = threading.Lock()
+
+    def start(self, force=False):
+        """啟用時 (或 force，例如請求帶 debug 旗標) 建立 Trace，否則回傳 None"""
+        return Trace() if (self.enabled or force) else None
+
+    def record(self, session_id, trace):
+        """將完成的 trace 計入 session 與模型的統計 (未啟用時不記錄)"""
+        if trace is None or not self.enabled:
+            return
+        stages = dict(trace.stages)
+        stages["total"] = trace.total_ms
+        scopes = [("sessions", session_id), ("models", trace.model or "none")]
+        with self._lock:
+            for scope in scopes:
+                entry = self._scopes.get(scope)
+                if entry is None:
+                    entry = {"stages": {}, "count": 0, "errors": 0}
+                    self._scopes[scope] = entry
+                entry["count"] += 1
+                entry["errors"] += int(trace.error)
+                for stage, ms in stages.items():
+                    samples = entry["stages"].get(stage)
+                    if samples is None:
+                        samples = entry["stages"][stage] = deque(maxlen=self.window)
+                    samples.append(ms)
+
+    def drop_session(self, session_id):
+        with self._lock:
+            self._scopes.pop(("sessions", session_id), None)
+
+    def reset(self):
+        with self._lock:
+            self._scopes.clear()
+
+    def snapshot(self):
+        """{"sessions": {id: {...}}, "models": {name: {...}}}，各階段含 p50/p95/p99 (ms)"""
+        with self._lock:
+            scopes = {
+                scope: (
+                    entry["count"],
+                    entry["errors"],
+                    {s: np.fromiter(d, dtype=np.float64) for s, d in entry["stages"].items()},
+                )
+                for scope, entry in self._scopes.items()
+            }
+
+        out = {"enabled": self.enabled, "window": self.window, "sessions": {}, "models": {}}
+        for (kind, name), (count, errors, stages) in scopes.items():
+            out[kind][name] = {
+                "count": count,
+                "errors": errors,
+                "stages": {
+                    stage: {
+                        "p50": float(np.percentile(v, 50)),
+                        "p95": float(np.percentile(v, 95)),
+                        "p99": float(np.percentile(v, 99)),
+                        "samples": int(v.size),
+                    }
+                    for stage, v in stages.items()
+                    if v.size
+                },
+            }
+        return out
+
+
+latency = LatencyRegistry(
+    window=getattr(config, "LATENCY_WINDOW", 2048),
+    enabled=getattr(config, "LATENCY_TRACE_ENABLED", False),
+)
@@ -5,6 +5,7 @@ import requests
 import numpy as np
 import pandas as pd
 import config
+from backend.utils.metrics import track_llm_call
 from .domain_knowledge import EXPERT_RULES
 
 
@@ -92,8 +93,9 @@ class LLMReporter:
             """在線程池中執行的同步 HTTP 請求"""
             try:
                 # 超時時間設定為 30 秒
-                response = requests.post(self.api_url, json=payload, timeout=30.0)
-                response.raise_for_status()
+                with track_llm_call():
+                    response = requests.post(self.api_url, json=payload, timeout=30.0)
+                    response.raise_for_status()
                 result = response.json()
                 return result.get("message", {}).get("content", "無法取得 AI 回覆內容")
             except requests.exceptions.Timeout:
@@ -408,13 +410,14 @@ class LLMReporter:
                     )
                     json_data = json.dumps(payload, default=numpy_converter)
 
-                    response = requests.post(
-                        self.api_url,
-                        data=json_data,
-                        headers={"Content-Type": "application/json"},
-                        timeout=90,  # 保持 90s
-                    )
-                    response.raise_for_status()
+                    with track_llm_call():
+                        response = requests.post(
+                            self.api_url,
+                            data=json_data,
+                            headers={"Content-Type": "application/json"},
+                            timeout=90,  # 保持 90s
+                        )
+                        response.raise_for_status()
                     result = response.json()
                     final_reply = result.get("message", {}).get("content", "").strip()
 
@@ -0,0 +1,174 @@
+# model_cache.py
+import os
+import threading
+from collections import OrderedDict
+
+import config
+
+
+def bundle_fingerprint(path):
+    """
+    以檔案 mtime / size 組成 bundle 指紋
+
+    目錄只看第一層檔案 (policy_bundle / pred_run 的模型檔都在第一層)；
+    任一檔案被覆寫後指紋就不同，會被視為新的 cache 項目。
+    """
+    if os.path.isdir(path):
+        entries = []
+        for name in sorted(os.listdir(path)):
+            full = os.path.join(path, name)
+            if os.path.isfile(full):
+                st = os.stat(full)
+                entries.append((name, st.st_mtime_ns, st.st_size))
+        return tuple(entries)
+    if os.path.isfile(path):
+        st = os.stat(path)
+        return ((os.path.basename(path), st.st_mtime_ns, st.st_size),)
+    return ()
+
+
+def _estimate_bytes(fingerprint):
+    """以磁碟檔案大小估算常駐記憶體 (模型載入後大小與檔案大小同一數量級)"""
+    return sum(size for _, _, size in fingerprint)
+
+
+class _CacheEntry:
+    __slots__ = ("key", "value", "size", "refs")
+
+    def __init__(self, key, value, size):
+        self.key = key
+        self.value = value
+        self.size = size
+        self.refs = 0
+
+
+class ModelCache:
+    """
+    跨 session 共用的唯讀模型快取 (LRU + 參考計數)
+
+    key = (kind, realpath, fingerprint)。相同模型只載入一次，
+    各 session 只持有參考；session 自己的可變狀態 (action_history 等) 不放在這裡。
+    超過記憶體預算時，只淘汰目前沒有 session 參考的最舊項目。
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = (
+            max_bytes
+            if max_bytes is not None
+            else getattr(config, "MODEL_CACHE_MAX_BYTES", 2 * 1024**3)
+        )
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, kind, path):
+        real = os.path.realpath(path)
+        return (kind, real, bundle_fingerprint(real))
+
+    def acquire(self, kind, path, loader):
+        """
+        取得 (並參考) 模型；不在快取中時呼叫 loader(path) 載入
+
+        Returns:
+            (key, value): 使用完畢後以 release(key) 歸還
+        """
+        key = self.make_key(kind, path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refs += 1
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return key, entry.value
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # 同一個 key 只允許一個執行緒載入，其他執行緒等待後直接命中
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refs += 1
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return key, entry.value
+
+            try:
+                value = loader(path)
+            except Exception:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+                raise
+
+            with self._lock:
+                self.misses += 1
+                entry = _CacheEntry(key, value, _estimate_bytes(key[2]))
+                entry.refs = 1
+                self._entries[key] = entry
+                self._key_locks.pop(key, None)
+                self._evict()
+                return key, value
+
+    def release(self, key):
+        """歸還參考；不會立即釋放，待超過預算時才依 LRU 淘汰"""
+        if key is None:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.refs > 0:
+                entry.refs -= 1
+            self._evict()
+
+    def _evict(self):
+        total = sum(e.size for e in self._entries.values())
+        if total <= self.max_bytes:
+            return
+        for key in list(self._entries.keys()):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry.refs > 0:
+                continue
+            del self._entries[key]
+            total -= entry.size
+            self.evictions += 1
+            print(f"♻️ Model cache evicted: {key[0]} {key[1]}")
+
+    def entry_sizes(self, keys):
+        """{key: (估計位元組, 參考數)}，已不在快取中的 key 略過"""
+        with self._lock:
+            return {
+                key: (self._entries[key].size, self._entries[key].refs)
+                for key in keys
+                if key in self._entries
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(e.size for e in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "items": [
+                    {
+                        "kind": e.key[0],
+                        "path": e.key[1],
+                        "bytes": e.size,
+                        "refs": e.refs,
+                    }
+                    for e in self._entries.values()
+                ],
+            }
+
+
+# 全域共用實例 (同一個 API process 內所有 session 共用)
+model_cache = ModelCache()
@@ -1,9 +1,9 @@
 # model_manager.py
 import os
 import json
-import d3rlpy
 import numpy as np
 import config
+from .frozen_policy import FROZEN_POLICY_FILE, export_frozen_policy, load_frozen_policy
 
 
 def save_policy_bundle(
@@ -23,6 +23,9 @@ def save_policy_bundle(
     # 1. 儲存 d3rlpy 模型
     algo.save(os.path.join(save_dir, "policy.d3rlpy"))
 
+    # 1b. 匯出推理用的 frozen actor (純 NumPy，API 端載入不需 torch)
+    frozen_path = export_frozen_policy(algo, os.path.join(save_dir, FROZEN_POLICY_FILE))
+
     # 2. 儲存 algo 特有的 meta
     algo_meta = {
         "library": "d3rlpy",
@@ -31,6 +34,9 @@ def save_policy_bundle(
         "saved_at_epoch": epoch,
         "policy_diff": float(diff) if diff is not None else None,
     }
+    # 匯出失敗時不寫 frozen_file，載入端直接使用 policy.d3rlpy
+    if frozen_path:
+        algo_meta["frozen_file"] = FROZEN_POLICY_FILE
     with open(os.path.join(save_dir, "algo_meta.json"), "w") as f:
         json.dump(algo_meta, f, indent=2)
 
@@ -53,15 +59,31 @@ def save_policy_bundle(
     print(f"Model bundle saved to: {save_dir}")
 
 
-def load_policy_bundle(bundle_dir, device="cpu"):
-    """Loads a saved policy bundle."""
+def load_policy_bundle(bundle_dir, device="cpu", prefer_frozen=True):
+    """
+    Loads a saved policy bundle.
+
+    若 bundle 內有 frozen actor (policy_frozen.npz) 則優先使用純 NumPy 推理，
+    不匯入 torch / d3rlpy；否則載入完整的 d3rlpy learner。
+    """
     with open(os.path.join(bundle_dir, "algo_meta.json"), "r") as f:
         algo_meta = json.load(f)
 
-    algo = d3rlpy.load_learnable(
-        os.path.join(bundle_dir, algo_meta["algo_file"]),
-        device=device,
-    )
+    algo = None
+    if prefer_frozen:
+        try:
+            algo = load_frozen_policy(bundle_dir, algo_meta)
+        except Exception as e:
+            print(f"⚠️ Failed to load frozen policy, fallback to d3rlpy: {e}")
+            algo = None
+
+    if algo is None:
+        import d3rlpy
+
+        algo = d3rlpy.load_learnable(
+            os.path.join(bundle_dir, algo_meta["algo_file"]),
+            device=device,
+        )
 
     with open(os.path.join(bundle_dir, "meta.json"), "r", encoding="utf-8") as f:
         meta = json.load(f)
@@ -71,6 +93,33 @@ def load_policy_bundle(bundle_dir, device="cpu"):
     return algo, meta
 
 
+def export_frozen_bundle(bundle_dir, device="cpu"):
+    """
+    為既有的 bundle (只有 policy.d3rlpy) 補匯出 frozen actor 並更新 algo_meta.json
+
+    Returns:
+        str | None: 寫出的 .npz 路徑，不支援的模型結構時為 None
+    """
+    algo_meta_path = os.path.join(bundle_dir, "algo_meta.json")
+    with open(algo_meta_path, "r") as f:
+        algo_meta = json.load(f)
+
+    import d3rlpy
+
+    algo = d3rlpy.load_learnable(
+        os.path.join(bundle_dir, algo_meta["algo_file"]),
+        device=device,
+    )
+    frozen_path = export_frozen_policy(
+        algo, os.path.join(bundle_dir, FROZEN_POLICY_FILE)
+    )
+    if frozen_path:
+        algo_meta["frozen_file"] = FROZEN_POLICY_FILE
+        with open(algo_meta_path, "w") as f:
+            json.dump(algo_meta, f, indent=2)
+    return frozen_path
+
+
 def find_latest_best_model(base_dir=None):
     """
     尋找最新的 best_model 路徑。
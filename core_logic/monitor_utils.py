@@ -1,11 +1,20 @@
 # monitor_utils.py
 import os
 import json
+import threading
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import config
 
 
+def _write_json_atomic(path, payload):
+    """先寫暫存檔再 os.replace，監控頁面輪詢時不會讀到寫到一半的檔案"""
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
 class PolicyStabilityCallback:
     def __init__(
         self,
@@ -17,6 +26,8 @@ class PolicyStabilityCallback:
         y_low=0.0,
         y_high=1.0,
         probe_count=16,
+        plot_every=None,
+        plot_async=None,
     ):
         self.df = df.reset_index(drop=True)
         self.bg_features = bg_features
@@ -32,31 +43,47 @@ class PolicyStabilityCallback:
         self.diff_history = []
         self.epoch_history = []
 
+        # 繪圖節流：每 plot_every 個 epoch 繪一次 (0 = 不繪製 PNG)，可於背景執行緒繪製
+        self.plot_every = int(
+            plot_every if plot_every is not None else getattr(config, "MONITOR_PLOT_EVERY", 10)
+        )
+        self.plot_async = (
+            plot_async if plot_async is not None else getattr(config, "MONITOR_PLOT_ASYNC", True)
+        )
+        self._plot_thread = None
+        self._plotted_epoch = 0
+        self._last = None  # 最近一次的 (epoch, avg_actions, diff)，收尾時補繪
+
         # 固定幾個測試樣本觀測 Policy 變化
         n = len(self.df)
         self.probe_indices = np.random.choice(
             np.arange(0, n), size=min(probe_count, n), replace=False
         ).tolist()
 
+        # 探針狀態張量 (probes × grid, state_dim) 只建一次，每個 epoch 重用
+        # 關鍵：必須與 engine_strategy.py 的狀態構建邏輯完全一致 [bg, x0, y]
+        probes = self.df.iloc[self.probe_indices]
+        bg = probes[self.bg_features].to_numpy(dtype=np.float64).astype(np.float32)
+        x0 = probes[self.action_features].to_numpy(dtype=np.float64).astype(np.float32)
+        n_probe, n_grid = len(self.probe_indices), len(self.y_grid)
+        self.probe_states = np.empty(
+            (n_probe, n_grid, bg.shape[1] + x0.shape[1] + 1), dtype=np.float32
+        )
+        self.probe_states[:, :, : bg.shape[1]] = bg[:, None, :]
+        self.probe_states[:, :, bg.shape[1] : -1] = x0[:, None, :]
+        self.probe_states[:, :, -1] = self.y_grid.astype(np.float32)[None, :]
+
+    def probe_actions(self, algo):
+        """一次 predict 取得所有探針 × y 網格的動作，回傳 (probes, grid, n_actions)"""
+        n_probe, n_grid, dim = self.probe_states.shape
+        actions = algo.predict(self.probe_states.reshape(n_probe * n_grid, dim))
+        return np.asarray(actions).reshape(n_probe, n_grid, -1)
+
     def on_epoch_end(self, algo):
         self.epoch += 1
 
         # 1. 計算 Policy Diff
-        current_actions_batch = []
-        for i in self.probe_indices:
-            row = self.df.iloc[i]
-            bg = row[self.bg_features].values.astype(np.float32)
-            x0 = row[self.action_features].values.astype(np.float32)
-
-            actions_list = []
-            for y in self.y_grid:
-                # 關鍵：這裡必須與 engine_strategy.py 的狀態構建邏輯完全一致
-                s = np.concatenate([bg, x0, [y]]).astype(np.float32)
-                a = algo.predict(s[None, :])[0]
-                actions_list.append(a)
-            current_actions_batch.append(np.stack(actions_list))
-
-        avg_actions = np.mean(np.stack(current_actions_batch), axis=0)
+        avg_actions = np.mean(self.probe_actions(algo), axis=0)
 
         diff = 0.0
         if self.prev_actions is not None:
@@ -67,14 +94,43 @@ class PolicyStabilityCallback:
             self.epoch_history.append(self.epoch)
         self.prev_actions = avg_actions.copy()
 
-        # 2. 繪製監控圖並儲存
-        self._save_monitor_plot(avg_actions, diff)
+        # 2. 儲存策略切片數據 (供 UI 直接繪製) 與狀態；PNG 依節流設定繪製
+        self._last = (self.epoch, avg_actions, diff)
+        self._save_policy_slice_json(avg_actions, diff)
         self._save_status_json(diff)
+        if self.plot_every and (self.epoch == 1 or self.epoch % self.plot_every == 0):
+            self._request_plot(self.epoch, avg_actions, diff)
 
         return diff
 
-    def _save_monitor_plot(self, avg_actions, diff):
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
+    def close(self):
+        """訓練結束：等待背景繪圖完成，並補繪最後一個 epoch"""
+        if self._plot_thread is not None:
+            self._plot_thread.join()
+            self._plot_thread = None
+        if self.plot_every and self._last is not None and self._plotted_epoch != self._last[0]:
+            self._save_monitor_plot(*self._last, list(self.epoch_history), list(self.diff_history))
+
+    def _request_plot(self, epoch, avg_actions, diff):
+        history = (list(self.epoch_history), list(self.diff_history))
+        if not self.plot_async:
+            self._save_monitor_plot(epoch, avg_actions, diff, *history)
+            return
+        # 上一張還沒畫完就略過這次 (不排隊，訓練不等繪圖)
+        if self._plot_thread is not None and self._plot_thread.is_alive():
+            return
+        self._plot_thread = threading.Thread(
+            target=self._save_monitor_plot,
+            args=(epoch, avg_actions, diff, *history),
+            name="policy-monitor-plot",
+            daemon=True,
+        )
+        self._plot_thread.start()
+
+    def _save_monitor_plot(self, epoch, avg_actions, diff, epoch_history, diff_history):
+        # 使用 Figure 物件而非 pyplot 全域狀態，可安全地於背景執行緒繪製
+        fig = Figure(figsize=(14, 5))
+        ax1, ax2 = fig.subplots(1, 2)
 
         # Policy Slice
         ax1.axvspan(
@@ -82,30 +138,48 @@ class PolicyStabilityCallback:
         )
         for i, name in enumerate(self.action_features):
             ax1.plot(self.y_grid, avg_actions[:, i], label=name)
-        ax1.set_title(f"Policy Slice @ Epoch {self.epoch}")
+        ax1.set_title(f"Policy Slice @ Epoch {epoch}")
         ax1.legend(fontsize="small")
         ax1.set_xlabel("Quantity (y)")
         ax1.set_ylabel("Action (normalized delta)")
 
         # Convergence
-        if self.diff_history:
-            ax2.plot(self.epoch_history, self.diff_history, marker=".")
+        if diff_history:
+            ax2.plot(epoch_history, diff_history, marker=".")
             # 使用 symlog 避免 diff 為 0 時報錯，並設定一個極小的線性閾值
             ax2.set_yscale("symlog", linthresh=1e-8)
             ax2.set_title("Policy Convergence (Log)")
 
-        plt.tight_layout()
-        fig.savefig(os.path.join(self.output_dir, "plot.png"))
-        plt.close(fig)
+        fig.tight_layout()
+        path = os.path.join(self.output_dir, "plot.png")
+        fig.savefig(path + ".tmp.png")
+        os.replace(path + ".tmp.png", path)
+        self._plotted_epoch = epoch
 
-    def _save_status_json(self, diff):
-        status_path = os.path.join(self.output_dir, "status.json")
-        with open(status_path, "w") as f:
-            json.dump(
-                {
-                    "epoch": self.epoch,
-                    "diff": diff,
-                    "target_range": [self.y_low, self.y_high],
+    def _save_policy_slice_json(self, avg_actions, diff):
+        """策略切片原始數據 (精簡 JSON，6 位有效數字)"""
+        _write_json_atomic(
+            os.path.join(self.output_dir, "policy_slice.json"),
+            {
+                "epoch": self.epoch,
+                "diff": diff,
+                "target_range": [self.y_low, self.y_high],
+                "y_grid": [float(f"{v:.6g}") for v in self.y_grid],
+                "actions": {
+                    name: [float(f"{v:.6g}") for v in avg_actions[:, i]]
+                    for i, name in enumerate(self.action_features)
                 },
-                f,
-            )
+                "epochs": self.epoch_history,
+                "diffs": [float(f"{v:.6g}") for v in self.diff_history],
+            },
+        )
+
+    def _save_status_json(self, diff):
+        _write_json_atomic(
+            os.path.join(self.output_dir, "status.json"),
+            {
+                "epoch": self.epoch,
+                "diff": diff,
+                "target_range": [self.y_low, self.y_high],
+            },
+        )
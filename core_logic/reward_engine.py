@@ -35,3 +35,122 @@ def calculate_reward(y, y2, a_norm, low=None, high=None):
     r_act = -lam * float(np.sum(a_norm**2))
 
     return r_base + r_improve + r_act
+
+
+def dist_to_band_array(y, low, high):
+    """dist_to_band 的向量化版本 (y 為 float64 陣列)，以遮罩取代 if 分支"""
+    y = np.asarray(y, dtype=np.float64)
+    return np.where(y < low, low - y, np.where(y > high, y - high, 0.0))
+
+
+def _action_energy(a_norm):
+    """逐列 sum(a_norm**2)；以 float32 加總再轉 float64，C 順序下每列的累加順序與 np.sum 相同"""
+    a_norm = np.ascontiguousarray(a_norm)
+    return np.sum(np.square(a_norm), axis=1).astype(np.float64)
+
+
+# ---------------------------------------------------------------------------
+# 可依名稱切換的獎勵定義
+# 簽名: fn(y, y2, a_norm, low, high, **params) -> float64 (N,)
+# 任務 JSON 以 "reward": "名稱" 或 {"name": "名稱", "params": {...}} 指定
+# ---------------------------------------------------------------------------
+REWARD_FUNCTIONS = {}
+DEFAULT_REWARD = "band"
+
+
+def register_reward(name):
+    """裝飾器：以名稱登記向量化獎勵函數"""
+
+    def decorator(fn):
+        REWARD_FUNCTIONS[name] = fn
+        return fn
+
+    return decorator
+
+
+@register_reward("band")
+def calculate_rewards(y, y2, a_norm, low=None, high=None, lam_in=0.05, lam_out=0.2):
+    """
+    calculate_reward 的向量化版本，一次計算所有轉移的獎勵
+
+    y / y2: 當前 / 下一步量測值 (N,)
+    a_norm: 正規化後的動作矩陣 (N, n_actions)，float32
+    回傳 float64 (N,)；預設參數下運算順序與逐筆版本一致，結果逐位元相同
+    """
+    d_prev = dist_to_band_array(y, low=low, high=high)
+    d_next = dist_to_band_array(y2, low=low, high=high)
+
+    r_base = 1.0 - 2.0 * d_next
+    r_improve = 2.0 * (d_prev - d_next)
+
+    # 區間內嚴格抑制亂動，區間外允許修正
+    lam = np.where(d_next == 0, lam_in, lam_out)
+    r_act = -lam * _action_energy(a_norm)
+
+    return r_base + r_improve + r_act
+
+
+@register_reward("band_quadratic")
+def band_quadratic_rewards(
+    y, y2, a_norm, low=None, high=None, scale=None, lam_in=0.05, lam_out=0.2
+):
+    """
+    區間外以平方距離懲罰 (偏離越遠下降越快)，距離以區間寬度正規化
+
+    scale: 距離正規化尺度，預設為 high - low
+    """
+    scale = float(scale) if scale else max(float(high) - float(low), 1e-6)
+    d_prev = dist_to_band_array(y, low=low, high=high) / scale
+    d_next = dist_to_band_array(y2, low=low, high=high) / scale
+
+    r_base = 1.0 - d_next**2
+    r_improve = d_prev**2 - d_next**2
+
+    lam = np.where(d_next == 0, lam_in, lam_out)
+    return r_base + r_improve - lam * _action_energy(a_norm)
+
+
+@register_reward("target")
+def target_rewards(y, y2, a_norm, low=None, high=None, target=None, lam=0.1):
+    """
+    追蹤目標值：以 |y2 - target| / 半區間寬 計分，區間內仍偏好靠近中心
+
+    target: 目標值，預設為區間中點
+    """
+    center = float(target) if target is not None else (float(low) + float(high)) / 2.0
+    half = max((float(high) - float(low)) / 2.0, 1e-6)
+    e_prev = np.abs(np.asarray(y, dtype=np.float64) - center) / half
+    e_next = np.abs(np.asarray(y2, dtype=np.float64) - center) / half
+
+    return (1.0 - e_next) + (e_prev - e_next) - lam * _action_energy(a_norm)
+
+
+def resolve_reward(spec=None):
+    """
+    解析任務設定中的獎勵定義，回傳 (函數, 參數)
+
+    spec: None / "名稱" / {"name": "名稱", "params": {...}}
+    """
+    if spec is None or spec == "":
+        return REWARD_FUNCTIONS[DEFAULT_REWARD], {}
+    if isinstance(spec, str):
+        name, params = spec, {}
+    elif isinstance(spec, dict):
+        name = spec.get("name") or DEFAULT_REWARD
+        params = dict(spec.get("params") or {})
+    else:
+        raise ValueError(f"Invalid reward spec: {spec!r}")
+
+    fn = REWARD_FUNCTIONS.get(name)
+    if fn is None:
+        raise ValueError(
+            f"Unknown reward '{name}'. Available: {sorted(REWARD_FUNCTIONS)}"
+        )
+    return fn, params
+
+
+def compute_rewards(y, y2, a_norm, low=None, high=None, reward=None):
+    """依名稱 (或預設 band) 計算整批轉移的獎勵向量"""
+    fn, params = resolve_reward(reward)
+    rewards = fn(y, y2, a_norm, low=low, high=high, **params)
+    return np.asarray(rewards, dtype=np.float64)
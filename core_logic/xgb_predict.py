@@ -1,10 +1,33 @@
 # xgb_predict.py
 import os
+import json
 import joblib
 import numpy as np
 import xgboost as xgb
 import config
 
+# 預測值即為 margin 的 objective (contributions 加總 = 預測值)
+IDENTITY_LINK_OBJECTIVES = {
+    "reg:squarederror",
+    "reg:squaredlogerror",
+    "reg:pseudohubererror",
+    "reg:absoluteerror",
+    "reg:quantileerror",
+}
+
+
+def best_iteration_range(booster):
+    """
+    早停模型只使用到 best_iteration 為止的樹 (與 XGBRegressor.predict 一致)
+
+    Returns:
+        booster.predict 的 iteration_range；(0, 0) 代表使用全部的樹
+    """
+    best = booster.attr("best_iteration")
+    if best is None:
+        return (0, 0)
+    return (0, int(best) + 1)
+
 
 class XGBSimulator:
     def __init__(self, model_dir=None):
@@ -27,6 +50,9 @@ class XGBSimulator:
 
         self.model = None
         self.feature_names = None
+        self.contrib_ready = False
+        self._explainer = None
+        self._tree_subsets = {}
         self.load_model()
 
     def load_model(self):
@@ -42,6 +68,80 @@ class XGBSimulator:
             self.feature_names = joblib.load(self.feature_names_path)
             print(f"✅ XGBoost 模擬器載入成功。特徵維度: {len(self.feature_names)}")
 
+        self._init_contribs()
+
+    def _init_contribs(self):
+        """
+        檢查能否以 booster.predict(pred_contribs=True) 取得 TreeSHAP 歸因 (不經 SHAP)
+
+        僅限 identity link 的 objective (contributions 加總即為預測的 margin)。
+        """
+        self.contrib_ready = False
+        if self.model is None or not self.feature_names:
+            return
+        try:
+            booster = self.model.get_booster()
+            objective = json.loads(booster.save_config())["learner"]["objective"]["name"]
+            if objective not in IDENTITY_LINK_OBJECTIVES:
+                print(f"ℹ️ Objective {objective} 非 identity link，歸因改用 SHAP")
+                return
+            self.contrib_ready = True
+        except Exception as e:
+            print(f"⚠️ XGBoost native contributions unavailable: {e}")
+
+    def get_explainer(self):
+        """SHAP 解釋器 (同一個模擬器只建立一次，共用此模擬器的 session 一起使用)"""
+        if self._explainer is None and self.model is not None:
+            import shap
+
+            self._explainer = shap.TreeExplainer(self.model)
+        return self._explainer
+
+    def tree_subset(self, feature_idx):
+        """
+        只包含「在 feature_idx 欄位上分裂」的樹所組成的子模型 (what-if 掃描用)
+
+        只改變這些欄位時，其餘樹的輸出不變，因此
+            predict(候選) = predict(目前) + subset(候選) - subset(目前)
+        每組欄位只建立一次 (共用此模擬器的 session 一起使用)；
+        非 identity link 或非 gbtree 模型回傳 None，由呼叫端改用完整模型。
+        """
+        key = tuple(sorted(int(i) for i in feature_idx))
+        if not hasattr(self, "_tree_subsets"):
+            self._tree_subsets = {}
+        if key in self._tree_subsets:
+            return self._tree_subsets[key]
+
+        subset = None
+        try:
+            subset = _TreeSubset.build(self.model.get_booster(), key)
+        except Exception as e:
+            print(f"⚠️ Tree subset unavailable, using full model: {e}")
+        self._tree_subsets[key] = subset
+        return subset
+
+    def sensitivity_curves(self, x_row, grids):
+        """
+        單筆輸入的敏感度曲線: 每個特徵各自掃描數值網格 (其他特徵固定)，全部堆疊成一次預測
+
+        Args:
+            x_row: 依 feature_names 順序的輸入向量
+            grids: [(feature index, 網格數值), ...]
+
+        Returns:
+            (current_pred, [每個網格的預測值陣列])
+        """
+        sizes = [len(grid) for _, grid in grids]
+        X = np.repeat(
+            np.asarray(x_row, dtype=np.float32).reshape(1, -1), 1 + sum(sizes), axis=0
+        )
+        pos = 1
+        for (idx, grid), n in zip(grids, sizes):
+            X[pos : pos + n, idx] = grid
+            pos += n
+        preds = np.asarray(self.model.predict(X), dtype=np.float64)
+        return float(preds[0]), np.split(preds[1:], np.cumsum(sizes)[:-1])
+
     def predict_next_y(self, row_data, current_actions=None, delta_actions=None):
         """
         輸入完整的 row 數據,預測下一步的 y (量測值)
@@ -85,6 +185,176 @@ class XGBSimulator:
             traceback.print_exc()
             return None
 
+    def build_feature_matrix(self, rows):
+        """
+        將多筆 row 組成 XGBoost 輸入矩陣
+
+        Args:
+            rows: row 數據列表 (dict 或 Series)
+
+        Returns:
+            (X, valid_mask): X 為 (n, n_features) 矩陣，缺特徵的列以 NaN 填入；
+            valid_mask 標記特徵完整的列
+        """
+        n_feats = len(self.feature_names) if self.feature_names else 0
+        X = np.full((len(rows), n_feats), np.nan, dtype=np.float64)
+        valid_mask = np.zeros(len(rows), dtype=bool)
+        if not self.feature_names:
+            return X, valid_mask
+
+        for i, row_data in enumerate(rows):
+            try:
+                X[i] = [row_data[f] for f in self.feature_names]
+                valid_mask[i] = True
+            except KeyError as e:
+                print(f"[ERROR] ❌ Missing feature in row {i}: {e}")
+        return X, valid_mask
+
+    def predict_matrix(self, X, valid_mask=None):
+        """
+        對整個特徵矩陣執行一次預測
+
+        Returns:
+            list: 每列的預測 y，模型未載入或該列特徵不完整時為 None
+        """
+        n = len(X)
+        if self.model is None or self.feature_names is None:
+            return [None] * n
+        if valid_mask is None:
+            valid_mask = np.ones(n, dtype=bool)
+
+        out = [None] * n
+        if not valid_mask.any():
+            return out
+        try:
+            y_pred = self.model.predict(X[valid_mask])
+        except Exception as e:
+            print(f"[ERROR] ❌ XGBoost batch prediction failed: {e}")
+            return out
+        for out_idx, row_idx in enumerate(np.flatnonzero(valid_mask)):
+            out[row_idx] = float(y_pred[out_idx])
+        return out
+
+    def predict_with_contribs(self, X, valid_mask=None):
+        """
+        以同一個 DMatrix 取得預測值與 TreeSHAP 歸因 (pred_contribs)
+
+        兩者都只使用到 best_iteration 為止的樹；預測值另以 booster.predict 計算，
+        不以 contributions 加總代替 (float32 逐樹累加的誤差隨樹數與數值範圍變大)。
+
+        Returns:
+            (preds, contribs): preds 同 predict_matrix；contribs 為每列依
+            feature_names 順序的歸因向量 (不含 bias)，無法計算時為 None。
+            contrib_ready 為 False 時回傳 None，由呼叫端改走 SHAP。
+        """
+        if not self.contrib_ready:
+            return None
+        n = len(X)
+        if valid_mask is None:
+            valid_mask = np.ones(n, dtype=bool)
+
+        preds = [None] * n
+        contribs = [None] * n
+        if not valid_mask.any():
+            return preds, contribs
+        try:
+            booster = self.model.get_booster()
+            iteration_range = best_iteration_range(booster)
+            dmat = xgb.DMatrix(X[valid_mask], missing=np.nan)
+            y_pred = booster.predict(dmat, iteration_range=iteration_range)
+            out = booster.predict(dmat, pred_contribs=True, iteration_range=iteration_range)
+        except Exception as e:
+            print(f"[ERROR] ❌ XGBoost contribution prediction failed: {e}")
+            return None
+
+        for out_idx, row_idx in enumerate(np.flatnonzero(valid_mask)):
+            preds[row_idx] = float(y_pred[out_idx])
+            contribs[row_idx] = out[out_idx, :-1]
+        return preds, contribs
+
+
+class _TreeSubset:
+    """
+    XGBoost 部分樹的子模型 (predict 回傳這些樹的 margin 加總，含相同的 base_score)
+
+    子模型的特徵重新編號為 columns (這些樹實際用到的欄位)，輸入只需這幾欄
+    """
+
+    def __init__(self, booster, columns, n_trees, n_total):
+        self.booster = booster
+        self.columns = columns
+        self.n_trees = n_trees
+        self.n_total = n_total
+
+    @classmethod
+    def build(cls, booster, feature_idx):
+        config_json = json.loads(booster.save_config())
+        objective = config_json["learner"]["objective"]["name"]
+        if objective not in IDENTITY_LINK_OBJECTIVES:
+            return None
+
+        raw = json.loads(booster.save_raw("json"))
+        learner = raw["learner"]
+        gbm = learner["gradient_booster"]
+        if gbm.get("name") != "gbtree":
+            return None
+        if int(learner["learner_model_param"].get("num_target", "1")) != 1:
+            return None
+        model = gbm["model"]
+
+        # 早停模型只取 best_iteration 為止的輪次 (與 predict 一致)
+        trees = model["trees"]
+        _, n_rounds = best_iteration_range(booster)
+        indptr = model.get("iteration_indptr")
+        if n_rounds and indptr and n_rounds < len(indptr) - 1:
+            trees = trees[: indptr[n_rounds]]
+
+        wanted = set(feature_idx)
+        keep, used = [], set()
+        for tree in trees:
+            splits = {
+                idx
+                for idx, left in zip(tree["split_indices"], tree["left_children"])
+                if left != -1
+            }
+            if splits & wanted:
+                keep.append(tree)
+                used |= splits
+        if not keep:
+            return cls(None, np.zeros(0, dtype=np.intp), 0, len(trees))
+
+        # 特徵重新編號為實際用到的欄位
+        columns = np.array(sorted(used), dtype=np.intp)
+        remap = {int(c): i for i, c in enumerate(columns)}
+        for new_id, tree in enumerate(keep):
+            tree["id"] = new_id
+            tree["split_indices"] = [
+                remap[idx] if left != -1 else 0
+                for idx, left in zip(tree["split_indices"], tree["left_children"])
+            ]
+            tree["tree_param"]["num_feature"] = str(len(columns))
+        model["trees"] = keep
+        model["tree_info"] = [0] * len(keep)
+        model["gbtree_model_param"]["num_trees"] = str(len(keep))
+        model["iteration_indptr"] = list(range(len(keep) + 1))
+        learner["learner_model_param"]["num_feature"] = str(len(columns))
+        # 子模型的輪次已重新編號，不能沿用原模型的早停屬性
+        for key in ("best_iteration", "best_score"):
+            learner.get("attributes", {}).pop(key, None)
+        for key in ("feature_names", "feature_types"):
+            if learner.get(key):
+                learner[key] = [learner[key][c] for c in columns]
+
+        sub = xgb.Booster()
+        sub.load_model(bytearray(json.dumps(raw).encode("utf-8")))
+        return cls(sub, columns, len(keep), len(trees))
+
+    def predict(self, X):
+        """X 為子模型欄位 (columns) 的矩陣"""
+        if self.booster is None:
+            return np.zeros(len(X), dtype=np.float64)
+        return np.asarray(self.booster.inplace_predict(X), dtype=np.float64)
+
 
 # --- 測試預測功能 ---
 if __name__ == "__main__":
@@ -0,0 +1,212 @@
+# xgb_sweep.py
+"""
+XGBoost 超參數搜尋 (grid / random)
+
+資料只載入、切分一次，寫成 .npy 後由各 worker 以 mmap 唯讀開啟 (不經 pickle 複製)；
+候選在 ProcessPool 中並行訓練，總執行緒預算平均分給各 worker。
+每個 trial 結束即回呼 on_trial，供引擎即時寫回任務 JSON。
+"""
+
+import itertools
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# 資料矩陣的檔名 (work_dir 下)
+_ARRAYS = ("X_train", "y_train", "X_test", "y_test")
+
+
+def expand_space(sweep, seed=0):
+    """
+    依搜尋設定產生候選超參數 (list[dict])
+
+    sweep = {
+        "mode": "grid" | "random",
+        "space": {
+            "max_depth": [4, 6, 8],
+            "learning_rate": {"low": 0.01, "high": 0.3, "log": true},
+        },
+        "budget": 12,   # 最多訓練的候選數
+    }
+    grid 模式只接受列表；格點數超過 budget 時以固定種子抽樣。
+    random 模式的列表為離散選項，{"low", "high"} 為連續區間
+    (log=true 時取對數均勻，int=true 時取整數)。
+    """
+    mode = sweep.get("mode", "grid")
+    space = sweep.get("space") or {}
+    budget = int(sweep.get("budget") or 0)
+    rng = random.Random(sweep.get("seed", seed))
+    names = sorted(space)
+
+    if mode == "grid":
+        for name in names:
+            if not isinstance(space[name], (list, tuple)):
+                raise ValueError(f"Grid sweep expects a list of values for '{name}'")
+        grid = [
+            dict(zip(names, values))
+            for values in itertools.product(*(space[n] for n in names))
+        ]
+        if budget and len(grid) > budget:
+            grid = [grid[i] for i in sorted(rng.sample(range(len(grid)), budget))]
+        return grid
+
+    if mode == "random":
+        if not budget:
+            raise ValueError("Random sweep requires a positive 'budget'")
+        candidates = []
+        for _ in range(budget):
+            params = {}
+            for name in names:
+                spec = space[name]
+                if isinstance(spec, (list, tuple)):
+                    params[name] = rng.choice(list(spec))
+                elif isinstance(spec, dict) and "low" in spec and "high" in spec:
+                    low, high = float(spec["low"]), float(spec["high"])
+                    if spec.get("log"):
+                        value = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+                    else:
+                        value = rng.uniform(low, high)
+                    params[name] = int(round(value)) if spec.get("int") else value
+                else:
+                    raise ValueError(f"Invalid search space for '{name}': {spec!r}")
+            candidates.append(params)
+        return candidates
+
+    raise ValueError(f"Unknown sweep mode: {mode}")
+
+
+def _train_trial(work_dir, trial_id, params, n_estimators, early_stop, n_jobs):
+    """(worker) 以 mmap 開啟共用資料並訓練單一候選，模型寫到 work_dir/trial_<id>.json"""
+    import xgboost as xgb
+    from sklearn.metrics import mean_absolute_error, r2_score
+
+    X_train, y_train, X_test, y_test = (
+        np.load(os.path.join(work_dir, f"{name}.npy"), mmap_mode="r") for name in _ARRAYS
+    )
+    # n_estimators / early_stop 可在搜尋空間中覆寫；trial 紀錄保留完整的候選參數
+    n_estimators = int(params.get("n_estimators", n_estimators))
+    early_stop = int(params.get("early_stop", early_stop))
+    model_params = {
+        k: v for k, v in params.items() if k not in ("n_estimators", "early_stop")
+    }
+
+    started = time.perf_counter()
+    model = xgb.XGBRegressor(
+        n_estimators=n_estimators,
+        objective="reg:squarederror",
+        tree_method="hist",
+        n_jobs=n_jobs,
+        early_stopping_rounds=early_stop,
+        **model_params,
+    )
+    model.fit(X_train, y_train, eval_set=[(X_test, y_test)], verbose=False)
+    y_pred = model.predict(X_test)
+    seconds = time.perf_counter() - started
+
+    model_path = os.path.join(work_dir, f"trial_{trial_id}.json")
+    model.save_model(model_path)
+    return {
+        "trial": trial_id,
+        "params": dict(params),
+        "r2": float(r2_score(y_test, y_pred)),
+        "mae": float(mean_absolute_error(y_test, y_pred)),
+        "best_iteration": int(getattr(model, "best_iteration", n_estimators - 1)),
+        "seconds": round(seconds, 3),
+        "model_path": model_path,
+    }
+
+
+def plan_workers(n_trials, total_threads, workers=None):
+    """依總執行緒預算決定 (worker 數, 每個 trial 的 n_jobs)"""
+    total_threads = max(1, int(total_threads))
+    workers = min(int(workers or total_threads), total_threads, max(n_trials, 1))
+    return workers, max(1, total_threads // workers)
+
+
+def run_sweep(
+    X_train,
+    y_train,
+    X_test,
+    y_test,
+    candidates,
+    n_estimators,
+    early_stop,
+    total_threads,
+    workers=None,
+    metric="r2",
+    work_dir=None,
+    on_trial=None,
+):
+    """
+    並行訓練所有候選，回傳 (最佳 trial, 所有 trial 依完成順序)
+
+    metric: "r2" (越大越好) 或 "mae" (越小越好)
+    最佳 trial 的模型檔 (model_path) 在 work_dir 內；呼叫端負責複製並清除 work_dir
+    """
+    if not candidates:
+        raise ValueError("Sweep has no candidates")
+    work_dir = work_dir or tempfile.mkdtemp(prefix="xgb_sweep_")
+    os.makedirs(work_dir, exist_ok=True)
+    for name, array in zip(_ARRAYS, (X_train, y_train, X_test, y_test)):
+        np.save(os.path.join(work_dir, f"{name}.npy"), np.ascontiguousarray(array))
+
+    workers, n_jobs = plan_workers(len(candidates), total_threads, workers)
+    print(
+        f"[INFO] Sweep: {len(candidates)} trials, {workers} workers x {n_jobs} threads"
+    )
+    args = [
+        (work_dir, i, params, n_estimators, early_stop, n_jobs)
+        for i, params in enumerate(candidates)
+    ]
+
+    trials = []
+
+    def record(trial):
+        trials.append(trial)
+        if trial.get("error"):
+            print(f"[TRIAL {trial['trial'] + 1}/{len(candidates)}] FAILED: {trial['error']}")
+        else:
+            print(
+                f"[TRIAL {trial['trial'] + 1}/{len(candidates)}] R2={trial['r2']:.4f} "
+                f"MAE={trial['mae']:.6f} ({trial['seconds']}s) {trial['params']}"
+            )
+        if on_trial:
+            on_trial(trial, list(trials))
+
+    def failed(a, e):
+        # 單一候選失敗 (例如不合法的參數) 不中斷整個搜尋
+        return {"trial": a[1], "params": a[2], "error": str(e)}
+
+    if workers == 1:
+        # 單一 worker 不必啟動子進程
+        for a in args:
+            try:
+                record(_train_trial(*a))
+            except Exception as e:
+                record(failed(a, e))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_train_trial, *a): a for a in args}
+            for future in as_completed(futures):
+                try:
+                    record(future.result())
+                except Exception as e:
+                    record(failed(futures[future], e))
+
+    done = [t for t in trials if not t.get("error")]
+    if not done:
+        raise RuntimeError(f"All {len(trials)} sweep trials failed: {trials[0]['error']}")
+    if metric == "mae":
+        best = min(done, key=lambda t: t["mae"])
+    else:
+        best = max(done, key=lambda t: t["r2"])
+    return best, trials
+
+
+def cleanup(work_dir):
+    shutil.rmtree(work_dir, ignore_errors=True)
@@ -11,20 +11,20 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, r2_score
 from datetime import datetime
 import json
+import shutil
 import numpy as np
 import config  # 匯入全域配置
+from core_logic import xgb_sweep
 
 
-def run_parameterized_xgb(
-    data_path, target_col, features, hyperparams, common_config, save_dir="model"
-):
+def _train_settings(hyperparams, common_config):
     """
-    執行參數化的引擎訓練 (以 XGBoost 為主，支援 UI > config.py > Hardcoded 優先級)
+    整合 hyperparams 與 common_config (UI > config.py > Hardcoded)
+    回傳 (基礎超參數, n_estimators, early_stop, val_split)
     """
     # 取得全域預設配置 (優先找對應演算法，若無則回退)
     algo_defaults = config.PRED_ALGO_CONFIGS.get("XGBoost", {})
 
-    # 整合 hyperparams 與 common_config
     n_estimators = int(
         common_config.get("n_estimators") or algo_defaults.get("n_estimators", 100)
     )
@@ -32,44 +32,70 @@ def run_parameterized_xgb(
         common_config.get("early_stop") or algo_defaults.get("early_stop", 10)
     )
     val_split = float(common_config.get("val_split") or 0.2)
+    params = {
+        "max_depth": int(
+            hyperparams.get("max_depth") or algo_defaults.get("max_depth", 6)
+        ),
+        "learning_rate": float(
+            hyperparams.get("learning_rate") or algo_defaults.get("learning_rate", 0.1)
+        ),
+        "subsample": float(
+            hyperparams.get("subsample") or algo_defaults.get("subsample", 0.8)
+        ),
+        "colsample_bytree": float(
+            hyperparams.get("colsample_bytree")
+            or algo_defaults.get("colsample_bytree", 0.8)
+        ),
+    }
+    return params, n_estimators, early_stop, val_split
 
-    print("DEBUG: Starting prediction engine training task...")
-    print(
-        f"DEBUG: target={target_col}, features_count={len(features)}, val_split={val_split}"
-    )
 
-    # 1. 載入並整理資料
+def _load_split(data_path, target_col, features, val_split):
+    """載入資料並切分訓練/測試集 (參考介面設定的驗證比例)"""
     df, _ = DataPreprocess.get_processed_data_and_cols(data_path)
 
-    # 2. 構建訓練矩陣
     X = df[features].values.astype(np.float32)
     y = df[target_col].values.astype(np.float32)
 
-    # 3. 訓練/測試集拆分 (參考介面設定的驗證比例)
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=val_split, random_state=42
+    return train_test_split(X, y, test_size=val_split, random_state=42)
+
+
+def _new_run_path(save_dir):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    run_path = os.path.join(save_dir, f"pred_run_{timestamp}")
+    os.makedirs(run_path, exist_ok=True)
+    return run_path
+
+
+def run_parameterized_xgb(
+    data_path, target_col, features, hyperparams, common_config, save_dir="model"
+):
+    """
+    執行參數化的引擎訓練 (以 XGBoost 為主，支援 UI > config.py > Hardcoded 優先級)
+    """
+    params, n_estimators, early_stop, val_split = _train_settings(
+        hyperparams, common_config
+    )
+
+    print("DEBUG: Starting prediction engine training task...")
+    print(
+        f"DEBUG: target={target_col}, features_count={len(features)}, val_split={val_split}"
+    )
+
+    # 1~3. 載入資料、構建訓練矩陣並拆分
+    X_train, X_test, y_train, y_test = _load_split(
+        data_path, target_col, features, val_split
     )
 
     # 4. 初始化模型 (參數優先級連動)
     model = xgb.XGBRegressor(
         n_estimators=n_estimators,
-        max_depth=int(
-            hyperparams.get("max_depth") or algo_defaults.get("max_depth", 6)
-        ),
-        learning_rate=float(
-            hyperparams.get("learning_rate") or algo_defaults.get("learning_rate", 0.1)
-        ),
-        subsample=float(
-            hyperparams.get("subsample") or algo_defaults.get("subsample", 0.8)
-        ),
-        colsample_bytree=float(
-            hyperparams.get("colsample_bytree")
-            or algo_defaults.get("colsample_bytree", 0.8)
-        ),
         objective="reg:squarederror",
         tree_method="hist",
-        n_jobs=-1,
+        # 訓練排程器分配的 CPU 執行緒預算 (直接執行腳本時使用所有核心)
+        n_jobs=int(os.environ.get("SIGMA2_TRAIN_THREADS", -1)),
         early_stopping_rounds=early_stop,
+        **params,
     )
 
     # 5. 執行訓練
@@ -83,11 +109,7 @@ def run_parameterized_xgb(
     print(f"[SUCCESS] Training completed | R2: {r2:.4f} | MAE: {mae:.6f}")
 
     # 7. 存檔
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    run_name = f"pred_run_{timestamp}"
-    run_path = os.path.join(save_dir, run_name)
-    os.makedirs(run_path, exist_ok=True)
-
+    run_path = _new_run_path(save_dir)
     model_path = os.path.join(run_path, "model.json")
     model.save_model(model_path)
     joblib.dump(features, os.path.join(run_path, "feature_names.pkl"))
@@ -101,6 +123,87 @@ def run_parameterized_xgb(
     }
 
 
+def run_xgb_sweep(
+    data_path,
+    target_col,
+    features,
+    hyperparams,
+    common_config,
+    sweep,
+    save_dir="model",
+    on_trial=None,
+):
+    """
+    超參數搜尋模式：資料只載入一次，候選在多個 worker 中並行訓練，最佳模型存為 model.json
+
+    sweep: {"mode": "grid"|"random", "space": {...}, "budget": N,
+            "workers": N, "metric": "r2"|"mae"}
+    on_trial(trial, trials): 每個 trial 完成時回呼 (供寫回任務 JSON)
+    """
+    base_params, n_estimators, early_stop, val_split = _train_settings(
+        hyperparams, common_config
+    )
+    # 候選只覆寫搜尋空間中的參數，其餘沿用 UI / config.py 設定
+    candidates = [
+        {**base_params, **params} for params in xgb_sweep.expand_space(sweep)
+    ]
+    metric = sweep.get("metric", "r2")
+    # 總執行緒預算：訓練排程器分配的數量，直接執行腳本時使用所有核心
+    total_threads = int(os.environ.get("SIGMA2_TRAIN_THREADS", 0)) or os.cpu_count() or 1
+
+    print("DEBUG: Starting prediction engine sweep task...")
+    print(
+        f"DEBUG: target={target_col}, features_count={len(features)}, "
+        f"trials={len(candidates)}, metric={metric}"
+    )
+
+    X_train, X_test, y_train, y_test = _load_split(
+        data_path, target_col, features, val_split
+    )
+
+    run_path = _new_run_path(save_dir)
+    work_dir = os.path.join(run_path, "_sweep")
+    try:
+        best, trials = xgb_sweep.run_sweep(
+            X_train,
+            y_train,
+            X_test,
+            y_test,
+            candidates,
+            n_estimators,
+            early_stop,
+            total_threads,
+            workers=sweep.get("workers"),
+            metric=metric,
+            work_dir=work_dir,
+            on_trial=on_trial,
+        )
+        model_path = os.path.join(run_path, "model.json")
+        shutil.copyfile(best["model_path"], model_path)
+    finally:
+        xgb_sweep.cleanup(work_dir)
+    joblib.dump(features, os.path.join(run_path, "feature_names.pkl"))
+
+    print(
+        f"[SUCCESS] Sweep completed | best trial {best['trial'] + 1} | "
+        f"R2: {best['r2']:.4f} | MAE: {best['mae']:.6f} | {best['params']}"
+    )
+    return {
+        "status": "success",
+        "r2": best["r2"],
+        "mae": best["mae"],
+        "model_path": model_path,
+        "run_path": run_path,
+        "best_params": best["params"],
+        "trials": [_public_trial(t) for t in trials],
+    }
+
+
+def _public_trial(trial):
+    """寫入任務 JSON 的 trial 摘要 (不含暫存模型路徑)"""
+    return {k: v for k, v in trial.items() if k != "model_path"}
+
+
 def run_from_json(json_path):
     """從 JSON 配置文件啟動訓練"""
     if not os.path.exists(json_path):
@@ -122,14 +225,36 @@ def run_from_json(json_path):
 
     # 執行訓練
     save_dir = job_config.get("bundles_dir", "model")
-    result = run_parameterized_xgb(
-        data_path=data_path,
-        target_col=target_col,
-        features=features,
-        hyperparams=job_config.get("hyperparams", {}),
-        common_config=job_config.get("common", {}),
-        save_dir=save_dir,
-    )
+    sweep = job_config.get("sweep")
+    if sweep:
+
+        def on_trial(trial, trials):
+            # 每個 trial 完成即寫回任務 JSON (供 UI 顯示進度)
+            job_config["sweep_trials"] = [_public_trial(t) for t in trials]
+            tmp_path = json_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(job_config, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, json_path)
+
+        result = run_xgb_sweep(
+            data_path=data_path,
+            target_col=target_col,
+            features=features,
+            hyperparams=job_config.get("hyperparams", {}),
+            common_config=job_config.get("common", {}),
+            sweep=sweep,
+            save_dir=save_dir,
+            on_trial=on_trial,
+        )
+    else:
+        result = run_parameterized_xgb(
+            data_path=data_path,
+            target_col=target_col,
+            features=features,
+            hyperparams=job_config.get("hyperparams", {}),
+            common_config=job_config.get("common", {}),
+            save_dir=save_dir,
+        )
 
     # 回寫狀態到 JSON (供 UI 顯示)
     if result and result.get("status") == "success":
@@ -137,6 +262,9 @@ def run_from_json(json_path):
         job_config["r2"] = result.get("r2")
         job_config["mae"] = result.get("mae")
         job_config["run_path"] = result.get("run_path")
+        if "best_params" in result:
+            job_config["best_params"] = result["best_params"]
+            job_config["sweep_trials"] = result["trials"]
 
         # 關鍵：在模型資料夾內也存一份「暫存緩存」，確保資料連動
         run_config_path = os.path.join(result.get("run_path"), "config.json")
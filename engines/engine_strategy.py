@@ -6,6 +6,7 @@ import logging
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from core_logic import DataPreprocess
+from core_logic import dataset_builder
 from core_logic import reward_engine
 from core_logic import model_manager
 from core_logic import monitor_utils
@@ -22,11 +23,18 @@ d3rlpy_logger.addHandler(logging.NullHandler())
 
 import d3rlpy
 import json
+import torch
 from datetime import datetime
 from contextlib import contextmanager
 import sys
 
 
+# 訓練排程器分配的 CPU 執行緒預算 (直接執行腳本時不限制)
+TRAIN_THREADS = int(os.environ.get("SIGMA2_TRAIN_THREADS", 0))
+if TRAIN_THREADS > 0:
+    torch.set_num_threads(TRAIN_THREADS)
+
+
 @contextmanager
 def silence_stdout():
     """暴力攔截 stdout，徹底關掉第三方套件的強制列印"""
@@ -49,6 +57,7 @@ def run_parameterized_rl(
     common_settings,
     goal_settings=None,
     save_dir="model",
+    reward=None,
 ):
     """
     執行參數化的離線強化學習訓練
@@ -61,6 +70,7 @@ def run_parameterized_rl(
         hyperparams: IQL 特定參數 (expectile, weight_temp 等)
         common_settings: 通用設定 (epochs, precision 等)
         goal_settings: 目標品質區間設定 (LSL/USL)
+        reward: 獎勵定義名稱或 {"name", "params"} (reward_engine 登記，預設 band)
     """
     if not data_path or not goal_col or not action_features:
         raise ValueError(
@@ -72,6 +82,9 @@ def run_parameterized_rl(
             "Quality goals (LSL/USL) must be set in UI, default values not allowed."
         )
 
+    # 先驗證獎勵定義，名稱錯誤時不必等資料載入
+    reward_engine.resolve_reward(reward)
+
     # 提取品質區間
     y_low = float(goal_settings.get("lsl", 0.0))
     y_high = float(goal_settings.get("usl", 1.0))
@@ -112,38 +125,17 @@ def run_parameterized_rl(
             y2_ranges[col] = [min_v, max_v]
             print(f"   Parameter '{col}': {[min_v, max_v]}")
 
-    # 2. 構建 MDPDataset
-    states, actions, rewards, terminals = [], [], [], []
-    for i in range(len(df) - 1):
-        row, row2 = df.iloc[i], df.iloc[i + 1]
-
-        # State: [選定的背景參數 + 當前動作 + 當前目標值]
-        s = np.concatenate(
-            [
-                row[state_features].values.astype(np.float32),
-                row[action_features].values.astype(np.float32),
-                [float(row[goal_col])],
-            ]
-        )
-
-        # Action: 正規化位移量
-        a_raw = (row2[action_features].values - row[action_features].values).astype(
-            np.float32
-        )
-        a_norm = np.clip(a_raw / action_stds, -1.0, 1.0)
-
-        # Reward: 呼叫獎勵引擎 (傳入介面設定的低標/高標)
-        r = reward_engine.calculate_reward(
-            float(row[goal_col]), float(row2[goal_col]), a_norm, low=y_low, high=y_high
-        )
-
-        states.append(s)
-        actions.append(a_norm)
-        rewards.append(r)
-        terminals.append(False)
-
-    if terminals:
-        terminals[-1] = True
+    # 2. 構建 MDPDataset (向量化：欄位一次切成矩陣，獎勵一次計算)
+    states, actions, rewards, terminals = dataset_builder.build_transitions(
+        df,
+        state_features,
+        action_features,
+        goal_col,
+        action_stds,
+        low=y_low,
+        high=y_high,
+        reward=reward,
+    )
 
     # print(f"DEBUG: Dataset constructed. Transitions: {len(states)}")
     if len(states) == 0:
@@ -264,6 +256,9 @@ def run_parameterized_rl(
         else:
             stable_counter = 0
 
+    # 等待背景繪圖並補繪最後一個 epoch
+    callback.close()
+
     # 6. 保存最終產出
     model_manager.save_policy_bundle(
         iql,
@@ -321,6 +316,7 @@ def run_from_json(json_path):
         common_settings=common_settings,
         goal_settings=goal_settings,
         save_dir=save_dir,
+        reward=job_config.get("reward"),
     )
 
     # 回寫狀態到 JSON (供 UI 顯示)
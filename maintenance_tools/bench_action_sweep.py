@@ -0,0 +1,91 @@
+# bench_action_sweep.py
+"""
+候選動作掃描 (ActionSweep) 效能量測
+
+比較項目:
+  1. 單列 N 個候選: 批次評估 (只含 action 相關的樹) vs 逐候選呼叫完整模型 predict
+  2. 多列 (預設 16 列) 的候選合併成一次呼叫
+
+用法:
+    python maintenance_tools/bench_action_sweep.py [model_dir] [candidates] [repeat]
+    (預設 model/，即 model/xgb_simulator.json；action 取自 model_dir 下第一個 policy_bundle/meta.json)
+"""
+
+import os
+import sys
+import time
+import contextlib
+import io
+import glob
+import json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from core_logic.xgb_predict import XGBSimulator
+from core_logic.feature_plan import FeatureGatherPlan
+from core_logic.action_sweep import ActionSweep
+
+
+def timeit(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples = np.array(samples)
+    return np.median(samples), np.percentile(samples, 95)
+
+
+def main(model_dir="model", candidates=2048, repeat=50):
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim = XGBSimulator(model_dir=model_dir)
+    if sim.model is None or not sim.feature_names:
+        print(f"❌ 找不到模型: {model_dir}")
+        return
+
+    # action 取自訓練好的 policy bundle；找不到時以 XGBoost 特徵中的前 3 欄模擬
+    actions = sim.feature_names[:3]
+    metas = sorted(glob.glob(os.path.join(model_dir, "*", "policy_bundle", "meta.json")))
+    if metas:
+        with open(metas[0], "r", encoding="utf-8") as f:
+            actions = [a for a in json.load(f)["action_features"] if a in sim.feature_names]
+    bg = [c for c in sim.feature_names if c not in actions]
+    plan = FeatureGatherPlan(bg, actions, sim.feature_names)
+    sweep = ActionSweep(plan, np.ones(len(actions)), n_candidates=candidates)
+    subset = sim.tree_subset(sweep.xgb_cols)
+
+    rng = np.random.default_rng(0)
+    print("=" * 60)
+    print(f"Model: {sim.model_path}  features={len(sim.feature_names)}")
+    print(f"Actions: {actions}")
+    if subset is not None:
+        print(f"Trees splitting on actions: {subset.n_trees} / {subset.n_total}")
+    print(f"Candidates per row: {sweep.n_candidates}")
+    print("=" * 60)
+
+    for n_rows in (1, 16):
+        values = rng.normal(size=(n_rows, len(plan.columns)))
+        med, p95 = timeit(lambda: sweep.sweep(sim, values, 0.0), repeat)
+        print(f"\n{n_rows} row(s) x {sweep.n_candidates} candidates (batched):")
+        print(f"  p50 {med:8.2f} ms  p95 {p95:8.2f} ms")
+
+    # 逐候選預測 (只量前 100 個候選再外推)
+    values = rng.normal(size=(1, len(plan.columns)))
+    X = plan.xgb(values)
+
+    def one_by_one():
+        for delta in sweep.deltas[:100]:
+            X[0, sweep.xgb_cols] = delta
+            sim.model.predict(X)
+
+    med, _ = timeit(one_by_one, max(1, repeat // 10))
+    print(f"\nPer-candidate predict (extrapolated to {sweep.n_candidates}):")
+    print(f"  ~{med * sweep.n_candidates / 100:8.1f} ms")
+
+
+if __name__ == "__main__":
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else "model"
+    candidates = int(sys.argv[2]) if len(sys.argv) > 2 else 2048
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    main(model_dir, candidates, repeat)
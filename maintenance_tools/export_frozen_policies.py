@@ -0,0 +1,52 @@
+# export_frozen_policies.py
+"""
+為既有的策略 bundle 補匯出 frozen actor (policy_frozen.npz)
+
+舊版 bundle 只有 policy.d3rlpy，API 端載入時必須匯入 torch / d3rlpy。
+執行本腳本後 load_policy_bundle 會優先使用純 NumPy 推理。
+
+用法:
+    python maintenance_tools/export_frozen_policies.py [root_dir ...]
+    (預設掃描 model/ 與 workspace/)
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from core_logic import model_manager
+from core_logic.frozen_policy import FROZEN_POLICY_FILE
+
+
+def find_bundles(root_dir):
+    for dirpath, _, filenames in os.walk(root_dir):
+        if "policy.d3rlpy" in filenames and "algo_meta.json" in filenames:
+            yield dirpath
+
+
+def main(roots):
+    exported, skipped = 0, 0
+    for root in roots:
+        if not os.path.exists(root):
+            continue
+        for bundle_dir in find_bundles(root):
+            if os.path.exists(os.path.join(bundle_dir, FROZEN_POLICY_FILE)):
+                skipped += 1
+                continue
+            t0 = time.perf_counter()
+            path = model_manager.export_frozen_bundle(bundle_dir)
+            if path:
+                exported += 1
+                print(f"✅ {bundle_dir} ({time.perf_counter() - t0:.2f}s)")
+            else:
+                print(f"⚠️ {bundle_dir}: unsupported policy, kept policy.d3rlpy only")
+
+    print(f"\nExported: {exported}, already frozen: {skipped}")
+
+
+if __name__ == "__main__":
+    roots = sys.argv[1:] or ["model", config.BASE_STORAGE_DIR]
+    main(roots)
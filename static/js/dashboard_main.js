@@ -168,25 +168,117 @@ window.initSimulatorSelectors = Simulator.initSimulatorSelectors;
 const timerWorkerScript = `
     let dashboardInterval = null;
     let pollInterval = null;
+    let eventSource = null;
+    let historyCursor = 0;
+    let historyRows = [];
+    let syncing = false;
+    const HISTORY_LIMIT = 5000;
+
+    function stopDashboard() {
+        if (dashboardInterval) clearInterval(dashboardInterval);
+        dashboardInterval = null;
+        if (eventSource) eventSource.close();
+        eventSource = null;
+    }
+
+    // 以 cursor 取回上次之後的新資料 (欄式)，合併到本地歷史
+    async function syncHistory(sessionId) {
+        if (syncing) return;
+        syncing = true;
+        try {
+            const response = await fetch('/api/history?session_id=' + encodeURIComponent(sessionId) + '&since=' + historyCursor);
+            if (response.ok) {
+                const resp = await response.json();
+                const before = historyRows.length;
+                if (resp.reset) historyRows = [];
+                if (resp.count > 0) historyRows = historyRows.concat(columnsToRows(resp));
+                // 伺服器端環形緩衝區已覆寫或清空的舊資料
+                if (historyRows.length > resp.total) historyRows.splice(0, historyRows.length - resp.total);
+                historyCursor = resp.cursor;
+                if (resp.reset || resp.count > 0 || historyRows.length !== before) {
+                    self.postMessage({ type: 'dashboard_data', history: historyRows });
+                }
+            }
+        } catch(err) { /* ignore */ }
+        syncing = false;
+    }
+
+    // 欄式增量回應 -> 與舊版 /api/history 相同格式的紀錄
+    function columnsToRows(resp) {
+        const c = resp.columns;
+        const rows = [];
+        for (let i = 0; i < resp.count; i++) {
+            const snapshots = {};
+            for (const [name, vals] of Object.entries(c.feature_snapshots)) {
+                if (vals[i] !== null) snapshots[name] = vals[i];
+            }
+            const recommendations = {};
+            for (const [name, rec] of Object.entries(c.recommendations)) {
+                if (rec.current[i] === null && rec.suggested_next[i] === null) continue;
+                recommendations[name] = {
+                    current: rec.current[i],
+                    suggested_delta: rec.suggested_delta[i],
+                    suggested_delta_smoothed: rec.suggested_delta_smoothed[i],
+                    suggested_next: rec.suggested_next[i],
+                    suggested_next_smoothed: rec.suggested_next_smoothed[i],
+                };
+            }
+            rows.push(Object.assign({
+                status: resp.status_labels[c.status[i]],
+                current_measure: c.current_measure[i],
+                measure_name: c.measure_name[i],
+                target_range: [c.target_low[i], c.target_high[i]],
+                recommendations: recommendations,
+                feature_snapshots: snapshots,
+                predicted_y_next: c.predicted_y_next[i],
+                top_influencers: c.top_influencers[i],
+                current_top_influencers: c.current_top_influencers[i],
+                smoothed_top_influencers: c.smoothed_top_influencers[i],
+                diagnosis: c.diagnosis[i],
+                timestamp: c.timestamp[i],
+            }, c.extras[i] || {}));
+        }
+        return rows;
+    }
 
     self.onmessage = async function(e) {
         const data = e.data;
 
-        // 1. Dashboard 更新 (Worker Fetch)
+        // 1. Dashboard 更新 (優先使用 SSE 推送；不支援時退回輪詢增量 /api/history)
         if (data.cmd === 'start_dashboard') {
             const sessionId = data.sessionId;
-            if (dashboardInterval) clearInterval(dashboardInterval);
-            dashboardInterval = setInterval(async () => {
-                try {
-                    const response = await fetch('/api/history?session_id=' + sessionId);
-                    if (response.ok) {
-                        const history = await response.json();
-                        self.postMessage({ type: 'dashboard_data', history: history });
+            stopDashboard();
+            historyCursor = 0;
+            historyRows = [];
+
+            if (typeof EventSource !== 'undefined') {
+                eventSource = new EventSource('/api/dashboard/events?session_id=' + encodeURIComponent(sessionId));
+                // 連線 (或重連) 後先補齊期間的歷史
+                eventSource.onopen = () => syncHistory(sessionId);
+                eventSource.addEventListener('prediction', (ev) => {
+                    const msg = JSON.parse(ev.data);
+                    if (msg.seq !== historyCursor) {
+                        syncHistory(sessionId);  // 有缺漏，改以 cursor 補齊
+                        return;
                     }
-                } catch(err) { /* ignore */ }
-            }, 1500);
+                    historyRows.push(msg.row);
+                    if (historyRows.length > HISTORY_LIMIT) historyRows.splice(0, historyRows.length - HISTORY_LIMIT);
+                    historyCursor = msg.seq + 1;
+                    self.postMessage({ type: 'dashboard_data', history: historyRows });
+                });
+                for (const name of ['history', 'history_cleared', 'reset']) {
+                    eventSource.addEventListener(name, () => syncHistory(sessionId));
+                }
+                for (const name of ['simulator_eof', 'model_load', 'ai_job']) {
+                    eventSource.addEventListener(name, (ev) => {
+                        self.postMessage({ type: 'server_event', event: name, data: JSON.parse(ev.data) });
+                    });
+                }
+            } else {
+                dashboardInterval = setInterval(() => syncHistory(sessionId), 1500);
+            }
         } else if (data.cmd === 'stop_dashboard') {
-            if (dashboardInterval) clearInterval(dashboardInterval);
+            stopDashboard();
         }
         // 2. AI 輪詢 (Worker 驅動)
         else if (data.cmd === 'start_polling') {
@@ -253,6 +345,14 @@ timerWorker.onmessage = async function (e) {
     if (data.type === 'dashboard_data') {
         Dashboard.renderDashboardData(data.history);
     }
+    else if (data.type === 'server_event') {
+        // AI 任務完成時立即查詢結果，不必等下一次輪詢
+        if (data.event === 'ai_job') {
+            const callback = aiPollingCallbacks[data.data.job_id];
+            if (callback) await callback();
+        }
+        window.dispatchEvent(new CustomEvent('sigma2:' + data.event, { detail: data.data }));
+    }
     else if (data.type === 'poll_tick') {
         const callback = aiPollingCallbacks[data.id];
         if (callback) {
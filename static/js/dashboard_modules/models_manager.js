@@ -68,7 +68,7 @@ export async function loadModelRegistry() {
             if (m.states && m.states.length > 0) infoText += `環境狀態 (States)：${m.states.join(', ')}\n`;
             if (m.features && m.features.length > 0) infoText += `預測特徵 (Features)：${m.features.join(', ')}\n`;
 
-            const isTraining = m.status === 'training';
+            const isTraining = m.status === 'training' || m.status === 'queued';
 
             tr.innerHTML = `
                 <td style="padding: 12px 15px; font-weight: 500; color: #1e293b; font-size: 14px;">${displayName}</td>
@@ -76,7 +76,7 @@ export async function loadModelRegistry() {
                     <span title="點擊查看訓練日誌" 
                           onclick="viewTrainingLog('${m.job_id}', '${displayName}')"
                           style="${pillStyle} ${m.status === 'completed' ? 'background: #2e7d32;' : (m.status === 'failed' ? 'background: #d32f2f;' : 'background: #1976d2;')}">
-                        ${m.status === 'completed' ? '訓練完成' : (m.status === 'failed' ? '任務失敗/停止' : '訓練中')}
+                        ${m.status === 'completed' ? '訓練完成' : (m.status === 'failed' ? '任務失敗/停止' : (m.status === 'queued' ? `排隊中${m.queue_position ? ' #' + m.queue_position : ''}` : '訓練中'))}
                     </span>
                 </td>
                 <td style="padding: 12px 15px;">
@@ -92,6 +92,30 @@ export async function clearHistory() {
 /**
  * 初始化儀表板上的模擬器下拉選單（檔案與模型）
  */
+// 等待伺服器推送的事件 (見 dashboard_main.js 的 server_event)，最多等 timeoutMs
+function waitForServerEvent(name, timeoutMs) {
+    return new Promise(resolve => {
+        const done = () => {
+            clearTimeout(timer);
+            window.removeEventListener(name, done);
+            resolve();
+        };
+        const timer = setTimeout(done, timeoutMs);
+        window.addEventListener(name, done);
+    });
+}
+
+async function waitForModelLoad(ticketId, intervalMs = 2000, timeoutMs = 300000) {
+    const started = Date.now();
+    while (Date.now() - started < timeoutMs) {
+        const ticket = await API.get(`/api/model/load_status/${ticketId}`);
+        if (['ready', 'failed', 'superseded'].includes(ticket.status)) return ticket;
+        // 收到 model_load 推送時立即查詢，輪詢只作為備援
+        await waitForServerEvent('sigma2:model_load', intervalMs);
+    }
+    return { status: 'timeout', error: '模型載入逾時' };
+}
+
 export function initSimulatorSelectors() {
     const fileSelect = document.getElementById('dashboard-file-select');
     const modelSelect = document.getElementById('dashboard-model-select');
@@ -121,6 +145,14 @@ export function initSimulatorSelectors() {
 
             try {
                 const result = await API.post('/api/model/load', { model_path: modelPath });
+                if (result.status === 'success' && result.ticket_id) {
+                    // 模型於背景載入，切換完成前仍使用舊模型
+                    const ticket = await waitForModelLoad(result.ticket_id);
+                    if (ticket.status !== 'ready') {
+                        alert(`❌ 模型載入失敗: ${ticket.error || ticket.status}`);
+                        return;
+                    }
+                }
                 if (result.status === 'success') {
                     // Apply Y2 Axis Range from Model Config
                     // Apply Y2 Ranges (Detailed Dictionary) - NEW
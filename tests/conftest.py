@@ -0,0 +1,126 @@
+"""
+測試共用的 fixture
+
+make_agent 把策略 (frozen actor) 與 XGBoost 模擬器寫成暫存 workspace 中的 bundle，
+再經 build_model_set / swap_model_set 建立 agent，屬性與正式環境的 agent 相同
+"""
+
+import sys
+import os
+import json
+import itertools
+
+import numpy as np
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BG = ["bg_a", "bg_b", "bg_c"]
+ACTIONS = ["act_x", "act_y"]
+ACTION_STDS = [0.5, 2.0]
+GOAL = (0.4, 0.6, 0.5)  # (lsl, usl, target)
+
+
+@pytest.fixture
+def bg():
+    return list(BG)
+
+
+@pytest.fixture
+def actions():
+    return list(ACTIONS)
+
+
+def _write_policy_bundle(bundle_dir):
+    """以固定權重的線性 actor 模擬 IQL 的 deterministic predict (tanh(x @ w))"""
+    os.makedirs(bundle_dir, exist_ok=True)
+    w = np.random.default_rng(0).normal(size=(len(BG) + len(ACTIONS) + 1, len(ACTIONS)))
+    np.savez(
+        os.path.join(bundle_dir, "policy_frozen.npz"),
+        layers=np.array([], dtype=str),
+        mu_w=w.astype(np.float32),
+        mu_b=np.zeros(len(ACTIONS), dtype=np.float32),
+        format_version=np.int32(1),
+    )
+    with open(os.path.join(bundle_dir, "algo_meta.json"), "w") as f:
+        json.dump({"algo_file": "policy.d3rlpy", "frozen_file": "policy_frozen.npz"}, f)
+    with open(os.path.join(bundle_dir, "meta.json"), "w") as f:
+        json.dump({"bg_features": BG, "action_features": ACTIONS, "action_stds": ACTION_STDS}, f)
+
+
+def _write_simulator(model_dir, model):
+    import joblib
+
+    os.makedirs(model_dir, exist_ok=True)
+    model.save_model(os.path.join(model_dir, "xgb_simulator.json"))
+    joblib.dump(BG + ACTIONS, os.path.join(model_dir, "xgb_features.pkl"))
+
+
+@pytest.fixture
+def make_agent(tmp_path, monkeypatch):
+    """
+    make_agent(model, session_id="test", goal=GOAL) -> AgenticReasoning
+
+    同一個 model 只寫一次 bundle，各 agent 經 ModelCache 共用模型 (與多個 session 載入同一模型相同)
+    """
+    pytest.importorskip("xgboost")
+    import backend.dependencies
+    from backend.services.file_service import FileService
+    from core_logic.agent_logic import AgenticReasoning
+
+    files = FileService(str(tmp_path / "workspace"))
+    monkeypatch.setattr(backend.dependencies, "get_file_service", lambda: files)
+    runs = {}
+    jobs = itertools.count()
+
+    def factory(model, session_id="test", goal=GOAL):
+        run = runs.get(id(model))
+        if run is None:
+            run = str(tmp_path / "runs" / f"run_{len(runs)}")
+            _write_policy_bundle(os.path.join(run, "policy_bundle"))
+            _write_simulator(os.path.join(run, "simulator"), model)
+            runs[id(model)] = run
+
+        job = f"job_{next(jobs)}.json"
+        lsl, usl, target = goal
+        with open(os.path.join(files.get_user_path(session_id, "configs"), job), "w") as f:
+            json.dump(
+                {
+                    "run_dir": run,
+                    "run_path": os.path.join(run, "simulator"),
+                    "actions": ACTIONS,
+                    "goalSettings": {"lsl": lsl, "usl": usl, "target": target},
+                },
+                f,
+            )
+
+        agent = AgenticReasoning(session_id, auto_load=False)
+        agent.swap_model_set(agent.build_model_set(job))
+        return agent
+
+    return factory
+
+
+@pytest.fixture(scope="module")
+def xgb_model():
+    xgb = pytest.importorskip("xgboost")
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(200, len(BG) + len(ACTIONS)))
+    y = X[:, 0] * 0.3 - X[:, 3] * 0.2 + 0.5
+    model = xgb.XGBRegressor(n_estimators=20, max_depth=3)
+    model.fit(X, y)
+    return model
+
+
+@pytest.fixture(scope="module")
+def early_stopped_model():
+    """驗證集為雜訊，訓練提早停止：best_iteration 之後的樹不應參與預測"""
+    xgb = pytest.importorskip("xgboost")
+    rng = np.random.default_rng(8)
+    X = rng.normal(size=(300, len(BG) + len(ACTIONS)))
+    y = X[:, 0] * 0.3 - X[:, 3] * 0.2 + 0.5
+    model = xgb.XGBRegressor(n_estimators=40, max_depth=3, early_stopping_rounds=5)
+    model.fit(X[:200], y[:200], eval_set=[(X[200:], rng.normal(size=100))], verbose=False)
+    assert model.best_iteration < model.get_booster().num_boosted_rounds() - 1
+    return model
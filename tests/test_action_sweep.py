@@ -0,0 +1,99 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from core_logic.action_sweep import ActionSweep
+from core_logic.feature_plan import FeatureGatherPlan
+
+
+@pytest.fixture
+def sweep_enabled(monkeypatch):
+    monkeypatch.setattr(config, "ACTION_SWEEP_ENABLED", True, raising=False)
+    monkeypatch.setattr(config, "ACTION_SWEEP_CANDIDATES", 256, raising=False)
+
+
+def test_sweep_picks_closest_candidate_within_bounds(make_agent, actions, xgb_model):
+    agent = make_agent(xgb_model)
+    plan = agent._get_gather_plan()
+    y2 = {"act_x": [-0.5, 0.5]}
+    sweep = ActionSweep(plan, agent.action_stds, y2, n_candidates=64, mode="grid")
+
+    values = np.random.default_rng(4).normal(size=(3, len(plan.columns)))
+    iql = np.full((3, len(actions)), 0.1)
+    results = sweep.sweep(agent.simulator, values, 0.5, iql)
+
+    for row, res in zip(values, results):
+        targets = np.clip(plan.actions(row)[0] + sweep.deltas, [-0.5, -np.inf], [0.5, np.inf])
+        X = np.repeat(plan.xgb(row), len(targets), axis=0)
+        X[:, sweep.xgb_cols] = targets
+        best = np.abs(xgb_model.predict(X) - 0.5).min()
+        assert abs(res["predicted_y"] - 0.5) <= best + 1e-6
+        assert -0.5 <= res["suggested_actions"][0] <= 0.5
+        assert res["improvement"] >= 0
+        assert res["candidates"] == sweep.n_candidates + 1
+
+
+@pytest.mark.parametrize("n_actions, budget", [(3, 2048), (13, 256), (13, 8192)])
+def test_grid_candidates_stay_within_budget(n_actions, budget):
+    """grid 模式的候選數不超過預算 (2^n_actions 超過預算時改為隨機取樣)"""
+    acts = [f"act_{i}" for i in range(n_actions)]
+    plan = FeatureGatherPlan(["bg_a"], acts, ["bg_a"] + acts)
+    sweep = ActionSweep(plan, np.ones(n_actions), n_candidates=budget, mode="grid")
+    assert 0 < sweep.n_candidates - 1 <= budget  # 第 0 個候選為維持現狀
+    assert np.abs(sweep.deltas).max() <= 2.0
+
+
+def test_tree_subset_matches_full_model(make_agent, bg, actions, xgb_model):
+    agent = make_agent(xgb_model)
+    subset = agent.simulator.tree_subset([3])
+    assert 0 < subset.n_trees <= subset.n_total
+
+    X = np.random.default_rng(6).normal(size=(32, len(bg) + len(actions))).astype(np.float32)
+    X2 = X.copy()
+    X2[:, 3] += 1.0
+    # 只改變 act_x 時，差值完全來自子模型的樹
+    np.testing.assert_allclose(
+        xgb_model.predict(X2) - xgb_model.predict(X),
+        subset.predict(X2[:, subset.columns]) - subset.predict(X[:, subset.columns]),
+        atol=1e-5,
+    )
+
+
+def test_tree_subset_ignores_trees_after_best_iteration(
+    make_agent, bg, actions, early_stopped_model
+):
+    agent = make_agent(early_stopped_model)
+    subset = agent.simulator.tree_subset([3])
+    assert subset.n_total == early_stopped_model.best_iteration + 1
+
+    X = np.random.default_rng(7).normal(size=(32, len(bg) + len(actions))).astype(np.float32)
+    X2 = X.copy()
+    X2[:, 3] += 1.0
+    np.testing.assert_allclose(
+        early_stopped_model.predict(X2) - early_stopped_model.predict(X),
+        subset.predict(X2[:, subset.columns]) - subset.predict(X[:, subset.columns]),
+        atol=1e-5,
+    )
+
+
+def test_batch_and_single_paths_return_same_sweep(
+    make_agent, bg, actions, xgb_model, sweep_enabled
+):
+    rng = np.random.default_rng(5)
+    rows = [dict(zip(bg + actions, rng.normal(size=len(bg) + len(actions)).tolist())) for _ in range(4)]
+    ys = [0.1, 0.5, 0.9, 1.3]
+
+    single = make_agent(xgb_model)
+    expected = [single.get_reasoned_advice(r, y)["optimizer"] for r, y in zip(rows, ys)]
+    got = [r["optimizer"] for r in make_agent(xgb_model).get_reasoned_advice_batch(rows, ys)]
+
+    for e, g in zip(expected, got):
+        np.testing.assert_allclose(e["delta"], g["delta"], rtol=1e-6)
+        assert e["predicted_y"] == pytest.approx(g["predicted_y"], rel=1e-6)
+        assert e["iql_predicted_y"] == pytest.approx(g["iql_predicted_y"], rel=1e-6)
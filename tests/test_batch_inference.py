@@ -0,0 +1,108 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+xgb = pytest.importorskip("xgboost")
+shap = pytest.importorskip("shap")
+
+from core_logic.feature_plan import FeatureGatherPlan
+
+
+def test_batch_matches_per_row(make_agent, bg, actions, xgb_model):
+    rng = np.random.default_rng(2)
+    rows = [
+        dict(zip(bg + actions, rng.normal(size=len(bg) + len(actions)).tolist()))
+        for _ in range(8)
+    ]
+    ys = [0.1, 0.5, 0.9, 0.45, 1.2, -0.3, 0.55, 0.7]
+
+    single = make_agent(xgb_model)
+    expected = [single.get_reasoned_advice(r, y) for r, y in zip(rows, ys)]
+
+    batch = make_agent(xgb_model)
+    got = batch.get_reasoned_advice_batch(rows, ys)
+
+    assert len(got) == len(expected)
+    for g, e in zip(got, expected):
+        assert g["status"] == e["status"]
+        assert g["predicted_y_next"] == pytest.approx(e["predicted_y_next"], abs=1e-6)
+        np.testing.assert_allclose(
+            g["iql_action_delta_smoothed"], e["iql_action_delta_smoothed"], atol=1e-5
+        )
+        assert g["current_top_influencers"] == e["current_top_influencers"]
+        assert g["smoothed_top_influencers"] == e["smoothed_top_influencers"]
+
+
+def test_batch_missing_xgb_feature_yields_none(make_agent, bg, actions, xgb_model):
+    """缺少 XGBoost 特徵的列只影響該列，與 predict_next_y 回傳 None 一致"""
+    agent = make_agent(xgb_model)
+    full = dict(zip(bg + actions, [0.1, 0.2, 0.3, 0.4, 0.5]))
+    partial = {k: v for k, v in full.items() if k != "bg_c"}
+
+    X, mask = agent.simulator.build_feature_matrix([full, partial])
+    assert mask.tolist() == [True, False]
+
+    preds = agent.simulator.predict_matrix(X, mask)
+    assert preds[0] == pytest.approx(agent.simulator.predict_next_y(full), abs=1e-6)
+    assert preds[1] is None
+
+
+def test_gather_plan_dict_and_series_agree(bg, actions):
+    pd = pytest.importorskip("pandas")
+    plan = FeatureGatherPlan(bg, actions, ["act_y", "bg_a", "extra"])
+    row = {"bg_a": 1.0, "bg_b": 2.0, "bg_c": 3.0, "act_x": 4.0, "act_y": 5.0}
+
+    assert plan.missing(row) == {"extra"}
+    assert plan.missing_state(plan.missing(row)) == set()
+
+    from_dict = plan.gather(row)
+    from_series = plan.gather(pd.Series(row))
+    np.testing.assert_array_equal(from_dict, from_series)
+
+    np.testing.assert_array_equal(plan.state(from_dict, 0.5)[0], [1, 2, 3, 4, 5, 0.5])
+    assert np.isnan(plan.xgb(from_dict)[0, 2])
+    assert plan.snapshot(from_dict) == row
+
+
+def test_native_contribs_match_shap(make_agent, bg, actions, xgb_model, monkeypatch):
+    """booster pred_contribs 單次呼叫的預測值與歸因，應與 predict + TreeExplainer 一致"""
+    agent = make_agent(xgb_model)
+    assert agent.simulator.contrib_ready
+
+    rng = np.random.default_rng(3)
+    X = rng.normal(size=(16, len(bg) + len(actions))).astype(np.float32)
+    mask = np.ones(len(X), dtype=bool)
+    mask[5] = False
+
+    preds, contribs = agent.simulator.predict_with_contribs(X, mask)
+    expected_preds = agent.simulator.predict_matrix(X, mask)
+    expected_shap = agent.simulator.get_explainer().shap_values(X)
+
+    assert preds[5] is None and contribs[5] is None
+    for i in np.flatnonzero(mask):
+        assert preds[i] == pytest.approx(expected_preds[i], abs=1e-5)
+        np.testing.assert_allclose(contribs[i], expected_shap[i], atol=1e-5)
+
+    # 關閉原生路徑時改走 SHAP，輸出的影響因子相同
+    monkeypatch.setattr(agent.simulator, "contrib_ready", False)
+    _, shap_rows = agent._predict_and_attribute(X, mask)
+    for i in np.flatnonzero(mask):
+        assert agent._get_influencers(contribs[i]) == agent._get_influencers(shap_rows[i])
+
+
+def test_native_contribs_respect_best_iteration(make_agent, bg, actions, early_stopped_model):
+    """早停模型的預測值與歸因只使用到 best_iteration 為止的樹 (與 XGBRegressor.predict 一致)"""
+    agent = make_agent(early_stopped_model)
+    X = np.random.default_rng(9).normal(size=(16, len(bg) + len(actions))).astype(np.float32)
+
+    preds, contribs = agent.simulator.predict_with_contribs(X)
+    np.testing.assert_allclose(preds, early_stopped_model.predict(X), atol=1e-6)
+
+    best = early_stopped_model.get_booster()[: early_stopped_model.best_iteration + 1]
+    expected_shap = shap.TreeExplainer(best).shap_values(X)
+    np.testing.assert_allclose(np.stack(contribs), expected_shap, atol=1e-5)
@@ -0,0 +1,116 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_logic import reward_engine
+from core_logic.dataset_builder import build_transitions
+
+
+def _legacy_transitions(df, state_features, action_features, goal_col, action_stds, low, high):
+    """原本 engine_strategy.run_parameterized_rl 的逐列迴圈 (對照組)"""
+    states, actions, rewards, terminals = [], [], [], []
+    for i in range(len(df) - 1):
+        row, row2 = df.iloc[i], df.iloc[i + 1]
+        s = np.concatenate(
+            [
+                row[state_features].values.astype(np.float32),
+                row[action_features].values.astype(np.float32),
+                [float(row[goal_col])],
+            ]
+        )
+        a_raw = (row2[action_features].values - row[action_features].values).astype(np.float32)
+        a_norm = np.clip(a_raw / action_stds, -1.0, 1.0)
+        r = reward_engine.calculate_reward(
+            float(row[goal_col]), float(row2[goal_col]), a_norm, low=low, high=high
+        )
+        states.append(s)
+        actions.append(a_norm)
+        rewards.append(r)
+        terminals.append(False)
+    if terminals:
+        terminals[-1] = True
+    return states, actions, rewards, terminals
+
+
+@pytest.mark.parametrize("n_actions", [1, 3, 13])
+def test_vectorized_transitions_match_row_loop_bitwise(n_actions):
+    rng = np.random.default_rng(n_actions)
+    n_rows = 400
+    bg = [f"bg_{i}" for i in range(7)]
+    acts = [f"act_{i}" for i in range(n_actions)]
+    df = pd.DataFrame(rng.normal(0.0, 3.0, (n_rows, len(bg) + n_actions)), columns=bg + acts)
+    df["bg_int"] = rng.integers(-50, 50, n_rows)  # 混合 int 欄位
+    df["Y"] = rng.normal(2.15, 0.2, n_rows)
+    df.loc[::17, acts] = df.loc[::17, acts] * 40  # 超出 ±1 需裁切的動作
+    state_features = bg + ["bg_int"]
+    action_stds = df[acts].diff().dropna().std().values.astype(np.float32) + 1e-6
+
+    legacy = _legacy_transitions(df, state_features, acts, "Y", action_stds, 2.0, 2.3)
+    fast = build_transitions(df, state_features, acts, "Y", action_stds, low=2.0, high=2.3)
+
+    # 與 engine_strategy 建構 MDPDataset 時相同的 dtype 轉換
+    for old, new in zip(legacy, fast):
+        old = np.array(old, dtype=np.float32)
+        new = np.array(new, dtype=np.float32)
+        assert old.shape == new.shape
+        assert old.tobytes() == new.tobytes()
+    # 未轉型前 (_train_entry 使用) 的獎勵也逐位元相同
+    assert np.array(legacy[2]).tobytes() == fast[2].tobytes()
+    wide = build_transitions(
+        df, state_features, acts, "Y", action_stds, low=2.0, high=2.3, obs_dtype=np.float64
+    )
+    assert np.array(legacy[0]).tobytes() == wide[0].tobytes()
+    assert fast[3].sum() == 1 and fast[3][-1]
+
+
+def test_single_row_has_no_transitions():
+    df = pd.DataFrame({"bg": [1.0], "a": [0.5], "Y": [2.1]})
+    obs, act, rew, term = build_transitions(
+        df, ["bg"], ["a"], "Y", np.ones(1, np.float32), 2.0, 2.3
+    )
+    assert obs.shape == (0, 3) and act.shape == (0, 1) and rew.shape == (0,) and term.shape == (0,)
+
+
+def test_reward_functions_resolve_by_name_and_params():
+    rng = np.random.default_rng(1)
+    y, y2 = rng.normal(2.15, 0.3, 200), rng.normal(2.15, 0.3, 200)
+    a_norm = rng.uniform(-1, 1, (200, 3)).astype(np.float32)
+
+    # 預設 band 與逐筆版本逐位元相同 (區間內外兩種 lam 都有涵蓋)
+    scalar = [
+        reward_engine.calculate_reward(a, b, c, low=2.0, high=2.3)
+        for a, b, c in zip(y, y2, a_norm)
+    ]
+    vector = reward_engine.compute_rewards(y, y2, a_norm, low=2.0, high=2.3)
+    assert np.array(scalar).tobytes() == vector.tobytes()
+
+    looser = reward_engine.compute_rewards(
+        y, y2, a_norm, 2.0, 2.3, reward={"name": "band", "params": {"lam_out": 0.0}}
+    )
+    outside = (y2 < 2.0) | (y2 > 2.3)
+    assert np.all(looser[outside] > vector[outside]) and np.all(looser[~outside] == vector[~outside])
+
+    quad = reward_engine.compute_rewards(y, y2, a_norm, 2.0, 2.3, reward="band_quadratic")
+    assert quad.shape == (200,) and quad.dtype == np.float64
+
+    with pytest.raises(ValueError, match="Unknown reward"):
+        reward_engine.resolve_reward("nope")
+
+
+def test_registered_reward_is_used_by_dataset_builder(monkeypatch):
+    def const(y, y2, a_norm, low, high, value=0.0):
+        return np.full(len(y), value)
+
+    monkeypatch.setitem(reward_engine.REWARD_FUNCTIONS, "const", const)
+    df = pd.DataFrame({"bg": [1.0, 2.0, 3.0], "a": [0.0, 1.0, 0.5], "Y": [2.1, 2.2, 2.5]})
+    *_, rewards, _ = build_transitions(
+        df, ["bg"], ["a"], "Y", np.ones(1, np.float32), 2.0, 2.3,
+        reward={"name": "const", "params": {"value": 3.0}},
+    )
+    assert rewards.tolist() == [3.0, 3.0]
@@ -0,0 +1,61 @@
+import sys
+import os
+import json
+import asyncio
+import threading
+
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.event_bus import EventBus
+
+
+def _parse(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+    return int(fields["id"]), fields["event"], json.loads(fields["data"])
+
+
+@pytest.mark.asyncio
+async def test_publish_from_thread_and_heartbeat():
+    bus = EventBus(heartbeat=0.05)
+    assert bus.publish("s1", "prediction", {"seq": 0}) is None  # 尚無訂閱者，不建立頻道
+
+    stream = bus.stream("s1")
+    assert await stream.__anext__() == "retry: 3000\n\n"
+    pending = asyncio.ensure_future(stream.__anext__())
+    await asyncio.sleep(0)
+
+    # 推理 / 模型載入執行緒發布事件
+    t = threading.Thread(target=bus.publish, args=("s1", "model_load", {"status": "ready"}))
+    t.start()
+    t.join()
+    assert _parse(await pending) == (1, "model_load", {"status": "ready"})
+
+    assert await stream.__anext__() == ": ping\n\n"
+    await stream.aclose()
+    assert bus.stats()["subscribers"] == 0
+
+
+@pytest.mark.asyncio
+async def test_resume_from_last_event_id():
+    bus = EventBus(buffer_size=3, heartbeat=0.05)
+    first = bus.stream("s1")
+    await first.__anext__()
+    for i in range(5):
+        bus.publish("s1", "prediction", {"seq": i})
+    await first.aclose()
+
+    # 仍在緩衝內 -> 補送缺漏的事件
+    resumed = bus.stream("s1", last_event_id=3)
+    await resumed.__anext__()
+    assert _parse(await resumed.__anext__())[2] == {"seq": 3}
+    assert _parse(await resumed.__anext__())[2] == {"seq": 4}
+    await resumed.aclose()
+
+    # 已超出緩衝範圍 -> reset，由前端以 /history?since= 重新同步
+    stale = bus.stream("s1", last_event_id=0)
+    await stale.__anext__()
+    assert _parse(await stale.__anext__())[1] == "reset"
+    await stale.aclose()
@@ -0,0 +1,94 @@
+import sys
+import os
+import glob
+import json
+import shutil
+
+import numpy as np
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+d3rlpy = pytest.importorskip("d3rlpy")
+
+from core_logic import model_manager
+from core_logic.frozen_policy import FrozenPolicy, FROZEN_POLICY_FILE, export_frozen_policy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUNDLES = sorted(
+    os.path.dirname(p)
+    for p in glob.glob(os.path.join(ROOT, "model", "rl_run_*", "*", "policy.d3rlpy"))
+)
+
+
+@pytest.mark.skipif(not BUNDLES, reason="no d3rlpy bundle under model/rl_run_*")
+@pytest.mark.parametrize("bundle_dir", BUNDLES)
+def test_frozen_policy_matches_algo_predict(bundle_dir, tmp_path):
+    with open(os.path.join(bundle_dir, "algo_meta.json"), "r") as f:
+        algo_meta = json.load(f)
+    algo = d3rlpy.load_learnable(os.path.join(bundle_dir, algo_meta["algo_file"]))
+
+    path = export_frozen_policy(algo, str(tmp_path / FROZEN_POLICY_FILE))
+    assert path is not None
+    frozen = FrozenPolicy.load(path)
+
+    # 在訓練資料分佈附近取樣 (mean ± 3 std)，外加少量極端值
+    scaler = algo.config.observation_scaler
+    rng = np.random.default_rng(0)
+    obs_dim = frozen.observation_size
+    mean = np.asarray(scaler.mean) if scaler is not None else np.zeros(obs_dim)
+    std = np.asarray(scaler.std) if scaler is not None else np.ones(obs_dim)
+    x = (mean + rng.normal(scale=3.0, size=(256, obs_dim)) * std).astype(np.float32)
+    x[:4] = x[:4] * 10
+
+    np.testing.assert_allclose(frozen.predict(x), algo.predict(x), atol=1e-5)
+
+    with pytest.raises(AssertionError):
+        frozen.predict(x[:, :-1])
+
+
+@pytest.mark.skipif(not BUNDLES, reason="no d3rlpy bundle under model/rl_run_*")
+def test_load_policy_bundle_prefers_frozen(tmp_path):
+    bundle_dir = str(tmp_path / "policy_bundle")
+    shutil.copytree(BUNDLES[0], bundle_dir)
+
+    algo, _ = model_manager.load_policy_bundle(bundle_dir)
+    assert not isinstance(algo, FrozenPolicy)
+
+    assert model_manager.export_frozen_bundle(bundle_dir) is not None
+    with open(os.path.join(bundle_dir, "algo_meta.json"), "r") as f:
+        assert json.load(f)["frozen_file"] == FROZEN_POLICY_FILE
+
+    frozen, meta = model_manager.load_policy_bundle(bundle_dir)
+    assert isinstance(frozen, FrozenPolicy)
+    assert meta["action_stds"].dtype == np.float32
+
+    state = np.zeros((3, frozen.observation_size), dtype=np.float32)
+    np.testing.assert_allclose(frozen.predict(state), algo.predict(state), atol=1e-5)
+
+
+def test_bundle_without_frozen_actor_loads_d3rlpy_quietly(tmp_path, monkeypatch, capsys):
+    """frozen actor 匯出失敗的 bundle：algo_meta 不寫 frozen_file，載入時不出現 fallback 警告"""
+
+    class _Algo:
+        def save(self, path):
+            open(path, "wb").close()
+
+    monkeypatch.setattr(model_manager, "export_frozen_policy", lambda algo, path: None)
+    bundle_dir = str(tmp_path / "policy_bundle")
+    model_manager.save_policy_bundle(_Algo(), bundle_dir, ["bg_a"], ["act_x"], np.ones(1))
+    with open(os.path.join(bundle_dir, "algo_meta.json"), "r") as f:
+        assert "frozen_file" not in json.load(f)
+
+    # 舊版寫入 "frozen_file": null 的 bundle 也視為沒有 frozen actor
+    from core_logic.frozen_policy import load_frozen_policy
+
+    assert load_frozen_policy(bundle_dir, {"frozen_file": None}) is None
+
+    loaded = object()
+    monkeypatch.setattr(d3rlpy, "load_learnable", lambda path, device: loaded)
+    capsys.readouterr()
+    algo, meta = model_manager.load_policy_bundle(bundle_dir)
+    assert algo is loaded and meta["action_features"] == ["act_x"]
+    assert "fallback" not in capsys.readouterr().out
@@ -0,0 +1,114 @@
+import sys
+import os
+import time
+import random
+import asyncio
+import threading
+
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.inference_executor import InferenceExecutor
+from backend.utils.exceptions import ServiceOverloadedError
+
+
+@pytest.mark.asyncio
+async def test_same_session_runs_in_order():
+    """同一 session 的請求即使併發送出，也依到達順序執行 (平滑狀態依賴順序)"""
+    executor = InferenceExecutor(max_workers=4, max_pending=64, max_pending_per_session=64)
+    order = []
+
+    def work(i):
+        time.sleep(random.uniform(0, 0.005))
+        order.append(i)
+        return i
+
+    results = await asyncio.gather(*(executor.run("s1", work, i) for i in range(20)))
+
+    assert results == list(range(20))
+    assert order == list(range(20))
+    stats = executor.stats()
+    assert stats["completed"] == 20 and stats["pending"] == 0
+    assert stats["active_sessions"] == 0
+
+
+@pytest.mark.asyncio
+async def test_different_sessions_run_concurrently():
+    executor = InferenceExecutor(max_workers=2)
+    barrier = threading.Barrier(2, timeout=2)
+
+    def work(name):
+        barrier.wait()  # 兩個 session 必須同時執行才會通過
+        return name
+
+    assert await asyncio.gather(
+        executor.run("a", work, "a"), executor.run("b", work, "b")
+    ) == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_is_full():
+    executor = InferenceExecutor(max_workers=1, max_pending=2, max_pending_per_session=8)
+    gate = threading.Event()
+
+    def blocked():
+        gate.wait(2)
+        return "done"
+
+    running = [asyncio.ensure_future(executor.run(f"s{i}", blocked)) for i in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(ServiceOverloadedError) as exc_info:
+        await executor.run("s9", blocked)
+    assert exc_info.value.status_code == 503
+
+    gate.set()
+    assert await asyncio.gather(*running) == ["done", "done"]
+    stats = executor.stats()
+    assert stats["rejected"] == 1 and stats["completed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_per_session_limit():
+    executor = InferenceExecutor(max_workers=2, max_pending=64, max_pending_per_session=1)
+    gate = threading.Event()
+
+    first = asyncio.ensure_future(executor.run("s1", gate.wait, 2))
+    await asyncio.sleep(0)
+
+    with pytest.raises(ServiceOverloadedError):
+        await executor.run("s1", gate.wait, 2)
+    # 其他 session 不受影響
+    assert await executor.run("s2", lambda: "ok") == "ok"
+
+    gate.set()
+    await first
+
+
+@pytest.mark.asyncio
+async def test_cancelled_request_keeps_session_order():
+    """請求被取消 (用戶端斷線) 時，同 session 的下一個請求要等執行中的推理結束才開始"""
+    executor = InferenceExecutor(max_workers=2)
+    started, events = threading.Event(), []
+
+    def slow():
+        started.set()
+        time.sleep(0.2)
+        events.append("slow_done")
+
+    def fast():
+        events.append("fast")
+
+    first = asyncio.ensure_future(executor.run("s1", slow))
+    await asyncio.get_running_loop().run_in_executor(None, started.wait)
+    second = asyncio.ensure_future(executor.run("s1", fast))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    await second
+    assert events == ["slow_done", "fast"]
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert executor.stats()["pending"] == 0
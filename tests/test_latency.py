@@ -0,0 +1,79 @@
+import sys
+import os
+import threading
+
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_logic.latency import LatencyRegistry, activate, lap
+
+
+def test_stages_recorded_per_session_and_model(make_agent, bg, actions, xgb_model):
+    registry = LatencyRegistry(window=16, enabled=True)
+    agent = make_agent(xgb_model)
+    row = dict(zip(bg + actions, [0.1, -0.2, 0.3, 0.5, 1.0]))
+
+    for _ in range(3):
+        trace = registry.start()
+        trace.model = "bundle_a"
+        # 推理在其他執行緒進行，以 activate() 設定該執行緒的 trace
+        t = threading.Thread(target=lambda: _run(agent, row, trace))
+        t.start()
+        t.join()
+        trace.lap("history")
+        registry.record("s1", trace)
+
+    snap = registry.snapshot()
+    stages = snap["sessions"]["s1"]["stages"]
+    assert {
+        "gather", "iql", "xgb", "smoothing", "attribution_smoothing", "compose", "history", "total"
+    } <= set(stages)
+    assert stages["total"]["samples"] == 3
+    assert stages["total"]["p50"] <= stages["total"]["p99"]
+    assert snap["models"]["bundle_a"]["count"] == 3
+
+    failed = registry.start()
+    with pytest.raises(KeyError):
+        with activate(failed):
+            agent.get_reasoned_advice({}, 0.5)
+    registry.record("s1", failed)
+    assert registry.snapshot()["sessions"]["s1"]["errors"] == 1
+
+
+def _run(agent, row, trace):
+    with activate(trace):
+        agent.get_reasoned_advice(row, 0.9)
+
+
+def test_readahead_hit_records_stages(make_agent, bg, actions, xgb_model):
+    """預讀命中的請求也有分段計時 (readahead_hit 取代 gather ~ xgb)"""
+    from backend.services.prediction_service import PredictionService
+
+    service = PredictionService()
+    agent = make_agent(xgb_model, "hit")
+    service._agents["hit"] = agent
+    row = dict(zip(bg + actions, [0.1, -0.2, 0.3, 0.5, 1.0]))
+    values = agent.gather_rows([row])
+    precomputed = (values, agent.infer_raw(values, [0.9]), agent.model_generation)
+
+    registry = LatencyRegistry(window=16, enabled=True)
+    trace = registry.start()
+    trace.lap("readahead_hit")
+    service._predict_precomputed_sync(row, 0.9, "hit", precomputed, trace)
+    trace.lap("history")
+    registry.record("hit", trace)
+
+    stages = registry.snapshot()["sessions"]["hit"]["stages"]
+    assert {"readahead_hit", "queue", "smoothing", "format", "history"} <= set(stages)
+    assert "gather" not in stages and "iql" not in stages
+
+
+def test_disabled_registry_creates_no_trace():
+    registry = LatencyRegistry(enabled=False)
+    assert registry.start() is None
+    assert registry.start(force=True) is not None  # debug 旗標仍可取得單次耗時
+    lap("gather")  # 沒有 trace 時為 no-op
+    registry.record("s1", registry.start(force=True))
+    assert registry.snapshot()["sessions"] == {}
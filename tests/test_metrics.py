@@ -0,0 +1,72 @@
+import sys
+import os
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.middleware.metrics import add_metrics_middleware
+from backend.utils import metrics
+
+
+def _app():
+    router = APIRouter()
+
+    @router.get("/model/load_status/{ticket_id}")
+    async def status(ticket_id: str):
+        return {"ticket": ticket_id}
+
+    app = FastAPI()
+    add_metrics_middleware(app)
+    app.include_router(router, prefix="/api/dashboard")
+
+    @app.get("/metrics")
+    async def scrape():
+        return metrics.render_latest()
+
+    return app
+
+
+def test_requests_labelled_by_route_template():
+    before = metrics.http_requests.value(
+        ("dashboard", "GET", "/api/dashboard/model/load_status/{ticket_id}", "200")
+    )
+    with TestClient(_app()) as client:
+        for ticket in ("a", "b", "c"):
+            client.get(f"/api/dashboard/model/load_status/{ticket}")
+        client.get("/no/such/path/123")
+
+    # 不同的 ticket_id 計入同一個路由模板
+    labels = ("dashboard", "GET", "/api/dashboard/model/load_status/{ticket_id}", "200")
+    assert metrics.http_requests.value(labels) == before + 3
+    assert metrics.http_requests.value(("unmatched", "GET", "unmatched", "404")) >= 1
+
+    text = metrics.registry.render()
+    assert "ticket_id}" in text and "/api/dashboard/model/load_status/a" not in text
+    assert (
+        'sigma2_http_request_duration_seconds_bucket{router="dashboard",method="GET",'
+        'route="/api/dashboard/model/load_status/{ticket_id}",le="+Inf"}'
+    ) in text
+
+
+def test_llm_calls_and_callback_gauges():
+    with metrics.track_llm_call():
+        assert metrics.llm_in_flight.value() == 1
+    with pytest.raises(ConnectionError):
+        with metrics.track_llm_call():
+            raise ConnectionError("down")
+    assert metrics.llm_in_flight.value() == 0
+
+    assert 'sigma2_llm_calls_total{outcome="error"}' in metrics.registry.render()
+
+    registry = metrics.MetricsRegistry()
+    registry.gauge_callback(
+        "sigma2_sessions", "Live sessions.", lambda: {("dashboard",): 2}, ("kind",)
+    )
+    registry.gauge_callback("sigma2_broken", "Broken gauge.", lambda: 1 / 0)
+    text = registry.render()
+    assert 'sigma2_sessions{kind="dashboard"} 2' in text
+    assert "sigma2_broken" not in text  # 收集失敗的 gauge 略過
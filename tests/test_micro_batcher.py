@@ -0,0 +1,102 @@
+import sys
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+xgb = pytest.importorskip("xgboost")
+pytest.importorskip("shap")
+
+from backend.services.micro_batcher import MicroBatcher
+
+
+@pytest.mark.asyncio
+async def test_micro_batch_matches_sequential(make_agent, bg, actions, xgb_model):
+    """多個 session 合併推理的結果，應與各 session 單獨依序推理相同 (含平滑)"""
+    rng = np.random.default_rng(4)
+    n_sessions, n_steps = 6, 4
+    rows = [
+        [
+            dict(zip(bg + actions, rng.normal(size=len(bg) + len(actions)).tolist()))
+            for _ in range(n_steps)
+        ]
+        for _ in range(n_sessions)
+    ]
+    ys = rng.uniform(0.0, 1.0, size=(n_sessions, n_steps)).tolist()
+
+    expected = []
+    for s in range(n_sessions):
+        agent = make_agent(xgb_model, f"s{s}")
+        expected.append(
+            [agent.get_reasoned_advice(r, y) for r, y in zip(rows[s], ys[s])]
+        )
+
+    batcher = MicroBatcher(ThreadPoolExecutor(max_workers=2), window_ms=20, max_batch=32)
+    agents = [make_agent(xgb_model, f"s{s}") for s in range(n_sessions)]
+    for step in range(n_steps):
+        got = await asyncio.gather(
+            *(
+                batcher.submit(agents[s], rows[s][step], ys[s][step])
+                for s in range(n_sessions)
+            )
+        )
+        for s, g in enumerate(got):
+            e = expected[s][step]
+            assert g["predicted_y_next"] == pytest.approx(e["predicted_y_next"], abs=1e-6)
+            np.testing.assert_allclose(
+                g["iql_action_delta_smoothed"], e["iql_action_delta_smoothed"], atol=1e-5
+            )
+            assert g["smoothed_top_influencers"] == e["smoothed_top_influencers"]
+
+    stats = batcher.stats()
+    assert stats["requests"] == n_sessions * n_steps
+    assert stats["batches"] < stats["requests"]
+    assert stats["fallbacks"] == 0
+
+
+@pytest.mark.asyncio
+async def test_sessions_with_different_goals_are_not_merged(
+    make_agent, bg, actions, xgb_model, monkeypatch
+):
+    """共用模型但目標規格不同的 session 不可合併，候選掃描依各自的 target_center"""
+    import config
+
+    monkeypatch.setattr(config, "ACTION_SWEEP_ENABLED", True, raising=False)
+    monkeypatch.setattr(config, "ACTION_SWEEP_CANDIDATES", 64, raising=False)
+    goals = {"low": (0.4, 0.6, 0.5), "high": (0.8, 1.0, 0.9)}
+
+    def agent_for(session_id):
+        return make_agent(xgb_model, session_id, goal=goals[session_id])
+
+    row = dict(zip(bg + actions, [0.1, 0.2, 0.3, 0.4, 0.5]))
+    expected = [agent_for(sid).get_reasoned_advice(row, 0.7)["optimizer"] for sid in goals]
+
+    agents = [agent_for(sid) for sid in goals]
+    assert agents[0].batch_key() != agents[1].batch_key()
+    batcher = MicroBatcher(ThreadPoolExecutor(max_workers=1), window_ms=20)
+    got = await asyncio.gather(*(batcher.submit(a, row, 0.7) for a in agents))
+    for g, e in zip(got, expected):
+        np.testing.assert_allclose(g["optimizer"]["delta"], e["delta"], rtol=1e-6)
+        assert g["optimizer"]["predicted_y"] == pytest.approx(e["predicted_y"], rel=1e-6)
+
+
+@pytest.mark.asyncio
+async def test_micro_batch_isolates_bad_row(make_agent, bg, actions, xgb_model):
+    """單一請求缺少狀態欄位時只影響該請求"""
+    batcher = MicroBatcher(ThreadPoolExecutor(max_workers=1), window_ms=20)
+    good, bad = make_agent(xgb_model, "good"), make_agent(xgb_model, "bad")
+    row = dict(zip(bg + actions, [0.1, 0.2, 0.3, 0.4, 0.5]))
+    broken = {k: v for k, v in row.items() if k != "bg_a"}
+
+    results = await asyncio.gather(
+        batcher.submit(good, row, 0.5),
+        batcher.submit(bad, broken, 0.5),
+        return_exceptions=True,
+    )
+    assert isinstance(results[0], dict)
+    assert isinstance(results[1], KeyError)
@@ -0,0 +1,91 @@
+import sys
+import os
+
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_logic.model_cache import ModelCache
+
+
+def _make_bundle(root, name, size):
+    path = root / name
+    path.mkdir()
+    (path / "model.bin").write_bytes(b"\0" * size)
+    return str(path)
+
+
+class CountingLoader:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, path):
+        self.calls.append(path)
+        return object()
+
+
+def test_sessions_share_one_loaded_model(tmp_path):
+    cache = ModelCache(max_bytes=10_000)
+    loader = CountingLoader()
+    bundle = _make_bundle(tmp_path, "a", 100)
+
+    k1, v1 = cache.acquire("policy", bundle, loader)
+    k2, v2 = cache.acquire("policy", bundle, loader)
+
+    assert v1 is v2 and k1 == k2
+    assert len(loader.calls) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["items"][0]["refs"] == 2
+
+
+def test_lru_eviction_skips_referenced_entries(tmp_path):
+    cache = ModelCache(max_bytes=250)
+    loader = CountingLoader()
+    a = _make_bundle(tmp_path, "a", 100)
+    b = _make_bundle(tmp_path, "b", 100)
+    c = _make_bundle(tmp_path, "c", 100)
+
+    ka, _ = cache.acquire("policy", a, loader)
+    kb, _ = cache.acquire("policy", b, loader)
+    cache.release(kb)  # b 無人參考，a 仍在使用
+    cache.acquire("policy", c, loader)
+
+    paths = {item["path"] for item in cache.stats()["items"]}
+    assert os.path.realpath(a) in paths
+    assert os.path.realpath(b) not in paths
+    assert cache.stats()["evictions"] == 1
+
+    # 再次取得 b 需要重新載入
+    cache.acquire("policy", b, loader)
+    assert loader.calls.count(b) == 2
+
+
+def test_modified_bundle_is_reloaded(tmp_path):
+    cache = ModelCache(max_bytes=10_000)
+    loader = CountingLoader()
+    bundle = _make_bundle(tmp_path, "a", 100)
+
+    k1, v1 = cache.acquire("simulator", bundle, loader)
+    (tmp_path / "a" / "model.bin").write_bytes(b"\1" * 120)
+    k2, v2 = cache.acquire("simulator", bundle, loader)
+
+    assert k1 != k2 and v1 is not v2
+    assert len(loader.calls) == 2
+
+
+def test_failed_load_is_not_cached(tmp_path):
+    cache = ModelCache(max_bytes=10_000)
+    bundle = _make_bundle(tmp_path, "a", 10)
+
+    def broken(path):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.acquire("policy", bundle, broken)
+    assert cache.stats()["entries"] == 0
+
+    loader = CountingLoader()
+    cache.acquire("policy", bundle, loader)
+    assert len(loader.calls) == 1
@@ -0,0 +1,102 @@
+import sys
+import os
+import time
+import threading
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.model_load_service import ModelLoadService
+
+
+class FakeModelSet:
+    def __init__(self, name):
+        self.name = name
+        self.errors = []
+        self.iql_algo = object()
+        self.simulator = None
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+
+class FakeAgent:
+    """build_model_set 會等待 gate，模擬耗時的模型載入"""
+
+    def __init__(self):
+        self.current = "old"
+        self.gates = {}
+        self.built = []
+
+    def build_model_set(self, model_path, progress=None):
+        progress("loading_policy", 30)
+        self.gates.setdefault(model_path, threading.Event()).wait(5)
+        if model_path == "broken.json":
+            raise FileNotFoundError("policy bundle missing")
+        ms = FakeModelSet(model_path)
+        self.built.append(ms)
+        return ms
+
+    def swap_model_set(self, model_set):
+        self.current = model_set.name
+
+
+def _wait_status(service, ticket_id, statuses, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        ticket = service.get_ticket(ticket_id)
+        if ticket["status"] in statuses:
+            return ticket
+        time.sleep(0.01)
+    raise AssertionError(f"ticket stuck in {ticket['status']}")
+
+
+def test_load_returns_ticket_and_swaps_when_ready():
+    service = ModelLoadService()
+    agent = FakeAgent()
+    swapped = []
+
+    ticket = service.submit("s1", "job_a.json", agent, lambda: swapped.append(True))
+    assert ticket["status"] == "queued"
+
+    _wait_status(service, ticket["ticket_id"], {"loading"})
+    # 載入期間仍使用舊模型
+    assert agent.current == "old"
+
+    agent.gates.setdefault("job_a.json", threading.Event()).set()
+    done = _wait_status(service, ticket["ticket_id"], {"ready"})
+    assert done["progress"] == 100
+    assert agent.current == "job_a.json"
+    assert swapped == [True]
+    assert service.get_latest("s1")["ticket_id"] == ticket["ticket_id"]
+
+
+def test_newer_request_supersedes_older_build():
+    service = ModelLoadService()
+    agent = FakeAgent()
+
+    first = service.submit("s1", "job_a.json", agent)
+    _wait_status(service, first["ticket_id"], {"loading"})
+    second = service.submit("s1", "job_b.json", agent)
+
+    agent.gates.setdefault("job_b.json", threading.Event()).set()
+    _wait_status(service, second["ticket_id"], {"ready"})
+    agent.gates.setdefault("job_a.json", threading.Event()).set()
+    _wait_status(service, first["ticket_id"], {"superseded"})
+
+    assert agent.current == "job_b.json"
+    assert [ms.released for ms in agent.built if ms.name == "job_a.json"] == [True]
+
+
+def test_failed_load_keeps_old_model():
+    service = ModelLoadService()
+    agent = FakeAgent()
+    agent.gates["broken.json"] = threading.Event()
+    agent.gates["broken.json"].set()
+
+    ticket = service.submit("s1", "broken.json", agent)
+    failed = _wait_status(service, ticket["ticket_id"], {"failed"})
+
+    assert "policy bundle missing" in failed["error"]
+    assert agent.current == "old"
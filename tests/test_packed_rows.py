@@ -0,0 +1,63 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.packed_rows import decode_rows, describe_schema
+from core_logic.feature_plan import FeatureGatherPlan
+
+
+def _pack(rows, ys, columns):
+    return np.array(
+        [[y] + [r.get(c, np.nan) for c in columns] for r, y in zip(rows, ys)],
+        dtype="<f4",
+    ).tobytes()
+
+
+def test_schema_id_follows_feature_order(bg, actions):
+    plan = FeatureGatherPlan(bg, actions, bg + actions)
+    assert plan.schema_id == FeatureGatherPlan(bg, actions, bg + actions).schema_id
+    assert plan.schema_id != FeatureGatherPlan(bg[::-1], actions, bg + actions).schema_id
+
+    schema = describe_schema(plan, generation=3)
+    assert schema["layout"] == ["measure_value"] + bg + actions
+    assert schema["row_bytes"] == 4 * (len(bg) + len(actions) + 1)
+
+    with pytest.raises(ValueError):
+        decode_rows(b"\x00" * (schema["row_bytes"] + 2), len(plan.columns))
+
+
+def test_packed_rows_match_json_rows(make_agent, bg, actions, xgb_model):
+    rng = np.random.default_rng(3)
+    cols = bg + actions
+    # 先轉成 float32，讓 JSON 路徑與二進位路徑看到相同數值
+    rows = [
+        dict(zip(cols, rng.normal(size=len(cols)).astype(np.float32).tolist()))
+        for _ in range(6)
+    ]
+    ys = [0.1, 0.5, 0.9, float("nan"), 1.2, 0.55]
+
+    expected = make_agent(xgb_model).get_reasoned_advice_batch(
+        rows, [0.0 if y != y else np.float32(y) for y in ys]
+    )
+
+    agent = make_agent(xgb_model)
+    plan = agent._get_gather_plan()
+    values, packed_ys = decode_rows(_pack(rows, ys, plan.columns), len(plan.columns))
+    assert packed_ys[3] == 0.0
+    got = agent.get_reasoned_advice_batch(values, packed_ys.tolist())
+
+    for e, g in zip(expected, got):
+        assert e["status"] == g["status"]
+        assert e["feature_snapshots"] == g["feature_snapshots"]
+        np.testing.assert_allclose(e["iql_action_delta"], g["iql_action_delta"], rtol=1e-6)
+
+    # 狀態欄位缺值與 JSON 路徑一樣拋出 KeyError
+    rows[2] = {k: v for k, v in rows[2].items() if k != "bg_b"}
+    values, packed_ys = decode_rows(_pack(rows, ys, plan.columns), len(plan.columns))
+    with pytest.raises(KeyError):
+        agent.get_reasoned_advice_batch(values, packed_ys.tolist())
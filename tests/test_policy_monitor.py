@@ -0,0 +1,85 @@
+import sys
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from core_logic.monitor_utils import PolicyStabilityCallback
+
+
+class _FakeAlgo:
+    """依狀態算出確定的動作；記錄 predict 呼叫次數"""
+
+    def __init__(self):
+        self.calls = 0
+        self.shift = 0.0
+
+    def predict(self, states):
+        self.calls += 1
+        y = states[:, -1:]
+        bg = states[:, :2].mean(axis=1, keepdims=True)
+        return np.tanh(y - bg - self.shift) * [1.0, -0.5]
+
+
+def _legacy_avg_actions(cb, algo):
+    """原本逐探針、逐 y 呼叫 predict 的算法 (對照組)"""
+    batch = []
+    for i in cb.probe_indices:
+        row = cb.df.iloc[i]
+        bg = row[cb.bg_features].values.astype(np.float32)
+        x0 = row[cb.action_features].values.astype(np.float32)
+        actions = []
+        for y in cb.y_grid:
+            s = np.concatenate([bg, x0, [y]]).astype(np.float32)
+            actions.append(algo.predict(s[None, :])[0])
+        batch.append(np.stack(actions))
+    return np.mean(np.stack(batch), axis=0)
+
+
+def test_batched_probes_single_predict_and_throttled_plot(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DASHBOARD_DIR", str(tmp_path))
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(1.0, 0.2, (50, 5)), columns=["b1", "b2", "b3", "a1", "a2"])
+    df["Y"] = rng.normal(2.1, 0.1, 50)
+    cb = PolicyStabilityCallback(
+        df, ["b1", "b2", "b3"], ["a1", "a2"], "Y", np.ones(2), 2.0, 2.3,
+        plot_every=3, plot_async=False,
+    )
+    plotted = []
+    monkeypatch.setattr(cb, "_save_monitor_plot", lambda epoch, *a: plotted.append(epoch))
+
+    algo = _FakeAlgo()
+    for epoch in range(1, 6):
+        algo.shift = 0.01 * epoch
+        diff = cb.on_epoch_end(algo)
+    assert algo.calls == 5  # 每個 epoch 一次 predict
+    np.testing.assert_allclose(cb.prev_actions, _legacy_avg_actions(cb, algo), rtol=1e-6, atol=1e-7)
+    assert diff > 0
+
+    assert plotted == [1, 3]
+    cb.close()
+    assert plotted == [1, 3, 5]  # 收尾補繪最後一個 epoch
+
+    data = json.loads((tmp_path / "policy_slice.json").read_text())
+    assert data["epoch"] == 5 and data["epochs"] == [2, 3, 4, 5]
+    assert len(data["y_grid"]) == 100 and set(data["actions"]) == {"a1", "a2"}
+    assert data["actions"]["a1"][0] == float(f"{cb.prev_actions[0, 0]:.6g}")
+    assert json.loads((tmp_path / "status.json").read_text())["epoch"] == 5
+
+
+def test_background_plot_writes_png(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DASHBOARD_DIR", str(tmp_path))
+    df = pd.DataFrame(
+        {"b1": [1.0, 2.0, 3.0], "b2": [0.0, 1.0, 0.0], "a1": [0.1, 0.2, 0.3], "a2": [0.0] * 3}
+    )
+    df["Y"] = 2.0
+    cb = PolicyStabilityCallback(df, ["b1", "b2"], ["a1", "a2"], "Y", np.ones(2), plot_every=1)
+    cb.on_epoch_end(_FakeAlgo())
+    cb.close()
+    assert (tmp_path / "plot.png").stat().st_size > 0
+    assert not list(tmp_path.glob("*.tmp*"))
@@ -0,0 +1,137 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.prediction_history import PredictionHistory, REC_KEYS
+
+
+def _result(i, actions=("act_x", "act_y"), extra_feat=None):
+    snaps = {"bg_a": i * 0.5, "bg_b": 1.0}
+    if extra_feat:
+        snaps[extra_feat] = 2.0
+    return {
+        "status": "HOLD" if i % 3 == 0 else "ADJUST",
+        "current_measure": 0.25 * i,
+        "measure_name": "Y",
+        "target_range": [0.5, 1.5],
+        "recommendations": {
+            a: dict(zip(REC_KEYS, [float(i), 0.5, 0.25, i + 0.5, i + 0.25])) for a in actions
+        },
+        "feature_snapshots": snaps,
+        "predicted_y_next": None if i % 3 == 0 else 0.75,
+        "top_influencers": ["bg_a"],
+        "current_top_influencers": ["bg_a"],
+        "smoothed_top_influencers": ["bg_b"],
+        "diagnosis": f"row {i}",
+        "timestamp": 1000.0 + i,
+        **({"goal_name": "Y"} if i % 2 else {}),
+    }
+
+
+def test_ring_buffer_keeps_latest_rows_as_dicts():
+    history = PredictionHistory(capacity=4)
+    for i in range(6):
+        history.append(_result(i))
+
+    assert len(history) == 4
+    assert [r["diagnosis"] for r in history] == ["row 2", "row 3", "row 4", "row 5"]
+    assert history[-1] == _result(5)
+    assert history[0] == _result(2)
+    assert [r["timestamp"] for r in history[-2:]] == [1004.0, 1005.0]
+
+
+def test_measure_and_prediction_keep_full_precision():
+    """量測值 / 預測值 / 規格上下限以 float64 保存，讀回與寫入的值完全相同"""
+    history = PredictionHistory(capacity=2)
+    row = dict(_result(1), current_measure=1234.5678901, predicted_y_next=0.1)
+    row["target_range"] = [0.3, 2.7]
+    history.append(row)
+
+    assert history[-1]["current_measure"] == 1234.5678901
+    assert history[-1]["predicted_y_next"] == 0.1
+    assert history[-1]["target_range"] == [0.3, 2.7]
+    cols = history.since(0, ["current_measure", "predicted_y_next", "target_low"])["columns"]
+    assert cols["current_measure"] == [1234.5678901]
+    assert cols["predicted_y_next"] == [0.1] and cols["target_low"] == [0.3]
+
+
+def test_since_returns_only_new_rows_and_resets_on_overwrite():
+    history = PredictionHistory(capacity=4)
+    for i in range(3):
+        history.append(_result(i))
+
+    first = history.since(0)
+    assert first["count"] == 3 and not first["reset"]
+    cursor = first["cursor"]
+
+    history.append(_result(3, extra_feat="bg_new"))
+    delta = history.since(cursor, ["timestamp", "feature_snapshots", "status"])
+    assert delta["count"] == 1 and delta["start"] == cursor
+    assert set(delta["columns"]) == {"timestamp", "feature_snapshots", "status"}
+    assert delta["columns"]["feature_snapshots"]["bg_new"] == [2.0]
+    assert delta["status_labels"][delta["columns"]["status"][0]] == "HOLD"
+
+    # cursor 指向的資料已被覆寫 -> reset，從保留的第一筆重送
+    for i in range(4, 9):
+        history.append(_result(i))
+    stale = history.since(cursor)
+    assert stale["reset"] and stale["start"] == history.first_seq
+    assert stale["count"] == 4
+
+    # 不同時期的特徵欄位以 null 補齊
+    mixed = history.since(None, ["feature_snapshots"])
+    assert "bg_new" not in mixed["columns"]["feature_snapshots"]
+
+
+def test_clear_keeps_cursor_monotonic():
+    history = PredictionHistory(capacity=8)
+    for i in range(3):
+        history.append(_result(i, actions=("act_x",)))
+    cursor = history.since(0)["cursor"]
+
+    history.clear()
+    assert not history and history.to_list() == []
+    resp = history.since(cursor)
+    assert resp["count"] == 0 and resp["total"] == 0
+
+    history.append(_result(7))
+    resp = history.since(cursor)
+    assert resp["count"] == 1
+    np.testing.assert_allclose(
+        resp["columns"]["recommendations"]["act_y"]["suggested_next"], [7.5]
+    )
+
+
+def test_feature_columns_grow_with_new_models():
+    """切換模型後特徵欄位增加，矩陣自動加寬且舊紀錄不受影響"""
+    history = PredictionHistory(capacity=4)
+    history.append(_result(0))
+    wide = _result(1)
+    wide["feature_snapshots"] = {f"f{i}": float(i) for i in range(150)}
+    history.append(wide)
+
+    assert history[0] == _result(0)
+    assert history[1] == wide
+    snaps = history.since(0, ["feature_snapshots"])["columns"]["feature_snapshots"]
+    assert snaps["f149"] == [None, 149.0]
+    assert snaps["bg_a"] == [0.0, None]
+
+
+def test_feature_matrices_are_sized_by_first_append():
+    """未預測的 session 不預先配置特徵矩陣；第一次寫入時依實際欄位數配置"""
+    empty = PredictionHistory()
+    assert empty.nbytes() < 1024**2
+    assert empty.to_list() == [] and empty.since()["count"] == 0
+
+    history = PredictionHistory()
+    history.append(_result(0))
+    assert history._recs.data.shape == (history.capacity, 2, len(REC_KEYS))
+    assert history._snapshots.data.shape == (history.capacity, 2)
+    history.append(_result(1, actions=("act_x", "act_y", "act_z")))
+    assert history._recs.data.shape[1] == 4
+    assert history[0] == _result(0) and history[1] == _result(1, actions=("act_x", "act_y", "act_z"))
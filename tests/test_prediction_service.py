@@ -0,0 +1,51 @@
+import sys
+import os
+import threading
+
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.prediction_service import PredictionService
+
+
+@pytest.mark.parametrize(
+    "advise, predict",
+    [
+        ("get_reasoned_advice", lambda s, row: s._predict_sync(row, 0.5, "swap")),
+        (
+            "get_reasoned_advice_batch",
+            lambda s, row: s._predict_batch_sync([row], [0.5], "swap")[0],
+        ),
+    ],
+)
+def test_model_swap_waits_until_output_is_formatted(
+    make_agent, bg, actions, xgb_model, monkeypatch, advise, predict
+):
+    """推理完成後背景載入切換模型：格式化仍使用推理時的 action 欄位與目標範圍"""
+    service = PredictionService()
+    agent = make_agent(xgb_model, "swap")
+    service._agents["swap"] = agent
+
+    new_set = agent.build_model_set(agent.model_target)
+    new_set.action_features = actions[:1]
+    new_set.y_low, new_set.y_high = 5.0, 6.0
+    swapper = threading.Thread(target=agent.swap_model_set, args=(new_set,))
+
+    original = getattr(agent, advise)
+
+    def advise_then_swap(*args):
+        out = original(*args)
+        swapper.start()
+        swapper.join(0.2)  # 仍持有模型鎖時，切換必須等待
+        return out
+
+    monkeypatch.setattr(agent, advise, advise_then_swap)
+    row = dict(zip(bg + actions, [0.1, -0.2, 0.3, 0.5, 1.0]))
+    out = predict(service, row)
+    swapper.join()
+
+    assert list(out["recommendations"]) == actions
+    assert out["target_range"] == [0.4, 0.6]
+    assert agent.action_features == actions[:1]  # 切換在格式化之後完成
@@ -0,0 +1,77 @@
+import sys
+import os
+import time
+import asyncio
+
+from fastapi import FastAPI, Body
+from fastapi.testclient import TestClient
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.file_service import FileService
+from backend.services.profile_service import ProfileService
+from backend.middleware.profiling import add_profiling_middleware
+from backend.routers import file_router
+from backend.dependencies import get_profile_service
+from backend.middleware.exception_handler import sigma2_exception_handler
+from backend.utils import Sigma2Exception
+
+
+def _busy_tool(seconds):
+    """模擬於執行緒池執行的背景工具"""
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(200))
+    return total
+
+
+def _app(tmp_path):
+    service = ProfileService(
+        FileService(str(tmp_path)), enabled=True, allowed_paths=["/predict"], interval=0.002
+    )
+    app = FastAPI()
+    app.add_exception_handler(Sigma2Exception, sigma2_exception_handler)
+
+    @app.post("/predict")
+    async def predict(payload: dict = Body(...)):
+        await asyncio.to_thread(_busy_tool, 0.2)
+        return {"ok": True}
+
+    @app.post("/other")
+    async def other(payload: dict = Body(...)):
+        return {"ok": True}
+
+    add_profiling_middleware(app, service)
+    app.include_router(file_router.router, prefix="/api/files")
+    app.dependency_overrides[get_profile_service] = lambda: service
+    return app
+
+
+def test_profile_captured_for_flagged_request(tmp_path):
+    with TestClient(_app(tmp_path)) as client:
+        r = client.post(
+            "/predict", json={"session_id": "s1", "x": 1}, headers={"X-Sigma2-Profile": "1"}
+        )
+        assert r.status_code == 200 and r.json() == {"ok": True}  # 本體原樣轉交
+        name = r.headers["x-sigma2-profile"]
+
+        # 未帶旗標或路徑不在允許清單內時不剖析
+        assert "x-sigma2-profile" not in client.post("/predict", json={"session_id": "s1"}).headers
+        assert "x-sigma2-profile" not in client.post("/other?profile=1", json={}).headers
+
+        listing = client.get("/api/files/profiles", params={"session_id": "s1"}).json()
+        assert [p["name"] for p in listing["profiles"]] == [name]
+        assert listing["profiles"][0]["samples"] > 0
+
+        folded = client.get(f"/api/files/profiles/{name}", params={"session_id": "s1"}).text
+        # 背景執行緒的工作也被取樣
+        assert "_busy_tool" in folded
+        stack, count = folded.splitlines()[0].rsplit(" ", 1)
+        assert int(count) > 0 and ";" in stack
+
+        missing = client.get("/api/files/profiles/profile_missing.folded", params={"session_id": "s1"})
+        assert missing.status_code == 404
+        other = client.get("/api/files/profiles/notes.txt", params={"session_id": "s1"})
+        assert other.status_code == 403
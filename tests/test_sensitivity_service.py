@@ -0,0 +1,54 @@
+import sys
+import os
+import asyncio
+
+import numpy as np
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.sensitivity_service import SensitivityService
+from backend.utils import ValidationError
+
+
+class _StubPredictionService:
+    def __init__(self, agent):
+        self.agent = agent
+
+    def get_agent(self, session_id):
+        return self.agent
+
+
+def test_curves_match_pointwise_predictions_and_are_cached(
+    make_agent, bg, actions, xgb_model
+):
+    agent = make_agent(xgb_model)
+    service = SensitivityService(_StubPredictionService(agent), points=9)
+    row = dict(zip(bg + actions, [0.1, -0.2, 0.3, 0.5, 1.0]))
+
+    out = service._curves_sync("s1", row, None, None, None, {"act_y": [0.0, 1.0, 2.0]})
+    assert set(out["curves"]) == set(actions) and out["computed"] == 2
+
+    curve = out["curves"]["act_x"]
+    assert len(curve["grid"]) == 9
+    # 網格以目前值為中心 (± 2 × action_std)
+    assert curve["grid"][4] == pytest.approx(row["act_x"], abs=1e-6)
+    X = np.tile(np.array([row[f] for f in bg + actions], dtype=np.float32), (9, 1))
+    X[:, 3] = curve["grid"]
+    np.testing.assert_allclose(curve["predicted"], xgb_model.predict(X), rtol=1e-6)
+    assert out["curves"]["act_y"]["grid"] == [0.0, 1.0, 2.0]
+
+    again = service._curves_sync("s1", row, ["act_x"], None, None, None)
+    assert again["computed"] == 0 and again["curves"]["act_x"] == curve
+    assert service.stats()["hits"] == 1
+
+    with pytest.raises(ValidationError):
+        service._curves_sync("s1", row, ["no_such_feature"], None, None, None)
+
+    # 網格點數超過上限的請求直接拒絕 (400)
+    small = SensitivityService(_StubPredictionService(agent), points=9, max_points=16)
+    with pytest.raises(ValidationError):
+        asyncio.run(small.curves("s1", row, points=17))
+    with pytest.raises(ValidationError):
+        asyncio.run(small.curves("s1", row, grids={"act_y": list(range(17))}))
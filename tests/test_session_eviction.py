@@ -0,0 +1,131 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.prediction_service import PredictionService
+from backend.services.session_service import SessionService
+from backend.services.session_eviction import SessionEvictionService
+from backend.services.event_bus import EventBus
+from tests.test_prediction_history import _result
+
+
+class _Agent:
+    """已載入模型組的 Agent (只記錄載入目標)"""
+
+    model_generation = 1
+    model_target = "job_abc.json"
+    _model_keys = {}
+
+
+class _FakePredictionService:
+    """agents: session_id -> 最後存取時間；loaded: session_id -> _Agent"""
+
+    def __init__(self):
+        self.agents = {}
+        self.loaded = {}
+
+    def find_agent(self, session_id):
+        return self.loaded.get(session_id)
+
+    def agent_ids(self):
+        return list(self.agents)
+
+    def last_access(self, session_id):
+        return self.agents.get(session_id)
+
+    def remove_agent(self, session_id):
+        self.loaded.pop(session_id, None)
+        return self.agents.pop(session_id, None) is not None
+
+
+class _FakeModelLoadService:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, session_id, model_path, agent, on_swapped=None):
+        self.submitted.append((session_id, model_path, agent))
+
+
+def _service(**kwargs):
+    sessions = SessionService()
+    prediction = _FakePredictionService()
+    service = SessionEvictionService(sessions, prediction, event_bus=EventBus(), **kwargs)
+    return sessions, prediction, service
+
+
+def _load(sessions, session_id, rows):
+    session = sessions.get_dashboard_session(session_id)
+    session.sim_df = pd.DataFrame(np.zeros((rows, 8)))
+    session.sim_file_name = f"{session_id}.csv"
+    session.sim_index = 7
+    return session
+
+
+def test_footprint_and_idle_eviction_keeps_light_state():
+    sessions, prediction, service = _service(idle_ttl=60, memory_budget=0)
+    _load(sessions, "old", 1000).prediction_history.append(_result(0))
+    _load(sessions, "new", 10)
+    sessions.get_ai_session("old").chat_history.append({"role": "user", "content": "hi"})
+    prediction.agents["old"] = 0.0
+    prediction.loaded["old"] = _Agent()
+    sessions._last_access["old"] -= 120  # 閒置 2 分鐘
+
+    report = service.report()
+    old = next(s for s in report["sessions"] if s["session_id"] == "old")
+    assert old["parts"]["sim_df"] >= 1000 * 8 * 8
+    assert old["parts"]["history"] > 0
+    assert old["evictable"] == old["parts"]["sim_df"]
+    assert old["idle_seconds"] >= 120
+
+    evicted = service.sweep()
+    assert [e["session_id"] for e in evicted] == ["old"]
+    assert evicted[0]["bytes"] == old["evictable"]
+    assert "old" not in prediction.agents
+    assert sessions.take_model_target("old") == {"model_target": "job_abc.json"}
+
+    # 只釋放 sim_df；預測歷史、對話紀錄、檔名與模擬位置保留，sim_df 由 /simulator/next 重新讀取
+    kept = sessions.peek_dashboard_session("old")
+    assert kept.sim_df is None
+    assert (kept.sim_file_name, kept.sim_index) == ("old.csv", 7)
+    assert len(kept.prediction_history) == 1
+    assert len(sessions.peek_ai_session("old").chat_history) == 1
+
+    # 已沒有可釋放的狀態，下次掃描不再淘汰
+    assert service.sweep() == []
+
+
+def test_memory_budget_evicts_least_recently_used_first():
+    sessions, _, service = _service(idle_ttl=10_000, min_idle=0)
+    for i, sid in enumerate(["a", "b", "c"]):
+        _load(sessions, sid, 20_000)
+        sessions._last_access[sid] -= 100 * (3 - i)  # a 最久沒用
+    # 預測歷史不釋放，預算只差半個 sim_df
+    evictable = service.footprint("a")["evictable"]
+    service.memory_budget = service.report()["total_bytes"] - evictable // 2
+
+    evicted = service.sweep()
+    assert [e["session_id"] for e in evicted] == ["a"]
+    assert evicted[0]["reason"] == "memory_budget"
+    assert [sid for sid in "abc" if sessions.peek_dashboard_session(sid).sim_df is None] == ["a"]
+
+
+def test_evicted_agent_reloads_previous_target_in_background():
+    sessions = SessionService()
+    prediction = PredictionService()
+    loader = _FakeModelLoadService()
+    prediction.model_load_service = loader
+    prediction.model_target_sources.append(sessions.take_model_target)
+
+    sessions.evict("s1", model={"model_target": "job_abc.json"})
+    agent = prediction.get_agent("s1")
+    # 不同步載入最新模型，先前的目標交給背景載入
+    assert agent.model_generation == 0
+    assert loader.submitted == [("s1", "job_abc.json", agent)]
+    assert prediction.get_agent("s1") is agent
+    assert len(loader.submitted) == 1
+    assert sessions.take_model_target("s1") is None
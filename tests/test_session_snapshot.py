@@ -0,0 +1,117 @@
+import sys
+import os
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.file_service import FileService
+from backend.services.session_service import SessionService
+from backend.services.session_snapshot import SessionSnapshotService
+from tests.test_prediction_history import _result
+
+
+class _Agent:
+    model_generation = 2
+    model_target = "job_abc.json"
+    _model_keys = {"policy": ("policy", "/models/a/policy_bundle", ())}
+
+
+class _FakePredictionService:
+    def __init__(self, agents=None):
+        self.agents = agents or {}
+        self.created = []
+
+    def find_agent(self, session_id):
+        return self.agents.get(session_id)
+
+    def get_agent(self, session_id, auto_load=True):
+        self.created.append((session_id, auto_load))
+        return self.agents.setdefault(session_id, _Agent())
+
+
+class _FakeModelLoadService:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, session_id, model_path, agent, on_swapped=None):
+        self.submitted.append((session_id, model_path))
+
+
+def test_snapshot_restores_history_position_and_prewarms_model(tmp_path):
+    files = FileService(str(tmp_path))
+    sessions = SessionService()
+    service = SessionSnapshotService(sessions, _FakePredictionService({"s1": _Agent()}), files)
+
+    session = sessions.get_dashboard_session("s1")
+    for i in range(7):
+        session.prediction_history.append(_result(i, extra_feat="bg_c" if i == 4 else None))
+    session.sim_file_name = "sim.csv"
+    session.sim_index = 42
+    session.current_model_config = {"goal": "Y", "y_low": 0.5}
+
+    assert service.snapshot_all() == 1
+    assert service.snapshot_all() == 0  # 狀態未變更不重寫
+
+    # --- 模擬重啟 ---
+    restarted = SessionService()
+    prediction = _FakePredictionService()
+    loader = _FakeModelLoadService()
+    fresh = SessionSnapshotService(restarted, prediction, files, loader)
+    assert fresh.scan() == ["s1"]
+    restarted.restorer = fresh.restore_dashboard
+    assert fresh.prewarm() == ["s1"]
+    assert loader.submitted == [("s1", "job_abc.json")]
+    assert prediction.created == [("s1", False)]
+
+    restored = restarted.get_dashboard_session("s1")
+    assert (restored.sim_file_name, restored.sim_index) == ("sim.csv", 42)
+    assert restored.current_model_config == {"goal": "Y", "y_low": 0.5}
+    assert restored.sim_df is None
+    assert restored.prediction_history.to_list() == session.prediction_history.to_list()
+    # 序號延續，重啟前的 cursor 仍可增量查詢
+    assert restored.prediction_history.since(5)["count"] == 2
+    assert fresh.restore_dashboard("s1") is None  # 只還原一次
+
+
+def test_sessions_beyond_prewarm_load_snapshot_model_on_first_access(tmp_path):
+    from backend.services.prediction_service import PredictionService
+    from backend.services.session_eviction import SessionEvictionService
+
+    files = FileService(str(tmp_path))
+    sessions = SessionService()
+    agents = {"s1": _Agent(), "s2": _Agent()}
+    service = SessionSnapshotService(sessions, _FakePredictionService(agents), files)
+    for sid in ("s1", "s2"):
+        sessions.get_dashboard_session(sid).prediction_history.append(_result(0))
+    assert service.snapshot_all() == 2
+
+    # --- 模擬重啟：只預先載入一個 session ---
+    restarted = SessionService()
+    prediction = PredictionService()
+    loader = _FakeModelLoadService()
+    prediction.model_load_service = loader
+    prediction.model_target_sources.append(restarted.take_model_target)
+    fresh = SessionSnapshotService(restarted, prediction, files, loader, prewarm_max=1)
+    fresh.scan()
+    restarted.restorer = fresh.restore_dashboard
+    prediction.model_target_sources.append(fresh.take_model_target)
+    warmed = fresh.prewarm()
+    assert len(warmed) == 1
+    (cold,) = {"s1", "s2"} - set(warmed)
+
+    # 預先載入的 session 尚未存取就被淘汰：回來時仍由快照還原，模型目標改由淘汰記錄提供
+    eviction = SessionEvictionService(restarted, prediction)
+    prediction.find_agent(warmed[0]).model_generation = 1
+    prediction.find_agent(warmed[0]).model_target = "job_abc.json"
+    assert eviction.evict(warmed[0])["evicted"]
+    assert len(restarted.get_dashboard_session(warmed[0]).prediction_history) == 1
+
+    # 未預先載入的 session 第一次建立 Agent 時，快照中的模型目標交給背景載入
+    agent = prediction.get_agent(cold)
+    assert agent.model_generation == 0
+    assert loader.submitted[1:] == [(cold, "job_abc.json")]
+    assert len(restarted.get_dashboard_session(cold).prediction_history) == 1
+    assert fresh.stats()["pending_models"] == []
+
+    prediction.get_agent(warmed[0])
+    assert loader.submitted[2:] == [(warmed[0], "job_abc.json")]
@@ -0,0 +1,85 @@
+import sys
+import os
+import time
+
+import numpy as np
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("xgboost")
+pytest.importorskip("shap")
+
+from backend.models.session_models import DashboardSession
+from backend.services.simulator_readahead import SimulatorReadAheadService
+
+
+def _session(n_rows, bg, actions):
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame(rng.normal(size=(n_rows, len(bg) + len(actions))), columns=bg + actions)
+    df["Y"] = rng.uniform(0.0, 1.0, size=n_rows)
+    df.loc[5, "bg_a"] = np.nan  # 狀態欄位缺值的列不預讀
+    return DashboardSession(
+        sim_df=df, sim_file_name="sim.csv", current_model_config={"goal": "Y"}
+    )
+
+
+def _wait_filled(service, session_id, target):
+    for _ in range(200):
+        if service.stats()["sessions"][session_id]["filled_to"] >= target:
+            return
+        time.sleep(0.01)
+    raise AssertionError("read-ahead did not fill in time")
+
+
+def test_readahead_matches_sequential(make_agent, bg, actions, xgb_model):
+    """預讀結果套用平滑後，應與逐筆依序推理相同"""
+    session = _session(40, bg, actions)
+    service = SimulatorReadAheadService(window=16, chunk_size=8)
+
+    expected_agent = make_agent(xgb_model)
+    agent = make_agent(xgb_model)
+    service.ensure("s", session, agent, 0)
+    _wait_filled(service, "s", 8)
+
+    hits = 0
+    for i, row in session.sim_df.iterrows():
+        y = float(row["Y"])
+        row = row.dropna().to_dict()
+        if i == 5:
+            assert service.take("s", session, agent, i, y) is None
+            continue
+        expected = expected_agent.get_reasoned_advice(row, y)
+        _wait_filled(service, "s", min(i + 1, len(session.sim_df)))
+        precomputed = service.take("s", session, agent, i, y)
+        assert precomputed is not None
+        values, raw, generation = precomputed
+        assert generation == agent.model_generation
+        got = agent.apply_raw(values, [y], raw)[0]
+        hits += 1
+
+        np.testing.assert_allclose(
+            got["iql_action_delta_smoothed"], expected["iql_action_delta_smoothed"], atol=1e-5
+        )
+        assert got["smoothed_top_influencers"] == expected["smoothed_top_influencers"]
+
+    assert service.stats()["hits"] == hits
+
+
+def test_readahead_invalidated_by_model_swap(make_agent, bg, actions, xgb_model):
+    session = _session(20, bg, actions)
+    service = SimulatorReadAheadService(window=16, chunk_size=8)
+    agent = make_agent(xgb_model)
+    service.ensure("s", session, agent, 0)
+    _wait_filled(service, "s", 8)
+
+    agent.swap_model_set(agent.build_model_set(agent.model_target))
+    y = float(session.sim_df["Y"].iloc[0])
+    assert service.take("s", session, agent, 0, y) is None
+
+    # 以新世代重新預讀
+    _wait_filled(service, "s", 9)
+    y1 = float(session.sim_df["Y"].iloc[1])
+    assert service.take("s", session, agent, 1, y1)[2] == agent.model_generation
@@ -0,0 +1,92 @@
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.stream_ingest import StreamIngestor
+from backend.utils import ServiceOverloadedError
+
+
+class _FakePredictionService:
+    """記錄每次批次大小；含 "bad" 欄位的列推理失敗，前 overloads 次回報佇列已滿"""
+
+    def __init__(self, overloads=0):
+        self.batches = []
+        self.overloads = overloads
+
+    async def predict_batch(self, rows, ys, session_id):
+        if self.overloads:
+            self.overloads -= 1
+            raise ServiceOverloadedError("busy")
+        if any("bad" in row for row in rows):
+            raise ValueError("missing state column")
+        self.batches.append(len(rows))
+        await asyncio.sleep(0)
+        return [{"y": y, "x": row["x"]} for row, y in zip(rows, ys)]
+
+
+def _channel(messages):
+    incoming = asyncio.Queue()
+    for m in messages:
+        incoming.put_nowait(m)
+    sent = []
+
+    async def receive_json():
+        m = await incoming.get()
+        if m is None:
+            raise ConnectionError("client closed")
+        return m
+
+    async def send_json(m):
+        sent.append(m)
+
+    return receive_json, send_json, sent
+
+
+@pytest.mark.asyncio
+async def test_rows_are_batched_and_replied_in_order():
+    service = _FakePredictionService(overloads=1)
+    recorded = []
+    ingestor = StreamIngestor("line-1", service, on_results=recorded.extend, max_batch=4)
+
+    messages = [{"rows": [{"id": i, "data": {"x": i}, "measure_value": i} for i in range(6)]}]
+    messages += [{"id": 6, "data": {"x": 6, "bad": 1}}, "not-an-object", None]
+    receive_json, send_json, sent = _channel(messages)
+    await ingestor.run(receive_json, send_json)
+
+    assert [m["id"] for m in sent] == [0, 1, 2, 3, 4, 5, 6, None]
+    assert [m["status"] for m in sent[:6]] == ["ok"] * 6
+    assert sent[3]["result"] == {"y": 3.0, "x": 3}
+    # 失敗的列只影響自己
+    assert sent[6]["status"] == "error" and "missing state column" in sent[6]["error"]
+    assert sent[7]["status"] == "error"
+    assert max(service.batches) <= 4 and sum(service.batches) == 6
+    assert len(recorded) == 6
+
+
+@pytest.mark.asyncio
+async def test_full_queue_stops_reading():
+    gate = asyncio.Event()
+
+    class _SlowService(_FakePredictionService):
+        async def predict_batch(self, rows, ys, session_id):
+            await gate.wait()
+            return await super().predict_batch(rows, ys, session_id)
+
+    ingestor = StreamIngestor("line-1", _SlowService(), max_batch=1, queue_size=2)
+    messages = [{"id": i, "data": {"x": i}} for i in range(10)] + [None]
+    receive_json, send_json, sent = _channel(messages)
+    task = asyncio.create_task(ingestor.run(receive_json, send_json))
+
+    for _ in range(20):
+        await asyncio.sleep(0)
+    # 推理卡住時只讀入 1 筆處理中 + 2 筆排隊 + 1 筆等待放入
+    assert ingestor.received <= 4
+
+    gate.set()
+    await task
+    assert [m["id"] for m in sent] == list(range(10))
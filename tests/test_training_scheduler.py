@@ -0,0 +1,148 @@
+import sys
+import os
+import json
+import threading
+import time
+
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.training_scheduler import TrainingScheduler
+from backend.utils.exceptions import ServiceOverloadedError
+
+
+class _FakeProc:
+    """由測試控制何時結束的子進程"""
+
+    _pids = iter(range(1000, 2000))
+
+    def __init__(self, env):
+        self.pid = next(self._pids)
+        self.env = env
+        self.returncode = None
+        self._done = threading.Event()
+
+    def exit(self, code=0):
+        self.returncode = code
+        self._done.set()
+
+    def terminate(self):
+        self.exit(-15)
+
+    def wait(self):
+        self._done.wait()
+        return self.returncode
+
+
+class _Launcher:
+    def __init__(self):
+        self.procs = {}
+
+    def __call__(self, argv, log_path, env):
+        proc = _FakeProc(env)
+        self.procs[argv[0]] = proc
+        return proc
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "timeout"
+        time.sleep(0.01)
+
+
+def test_concurrency_limit_priority_and_session_quota():
+    launcher = _Launcher()
+    scheduler = TrainingScheduler(
+        max_concurrent=2, session_max_running=1, session_max_queued=2, cpu_threads=8,
+        launcher=launcher,
+    )
+    assert scheduler.submit("a", "s1", ["a"], "a.log")["status"] == "running"
+    assert scheduler.submit("b", "s1", ["b"], "b.log")["status"] == "queued"  # s1 已有一個在跑
+    assert scheduler.submit("c", "s2", ["c"], "c.log")["status"] == "running"
+    assert scheduler.submit("d", "s3", ["d"], "d.log")["queue_position"] == 2
+    assert scheduler.submit("e", "s3", ["e"], "e.log", priority=5)["queue_position"] == 1
+    scheduler.submit("f", "s1", ["f"], "f.log")
+    with pytest.raises(ServiceOverloadedError):
+        scheduler.submit("g", "s1", ["g"], "g.log")  # s1 已有 2 個排隊中
+
+    # 執行緒預算：8 核 / 2 並行
+    assert launcher.procs["a"].env["SIGMA2_TRAIN_THREADS"] == "4"
+    assert launcher.procs["a"].env["OMP_NUM_THREADS"] == "4"
+
+    # c 結束 -> 優先權高的 e 先啟動 (d 同 session 排在後面)
+    launcher.procs["c"].exit(1)
+    _wait_for(lambda: scheduler.get("e")["status"] == "running")
+    assert scheduler.get("c")["status"] == "failed" and scheduler.get("c")["returncode"] == 1
+    assert scheduler.get("d")["status"] == "queued"
+
+    # 取消：排隊中的直接移除，執行中的終止子進程
+    assert scheduler.cancel("d")
+    assert scheduler.get("d")["status"] == "cancelled"
+    assert scheduler.cancel("a")
+    _wait_for(lambda: scheduler.get("a")["status"] == "cancelled")
+    _wait_for(lambda: scheduler.get("b")["status"] == "running")  # s1 的下一個作業接手
+    assert scheduler.counts()["running"] == 2 and scheduler.get("f")["queue_position"] == 1
+
+
+def test_real_subprocess_status_synced_to_job_config(tmp_path):
+    scheduler = TrainingScheduler(max_concurrent=1, cpu_threads=1)
+    script = (
+        "import json, os, sys; p = sys.argv[1]; c = json.load(open(p));"
+        "c['status'] = 'completed' if os.environ['SIGMA2_TRAIN_THREADS'] == '1' else 'x';"
+        "json.dump(c, open(p, 'w'))"
+    )
+    jobs = {}
+    for job_id, code in (("ok", script), ("crash", "import sys; sys.exit(3)")):
+        path = tmp_path / f"{job_id}.json"
+        path.write_text(json.dumps({"job_id": job_id, "status": "queued"}))
+        jobs[job_id] = path
+        scheduler.submit(
+            job_id, "s1", [sys.executable, "-c", code, str(path)], str(tmp_path / f"{job_id}.log"),
+            config_path=str(path),
+        )
+    _wait_for(lambda: scheduler.get("crash")["status"] in ("completed", "failed"), timeout=30)
+
+    ok = json.loads(jobs["ok"].read_text())
+    assert scheduler.get("ok")["status"] == "completed" and ok["status"] == "completed"
+    assert ok["threads"] == 1 and ok["pid"] == scheduler.get("ok")["pid"]
+    crash = json.loads(jobs["crash"].read_text())
+    assert crash["status"] == "failed" and "exit code 3" in crash["error"]
+
+
+def test_jobs_started_before_restart_are_probed_by_pid(tmp_path, monkeypatch):
+    """排程器不認得的訓練作業：子進程仍存活則維持 training，否則標記失敗"""
+    import asyncio
+    import subprocess
+    import backend.dependencies as dependencies
+    from backend.services.analysis_service import AnalysisService
+
+    class _Files:
+        def get_user_path(self, session_id, kind):
+            return str(tmp_path)
+
+    monkeypatch.setattr(dependencies, "get_file_service", lambda: _Files())
+    live = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    try:
+        for job_id, status, pid in (
+            ("live", "training", live.pid),
+            ("dead", "training", dead.pid),
+            ("lost", "queued", None),
+        ):
+            (tmp_path / f"{job_id}.json").write_text(
+                json.dumps({"job_id": job_id, "status": status, "pid": pid})
+            )
+        service = AnalysisService(scheduler=TrainingScheduler(launcher=_Launcher()))
+        models = {m["job_id"]: m for m in asyncio.run(service.list_models("s1"))}
+    finally:
+        live.kill()
+        live.wait()
+
+    assert models["live"]["status"] == "training"
+    assert models["dead"]["status"] == "failed" and models["lost"]["status"] == "failed"
+    assert json.loads((tmp_path / "dead.json").read_text())["status"] == "failed"
+    assert sorted(os.listdir(tmp_path)) == ["dead.json", "live.json", "lost.json"]
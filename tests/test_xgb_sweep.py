@@ -0,0 +1,104 @@
+import sys
+import os
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_logic import xgb_sweep
+from engines import engine_prediction
+
+
+def test_expand_space_grid_and_random():
+    space = {"max_depth": [3, 5], "learning_rate": [0.1, 0.2, 0.3]}
+    grid = xgb_sweep.expand_space({"mode": "grid", "space": space})
+    assert len(grid) == 6 and {"max_depth": 5, "learning_rate": 0.3} in grid
+    sampled = xgb_sweep.expand_space({"mode": "grid", "space": space, "budget": 4})
+    assert len(sampled) == 4 and all(c in grid for c in sampled)
+
+    sweep = {
+        "mode": "random",
+        "budget": 20,
+        "seed": 7,
+        "space": {
+            "max_depth": {"low": 2, "high": 8, "int": True},
+            "learning_rate": {"low": 0.01, "high": 0.3, "log": True},
+            "subsample": [0.6, 0.8],
+        },
+    }
+    random_candidates = xgb_sweep.expand_space(sweep)
+    assert random_candidates == xgb_sweep.expand_space(sweep)  # 固定種子可重現
+    assert all(isinstance(c["max_depth"], int) for c in random_candidates)
+    assert all(2 <= c["max_depth"] <= 8 for c in random_candidates)
+    assert all(0.01 <= c["learning_rate"] <= 0.3 for c in random_candidates)
+
+    with pytest.raises(ValueError):
+        xgb_sweep.expand_space({"mode": "random", "space": {"max_depth": [3]}})
+    assert xgb_sweep.plan_workers(n_trials=3, total_threads=8) == (3, 2)
+    assert xgb_sweep.plan_workers(n_trials=10, total_threads=4, workers=2) == (2, 2)
+
+
+def test_sweep_job_streams_trials_and_saves_best_model(tmp_path, monkeypatch):
+    monkeypatch.setenv("SIGMA2_TRAIN_THREADS", "2")
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4))
+    df = pd.DataFrame(X, columns=["f0", "f1", "f2", "f3"])
+    df["Y"] = 2 * X[:, 0] - X[:, 1] ** 2 + rng.normal(0, 0.1, 300)
+    data_path = tmp_path / "data.csv"
+    df.to_csv(data_path, index=False)
+
+    job_path = tmp_path / "job.json"
+    job_path.write_text(
+        json.dumps(
+            {
+                "data_full_path": str(data_path),
+                "goal": "Y",
+                "features": ["f0", "f1", "f2", "f3"],
+                "common": {"n_estimators": 30},
+                "bundles_dir": str(tmp_path / "bundles"),
+                "sweep": {
+                    "mode": "grid",
+                    "space": {
+                        "max_depth": [1, 4],
+                        "learning_rate": [0.3],
+                        "n_estimators": [25],
+                        "subsample": [2.0, 1.0],
+                    },
+                },
+            }
+        )
+    )
+    streamed = []
+    original = json.dump
+
+    def spy(obj, f, **kwargs):
+        if isinstance(obj, dict) and "sweep_trials" in obj and obj.get("status") != "completed":
+            streamed.append(len(obj["sweep_trials"]))
+        return original(obj, f, **kwargs)
+
+    monkeypatch.setattr(engine_prediction.json, "dump", spy)
+    result = engine_prediction.run_from_json(str(job_path))
+
+    job = json.loads(job_path.read_text())
+    assert streamed == [1, 2, 3, 4]  # 每個 trial 完成即寫回
+    assert job["status"] == "completed" and len(job["sweep_trials"]) == 4
+    # subsample=2.0 不合法：該 trial 記錄錯誤，不中斷搜尋
+    assert sum(1 for t in job["sweep_trials"] if t.get("error")) == 2
+    ok = [t for t in job["sweep_trials"] if not t.get("error")]
+    assert job["best_params"]["max_depth"] == 4 and job["r2"] == max(t["r2"] for t in ok)
+    # 搜尋空間中覆寫的 n_estimators 保留在 trial 紀錄與最佳參數中
+    assert job["best_params"]["n_estimators"] == 25
+    assert all(t["params"]["n_estimators"] == 25 for t in job["sweep_trials"])
+    assert os.path.exists(result["model_path"]) and not os.path.exists(
+        os.path.join(result["run_path"], "_sweep")
+    )
+
+    import xgboost as xgb
+
+    model = xgb.XGBRegressor()
+    model.load_model(result["model_path"])
+    assert model.get_booster().num_features() == 4